@@ -0,0 +1,55 @@
+import math
+import os
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read(path: str) -> str | None:
+    """Stripped contents of `path`, or None if it cannot be read (no cgroup filesystem, e.g. outside a container)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_quota() -> float | None:
+    """
+    Read the container's CPU limit from the cgroup filesystem.
+    A Kubernetes `resources.limits.cpu: 500m` shows up here as `0.5`.
+
+    Returns:
+        float | None: The CPU quota in cores, or None if the container is not CPU limited.
+    """
+    cpu_max = _read(CGROUP_V2_CPU_MAX)  # cgroup v2: "<quota> <period>" or "max <period>"
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    quota_us, period_us = _read(CGROUP_V1_CPU_QUOTA), _read(CGROUP_V1_CPU_PERIOD)  # cgroup v1: quota is -1 when unlimited
+    if quota_us and period_us and int(quota_us) > 0:
+        return int(quota_us) / int(period_us)
+    return None
+
+
+def available_cpus() -> int:
+    """
+    Number of CPUs this process can actually use: the cgroup quota rounded up,
+    bounded by the CPUs the process is allowed to run on. Always at least 1.
+
+    Returns:
+        int: The usable CPU count.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS / Windows
+        cpus = os.cpu_count() or 1
+
+    quota = cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
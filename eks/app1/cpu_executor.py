@@ -0,0 +1,123 @@
+import asyncio
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from prometheus_client import Counter, Histogram
+
+from .cgroup import available_cpus
+from .metrics import get_or_create
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CPU_EXECUTOR_QUEUE_WAIT = get_or_create(
+    Histogram, "cpu_executor_queue_wait_seconds", "Time CPU-bound jobs waited for a free worker", buckets=_BUCKETS
+)
+CPU_EXECUTOR_EXECUTION = get_or_create(
+    Histogram, "cpu_executor_execution_seconds", "Time CPU-bound jobs spent executing", buckets=_BUCKETS
+)
+CPU_EXECUTOR_REJECTED = get_or_create(
+    Counter, "cpu_executor_rejected", "CPU-bound jobs rejected because the executor queue was full"
+)
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when the executor already holds `max_workers + max_queue` jobs."""
+
+
+def _timed_call(fn: Callable, args: tuple) -> tuple[Any, float, float]:
+    """Run `fn(*args)` inside the worker and return the result with its start/end monotonic timestamps."""
+    started = time.monotonic()  # CLOCK_MONOTONIC is system-wide, so comparable across worker processes
+    result = fn(*args)
+    return result, started, time.monotonic()
+
+
+class CpuExecutor:
+    """
+    Runs CPU-bound functions off the event loop with a bounded queue.
+
+    Modes:
+        - `inline`: call the function directly on the calling thread (blocks the event loop, for debugging)
+        - `thread`: a `ThreadPoolExecutor` - still bound by the GIL for pure-Python work
+        - `process`: a `ProcessPoolExecutor` - real parallelism, the event loop stays free
+
+    Attributes:
+        mode (str): One of `EXECUTOR_MODES`.
+        max_workers (int): Worker count, `0` sizes the pool to the container's CPU quota.
+        max_queue (int): Jobs allowed to wait for a worker before new jobs are rejected.
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: int = 0, max_queue: int = 8) -> None:
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"CPU executor mode must be one of {EXECUTOR_MODES}, got {mode!r}")
+        self.mode = mode
+        self.max_workers = max_workers or available_cpus()
+        self.max_queue = max_queue
+        self._pending = 0  # only touched from the event loop thread
+        self._executor: Executor | None = None
+        if mode == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cpu-executor")
+        elif mode == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs currently queued or running."""
+        return self._pending
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of jobs held at once (running + queued)."""
+        return self.max_workers + self.max_queue
+
+    def _release(self, _: Future) -> None:
+        """Free the slot held by a finished job. Must run on the event loop."""
+        self._pending -= 1
+
+    def _release_from_worker(self, loop: asyncio.AbstractEventLoop) -> Callable[[Future], None]:
+        """Done-callback that hands `_release` back to `loop` from the worker thread or process manager."""
+        def callback(future: Future) -> None:
+            """Schedule `_release` on the loop that submitted `future`."""
+            try:
+                loop.call_soon_threadsafe(self._release, future)
+            except RuntimeError:  # event loop already closed during shutdown
+                pass
+
+        return callback
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """
+        Run `fn(*args)` according to the executor mode and record queue-wait / execution time.
+        Capacity is released when the job actually finishes, even if the awaiting request was cancelled.
+
+        Args:
+            fn (Callable): A module-level (picklable) function.
+            *args: Positional arguments for `fn`.
+        Raises:
+            ExecutorSaturatedError: If `capacity` jobs are already queued or running.
+        Returns:
+            Any: The return value of `fn`.
+        """
+        if self._pending >= self.capacity:
+            CPU_EXECUTOR_REJECTED.inc()
+            raise ExecutorSaturatedError(f"{self._pending} CPU-bound jobs in flight (capacity {self.capacity})")
+
+        submitted = time.monotonic()
+        if self._executor is None:
+            result, started, finished = _timed_call(fn, args)
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._executor.submit(_timed_call, fn, args)  # may raise (broken pool, shut down): nothing to release
+            self._pending += 1  # the release is scheduled on this loop, so it can't run before this line
+            future.add_done_callback(self._release_from_worker(loop))
+            result, started, finished = await asyncio.wrap_future(future)
+
+        CPU_EXECUTOR_QUEUE_WAIT.observe(max(0.0, started - submitted))
+        CPU_EXECUTOR_EXECUTION.observe(finished - started)
+        return result
+
+    def shutdown(self) -> None:
+        """Stop the worker pool, dropping jobs that have not started yet."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
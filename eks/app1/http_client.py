@@ -0,0 +1,65 @@
+import importlib.util
+
+import httpx
+
+from .logging_config import logger
+from .rpc_client import RpcTransport
+
+
+def build_app2_client(
+    max_connections: int,
+    max_keepalive_connections: int,
+    keepalive_expiry: float,
+    connect_timeout: float,
+    read_timeout: float,
+    pool_timeout: float,
+    http2: bool = False,
+    rpc_url: str = "",
+    rpc_connections: int = 2,
+    rpc_retry_seconds: float = 5.0,
+) -> httpx.AsyncClient:
+    """
+    Build the long-lived, pooled `httpx.AsyncClient` used for every app1 -> app2 call.
+    One client per process keeps TCP connections alive between requests instead of paying
+    a new connect (and burning an ephemeral port) on every call.
+
+    Args:
+        max_connections (int): Maximum number of concurrent connections to app2.
+        max_keepalive_connections (int): Maximum number of idle connections kept in the pool.
+        keepalive_expiry (float): Seconds an idle connection is kept before being closed.
+        connect_timeout (float): Seconds to wait for a TCP connection to be established.
+        read_timeout (float): Seconds to wait for response data (also used for writes).
+        pool_timeout (float): Seconds to wait for a free connection from the pool.
+        http2 (bool, optional): Enable HTTP/2 if the `h2` package is installed. Defaults to False.
+        rpc_url (str, optional): `tcp://<host>:<port>` of app2's RPC server: requests are sent as msgpack frames
+            multiplexed over `rpc_connections` persistent connections (see `rpc_client.py`), over HTTP while it is
+            unreachable (retried every `rpc_retry_seconds`) and for paths it has no route for. Defaults to "" (HTTP only).
+        rpc_connections (int, optional): Connections to the RPC server. Defaults to 2.
+        rpc_retry_seconds (float, optional): Time on HTTP after the RPC server could not be reached. Defaults to 5.
+    Returns:
+        httpx.AsyncClient: The pooled client, to be closed on application shutdown.
+    """
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("APP2_HTTP2 requested but `h2` is not installed, falling back to HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    timeout = httpx.Timeout(connect=connect_timeout, read=read_timeout, write=read_timeout, pool=pool_timeout)
+
+    if rpc_url:
+        url = httpx.URL(rpc_url)
+        transport = RpcTransport(
+            url.host,
+            url.port or 9000,
+            fallback=httpx.AsyncHTTPTransport(limits=limits, http2=http2),
+            connections=rpc_connections,
+            retry_seconds=rpc_retry_seconds,
+        )
+        return httpx.AsyncClient(timeout=timeout, transport=transport)
+
+    # * HTTP/2 is only negotiated via ALPN over TLS - plain `http://` upstreams stay on HTTP/1.1
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
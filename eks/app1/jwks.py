@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import jwt
+from prometheus_client import Counter
+
+from .logging_config import logger
+from .metrics import get_or_create
+
+# * algorithms accepted from the JWKS - never a symmetric (`oct`) key, that would let anyone holding it mint tokens
+ASYMMETRIC_ALGORITHMS = ("EdDSA", "RS256", "ES256")
+
+JWKS_REFRESHES = get_or_create(Counter, "jwks_refreshes", "JWKS fetches from the auth service", labelnames=["result"])
+JWKS_UNKNOWN_KID = get_or_create(
+    Counter, "jwks_unknown_kid", "Tokens rejected because their `kid` was not in the cached JWKS"
+)
+
+
+class JwksCache:
+    """
+    In-memory copy of auth's JWK Set, keyed by `kid`.
+
+    Verification only reads the in-memory dict (`get`), it never waits on the network:
+    the set is fetched on startup, refreshed every `refresh_interval_seconds` by a background task,
+    and an unknown `kid` (e.g. right after auth rotated its key) wakes that task early,
+    at most once per `min_refetch_interval_seconds`.
+
+    Attributes:
+        url (str): The JWKS URL, e.g. `http://auth-service/.well-known/jwks.json`.
+        refresh_interval_seconds (float): How often the set is refetched.
+        min_refetch_interval_seconds (float): Minimum time between refetches triggered by unknown `kid`s.
+        timeout_seconds (float): Timeout of a single fetch.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        refresh_interval_seconds: float = 300.0,
+        min_refetch_interval_seconds: float = 30.0,
+        timeout_seconds: float = 2.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.url = url
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.min_refetch_interval_seconds = min_refetch_interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self._transport = transport  # lets tests serve the JWKS from an in-process auth stand-in
+        self._keys: dict[str, jwt.PyJWK] = {}  # replaced as a whole, so readers never see a partial set
+        self._lock = threading.Lock()  # `verify_jwt` is sync, so `get` runs in the threadpool
+        self._last_refetch_request = float("-inf")
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._client: httpx.AsyncClient | None = None
+
+    def __len__(self) -> int:
+        """Number of cached signing keys."""
+        return len(self._keys)
+
+    def keys(self) -> list[jwt.PyJWK]:
+        """Return the cached keys."""
+        return list(self._keys.values())
+
+    def get(self, kid: str | None) -> jwt.PyJWK | None:
+        """
+        Return the cached key for `kid`, or None (and schedule a rate-limited refetch) if it is unknown.
+        Args:
+            kid (str | None): The `kid` from the token's JOSE header.
+        Returns:
+            jwt.PyJWK | None: The verification key.
+        """
+        key = self._keys.get(kid) if kid else None
+        if key is None:
+            JWKS_UNKNOWN_KID.inc()
+            self.request_refetch()
+        return key
+
+    def request_refetch(self) -> bool:
+        """
+        Wake the background task to refetch the JWKS now, unless that already happened within
+        `min_refetch_interval_seconds`. Safe to call from any thread.
+
+        Returns:
+            bool: True if a refetch was scheduled.
+        """
+        now = time.monotonic()
+        with self._lock:
+            loop, wake = self._loop, self._wake
+            if loop is None or wake is None or now - self._last_refetch_request < self.min_refetch_interval_seconds:
+                return False
+            self._last_refetch_request = now
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:  # event loop already closed during shutdown
+            return False
+        return True
+
+    async def refresh(self) -> bool:
+        """
+        Fetch the JWKS and replace the cached keys. Keys that are unusable or not asymmetric are skipped.
+        On failure the previous keys are kept.
+
+        Returns:
+            bool: True if the set was fetched.
+        """
+        if self._client is None:
+            raise RuntimeError("JwksCache.start() was not called")
+        try:
+            response = await self._client.get(self.url)
+            response.raise_for_status()
+            jwks = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            JWKS_REFRESHES.labels(result="error").inc()
+            logger.warning(f"JWKS fetch from {self.url} failed: {e!r}")
+            return False
+
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            try:
+                key = jwt.PyJWK(jwk)
+            except jwt.PyJWKError as e:
+                logger.warning(f"skipping unusable JWK {jwk.get('kid')}: {e}")
+                continue
+            if key.key_id and key.algorithm_name in ASYMMETRIC_ALGORITHMS:
+                keys[key.key_id] = key
+        self._keys = keys
+        JWKS_REFRESHES.labels(result="ok").inc()
+        return True
+
+    async def _run(self, wake: asyncio.Event) -> None:
+        """Refresh every `refresh_interval_seconds`, or early when `wake` is set by a rate-limited refetch."""
+        while True:
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=self.refresh_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+            await self.refresh()
+
+    async def start(self) -> None:
+        """Fetch the JWKS once and start the background refresh task (called from the app's lifespan)."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = wake = asyncio.Event()
+        self._client = httpx.AsyncClient(timeout=self.timeout_seconds, transport=self._transport)
+        await self.refresh()  # startup, not the request path - if auth is not up yet the background task retries
+        self._task = asyncio.create_task(self._run(wake))
+
+    async def stop(self) -> None:
+        """Stop the background task and close the HTTP client."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._client is not None:
+            await self._client.aclose()
+        self._loop = None
@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from prometheus_client import Counter
+
+from .metrics import get_or_create
+
+JWT_CACHE_HITS = get_or_create(Counter, "jwt_cache_hits", "Verified JWT payloads served from the cache")
+JWT_CACHE_MISSES = get_or_create(Counter, "jwt_cache_misses", "JWT lookups that required a full decode and verification")
+JWT_CACHE_EVICTIONS = get_or_create(Counter, "jwt_cache_evictions", "Cached JWT payloads evicted because the cache was full")
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of already verified JWT payloads.
+    Keys are SHA-256 digests of the raw token (the token itself is never stored) and every entry expires
+    at the token's `exp` claim, or after `max_ttl_seconds` if that comes first / the claim is missing.
+    Only tokens that passed `jwt.decode` are stored, so a hit is equivalent to a cold decode.
+
+    Attributes:
+        max_entries (int): Maximum number of cached payloads, `0` disables the cache.
+        max_ttl_seconds (float): Upper bound on how long any payload is cached.
+    """
+
+    def __init__(self, max_entries: int, max_ttl_seconds: float, clock: Callable[[], float] = time.time) -> None:
+        self.max_entries = max_entries
+        self.max_ttl_seconds = max_ttl_seconds
+        self._clock = clock  # wall clock, `exp` is a unix timestamp
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()  # `verify_jwt` is sync, so it runs in the threadpool
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        """SHA-256 digest of `token`, so raw tokens are never kept in memory as keys."""
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        """
+        Return a copy of the cached payload for `token`, or None if it is not cached or has expired.
+        Args:
+            token (str): The raw encoded JWT.
+        Returns:
+            dict | None: The decoded payload if cached and still valid.
+        """
+        if not self.max_entries:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if self._clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    JWT_CACHE_HITS.inc()
+                    return dict(payload)  # callers may mutate the payload, never hand out the cached one
+                del self._entries[key]
+        JWT_CACHE_MISSES.inc()
+        return None
+
+    def put(self, token: str, payload: dict) -> None:
+        """
+        Cache the verified `payload` for `token` until its `exp` claim (bounded by `max_ttl_seconds`).
+        Args:
+            token (str): The raw encoded JWT that was verified.
+            payload (dict): The payload returned by `jwt.decode`.
+        """
+        if not self.max_entries:
+            return
+        now = self._clock()
+        expires_at = now + self.max_ttl_seconds
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= now:
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(payload))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                JWT_CACHE_EVICTIONS.inc()
+
+    def clear(self) -> None:
+        """Drop every cached payload."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Number of cached entries, including any not yet evicted after expiry."""
+        return len(self._entries)
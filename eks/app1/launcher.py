@@ -0,0 +1,87 @@
+# * container entry point: `python -m <service>.launcher` (identical in every service, app path comes from the package)
+# * picks the uvicorn worker count from the container's CPU quota, uses uvloop/httptools when installed
+# * and switches Prometheus to multiprocess collection when more than one worker is started
+import glob
+import importlib.util
+import os
+import tempfile
+
+import uvicorn
+
+from .cgroup import available_cpus
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")  # nosec B104 - listens on all interfaces inside the pod
+SERVER_PORT = int(os.getenv("SERVER_PORT", 80))
+SERVER_WORKERS = os.getenv("SERVER_WORKERS", "1")  # an integer or `auto` (one worker per CPU in the cgroup quota)
+SERVER_LOOP = os.getenv("SERVER_LOOP", "auto")  # auto | uvloop | asyncio
+SERVER_HTTP = os.getenv("SERVER_HTTP", "auto")  # auto | httptools | h11
+SERVER_KEEPALIVE_SECONDS = int(os.getenv("SERVER_KEEPALIVE_SECONDS", 5))
+
+
+def resolve_workers(value: str) -> int:
+    """
+    Turn the `SERVER_WORKERS` setting into a worker count.
+    Args:
+        value (str): An integer, or `auto` to use one worker per CPU available to the container.
+    Returns:
+        int: The number of uvicorn worker processes, at least 1.
+    """
+    if value.strip().lower() in ("", "auto"):
+        return available_cpus()
+    return max(1, int(value))
+
+
+def resolve_loop(value: str) -> str:
+    """Return `uvloop` when requested or when `auto` and installed, otherwise `asyncio`."""
+    if value == "auto":
+        return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    return value
+
+
+def resolve_http(value: str) -> str:
+    """Return `httptools` when requested or when `auto` and installed, otherwise `h11`."""
+    if value == "auto":
+        return "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return value
+
+
+def prepare_multiprocess_metrics(workers: int) -> str | None:
+    """
+    With more than one worker every process keeps its own metric values, so `/metrics` would only show
+    whichever worker answered the scrape. Point `prometheus_client` at a shared directory (before any
+    worker imports it) so the Instrumentator aggregates all workers, and clear files left by a previous run.
+
+    Args:
+        workers (int): The number of worker processes that will be started.
+    Returns:
+        str | None: The multiprocess directory, or None when running a single worker.
+    """
+    if workers <= 1:
+        return None
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="prometheus-multiproc-")
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+
+def main() -> None:
+    """Start uvicorn for `<package>.main:app` with the resolved settings."""
+    workers = resolve_workers(SERVER_WORKERS)
+    os.environ["SERVER_WORKERS"] = str(workers)  # lets the app size its own pools per worker
+    prepare_multiprocess_metrics(workers)
+
+    uvicorn.run(
+        f"{__package__}.main:app",
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        workers=workers,
+        loop=resolve_loop(SERVER_LOOP),
+        http=resolve_http(SERVER_HTTP),
+        timeout_keep_alive=SERVER_KEEPALIVE_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,219 @@
+import asyncio
+import json
 import os
-from typing import Any, Callable
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 
 import httpx
 import jwt
-from fastapi import Depends, FastAPI, HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
 from jwt import ExpiredSignatureError, InvalidTokenError
+from jwt.utils import base64url_encode
 from prometheus_fastapi_instrumentator import Instrumentator
-from pydantic import BaseModel
-
-from .logging_config import logger
-from .middleware import add_cors_middleware
+from pydantic import BaseModel, ValidationError, field_validator
+
+from .cgroup import available_cpus
+from .concurrency import add_concurrency_limit_middleware
+from .cpu_executor import CpuExecutor, ExecutorSaturatedError
+from .health import HealthMonitor, add_health_endpoints
+from .http_client import build_app2_client
+from .instrumentation import Span
+from .jwks import ASYMMETRIC_ALGORITHMS, JwksCache
+from .jwt_cache import VerifiedTokenCache
+from .middleware import add_cors_middleware, add_request_logging_middleware
+from .profiler import SamplingProfiler, add_profiler_endpoints
+from .ratelimit import RateLimiter, route_path
+from .resilience import (
+    DEADLINE_HEADER,
+    CircuitBreaker,
+    CircuitOpenError,
+    Deadline,
+    DeadlineExceededError,
+    RetryBudget,
+    Upstream,
+)
+from .response_cache import ResponseCache
+from .responses import FastJSONResponse, RawJSON, add_compression_middleware, dumps
+from .revocation import TOKENS_REJECTED_REVOKED, RevocationList
+from .rpc import RPC_CONTENT_TYPE, unpack_body
+from .warmup import Warmup
+from .workloads import WORKLOAD_ADMINS, WorkloadEngine, WorkloadLimitError, WorkloadProfile
 
 if os.getenv("ENV", "development") != "production":
-    from dotenv import load_dotenv
+    try:
+        from dotenv import load_dotenv  # dev-only dependency, not installed in the image
+    except ImportError:
+        pass
+    else:
+        load_dotenv()
 
-    load_dotenv()
+APP2_URL = os.getenv("APP2_URL", "http://fastapi-app2-service")
+# * connection pool settings for the shared app2 client (see `http_client.py`)
+APP2_MAX_CONNECTIONS = int(os.getenv("APP2_MAX_CONNECTIONS", 100))
+APP2_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("APP2_MAX_KEEPALIVE_CONNECTIONS", 20))
+# * keep below app2's uvicorn `--timeout-keep-alive` (5s) so idle connections are never reused after the server closed them
+APP2_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("APP2_KEEPALIVE_EXPIRY_SECONDS", 4.0))
+APP2_CONNECT_TIMEOUT_SECONDS = float(os.getenv("APP2_CONNECT_TIMEOUT_SECONDS", 2.0))
+APP2_READ_TIMEOUT_SECONDS = float(os.getenv("APP2_READ_TIMEOUT_SECONDS", 5.0))
+APP2_POOL_TIMEOUT_SECONDS = float(os.getenv("APP2_POOL_TIMEOUT_SECONDS", 2.0))
+APP2_HTTP2 = os.getenv("APP2_HTTP2", "false").lower() == "true"
+# * `tcp://<host>:<port>` of app2's msgpack RPC port (see `rpc.py`), HTTP to `APP2_URL` stays the fallback, "" = HTTP only
+APP2_RPC_URL = os.getenv("APP2_RPC_URL", "")
+APP2_RPC_CONNECTIONS = int(os.getenv("APP2_RPC_CONNECTIONS", 2))  # calls are multiplexed, a few connections are enough
+APP2_RPC_RETRY_SECONDS = float(os.getenv("APP2_RPC_RETRY_SECONDS", 5.0))  # on HTTP this long after a failed connect
+# * short-TTL cache of app2's response shared by every `/read_app2` caller (see `response_cache.py`)
+APP2_CACHE_TTL_SECONDS = float(os.getenv("APP2_CACHE_TTL_SECONDS", 1.0))  # `0` = no caching, only coalescing
+APP2_CACHE_MAX_ENTRIES = int(os.getenv("APP2_CACHE_MAX_ENTRIES", 128))
+APP2_CACHE_STALE_WHILE_REVALIDATE_SECONDS = float(os.getenv("APP2_CACHE_STALE_WHILE_REVALIDATE_SECONDS", 5.0))
+APP2_CACHE_STALE_IF_ERROR_SECONDS = float(os.getenv("APP2_CACHE_STALE_IF_ERROR_SECONDS", 60.0))
+# * `/read_app2/batch`: sub-requests accepted per batch and how many of them are in flight to app2 at once
+APP2_BATCH_MAX_ITEMS = int(os.getenv("APP2_BATCH_MAX_ITEMS", 100))
+APP2_BATCH_CONCURRENCY = int(os.getenv("APP2_BATCH_CONCURRENCY", 10))
+# * resilience of app1 -> app2 calls (see `resilience.py`)
+APP2_BREAKER_FAILURE_THRESHOLD = int(os.getenv("APP2_BREAKER_FAILURE_THRESHOLD", 5))  # consecutive failures
+APP2_BREAKER_RECOVERY_SECONDS = float(os.getenv("APP2_BREAKER_RECOVERY_SECONDS", 5.0))  # open time before a probe call
+APP2_MAX_ATTEMPTS = int(os.getenv("APP2_MAX_ATTEMPTS", 2))  # first attempt + retries on 5xx, timeouts and connection errors
+# * retries + hedges allowed as a fraction of app2 requests over the last 10s, plus a small floor
+APP2_RETRY_BUDGET_RATIO = float(os.getenv("APP2_RETRY_BUDGET_RATIO", 0.1))
+APP2_RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("APP2_RETRY_BUDGET_MIN_PER_SECOND", 1.0))
+APP2_HEDGE = os.getenv("APP2_HEDGE", "false").lower() == "true"  # resend slow requests after the observed p95
+APP2_HEDGE_QUANTILE = float(os.getenv("APP2_HEDGE_QUANTILE", 0.95))
+APP2_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("APP2_HEDGE_MIN_DELAY_SECONDS", 0.01))
+# * deadline of a request without an `X-Request-Deadline-Ms` header, and the upper bound for one with it
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", 10.0))
+
+ALGORITHM = os.environ.get("ALGORITHM", "HS256")
+# * only needed for HS256 - with EdDSA/RS256/ES256 tokens are verified with auth's public keys (see `jwks.py`)
+SECRET_KEY = os.environ.get("SECRET_KEY", "")
+if ALGORITHM not in ASYMMETRIC_ALGORITHMS and not SECRET_KEY:
+    raise ValueError("SECRET_KEY environment variable is not set")
+# * verify with `kubectl get svc` in the `auth` namespace
+AUTH_SERVICE_URL = os.environ.get("AUTH_SERVICE_URL", "http://fastapi-auth-service:80")
+JWKS_REFRESH_INTERVAL_SECONDS = float(os.getenv("JWKS_REFRESH_INTERVAL_SECONDS", 300))
+# * an unknown `kid` triggers an early refetch at most this often
+JWKS_MIN_REFETCH_INTERVAL_SECONDS = float(os.getenv("JWKS_MIN_REFETCH_INTERVAL_SECONDS", 30))
+JWKS_FETCH_TIMEOUT_SECONDS = float(os.getenv("JWKS_FETCH_TIMEOUT_SECONDS", 2.0))
+# * verified-token cache used by `verify_jwt` (`0` entries disables it)
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", 10_000))
+JWT_CACHE_MAX_TTL_SECONDS = float(os.getenv("JWT_CACHE_MAX_TTL_SECONDS", 300))
+# * follow auth's revocation feed (`/revocations`) so logged-out/revoked tokens are rejected (see `revocation.py`)
+REVOCATION_SYNC_ENABLED = os.getenv("REVOCATION_SYNC_ENABLED", "false").lower() == "true"
+REVOCATION_SYNC_INTERVAL_SECONDS = float(os.getenv("REVOCATION_SYNC_INTERVAL_SECONDS", 5))  # max delay of a revocation
+REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", 10_000))  # grows when exceeded
+REVOCATION_FILTER_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", 0.001))
+
+# * where CPU-bound handlers (`/burn`) run: `inline`, `thread` or `process` (see `cpu_executor.py`)
+CPU_EXECUTOR_MODE = os.getenv("CPU_EXECUTOR_MODE", "thread")
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", 0))  # `0` = share the container's CPU quota between workers
+if not CPU_EXECUTOR_WORKERS:
+    # * `SERVER_WORKERS` is set by `launcher.py`, don't oversubscribe the CPUs with one full pool per uvicorn worker
+    _server_workers = os.getenv("SERVER_WORKERS", "1")
+    CPU_EXECUTOR_WORKERS = max(1, available_cpus() // (int(_server_workers) if _server_workers.isdigit() else 1))
+CPU_EXECUTOR_MAX_QUEUE = int(os.getenv("CPU_EXECUTOR_MAX_QUEUE", 8))
+# * `/readyz` reports not ready once this many `/burn` jobs wait for a CPU worker (default: when they start being rejected)
+READY_MAX_EXECUTOR_QUEUE = int(os.getenv("READY_MAX_EXECUTOR_QUEUE", CPU_EXECUTOR_MAX_QUEUE))
+# * keep-alive connections to app2 opened at startup (see `warmup.py`), `0` leaves the pool empty until the first request
+WARMUP_APP2_CONNECTIONS = int(os.getenv("WARMUP_APP2_CONNECTIONS", 0))
+
+HEALTH = HealthMonitor()
+PROFILER = SamplingProfiler()  # admin-only `/debug/profile` when `PROFILER_ENABLED`
+WARMUP = Warmup()  # steps added below, run before the worker serves its first request
+RATE_LIMITER = RateLimiter()  # per-subject quotas (`RATE_LIMIT_RULES`) when `RATE_LIMIT_ENABLED`
+WORKLOADS = WorkloadEngine()  # synthetic `/workload` profiles (`WORKLOAD_PROFILES`) when `WORKLOAD_ENABLED`
+# * hot-path timings on `/metrics` as `span_duration_seconds{span=...}` (`verify_jwt` is timed by its decorator)
+APP2_CALL_SPAN = Span("app2_call")
+BURN_CPU_SPAN = Span("burn_cpu")
+JWT_CACHE = VerifiedTokenCache(max_entries=JWT_CACHE_MAX_ENTRIES, max_ttl_seconds=JWT_CACHE_MAX_TTL_SECONDS)
+JWKS = JwksCache(
+    url=AUTH_SERVICE_URL.rstrip("/") + "/.well-known/jwks.json",
+    refresh_interval_seconds=JWKS_REFRESH_INTERVAL_SECONDS,
+    min_refetch_interval_seconds=JWKS_MIN_REFETCH_INTERVAL_SECONDS,
+    timeout_seconds=JWKS_FETCH_TIMEOUT_SECONDS,
+)
+REVOCATIONS = RevocationList(
+    url=AUTH_SERVICE_URL.rstrip("/") + "/revocations",
+    sync_interval_seconds=REVOCATION_SYNC_INTERVAL_SECONDS,
+    timeout_seconds=JWKS_FETCH_TIMEOUT_SECONDS,
+    capacity=REVOCATION_FILTER_CAPACITY,
+    error_rate=REVOCATION_FILTER_ERROR_RATE,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Manage resources that live for the whole lifetime of the application.
+    Creates the pooled app2 client with its resilience policy, the app2 response cache and the CPU executor on startup
+    (and loads auth's JWKS when tokens are asymmetrically signed, and auth's revocations when enabled), warms them up,
+    starts sampling the event-loop lag reported by `/readyz` and the profiler's background mode,
+    and releases them on shutdown.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+    """
+    app.state.app2_client = build_app2_client(
+        max_connections=APP2_MAX_CONNECTIONS,
+        max_keepalive_connections=APP2_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=APP2_KEEPALIVE_EXPIRY_SECONDS,
+        connect_timeout=APP2_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=APP2_READ_TIMEOUT_SECONDS,
+        pool_timeout=APP2_POOL_TIMEOUT_SECONDS,
+        http2=APP2_HTTP2,
+        rpc_url=APP2_RPC_URL,
+        rpc_connections=APP2_RPC_CONNECTIONS,
+        rpc_retry_seconds=APP2_RPC_RETRY_SECONDS,
+    )
+    app.state.app2_upstream = Upstream(
+        "app2",
+        breaker=CircuitBreaker(
+            "app2", failure_threshold=APP2_BREAKER_FAILURE_THRESHOLD, recovery_seconds=APP2_BREAKER_RECOVERY_SECONDS
+        ),
+        retry_budget=RetryBudget(ratio=APP2_RETRY_BUDGET_RATIO, min_per_second=APP2_RETRY_BUDGET_MIN_PER_SECOND),
+        max_attempts=APP2_MAX_ATTEMPTS,
+        hedge=APP2_HEDGE,
+        hedge_quantile=APP2_HEDGE_QUANTILE,
+        hedge_min_delay_seconds=APP2_HEDGE_MIN_DELAY_SECONDS,
+    )
+    app.state.app2_cache = ResponseCache(
+        ttl_seconds=APP2_CACHE_TTL_SECONDS,
+        max_entries=APP2_CACHE_MAX_ENTRIES,
+        stale_while_revalidate_seconds=APP2_CACHE_STALE_WHILE_REVALIDATE_SECONDS,
+        stale_if_error_seconds=APP2_CACHE_STALE_IF_ERROR_SECONDS,
+    )
+    app.state.cpu_executor = CpuExecutor(
+        mode=CPU_EXECUTOR_MODE, max_workers=CPU_EXECUTOR_WORKERS, max_queue=CPU_EXECUTOR_MAX_QUEUE
+    )
+    if ALGORITHM in ASYMMETRIC_ALGORITHMS:
+        await JWKS.start()
+    if REVOCATION_SYNC_ENABLED:
+        await REVOCATIONS.start()
+    await WARMUP.run()  # nothing is served before it is done, so the readiness probe can't pass earlier
+    HEALTH.start()
+    PROFILER.start()
+    try:
+        yield
+    finally:
+        await PROFILER.stop()
+        await HEALTH.stop()
+        await REVOCATIONS.stop()
+        await JWKS.stop()
+        app.state.cpu_executor.shutdown()
+        await app.state.app2_client.aclose()
 
-app = FastAPI()
-add_cors_middleware(app)  # Add CORS middleware to allow cross-origin requests from the frontend
+
+app = FastAPI(lifespan=lifespan)
 
 # * allows Prometheus to scrape metrics from this FastAPI app
 # * automatically exposes metrics at /metrics endpoint that Prometheus can scrape
 Instrumentator().instrument(app).expose(app)
-
-APP2_URL = os.getenv("APP2_URL", "http://fastapi-app2-service")
-SECRET_KEY = os.environ["SECRET_KEY"]
-ALGORITHM = os.environ.get("ALGORITHM", "HS256")
-# * verify with `kubectl get svc` in the `auth` namespace
-AUTH_SERVICE_URL = os.environ.get("AUTH_SERVICE_URL", "http://fastapi-auth-service:80")
+add_health_endpoints(app, HEALTH)  # `/livez` + `/readyz` for the probes
+add_concurrency_limit_middleware(app)  # fail fast with 503 instead of queueing once the adaptive limit is reached
+add_compression_middleware(app)  # `br` / `gzip` for larger JSON bodies when `COMPRESSION_ENABLED`
+add_request_logging_middleware(app)  # logs every request and turns unhandled errors into a JSON 500
+# * added last, so outermost: the frontend can read the 503s and 500s of the middleware above, not just route responses
+add_cors_middleware(app)
 
 
 class LoginRequest(BaseModel):
@@ -44,16 +229,41 @@ class LoginRequest(BaseModel):
     password: str
 
 
+class App2SubRequest(BaseModel):
+    """
+    One sub-request of a `/read_app2/batch` call.
+
+    Attributes:
+        id (str | None): Echoed back with the result, results are streamed in completion order.
+        path (str): Path (and query string) on app2, relative to `APP2_URL`. Defaults to `/`.
+    """
+
+    id: str | None = None
+    path: str = "/"
+
+    @field_validator("path")
+    @classmethod
+    def path_must_be_relative(cls, path: str) -> str:
+        """Only paths on app2 are allowed, never another host (`//host/...`)."""
+        if not path.startswith("/") or path.startswith("//"):
+            raise ValueError("path must start with a single '/'")
+        return path
+
+
+@Span("verify_jwt")
 def verify_jwt(request: Request) -> dict:
     """
     Verify the JWT token from the request headers or cookies.
     This function checks for the presence of a JWT token in the Authorization header
     or in the cookies. If the token is found, it decodes it and verifies its validity.
+    Payloads of already verified tokens are served from `JWT_CACHE` until the token's `exp`.
+    With an asymmetric `ALGORITHM` the key is looked up by the token's `kid` in the cached JWKS (no network call),
+    and the token's `jti` is checked against the local copy of auth's revocations (no network call either).
 
     Args:
         request (Request): The FastAPI request object containing headers.
     Raises:
-        HTTPException: If the token is missing, expired, or invalid.
+        HTTPException: If the token is missing, expired, revoked or invalid.
     Returns:
         dict: The decoded JWT payload if the token is valid.
     """
@@ -68,17 +278,136 @@ def verify_jwt(request: Request) -> dict:
     if not token:
         raise HTTPException(status_code=401, detail="Missing token")
 
+    payload = JWT_CACHE.get(token)
+    if payload is None:
+        try:
+            if ALGORITHM in ASYMMETRIC_ALGORITHMS:
+                signing_key = JWKS.get(jwt.get_unverified_header(token).get("kid"))
+                if signing_key is None:
+                    raise HTTPException(status_code=401, detail="Unknown signing key")
+                payload = jwt.decode(token, signing_key.key, algorithms=[signing_key.algorithm_name])
+            else:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except ExpiredSignatureError:
+            raise HTTPException(status_code=401, detail="Token expired")
+        except InvalidTokenError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        JWT_CACHE.put(token, payload)
+
+    if REVOCATIONS.is_revoked(payload.get("jti")):  # checked on cache hits too, a token can be revoked at any time
+        TOKENS_REJECTED_REVOKED.inc()
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return payload
+
+
+def optional_jwt(request: Request) -> dict | None:
+    """The verified JWT payload if the request carries a valid token, None otherwise (for routes open to anyone)."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        return verify_jwt(request)
+    except HTTPException:
+        return None
+
+
+async def limit_subject(request: Request, payload: dict = Depends(verify_jwt)) -> None:
+    """
+    Per-subject quota of the requested route (`RATE_LIMIT_RULES`), keyed on the verified token's `sub`
+    (`verify_jwt` runs once per request, the route's own dependency gets the same payload).
+    `async`, so the limiter state is only touched from the event loop thread.
+    """
+    await RATE_LIMITER.limit(route_path(request), f"sub:{payload.get('sub')}")
+
+
+async def limit_subject_or_client(request: Request, payload: dict | None = Depends(optional_jwt)) -> None:
+    """`limit_subject` for routes that don't require a token (`/burn`): keyed on the client address without one."""
+    key = f"sub:{payload.get('sub')}" if payload is not None else f"ip:{RATE_LIMITER.client_address(request)}"
+    await RATE_LIMITER.limit(route_path(request), key)
+
+
+def get_app2_client(request: Request) -> httpx.AsyncClient:
+    """Return the shared, pooled app2 client created in `lifespan`."""
+    return request.app.state.app2_client
+
+
+def get_app2_upstream(request: Request) -> Upstream:
+    """Return the resilience policy (circuit breaker, retry budget, hedging) for app2 calls, created in `lifespan`."""
+    return request.app.state.app2_upstream
+
+
+def get_deadline(request: Request) -> Deadline:
+    """Return the request's deadline: the caller's `X-Request-Deadline-Ms`, capped at `REQUEST_DEADLINE_SECONDS`."""
+    return Deadline.from_header(request.headers.get(DEADLINE_HEADER), REQUEST_DEADLINE_SECONDS)
+
+
+def get_app2_cache(request: Request) -> ResponseCache:
+    """Return the app2 response cache created in `lifespan`."""
+    return request.app.state.app2_cache
+
+
+def get_cpu_executor(request: Request) -> CpuExecutor:
+    """Return the executor CPU-bound handlers run on, created in `lifespan`."""
+    return request.app.state.cpu_executor
+
+
+def cpu_executor_saturation() -> str | None:
+    """Readiness check: too many `/burn` jobs waiting for a CPU worker."""
+    executor: CpuExecutor = app.state.cpu_executor
+    queued = max(0, executor.depth - executor.max_workers)
+    if READY_MAX_EXECUTOR_QUEUE and queued >= READY_MAX_EXECUTOR_QUEUE:
+        return f"{queued} CPU-bound jobs queued (max {READY_MAX_EXECUTOR_QUEUE})"
+    return None
+
+
+def app2_pool_saturation() -> str | None:
+    """Readiness check: every connection of the app2 pool is busy, new app2 calls would wait for one."""
+    in_flight = app.state.app2_upstream.in_flight
+    if in_flight >= APP2_MAX_CONNECTIONS:
+        return f"app2 connection pool exhausted ({in_flight} requests in flight)"
+    return None
+
+
+def prime_jwt() -> None:
+    """Warm-up step: verify a token once, so the first request doesn't pay for PyJWT's and the crypto backend's setup."""
+    if ALGORITHM not in ASYMMETRIC_ALGORITHMS:
+        jwt.decode(jwt.encode({"sub": "warmup"}, SECRET_KEY, algorithm=ALGORITHM), SECRET_KEY, algorithms=[ALGORITHM])
+        return
+    # * no private key here: a made-up signature still runs the whole verification with every cached public key
+    for key in JWKS.keys():
+        header = base64url_encode(json.dumps({"alg": key.algorithm_name, "kid": key.key_id}).encode())
+        token = b".".join([header, base64url_encode(b'{"sub":"warmup"}'), base64url_encode(bytes(64))])
+        try:
+            jwt.decode(token, key.key, algorithms=[key.algorithm_name])
+        except InvalidTokenError:
+            pass
 
 
-@app.get("/")
-def read_root(payload: dict = Depends(verify_jwt)) -> dict[str, str]:
+async def warm_app2_pool() -> None:
+    """
+    Warm-up step: open `WARMUP_APP2_CONNECTIONS` keep-alive connections to app2 (DNS lookup and TCP connect),
+    or the `APP2_RPC_CONNECTIONS` RPC connections when `APP2_RPC_URL` is set.
+    """
+    client: httpx.AsyncClient = app.state.app2_client
+    connections = min(WARMUP_APP2_CONNECTIONS, APP2_MAX_KEEPALIVE_CONNECTIONS)
+    # * concurrent requests can't share a connection, each one opens its own and returns it to the pool
+    await asyncio.gather(*(client.get(APP2_URL.rstrip("/") + "/livez") for _ in range(connections)))
+
+
+async def warm_cpu_executor() -> None:
+    """Warm-up step: start every CPU worker (a `process` pool spawns its processes, each importing app1, on first use)."""
+    executor: CpuExecutor = app.state.cpu_executor
+    await asyncio.gather(*(executor.run(burn_cpu, 1) for _ in range(executor.max_workers)))
+
+
+HEALTH.add_check(cpu_executor_saturation)
+HEALTH.add_check(app2_pool_saturation)
+WARMUP.add_step("jwt", prime_jwt)
+if WARMUP_APP2_CONNECTIONS > 0:
+    WARMUP.add_step("app2_pool", warm_app2_pool)
+WARMUP.add_step("cpu_executor", warm_cpu_executor)
+add_profiler_endpoints(app, PROFILER, verify_jwt)  # admins (`PROFILER_ADMINS`) only, tokens verified like every route
+
+
+@app.get("/", dependencies=[Depends(limit_subject)], response_model=dict[str, str])
+def read_root(payload: dict = Depends(verify_jwt)) -> FastJSONResponse:
     """
     Root endpoint that returns a greeting message.
     It verifies the JWT token from the request headers or cookies and returns a personalized greeting.
@@ -86,36 +415,160 @@ def read_root(payload: dict = Depends(verify_jwt)) -> dict[str, str]:
     Args:
         payload (dict): The decoded JWT payload obtained from the `verify_jwt` dependency.
     Returns:
-        dict: A dictionary containing a greeting message with the username extracted from the JWT payload.
+        FastJSONResponse: A greeting message with the username extracted from the JWT payload.
     """
     username = payload.get("sub", "unknown user")  # `sub` set in `auth` service
-    return {"message": f"Hello from Kubernetes, {username}!!!!!"}
+    return FastJSONResponse({"message": f"Hello from Kubernetes, {username}!!!!!"})
 
 
-@app.get("/read_app2")
-async def read_app2(_: dict = Depends(verify_jwt)) -> dict[str, Any]:
+async def fetch_app2(client: httpx.AsyncClient, upstream: Upstream, url: str, deadline: Deadline) -> Any:
+    """
+    GET `url` on app2 through its resilience policy and return the JSON body, as app2 sent it (`RawJSON`, embedded in
+    app1's responses without a decode / encode cycle) unless app2 answered with another content type
+    (decoded, e.g. the msgpack body of an RPC call).
+    Args:
+        client (httpx.AsyncClient): The shared app2 client.
+        upstream (Upstream): The app2 circuit breaker / retry / hedging policy.
+        url (str): The app2 URL.
+        deadline (Deadline): The deadline of the request, sent along to app2.
+    Raises:
+        CircuitOpenError: If app2's circuit is open.
+        httpx.HTTPError: On timeouts (including a passed deadline), connection errors and non-2xx responses
+            (never cache error responses, the cache serves a stale value instead when there is one).
+    Returns:
+        Any: The JSON response, `RawJSON` or decoded.
+    """
+    with APP2_CALL_SPAN.time():  # the round trip, retries and hedges included
+        r = await upstream.get(client, url, deadline)
+    r.raise_for_status()
+    content_type = r.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        return RawJSON(r.content)
+    if content_type == RPC_CONTENT_TYPE:
+        return unpack_body(r.content)
+    return r.json()
+
+
+def app2_error(e: Exception) -> HTTPException:
+    """
+    Classify an error of an app2 call into the error app1 answers with.
+    Args:
+        e (Exception): The error raised while calling app2.
+    Returns:
+        HTTPException: 504 for timeouts, 502 for app2 errors and connection errors,
+            503 while app2's circuit is open, 500 for anything else.
+    """
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, round(e.retry_after)))},
+        )
+    if isinstance(e, httpx.TimeoutException):
+        return HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=f"timeout: {str(e)}")
+    if isinstance(e, httpx.HTTPStatusError):
+        return HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"upstream error: {e.response.status_code}")
+    if isinstance(e, httpx.RequestError):
+        return HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"request error: {str(e)}")
+    return HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"unexpected error: {str(e)}")
+
+
+@app.get("/read_app2", dependencies=[Depends(limit_subject)], response_model=dict[str, Any])
+async def read_app2(
+    _: dict = Depends(verify_jwt),
+    client: httpx.AsyncClient = Depends(get_app2_client),
+    upstream: Upstream = Depends(get_app2_upstream),
+    cache: ResponseCache = Depends(get_app2_cache),
+    deadline: Deadline = Depends(get_deadline),
+) -> FastJSONResponse:
     """
     Endpoint to read data from FastAPI App 2.
-    It verifies the JWT token from the request headers or cookies and then makes an HTTP GET request
-    to app2 to retrieve data.
+    It verifies the JWT token from the request headers or cookies and then returns app2's response
+    from the short-TTL cache, which makes at most one HTTP GET request to app2 at a time
+    (retried/hedged within budget, failing fast while app2's circuit is open).
+    That request is shared by every caller waiting on it, so it gets the longest budget (`REQUEST_DEADLINE_SECONDS`)
+    rather than the deadline of whoever started it; each caller only waits for it until its own deadline.
 
     Args:
         payload (dict): The decoded JWT payload obtained from the `verify_jwt` dependency.
+        client (httpx.AsyncClient): The shared app2 client obtained from the `get_app2_client` dependency.
+        upstream (Upstream): The app2 resilience policy obtained from the `get_app2_upstream` dependency.
+        cache (ResponseCache): The app2 response cache obtained from the `get_app2_cache` dependency.
+        deadline (Deadline): The request's deadline obtained from the `get_deadline` dependency.
     Returns:
-        dict: A dictionary containing a greeting message and the response from FastAPI App 2.
+        FastJSONResponse: A greeting message and the response from FastAPI App 2 (its body embedded as is).
     """
     try:
-        async with httpx.AsyncClient() as client:
-            r = await client.get(APP2_URL)
-            app2_data = r.json()
-    except httpx.TimeoutException as e:
-        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=f"timeout: {str(e)}")
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"request error: {str(e)}")
+        app2_data = await asyncio.wait_for(
+            cache.get(APP2_URL, lambda: fetch_app2(client, upstream, APP2_URL, Deadline(REQUEST_DEADLINE_SECONDS))),
+            deadline.remaining(),  # the shared fetch is shielded: giving up here doesn't cancel it for the others
+        )
+    except TimeoutError:
+        raise app2_error(DeadlineExceededError("request deadline passed while waiting for app2"))
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"unexpected error: {str(e)}")
+        raise app2_error(e)
+
+    return FastJSONResponse({"message": "Hello from FastAPI App 1 (with configmap)", "app2_response": app2_data})
 
-    return {"message": "Hello from FastAPI App 1 (with configmap)", "app2_response": app2_data}
+
+@app.post("/read_app2/batch", dependencies=[Depends(limit_subject)])
+async def read_app2_batch(
+    sub_requests: list[App2SubRequest],
+    _: dict = Depends(verify_jwt),
+    client: httpx.AsyncClient = Depends(get_app2_client),
+    upstream: Upstream = Depends(get_app2_upstream),
+    deadline: Deadline = Depends(get_deadline),
+) -> StreamingResponse:
+    """
+    Batched `/read_app2`: one request through the ingress instead of one per app2 call.
+    The sub-requests are sent to app2 concurrently (at most `APP2_BATCH_CONCURRENCY` at a time, over the shared
+    client and resilience policy, sharing the request's deadline) and every result is streamed back
+    as one NDJSON line as soon as it completes:
+    `{"index", "id", "status": 200, "app2_response"}`, or `{"index", "id", "status", "detail"}` for a failed
+    sub-request, classified like `/read_app2` errors (504 timeout, 502 app2/connection error, 503 circuit open, 500 other).
+    Sub-requests bypass `/read_app2`'s response cache: each one is its own app2 call, also for repeated paths,
+    instead of joining another request's in-flight call (and its deadline) or being answered from a cached copy.
+
+    Args:
+        sub_requests (list[App2SubRequest]): The app2 calls to make.
+        payload (dict): The decoded JWT payload obtained from the `verify_jwt` dependency.
+        client (httpx.AsyncClient): The shared app2 client obtained from the `get_app2_client` dependency.
+        upstream (Upstream): The app2 resilience policy obtained from the `get_app2_upstream` dependency.
+        deadline (Deadline): The request's deadline obtained from the `get_deadline` dependency.
+    Raises:
+        HTTPException: 413 if the batch has more than `APP2_BATCH_MAX_ITEMS` sub-requests.
+    Returns:
+        StreamingResponse: `application/x-ndjson`, one line per sub-request in completion order.
+    """
+    if len(sub_requests) > APP2_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"at most {APP2_BATCH_MAX_ITEMS} sub-requests"
+        )
+    semaphore = asyncio.Semaphore(APP2_BATCH_CONCURRENCY)
+
+    async def run(index: int, sub_request: App2SubRequest) -> dict[str, Any]:
+        """Fetch one sub-request under the shared semaphore. Errors become a per-item status, not a failed batch."""
+        url = APP2_URL.rstrip("/") + sub_request.path
+        result: dict[str, Any] = {"index": index, "id": sub_request.id}
+        async with semaphore:
+            try:
+                result["app2_response"] = await fetch_app2(client, upstream, url, deadline)
+            except Exception as e:
+                error = app2_error(e)
+                return {**result, "status": error.status_code, "detail": error.detail}
+        return {**result, "status": status.HTTP_200_OK}
+
+    async def results() -> AsyncIterator[bytes]:
+        """Yield each sub-request's result as an NDJSON line as soon as it completes."""
+        tasks = [asyncio.create_task(run(index, sub_request)) for index, sub_request in enumerate(sub_requests)]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield dumps(await completed) + b"\n"
+        finally:
+            for task in tasks:  # the client disconnected: don't keep calling app2 for nobody
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 
 # ********************************************************************************* #
@@ -132,13 +585,108 @@ def burn_cpu(iterations: int) -> str:
     return result.hex()
 
 
-@app.get("/burn")
-def cpu_burner(iterations: int = 10_000) -> dict[str, str]:
-    """CPU-bound endpoint: increasing `iterations` linearly increases work."""
-    digest = burn_cpu(iterations)
+@app.get("/burn", dependencies=[Depends(limit_subject_or_client)])
+async def cpu_burner(iterations: int = 10_000, executor: CpuExecutor = Depends(get_cpu_executor)) -> dict[str, str]:
+    """
+    CPU-bound endpoint: increasing `iterations` linearly increases work.
+    The work runs on the configured `CpuExecutor` so `/healthz` and other routes stay responsive,
+    and requests are rejected with a 503 once the executor queue is full (with a 429 over the caller's quota).
+    """
+    try:
+        with BURN_CPU_SPAN.time():  # queue wait + execution, split in the `cpu_executor_*` histograms
+            digest = await executor.run(burn_cpu, iterations)
+    except ExecutorSaturatedError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="CPU executor saturated", headers={"Retry-After": "1"}
+        )
     return {"digest": digest}
 
 
+def require_workloads() -> None:
+    """The `/workload` endpoints only exist when `WORKLOAD_ENABLED` (they can hold memory and threads on purpose)."""
+    if not WORKLOADS.enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+def require_workload_admin(payload: dict = Depends(verify_jwt)) -> dict:
+    """Reject verified tokens whose subject is not in `WORKLOAD_ADMINS`."""
+    if payload.get("sub") not in WORKLOAD_ADMINS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    return payload
+
+
+async def run_workload_profile(
+    name: str,
+    profile: WorkloadProfile,
+    executor: CpuExecutor,
+    client: httpx.AsyncClient,
+    upstream: Upstream,
+    deadline: Deadline,
+) -> dict[str, Any]:
+    """
+    Run a workload profile with app1's CPU executor and app2 client (through its resilience policy, never the cache).
+    Raises:
+        HTTPException: 503 once the executor queue is full or the worker's memory budget is used up.
+    Returns:
+        dict: The profile's name and its `WorkloadEngine.run` report.
+    """
+    try:
+        report = await WORKLOADS.run(profile, executor, lambda: fetch_app2(client, upstream, APP2_URL, deadline))
+    except (ExecutorSaturatedError, WorkloadLimitError) as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
+    return {"profile": name, **report}
+
+
+# * `require_workloads` first: disabled endpoints answer 404 before any token is looked at
+@app.get("/workload", dependencies=[Depends(require_workloads), Depends(require_workload_admin)])
+def list_workloads() -> dict[str, WorkloadProfile]:
+    """The named workload profiles: built-in and from `WORKLOAD_PROFILES`."""
+    return WORKLOADS.profiles
+
+
+@app.get(
+    "/workload/{name}", dependencies=[Depends(require_workloads), Depends(require_workload_admin), Depends(limit_subject)]
+)
+async def run_named_workload(
+    name: str,
+    scale: float = Query(1.0, gt=0, le=100),
+    executor: CpuExecutor = Depends(get_cpu_executor),
+    client: httpx.AsyncClient = Depends(get_app2_client),
+    upstream: Upstream = Depends(get_app2_upstream),
+    deadline: Deadline = Depends(get_deadline),
+) -> dict[str, Any]:
+    """
+    Run the named workload profile, its amount of work multiplied by `scale` - point a load generator at a mix
+    of profiles to reproduce production's CPU / memory / latency shape on a pod and watch the HPA react.
+    Raises:
+        HTTPException: 404 for an unknown profile, 422 if scaling takes a step above its limits,
+            503 while the executor or the memory budget is saturated.
+    Returns:
+        dict: Wall time, CPU time and memory of the run and of every step.
+    """
+    profile = WORKLOADS.profiles.get(name)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"unknown workload profile {name!r}")
+    if scale != 1.0:
+        try:
+            profile = profile.scaled(scale)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors(include_url=False))
+    return await run_workload_profile(name, profile, executor, client, upstream, deadline)
+
+
+@app.post("/workload", dependencies=[Depends(require_workloads), Depends(require_workload_admin), Depends(limit_subject)])
+async def run_workload(
+    profile: WorkloadProfile,
+    executor: CpuExecutor = Depends(get_cpu_executor),
+    client: httpx.AsyncClient = Depends(get_app2_client),
+    upstream: Upstream = Depends(get_app2_upstream),
+    deadline: Deadline = Depends(get_deadline),
+) -> dict[str, Any]:
+    """`/workload/{name}` for a profile given in the request body instead of a named one."""
+    return await run_workload_profile("adhoc", profile, executor, client, upstream, deadline)
+
+
 # ********************************************************************************* #
 
 
@@ -146,14 +694,3 @@ def cpu_burner(iterations: int = 10_000) -> dict[str, str]:
 def health_check() -> dict[str, str]:
     """Health check endpoint to verify the service is running."""
     return {"status": "ok"}
-
-
-@app.middleware("http")
-async def log_path(request: Request, call_next: Callable) -> JSONResponse:
-    """Middleware to log the incoming request path"""
-    logger.info(f"INCOMING PATH: {request.url.path}")
-    try:
-        return await call_next(request)
-    except Exception as e:
-        logger.error(f"Error occurred: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -0,0 +1,424 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Callable
+
+import httpx
+from prometheus_client import Counter, Gauge
+
+from .metrics import get_or_create
+from .tracing import TRACEPARENT_HEADER, TRACER
+
+# * remaining time budget of a request in milliseconds, read from incoming requests and sent to upstreams
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+CIRCUIT_STATES = {"closed": 0, "open": 1, "half_open": 2}
+
+UPSTREAM_CIRCUIT_STATE = get_or_create(
+    Gauge,
+    "upstream_circuit_state",
+    "Circuit breaker state per upstream (0 closed, 1 open, 2 half-open)",
+    labelnames=["upstream"],
+    multiprocess_mode="livemax",
+)
+UPSTREAM_ATTEMPTS = get_or_create(
+    Counter, "upstream_attempts", "Requests sent to an upstream", labelnames=["upstream", "kind"]
+)
+UPSTREAM_FAILURES = get_or_create(
+    Counter, "upstream_failures", "Upstream attempts that failed (5xx, timeout, connection error)", labelnames=["upstream"]
+)
+UPSTREAM_SHORT_CIRCUITED = get_or_create(
+    Counter, "upstream_short_circuited", "Upstream calls failed without being sent", labelnames=["upstream", "reason"]
+)
+UPSTREAM_RETRIES_DENIED = get_or_create(
+    Counter,
+    "upstream_retries_denied",
+    "Retries and hedges not sent because the retry budget was spent",
+    labelnames=["upstream"],
+)
+UPSTREAM_HEDGE_WINS = get_or_create(
+    Counter, "upstream_hedge_wins", "Hedged requests that answered before the original one", labelnames=["upstream"]
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, upstream: str, retry_after: float) -> None:
+        super().__init__(f"circuit open: {upstream}")
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(httpx.TimeoutException):
+    """Raised when the request's deadline passed before the upstream could be called."""
+
+
+class Deadline:
+    """
+    Point in time by which a request has to be answered, measured on the monotonic clock.
+    Passed between services as the remaining milliseconds (`DEADLINE_HEADER`), never as a wall-clock time,
+    so clock skew between pods does not matter.
+    """
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    @classmethod
+    def from_header(cls, value: str | None, max_seconds: float, clock: Callable[[], float] = time.monotonic) -> "Deadline":
+        """
+        Deadline of an incoming request.
+        Args:
+            value (str | None): The `DEADLINE_HEADER` value, remaining milliseconds.
+            max_seconds (float): Used when the header is missing or invalid, and as an upper bound otherwise.
+            clock (Callable, optional): Monotonic clock. Defaults to `time.monotonic`.
+        Returns:
+            Deadline: The request's deadline.
+        """
+        try:
+            seconds = min(max(float(value) / 1000, 0.0), max_seconds) if value is not None else max_seconds
+        except ValueError:
+            seconds = max_seconds
+        return cls(seconds if math.isfinite(seconds) else max_seconds, clock)
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires_at - self._clock())
+
+    def header_value(self) -> str:
+        """The remaining time as a `DEADLINE_HEADER` value."""
+        return str(int(self.remaining() * 1000))
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after `failure_threshold` consecutive failures.
+
+    States:
+        - `closed`: every call goes through, successes reset the failure count
+        - `open`: calls fail immediately for `recovery_seconds`
+        - `half_open`: a single probe call goes through, its success closes the circuit, its failure reopens it
+
+    Only used from the event loop thread, so no locking.
+
+    Attributes:
+        name (str): The upstream name, used as the metric label.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        recovery_seconds (float): How long the circuit stays open before a probe is let through.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._state_gauge = UPSTREAM_CIRCUIT_STATE.labels(upstream=name)
+        self._set_state("closed")
+
+    def _set_state(self, state: str) -> None:
+        """Switch to `state` and update the state gauge."""
+        self.state = state
+        self._state_gauge.set(CIRCUIT_STATES[state])
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe through."""
+        return max(0.0, self._opened_at + self.recovery_seconds - self._clock())
+
+    def allow(self) -> bool:
+        """Return True if a call may be sent now (in `half_open`, only the single probe call)."""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if self.retry_after() > 0:
+                return False
+            self._set_state("half_open")
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        """Record a successful call, closing the circuit."""
+        self._failures = 0
+        self._probe_in_flight = False
+        if self.state != "closed":
+            self._set_state("closed")
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit after too many of them or when the probe failed."""
+        self._probe_in_flight = False
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self._opened_at = self._clock()
+            self._set_state("open")
+
+    def record_cancelled(self) -> None:
+        """Record a call that was cancelled before it finished (e.g. a hedge that lost), freeing the probe slot."""
+        self._probe_in_flight = False
+
+
+class RetryBudget:
+    """
+    Caps retries (and hedged requests) at `ratio` of the requests seen in the last `window_seconds`,
+    plus `min_per_second` so an upstream with little traffic can still be retried.
+    Unlike a fixed retry count per request, this cannot multiply the load on an upstream that is already failing.
+
+    Attributes:
+        ratio (float): Allowed retries per request, e.g. 0.1 = 10% extra load at most.
+        min_per_second (float): Retries always allowed per second of the window.
+        window_seconds (int): Length of the sliding window, in one-second buckets.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        min_per_second: float = 1.0,
+        window_seconds: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._buckets: deque[list[int]] = deque()  # [second, requests, retries], oldest first
+
+    def _bucket(self) -> list[int]:
+        """The `[second, requests, retries]` bucket for the current second, dropping buckets outside the window."""
+        second = int(self._clock())
+        while self._buckets and self._buckets[0][0] <= second - self.window_seconds:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        return self._buckets[-1]
+
+    def record_request(self) -> None:
+        """Count a request (not a retry)."""
+        self._bucket()[1] += 1
+
+    def try_spend(self) -> bool:
+        """Return True, and count a retry, if the budget allows one more."""
+        bucket = self._bucket()
+        requests = sum(b[1] for b in self._buckets)
+        retries = sum(b[2] for b in self._buckets)
+        if retries >= self.ratio * requests + self.min_per_second * self.window_seconds:
+            return False
+        bucket[2] += 1
+        return True
+
+
+class LatencyTracker:
+    """Latencies of the last `sample_size` successful calls, to derive the hedging delay from."""
+
+    def __init__(self, sample_size: int = 1000) -> None:
+        self._samples: deque[float] = deque(maxlen=sample_size)
+        self._sorted: list[float] = []
+        self._new_samples = 0
+
+    def __len__(self) -> int:
+        """Number of latency samples currently kept."""
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        """Add the latency of a successful call."""
+        self._samples.append(seconds)
+        self._new_samples += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Return the `q` quantile (0-1) of the recorded latencies.
+        The samples are only re-sorted every 32 new samples, hedging does not need an exact value.
+        """
+        if self._samples and (not self._sorted or self._new_samples >= 32):
+            self._sorted = sorted(self._samples)
+            self._new_samples = 0
+        if not self._sorted:
+            return 0.0
+        return self._sorted[min(len(self._sorted) - 1, int(q * len(self._sorted)))]
+
+
+class Upstream:
+    """
+    Resilience policy for idempotent GETs to one upstream service.
+
+    Every call:
+        - fails fast with `CircuitOpenError` while the upstream's circuit is open
+        - is sent with the request's remaining deadline as timeout and in `DEADLINE_HEADER`
+        - is retried on 5xx / timeouts / connection errors, up to `max_attempts`, within the `RetryBudget`
+        - with `hedge` enabled, sends a second copy when the first did not answer within the `hedge_quantile`
+          latency, and uses whichever answers first (hedges are paid from the retry budget too)
+
+    Attributes:
+        name (str): The upstream name, used as the metric label.
+        breaker (CircuitBreaker): The upstream's circuit breaker.
+        retry_budget (RetryBudget): Shared by retries and hedges.
+        max_attempts (int): First attempt + retries.
+        hedge (bool): Enable hedged requests.
+        hedge_quantile (float): Latency quantile (0-1) after which a hedge is sent.
+        hedge_min_delay_seconds (float): Lower bound of the hedging delay.
+        hedge_min_samples (int): Successful calls needed before hedging starts.
+        in_flight (int): Requests to the upstream currently in flight.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        breaker: CircuitBreaker,
+        retry_budget: RetryBudget,
+        max_attempts: int = 2,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay_seconds: float = 0.01,
+        hedge_min_samples: int = 20,
+    ) -> None:
+        self.name = name
+        self.breaker = breaker
+        self.retry_budget = retry_budget
+        self.max_attempts = max(1, max_attempts)
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay_seconds = hedge_min_delay_seconds
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+        self.in_flight = 0
+        self._attempts = {kind: UPSTREAM_ATTEMPTS.labels(upstream=name, kind=kind) for kind in ("first", "retry", "hedge")}
+        self._failures = UPSTREAM_FAILURES.labels(upstream=name)
+        self._retries_denied = UPSTREAM_RETRIES_DENIED.labels(upstream=name)
+        self._hedge_wins = UPSTREAM_HEDGE_WINS.labels(upstream=name)
+
+    async def get(self, client: httpx.AsyncClient, url: str, deadline: Deadline) -> httpx.Response:
+        """
+        GET `url` under this upstream's policy.
+        Args:
+            client (httpx.AsyncClient): The client to send with.
+            url (str): The upstream URL.
+            deadline (Deadline): The deadline of the request this call is made for.
+        Raises:
+            CircuitOpenError: If the circuit is open.
+            DeadlineExceededError: If no time is left for a first attempt.
+            httpx.HTTPError: The error of the last attempt.
+        Returns:
+            httpx.Response: The first non-5xx response, or the last 5xx one.
+        """
+        self.retry_budget.record_request()
+        outcome: httpx.Response | httpx.HTTPError | None = None
+        for attempt in range(self.max_attempts):
+            if attempt and not self.retry_budget.try_spend():
+                self._retries_denied.inc()
+                break
+            if deadline.remaining() <= 0 or not self.breaker.allow():
+                if attempt:
+                    break  # report the previous attempt's error rather than why there was no retry
+                if deadline.remaining() <= 0:
+                    UPSTREAM_SHORT_CIRCUITED.labels(upstream=self.name, reason="deadline_exceeded").inc()
+                    raise DeadlineExceededError("deadline exceeded")
+                UPSTREAM_SHORT_CIRCUITED.labels(upstream=self.name, reason="circuit_open").inc()
+                raise CircuitOpenError(self.name, self.breaker.retry_after())
+            try:
+                outcome = await self._send(client, url, deadline, "retry" if attempt else "first")
+            except httpx.HTTPError as e:
+                outcome = e
+                continue
+            if outcome.status_code < 500:
+                return outcome
+        if isinstance(outcome, httpx.HTTPError):
+            raise outcome
+        if outcome is None:  # the first attempt either sets it or raises, so only with `max_attempts` < 1
+            raise ValueError(f"{self.name}: max_attempts must be at least 1")
+        return outcome
+
+    def _timeout(self, client: httpx.AsyncClient, deadline: Deadline) -> httpx.Timeout:
+        """The client's timeouts, each capped at the time left before `deadline`."""
+        remaining = deadline.remaining()
+        configured = client.timeout
+        return httpx.Timeout(
+            connect=min(configured.connect or remaining, remaining),
+            read=min(configured.read or remaining, remaining),
+            write=min(configured.write or remaining, remaining),
+            pool=min(configured.pool or remaining, remaining),
+        )
+
+    async def _attempt(self, client: httpx.AsyncClient, url: str, deadline: Deadline, kind: str) -> httpx.Response:
+        """Send one GET (a first try, retry or hedge) in its own client span, feeding the breaker and latency tracker."""
+        self._attempts[kind].inc()
+        self.in_flight += 1
+        started = time.perf_counter()
+        headers = {DEADLINE_HEADER: deadline.header_value()}
+        with TRACER.span(f"GET {self.name}", kind="client") as span:  # each attempt (retry, hedge) is its own span
+            if span is not None:
+                span.attributes["attempt"] = kind
+                headers[TRACEPARENT_HEADER] = span.traceparent()  # the upstream's server span becomes its child
+            try:
+                response = await client.get(url, headers=headers, timeout=self._timeout(client, deadline))
+            except asyncio.CancelledError:
+                self.breaker.record_cancelled()
+                raise
+            except httpx.HTTPError:
+                self._failures.inc()
+                self.breaker.record_failure()
+                raise
+            finally:
+                self.in_flight -= 1
+            if span is not None:
+                span.set_status_code(response.status_code)
+        if response.status_code >= 500:
+            self._failures.inc()
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+            self.latency.record(time.perf_counter() - started)
+        return response
+
+    def _hedge_delay(self) -> float | None:
+        """Seconds to wait before hedging, or None while hedging is off or there are too few samples."""
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay_seconds, self.latency.quantile(self.hedge_quantile))
+
+    def _may_hedge(self, deadline: Deadline) -> bool:
+        """True if the deadline, the retry budget and the breaker all allow a hedged copy."""
+        if deadline.remaining() <= 0:
+            return False
+        if not self.retry_budget.try_spend():
+            self._retries_denied.inc()
+            return False
+        return self.breaker.allow()
+
+    async def _send(self, client: httpx.AsyncClient, url: str, deadline: Deadline, kind: str) -> httpx.Response:
+        """Send an attempt, hedging with a second copy if it is slower than `_hedge_delay`. The first response wins."""
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._attempt(client, url, deadline, kind)
+
+        first = asyncio.create_task(self._attempt(client, url, deadline, kind))
+        started = [first]
+        try:
+            done, _ = await asyncio.wait(started, timeout=delay)
+            if not done and self._may_hedge(deadline):
+                started.append(asyncio.create_task(self._attempt(client, url, deadline, "hedge")))
+            pending = set(started)
+            failed: asyncio.Task[httpx.Response] | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    if finished.cancelled():  # cancelled from outside, e.g. on shutdown: not a result of this call
+                        continue
+                    if finished.exception() is None and finished.result().status_code < 500:
+                        if finished is not first:
+                            self._hedge_wins.inc()
+                        return finished.result()
+                    failed = failed or finished
+            if failed is None:
+                raise asyncio.CancelledError()  # every copy was cancelled
+            return failed.result()  # every copy failed: the error (or 5xx response) of the first one to fail
+        finally:
+            for task in started:
+                task.cancel()
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable
+from typing import Any, Callable
+
+from prometheus_client import Counter
+
+from .metrics import get_or_create
+
+RESPONSE_CACHE_HITS = get_or_create(Counter, "response_cache_hits", "Upstream responses served fresh from the cache")
+RESPONSE_CACHE_MISSES = get_or_create(Counter, "response_cache_misses", "Cache lookups that started an upstream request")
+RESPONSE_CACHE_COALESCED = get_or_create(
+    Counter, "response_cache_coalesced", "Cache misses that waited on an upstream request already in flight"
+)
+# * reason: `revalidating` (stale-while-revalidate) or `upstream_error` (stale-if-error)
+RESPONSE_CACHE_STALE = get_or_create(
+    Counter, "response_cache_stale", "Stale responses served from the cache", labelnames=["reason"]
+)
+_STALE_REVALIDATING = RESPONSE_CACHE_STALE.labels(reason="revalidating")
+_STALE_UPSTREAM_ERROR = RESPONSE_CACHE_STALE.labels(reason="upstream_error")
+
+
+class ResponseCache:
+    """
+    Short-TTL in-process cache for upstream responses that are the same for every caller.
+
+    - fresh entries (younger than `ttl_seconds`) are returned directly
+    - single-flight: concurrent misses for a key share one upstream request instead of each sending their own
+    - stale-while-revalidate: for `stale_while_revalidate_seconds` after expiring, the old value is returned
+      immediately while one background request refreshes it
+    - stale-if-error: when the upstream request fails, a value up to `stale_if_error_seconds` past its TTL
+      is returned instead of the error
+
+    With `ttl_seconds` 0 nothing is stored, so neither stale path ever serves a value: only concurrent misses share
+    a request. Values are returned as stored, callers must not mutate them.
+    Only used from the event loop, so no locking is needed.
+
+    Attributes:
+        ttl_seconds (float): How long an entry is fresh, `0` only coalesces concurrent requests.
+        max_entries (int): Maximum number of cached keys (least recently used evicted first).
+        stale_while_revalidate_seconds (float): How long past its TTL an entry is served while being refreshed.
+        stale_if_error_seconds (float): How long past its TTL an entry may be served when the upstream fails.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int = 128,
+        stale_while_revalidate_seconds: float = 0.0,
+        stale_if_error_seconds: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stale_while_revalidate_seconds = stale_while_revalidate_seconds
+        self.stale_if_error_seconds = stale_if_error_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()  # key -> (fetched at, value)
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        """Number of cached entries, fresh or stale."""
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop every cached entry (requests already in flight are not cancelled)."""
+        self._entries.clear()
+
+    def _store(self, key: str, value: Any) -> None:
+        """Cache `value` under `key` as the most recently used entry, evicting the oldest beyond `max_entries`."""
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _fetch_and_store(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fetch` and cache its result. Failures are not cached."""
+        value = await fetch()
+        self._store(key, value)
+        return value
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        """Done-callback: forget the in-flight fetch for `key` and consume its exception."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # background refreshes nobody awaits must not log "exception was never retrieved"
+
+    def _start_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Start `fetch` as a task that callers waiting on `key` share."""
+        task = asyncio.create_task(self._fetch_and_store(key, fetch))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finished(key, t))
+        return task
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the value for `key`, calling `fetch` at most once at a time per key to (re)load it.
+        Args:
+            key (str): Cache key, e.g. the upstream URL.
+            fetch (Callable): Coroutine factory performing the upstream request and returning the value to cache.
+        Raises:
+            Exception: Whatever `fetch` raised, if no entry recent enough for stale-if-error exists.
+        Returns:
+            Any: The cached or freshly fetched value.
+        """
+        entry = self._entries.get(key)
+        age = None
+        if entry is not None:
+            age = self._clock() - entry[0]
+            self._entries.move_to_end(key)
+            if age < self.ttl_seconds:
+                RESPONSE_CACHE_HITS.inc()
+                return entry[1]
+            if age < self.ttl_seconds + self.stale_while_revalidate_seconds:
+                if key not in self._inflight:
+                    self._start_fetch(key, fetch)
+                _STALE_REVALIDATING.inc()
+                return entry[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            RESPONSE_CACHE_MISSES.inc()
+            task = self._start_fetch(key, fetch)
+        else:
+            RESPONSE_CACHE_COALESCED.inc()
+
+        try:
+            return await asyncio.shield(task)  # a cancelled caller must not cancel the request others are waiting on
+        except Exception:
+            if entry is not None and age is not None and age < self.ttl_seconds + self.stale_if_error_seconds:
+                _STALE_UPSTREAM_ERROR.inc()
+                return entry[1]
+            raise
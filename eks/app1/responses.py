@@ -0,0 +1,193 @@
+import os
+import zlib
+from types import ModuleType
+from typing import Any, Callable
+
+import pydantic_core
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+orjson: ModuleType | None  # declared up front, so the `None` fallback type-checks
+try:
+    import orjson
+except ImportError:  # optional: `pydantic_core` (installed with FastAPI) renders the same bytes, only slower
+    orjson = None
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered without it
+    brotli = None
+
+# * render `FastJSONResponse` bodies with orjson (when installed) instead of `pydantic_core`
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_ENABLED", "false").lower() == "true"
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "false").lower() == "true"
+# * smaller bodies are sent as is, compressing them costs more CPU than it saves on the wire
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))  # 1-9
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))  # 0-11, above ~5 it gets much slower
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class RawJSON(bytes):
+    """Already encoded JSON (e.g. an upstream's response body), embedded as is by `dumps` instead of being re-encoded."""
+
+
+def _key_value(encode: Callable[[Any], bytes], key: str, value: Any) -> bytes:
+    """One `"key":value` member of a JSON object, embedding `RawJSON` values as is."""
+    return encode(key) + b":" + (value if isinstance(value, RawJSON) else encode(value))
+
+
+def dumps(content: Any, fast: bool = FAST_JSON_ENABLED) -> bytes:
+    """
+    Encode `content` to the same bytes as `JSONResponse` (compact UTF-8), with orjson when `fast` and installed,
+    otherwise with `pydantic_core` (several times faster than stdlib `json`). `RawJSON` values of a top-level dict
+    are embedded without being decoded.
+    Args:
+        content (Any): JSON-serialisable content (str keys, no models or datetimes).
+        fast (bool, optional): Use orjson. Defaults to `FAST_JSON_ENABLED`.
+    Returns:
+        bytes: The encoded JSON.
+    """
+    encode = orjson.dumps if fast and orjson is not None else pydantic_core.to_json
+    if isinstance(content, dict) and any(isinstance(value, RawJSON) for value in content.values()):
+        items = (_key_value(encode, key, value) for key, value in content.items())
+        return b"{" + b",".join(items) + b"}"
+    return encode(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    `JSONResponse` rendered by `dumps`: Rust encoders instead of stdlib `json`, `RawJSON` values embedded as is.
+    Hot endpoints return it directly, which also skips FastAPI's response validation and serialisation
+    (a custom `default_response_class` would not: it only replaces the final encoding step, and turns off
+    FastAPI's direct-to-bytes serialisation of annotated return values).
+    """
+
+    def render(self, content: Any) -> bytes:
+        """Encode `content` with `dumps`."""
+        return dumps(content)
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """
+    Pick the response encoding from an `Accept-Encoding` header.
+    Args:
+        accept_encoding (str): The header, e.g. `gzip, deflate, br;q=0.9`.
+    Returns:
+        str | None: `br` (when brotli is installed) or `gzip` if the client accepts it, otherwise None.
+    """
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            accepted[coding.strip()] = float(q) if q else 1.0
+        except ValueError:
+            accepted[coding.strip()] = 0.0
+    for coding in ("br", "gzip") if brotli is not None else ("gzip",):
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+class Compressor:
+    """
+    Incremental `br` / `gzip` compressor: every chunk is flushed, so streamed responses (NDJSON) stay streamed.
+
+    Attributes:
+        encoding (str): `br` or `gzip`.
+    """
+
+    def __init__(
+        self, encoding: str, gzip_level: int = COMPRESSION_GZIP_LEVEL, brotli_quality: int = COMPRESSION_BROTLI_QUALITY
+    ) -> None:
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # wbits 16 + 15: gzip header and trailer
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """Compress a chunk, `final` ends the stream."""
+        if self.encoding == "br":
+            return self._brotli.process(data) + (self._brotli.finish() if final else self._brotli.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing JSON / NDJSON / text responses with `br` or `gzip`, as negotiated
+    from `Accept-Encoding`. Complete bodies below `min_bytes` and responses that already have
+    a `Content-Encoding` are sent as is; streamed bodies are compressed chunk by chunk.
+
+    Attributes:
+        app (ASGIApp): The wrapped application.
+        min_bytes (int): Smallest complete body that is compressed.
+    """
+
+    def __init__(self, app: ASGIApp, min_bytes: int = COMPRESSION_MIN_BYTES) -> None:
+        self.app = app
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Compress the response if the client accepts an encoding, otherwise pass it through untouched."""
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", "")) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor: Compressor | None = None
+
+        async def send_compressed(message: Message) -> None:
+            """Forward `message`, compressing the body once the first chunk shows it is worth it."""
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message  # held back until the first body chunk shows whether compressing pays off
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if start is not None:
+                initial, start = start, None
+                headers = MutableHeaders(raw=initial["headers"])
+                if (
+                    "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.min_bytes)
+                ):
+                    await send(initial)
+                    await send(message)
+                    return
+                compressor = Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                del headers["Content-Length"]
+                if not more_body:
+                    body = compressor.compress(body, final=True)
+                    headers["Content-Length"] = str(len(body))
+                    await send(initial)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(initial)
+            if compressor is None:
+                await send(message)
+                return
+            body = compressor.compress(body, final=not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def add_compression_middleware(app: FastAPI) -> None:
+    """
+    Add `CompressionMiddleware` to the FastAPI application when `COMPRESSION_ENABLED` is set.
+    Call it before `add_request_logging_middleware`, so the logged duration includes compressing.
+    Args:
+        app (FastAPI): The FastAPI application instance to which the middleware will be added.
+    """
+    if COMPRESSION_ENABLED:
+        app.add_middleware(CompressionMiddleware)
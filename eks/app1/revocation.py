@@ -0,0 +1,214 @@
+import asyncio
+import math
+import time
+from typing import Callable
+
+import httpx
+from prometheus_client import Counter, Gauge
+
+from .logging_config import logger
+from .metrics import get_or_create
+
+# * feeds (auth restarts) whose cursor is remembered, the least recently seen are forgotten first
+MAX_FEEDS = 32
+
+REVOCATION_SYNCS = get_or_create(Counter, "revocation_syncs", "Syncs of auth's token revocation feed", labelnames=["result"])
+REVOKED_TOKENS = get_or_create(
+    Gauge, "revoked_tokens", "Unexpired revoked tokens known to this worker", multiprocess_mode="livemax"
+)
+TOKENS_REJECTED_REVOKED = get_or_create(
+    Counter, "tokens_rejected_revoked", "Requests rejected because their token was revoked"
+)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings: `hashes` bit positions per item, derived from the item's `hash()`
+    (double hashing). The string hash is cached on the object and salted per process, which is fine for a filter
+    that never leaves the process. Never a false negative, false positives at about `error_rate` once `capacity`
+    items were added. Items can't be removed, the filter is rebuilt instead.
+
+    Attributes:
+        capacity (int): Items the filter is sized for.
+        size (int): Number of bits.
+        hashes (int): Bit positions per item.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        self.capacity = max(1, capacity)
+        self.size = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item: str) -> None:
+        """Add `item` to the filter."""
+        h = hash(item)
+        position, step = h & 0xFFFFFFFF, (h >> 32) | 1
+        for _ in range(self.hashes):
+            position %= self.size
+            self._bits[position >> 3] |= 1 << (position & 7)
+            position += step
+
+    def __contains__(self, item: str) -> bool:
+        """True if `item` may have been added, False if it certainly was not."""
+        # on the request path: inlined, and a miss usually stops at the first or second clear bit
+        h = hash(item)
+        bits, size = self._bits, self.size
+        position, step = h & 0xFFFFFFFF, (h >> 32) | 1
+        for _ in range(self.hashes):
+            position %= size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+        return True
+
+
+class RevocationList:
+    """
+    Local copy of auth's token revocations (`/revocations`), so `verify_jwt` rejects revoked tokens
+    without a network hop.
+
+    A Bloom filter answers "not revoked" for almost every token; only its positives are confirmed in the
+    exact `jti -> exp` map. Revocations age out at the token's `exp`: expired ones are dropped after every sync
+    and the filter is rebuilt from the map then (and doubled when it fills up). A background task follows the
+    feed incrementally with a cursor per feed `epoch`: a new epoch (auth restarted, its store is on the pod) is
+    read from the start and merged in, revocations are never dropped before they expire. It follows a single
+    auth replica (the auth chart refuses more): the feed of a replica this client isn't connected to is never
+    read. Only the event loop thread writes, `is_revoked` runs in the threadpool without locking.
+
+    Attributes:
+        url (str): The feed URL, e.g. `http://auth-service/revocations`.
+        sync_interval_seconds (float): Time between syncs.
+        timeout_seconds (float): Timeout of a single request.
+        error_rate (float): False positive rate of the Bloom filter at its capacity.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        sync_interval_seconds: float = 5.0,
+        timeout_seconds: float = 2.0,
+        capacity: int = 10_000,
+        error_rate: float = 0.001,
+        transport: httpx.AsyncBaseTransport | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.url = url
+        self.sync_interval_seconds = sync_interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.error_rate = error_rate
+        self._clock = clock  # wall clock, `exp` is a unix timestamp
+        self._transport = transport  # lets tests serve the feed from an in-process auth stand-in
+        self._revoked: dict[str, int] = {}  # jti -> exp
+        self._filter = BloomFilter(capacity, error_rate)
+        self._epoch: str | None = None  # the feed that answered last
+        self._cursors: dict[str, int] = {}  # epoch -> cursor, least recently seen first
+        self._task: asyncio.Task | None = None
+        self._client: httpx.AsyncClient | None = None
+
+    def __len__(self) -> int:
+        """Number of revoked, unexpired token ids held locally."""
+        return len(self._revoked)
+
+    def is_revoked(self, jti: str | None) -> bool:
+        """
+        Check a token ID against the local copy (tokens without `jti` can't be revoked).
+        Args:
+            jti (str | None): The token's `jti` claim.
+        Returns:
+            bool: True if the token was revoked and has not expired yet.
+        """
+        if not jti or not self._revoked or jti not in self._filter:
+            return False
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > self._clock()
+
+    def add(self, jti: str, expires_at: int) -> None:
+        """Record a revocation of the token `jti`, valid until `expires_at`."""
+        self._revoked[jti] = expires_at  # map first: a filter positive is always confirmed by it
+        if len(self._revoked) > self._filter.capacity:
+            self._rebuild()
+        else:
+            self._filter.add(jti)
+
+    def prune(self) -> int:
+        """Drop revocations of expired tokens, rebuild the filter without them and return how many were dropped."""
+        now = self._clock()
+        revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+        dropped = len(self._revoked) - len(revoked)
+        if dropped:
+            self._revoked = revoked
+            self._rebuild()
+        REVOKED_TOKENS.set(len(revoked))
+        return dropped
+
+    def _rebuild(self) -> None:
+        """Rebuild the Bloom filter from the revoked ids, growing it if they outnumber half its capacity."""
+        capacity = max(self._filter.capacity, 2 * len(self._revoked))
+        rebuilt = BloomFilter(capacity, self.error_rate)
+        for jti in self._revoked:
+            rebuilt.add(jti)
+        self._filter = rebuilt  # replaced as a whole, readers never see a partially built filter
+
+    async def sync(self) -> bool:
+        """
+        Fetch the revocations after the cursor (every page) and apply them. On failure the local copy is kept
+        and the next sync continues from the same cursor. A page from another feed than the one asked for is
+        applied when it starts at or before that feed's cursor, otherwise it is asked again from that cursor.
+
+        Returns:
+            bool: True if the feed was read up to its end.
+        """
+        if self._client is None:
+            raise RuntimeError("RevocationList.start() was not called")
+        try:
+            while True:
+                since = self._cursors.get(self._epoch, 0) if self._epoch is not None else 0
+                response = await self._client.get(self.url, params={"since": since})
+                response.raise_for_status()
+                page = response.json()
+                self._epoch = epoch = page["epoch"]
+                cursor = self._cursors.pop(epoch, 0)
+                self._cursors[epoch] = cursor  # most recently seen
+                while len(self._cursors) > MAX_FEEDS:
+                    del self._cursors[next(iter(self._cursors))]
+                if since > cursor:  # asked with another feed's cursor, beyond this one's: ask again from ours
+                    continue  # terminates: `since` only decreases until a page is applied
+                for revocation in page["revocations"]:
+                    self.add(revocation["jti"], int(revocation["exp"]))
+                self._cursors[epoch] = max(cursor, page["cursor"])
+                if not page["more"]:
+                    break
+        except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+            REVOCATION_SYNCS.labels(result="error").inc()
+            logger.warning(f"revocation sync from {self.url} failed: {e!r}")
+            return False
+        finally:
+            self.prune()
+        REVOCATION_SYNCS.labels(result="ok").inc()
+        return True
+
+    async def _run(self) -> None:
+        """Sync every `sync_interval_seconds`."""
+        while True:
+            await asyncio.sleep(self.sync_interval_seconds)
+            await self.sync()
+
+    async def start(self) -> None:
+        """Sync once and start the background sync task (called from the app's lifespan)."""
+        self._client = httpx.AsyncClient(timeout=self.timeout_seconds, transport=self._transport)
+        await self.sync()  # startup, not the request path - if auth is not up yet the background task retries
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and close the HTTP client."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,238 @@
+import asyncio
+import itertools
+import time
+from typing import Any, Callable
+
+import httpx
+from prometheus_client import Counter
+
+from .logging_config import logger
+from .metrics import get_or_create
+from .rpc import RPC_MAX_FRAME_BYTES, UNROUTED_HEADER, RpcProtocolError, encode_frame, read_frame
+
+# * headers httpx adds to every request, meaningless between two services on a private connection
+_SKIPPED_HEADERS = frozenset({"host", "accept", "accept-encoding", "connection", "user-agent", "content-length"})
+
+RPC_CLIENT_REQUESTS = get_or_create(
+    Counter, "rpc_client_requests", "Requests sent through an RPC transport, by how they were sent", labelnames=["transport"]
+)
+
+
+class _RpcConnection:
+    """One client connection: calls are written as they come and matched with their responses by stream id."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, max_frame_bytes: int) -> None:
+        self._writer = writer
+        self._pending: dict[int, asyncio.Future] = {}
+        self._stream_ids = itertools.count(1)
+        self.closed = False
+        self._reader_task = asyncio.create_task(self._read_responses(reader, max_frame_bytes))
+
+    @property
+    def in_flight(self) -> int:
+        """Calls waiting for their response."""
+        return len(self._pending)
+
+    async def call(self, message: list[Any], timeout: float | None) -> list[Any]:
+        """
+        Send a call (`message` without its stream id) and wait for its response.
+        Raises:
+            asyncio.TimeoutError: If no response came within `timeout` seconds.
+            ConnectionError: If the connection closed before the response came.
+        Returns:
+            list: The response, `[stream_id, status, headers, body]`.
+        """
+        if self.closed:
+            raise ConnectionResetError("RPC connection closed")
+        stream_id = next(self._stream_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[stream_id] = future
+        try:
+            self._writer.write(encode_frame([stream_id, *message]))
+            await self._writer.drain()
+            return await (asyncio.wait_for(future, timeout) if timeout else future)
+        finally:
+            self._pending.pop(stream_id, None)  # a late response to a timed out / cancelled call is dropped
+
+    async def _read_responses(self, reader: asyncio.StreamReader, max_frame_bytes: int) -> None:
+        """Resolve pending calls by stream id until the connection closes, then fail the rest."""
+        error: Exception = ConnectionResetError("RPC connection closed by the server")
+        try:
+            while (frame := await read_frame(reader, max_frame_bytes)) is not None:
+                future = self._pending.get(frame[0])
+                if future is not None and not future.done():
+                    future.set_result(frame)
+        except (ConnectionError, asyncio.IncompleteReadError, RpcProtocolError) as e:
+            error = ConnectionResetError(f"RPC connection lost: {e!r}")
+        finally:
+            self.closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._writer.close()
+
+    async def aclose(self) -> None:
+        """Close the connection, failing the calls still waiting."""
+        self._writer.close()
+        self._reader_task.cancel()
+        await asyncio.gather(self._reader_task, return_exceptions=True)
+
+
+class RpcTransport(httpx.AsyncBaseTransport):
+    """
+    `httpx` transport sending requests to an `RpcServer` over a few persistent connections, many calls multiplexed
+    on each one. Used as the transport of an `httpx.AsyncClient`, so everything built on the client (timeouts,
+    deadline and `traceparent` headers, retries, hedging, circuit breaking) is unchanged, and responses come back
+    as `httpx.Response` objects with an `RPC_CONTENT_TYPE` body (see `unpack_body`).
+
+    A connection that fails to open is tried again after `retry_seconds`, calls go on the others meanwhile.
+    Falls back to `fallback` (HTTP to the same upstream):
+        - while none of the connections can be opened, trying again every `retry_seconds`
+        - for paths the server has no RPC route for (remembered, later calls go straight over HTTP)
+
+    Attributes:
+        host (str): The RPC server's host.
+        port (int): The RPC server's port.
+        fallback (httpx.AsyncBaseTransport): The HTTP transport.
+        connections (int): Connections opened, each call goes on the one with the fewest calls in flight.
+        retry_seconds (float): How long a connection that failed to open is left alone, and how long calls go
+            over HTTP when none could be opened.
+        max_frame_bytes (int): Largest response frame accepted.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        fallback: httpx.AsyncBaseTransport,
+        connections: int = 2,
+        retry_seconds: float = 5.0,
+        max_frame_bytes: int = RPC_MAX_FRAME_BYTES,
+        max_unrouted_paths: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.fallback = fallback
+        self.connections = max(1, connections)
+        self.retry_seconds = retry_seconds
+        self.max_frame_bytes = max_frame_bytes
+        self.max_unrouted_paths = max_unrouted_paths
+        self._clock = clock
+        self._slots: list[asyncio.Task[_RpcConnection] | None] = [None] * self.connections  # each one connecting or connected
+        self._slot_retry_at = [0.0] * self.connections  # a slot whose connect failed isn't opened again before this
+        self._unavailable_until = 0.0
+        self._unrouted_paths: set[str] = set()
+        self._sent = {transport: RPC_CLIENT_REQUESTS.labels(transport=transport) for transport in ("rpc", "http_fallback")}
+
+    async def _connect(self) -> _RpcConnection:
+        """Open a new connection to the RPC server."""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        return _RpcConnection(reader, writer, self.max_frame_bytes)
+
+    @staticmethod
+    def _open(slot: asyncio.Task[_RpcConnection] | None) -> _RpcConnection | None:
+        """The connection of `slot` if it is connected and still open, otherwise None."""
+        if slot is None or not slot.done() or slot.cancelled() or slot.exception() is not None or slot.result().closed:
+            return None
+        return slot.result()
+
+    def _open_slot(self, index: int) -> asyncio.Task[_RpcConnection]:
+        """Start connecting slot `index`, if that fails it isn't tried again for `retry_seconds`."""
+        task = self._slots[index] = asyncio.create_task(self._connect())
+
+        def connected(task: asyncio.Task[_RpcConnection]) -> None:
+            """Start the slot's backoff if the connect failed (also retrieves the exception)."""
+            if task.cancelled() or task.exception() is not None:
+                self._slot_retry_at[index] = self._clock() + self.retry_seconds
+
+        task.add_done_callback(connected)
+        return task
+
+    async def _connection(self, timeout: float | None) -> _RpcConnection:
+        """
+        The open connection with the fewest calls in flight. Missing connections are opened in the background
+        while another one is open, otherwise the first one to connect is waited for.
+        Raises:
+            OSError: If every connection failed to open (or is within its `retry_seconds` since failing).
+            asyncio.TimeoutError: If none connected within `timeout` seconds.
+        """
+        now = self._clock()
+        connections, connecting = [], set()
+        for index, slot in enumerate(self._slots):
+            connection = self._open(slot)
+            if connection is not None:
+                connections.append(connection)
+                continue
+            if slot is None or (slot.done() and now >= self._slot_retry_at[index]):  # never opened, closed or failed
+                slot = self._open_slot(index)
+            if not slot.done():
+                connecting.add(slot)
+        if connections:
+            return min(connections, key=lambda connection: connection.in_flight)
+
+        error: BaseException = ConnectionError(f"no RPC connection to {self.host}:{self.port} could be opened")
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while connecting:
+            # * `asyncio.wait` never cancels the connects: a cancelled caller (e.g. a losing hedge) doesn't abort them
+            done, connecting = await asyncio.wait(
+                connecting,
+                timeout=None if deadline is None else max(0.0, deadline - loop.time()),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                raise asyncio.TimeoutError
+            for task in done:
+                if task.cancelled():
+                    continue
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception() or error
+        raise error
+
+    async def _send_fallback(self, request: httpx.Request) -> httpx.Response:
+        """Send `request` over HTTP instead."""
+        self._sent["http_fallback"].inc()
+        return await self.fallback.handle_async_request(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send `request` as an RPC call, or over HTTP while the server is unreachable or lacks the route."""
+        path = request.url.raw_path.decode("ascii")
+        route = path.partition("?")[0]
+        if route in self._unrouted_paths or self._clock() < self._unavailable_until:
+            return await self._send_fallback(request)
+        timeouts = request.extensions.get("timeout", {})
+        try:
+            connection = await self._connection(timeouts.get("connect"))
+        except (OSError, asyncio.TimeoutError) as e:
+            self._unavailable_until = self._clock() + self.retry_seconds
+            logger.warning(f"RPC {self.host}:{self.port} unreachable ({e!r}), using HTTP for {self.retry_seconds}s")
+            return await self._send_fallback(request)
+
+        headers = {name: value for name, value in request.headers.items() if name not in _SKIPPED_HEADERS}
+        self._sent["rpc"].inc()
+        try:
+            _, status, response_headers, body = await connection.call(
+                [request.method, path, headers, await request.aread()], timeouts.get("read")
+            )
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout(f"RPC call to {self.host}:{self.port} timed out", request=request)
+        except ConnectionError as e:
+            raise httpx.ReadError(str(e), request=request)
+
+        if status == 404 and UNROUTED_HEADER in response_headers:
+            if len(self._unrouted_paths) < self.max_unrouted_paths:
+                self._unrouted_paths.add(route)
+            return await self._send_fallback(request)
+        return httpx.Response(status, headers=response_headers, content=body)
+
+    async def aclose(self) -> None:
+        """Close the RPC connections and the HTTP fallback."""
+        for slot in self._slots:
+            connection = self._open(slot)
+            if connection is not None:
+                await connection.aclose()
+            elif slot is not None:
+                slot.cancel()
+        await self.fallback.aclose()
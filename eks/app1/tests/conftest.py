@@ -0,0 +1,64 @@
+import threading
+import time
+from collections.abc import Generator
+
+import jwt
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+
+from app1.main import ALGORITHM, SECRET_KEY, app
+from app1.tests.helpers import App2StandIn
+
+
+@pytest.fixture
+def client_verified_auth_header() -> Generator[TestClient, None, None]:
+    """fixture to create a testclient with jwt authentication via authorization header"""
+    # * generate a valid JWT token
+    token = jwt.encode({"sub": "Koyomi Araragi"}, SECRET_KEY, algorithm=ALGORITHM)
+
+    with TestClient(app) as test_client:
+        # * set the Authorization header for all requests
+        test_client.headers.update({"Authorization": f"Bearer {token}"})
+        yield test_client
+
+
+@pytest.fixture
+def client_verified_auth_cookies() -> Generator[TestClient, None, None]:
+    """fixture to create a testclient with verified jwt authentication using cookies"""
+    # * generate a valid JWT token
+    token = jwt.encode({"sub": "Koyomi Araragi"}, SECRET_KEY, algorithm=ALGORITHM)
+
+    with TestClient(app) as test_client:
+        # * set the Authorization header for all requests
+        test_client.cookies.set("access_token", token)
+        yield test_client
+
+
+@pytest.fixture
+def client_unpatched_auth() -> Generator[TestClient, None, None]:
+    """fixture to create a testclient without any jwt authentication"""
+    with TestClient(app) as test_client_unpatched:
+        yield test_client_unpatched
+
+
+@pytest.fixture(scope="module")
+def app2_server() -> Generator[App2StandIn, None, None]:
+    """fixture running one app2 stand-in on a free localhost port for the whole module"""
+    stand_in = App2StandIn()
+    server = uvicorn.Server(uvicorn.Config(stand_in.app, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    stand_in.url = f"http://127.0.0.1:{server.servers[0].sockets[0].getsockname()[1]}/"
+    yield stand_in
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def app2_stand_in(app2_server: App2StandIn) -> App2StandIn:
+    """fixture returning the app2 stand-in without faults"""
+    app2_server.reset()
+    return app2_server
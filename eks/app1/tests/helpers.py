@@ -0,0 +1,67 @@
+import asyncio
+
+import jwt
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from prometheus_client import REGISTRY
+
+from app1.main import ALGORITHM, SECRET_KEY
+from app1.resilience import DEADLINE_HEADER
+
+
+class DummyRequest:
+    """a dummy request class to simulate fastapi request objects for testing purposes"""
+
+    def __init__(self, headers: dict = None, cookies: dict = None) -> None:
+        self.headers = headers or {}
+        self.cookies = cookies or {}
+
+
+def create_jwt_token(payload: dict) -> str:
+    """create a jwt token for testing purposes"""
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def bearer_for(sub: str) -> dict[str, str]:
+    """authorization header with a valid token for `sub`"""
+    return {"Authorization": f"Bearer {jwt.encode({'sub': sub}, SECRET_KEY, algorithm=ALGORITHM)}"}
+
+
+def metric_value(name: str) -> float:
+    """read the current value of an unlabelled prometheus metric from the default registry"""
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+def bearer(token: str) -> DummyRequest:
+    """a dummy request carrying `token` in the authorization header"""
+    return DummyRequest(headers={"Authorization": f"Bearer {token}"})
+
+
+class App2StandIn:
+    """a local app2 with injectable faults (5xx responses, slow responses), served by uvicorn on a real port"""
+
+    def __init__(self) -> None:
+        self.url = ""
+        self.app = FastAPI()
+        self.app.get("/")(self.root)
+        self.reset()
+
+    def reset(self) -> None:
+        """remove every injected fault and forget the recorded requests"""
+        self.fail_status: int | None = None
+        self.delays: list[float] = []  # one consumed per request
+        self.deadlines: list[str | None] = []  # the deadline header of every request
+
+    @property
+    def requests(self) -> int:
+        """number of requests received"""
+        return len(self.deadlines)
+
+    async def root(self, request: Request) -> JSONResponse:
+        """app2's root endpoint with the injected faults applied"""
+        self.deadlines.append(request.headers.get(DEADLINE_HEADER))
+        if self.delays:
+            await asyncio.sleep(self.delays.pop(0))
+        if self.fail_status:
+            return JSONResponse({"detail": "injected fault"}, status_code=self.fail_status)
+        return JSONResponse({"message": "Hello from FastAPI App 2"})
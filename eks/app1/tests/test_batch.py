@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from httpx import TimeoutException
+from pytest_httpx import HTTPXMock
+
+from app1 import main
+from app1.main import APP2_URL, app
+from app1.tests.helpers import create_jwt_token
+
+
+def read_ndjson(response: httpx.Response) -> dict[str, dict]:
+    """parse a /read_app2/batch response into its results keyed by sub-request id"""
+    return {result["id"]: result for result in map(json.loads, response.text.splitlines())}
+
+
+def test_read_app2_batch(httpx_mock: HTTPXMock, client_verified_auth_header: TestClient) -> None:
+    """test /read_app2/batch streams one ndjson line per sub-request with errors classified inline"""
+    base = APP2_URL.rstrip("/")
+    httpx_mock.add_response(url=base + "/", json={"mocked": True})
+    # * failed sub-requests are retried once
+    httpx_mock.add_response(url=base + "/?page=2", status_code=503, is_reusable=True)
+    httpx_mock.add_exception(url=base + "/slow", exception=TimeoutException("timeout"), is_reusable=True)
+    httpx_mock.add_exception(url=base + "/down", exception=httpx.ConnectError("refused"), is_reusable=True)
+    sub_requests = [
+        {"id": "ok", "path": "/"},
+        {"id": "5xx", "path": "/?page=2"},
+        {"id": "timeout", "path": "/slow"},
+        {"id": "down", "path": "/down"},
+    ]
+
+    response = client_verified_auth_header.post("/read_app2/batch", json=sub_requests)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = read_ndjson(response)
+    assert results["ok"] == {"index": 0, "id": "ok", "status": 200, "app2_response": {"mocked": True}}
+    assert results["5xx"] == {"index": 1, "id": "5xx", "status": 502, "detail": "upstream error: 503"}
+    assert results["timeout"]["status"] == 504 and results["timeout"]["detail"].startswith("timeout:")
+    assert results["down"]["status"] == 502 and results["down"]["detail"].startswith("request error:")
+
+
+def test_read_app2_batch_bounds_concurrency(httpx_mock: HTTPXMock, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test a batch never has more than APP2_BATCH_CONCURRENCY app2 calls in flight and streams in completion order"""
+    monkeypatch.setattr(main, "APP2_BATCH_CONCURRENCY", 3)
+    in_flight, peak = 0, 0
+
+    async def app2(request: httpx.Request) -> httpx.Response:
+        """answer like app2 while tracking the peak number of concurrent calls"""
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05 if request.url.path == "/slow" else 0.01)
+        in_flight -= 1
+        return httpx.Response(200, json={"path": request.url.path})
+
+    httpx_mock.add_callback(app2, is_reusable=True)
+    headers = {"Authorization": f"Bearer {create_jwt_token({'sub': 'Hitagi Senjougahara'})}"}
+    sub_requests = [{"id": "slow", "path": "/slow"}] + [{"id": str(i), "path": f"/{i}"} for i in range(11)]
+
+    with TestClient(app) as test_client:
+        response = test_client.post("/read_app2/batch", json=sub_requests, headers=headers)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 12 and all(line["status"] == 200 for line in lines)
+    assert lines[0]["id"] != "slow"  # the first sub-request finishes last but does not hold back the others
+    assert peak == 3
+
+
+def test_read_app2_batch_repeated_paths_each_call_app2(
+    httpx_mock: HTTPXMock, client_verified_auth_header: TestClient
+) -> None:
+    """test sub-requests bypass the response cache: repeated paths are separate app2 calls, also after a /read_app2"""
+    httpx_mock.add_response(url=APP2_URL, json={"mocked": True})
+    httpx_mock.add_response(url=APP2_URL.rstrip("/") + "/", json={"mocked": True}, is_reusable=True)
+    assert client_verified_auth_header.get("/read_app2").status_code == 200  # cached for /read_app2
+
+    response = client_verified_auth_header.post("/read_app2/batch", json=[{"id": str(i), "path": "/"} for i in range(3)])
+    assert [result["status"] for result in read_ndjson(response).values()] == [200] * 3
+    assert len(httpx_mock.get_requests()) == 4
+
+
+def test_read_app2_batch_too_large(monkeypatch: pytest.MonkeyPatch, client_verified_auth_header: TestClient) -> None:
+    """test batches over APP2_BATCH_MAX_ITEMS and paths to other hosts are rejected"""
+    monkeypatch.setattr(main, "APP2_BATCH_MAX_ITEMS", 2)
+    response = client_verified_auth_header.post("/read_app2/batch", json=[{"path": "/"}] * 3)
+    assert response.status_code == 413
+    response = client_verified_auth_header.post("/read_app2/batch", json=[{"path": "//evil.example/"}])
+    assert response.status_code == 422
@@ -0,0 +1,69 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+
+from app1 import concurrency
+
+
+def test_adaptive_limiter_aimd() -> None:
+    """test the limit grows while requests are fast and the limit is in use, and shrinks on slow or failed requests"""
+    limiter = concurrency.AdaptiveLimiter("/aimd-test", initial_limit=4, latency_tolerance=2, latency_floor_seconds=0.01)
+    for _ in range(4):
+        assert limiter.try_acquire()
+    assert not limiter.try_acquire()  # at the limit: rejected
+    for _ in range(4):
+        limiter.release(0.001)  # fast, with the limit in use: additive increase
+    assert limiter.limit > 4
+
+    grown = limiter.limit
+    assert limiter.try_acquire()
+    limiter.release(0.5)  # far above 2x the no-load latency and the floor: multiplicative decrease
+    assert limiter.limit == pytest.approx(grown * 0.9)
+    assert limiter.try_acquire()
+    limiter.release(0.001, failed=True)
+    assert limiter.limit == pytest.approx(grown * 0.81)
+    assert REGISTRY.get_sample_value("concurrency_limit", {"route": "/aimd-test"}) == pytest.approx(grown * 0.81)
+    assert REGISTRY.get_sample_value("concurrency_limit_rejections_total", {"route": "/aimd-test"}) == 1
+
+
+def test_concurrency_limit_middleware_sheds_load() -> None:
+    """test requests over the limit fail fast with 503 + retry-after while probes and /metrics are never limited"""
+    release = asyncio.Event()
+    limited_app = FastAPI()
+
+    @limited_app.get("/work")
+    async def work() -> dict[str, str]:
+        """hold the request open until released"""
+        await release.wait()
+        return {"status": "done"}
+
+    @limited_app.get("/healthz")
+    async def healthz() -> dict[str, str]:
+        """unlimited probe route"""
+        return {"status": "ok"}
+
+    limiters = concurrency.RouteLimiters(routes="/work", initial_limit=2, min_limit=1)
+    limited_app.add_middleware(concurrency.ConcurrencyLimitMiddleware, limiters=limiters)
+
+    async def run() -> tuple[list[httpx.Response], httpx.Response, httpx.Response]:
+        """fill the limit, then send one more /work and a probe"""
+        transport = httpx.ASGITransport(app=limited_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://limited") as client:
+            admitted = [asyncio.create_task(client.get("/work")) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            rejected = await client.get("/work")
+            probe = await client.get("/healthz")
+            release.set()
+            return list(await asyncio.gather(*admitted)), rejected, probe
+
+    admitted, rejected, probe = asyncio.run(run())
+    assert [r.status_code for r in admitted] == [200, 200]
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "1"
+    assert rejected.json() == {"detail": "Server overloaded"}
+    assert probe.status_code == 200
+    assert limiters.get("/work").in_flight == 0
+    assert limiters.get("/metrics") is None
@@ -0,0 +1,91 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app1.cpu_executor import CpuExecutor, ExecutorSaturatedError
+from app1.main import app, burn_cpu
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_cpu_executor_modes(mode: str) -> None:
+    """test every executor mode returns the same result as calling `burn_cpu` directly"""
+    executor = CpuExecutor(mode=mode, max_workers=1, max_queue=0)
+    try:
+        assert asyncio.run(executor.run(burn_cpu, 50)) == burn_cpu(50)
+        assert executor.depth == 0
+    finally:
+        executor.shutdown()
+
+
+def test_cpu_executor_rejects_when_full() -> None:
+    """test jobs beyond `max_workers + max_queue` are rejected instead of queued"""
+
+    async def scenario() -> None:
+        """fill the only worker and queue slot, then expect the next job to be rejected"""
+        executor = CpuExecutor(mode="thread", max_workers=1, max_queue=1)
+        try:
+            running = [asyncio.ensure_future(executor.run(time.sleep, 0.2)) for _ in range(2)]
+            await asyncio.sleep(0)  # let both jobs get submitted
+            with pytest.raises(ExecutorSaturatedError):
+                await executor.run(time.sleep, 0)
+            await asyncio.gather(*running)
+            assert executor.depth == 0
+        finally:
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_cpu_executor_failed_submit_holds_no_capacity() -> None:
+    """test a job the pool refuses (shut down, broken) doesn't keep its slot"""
+    executor = CpuExecutor(mode="thread", max_workers=1, max_queue=0)
+    executor.shutdown()
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            asyncio.run(executor.run(burn_cpu, 10))
+    assert executor.depth == 0
+
+
+def test_healthz_stays_flat_while_burn_saturated(client_unpatched_auth: TestClient) -> None:
+    """test /healthz latency stays flat while every /burn worker and queue slot is busy in the process pool"""
+
+    def healthz_latencies(n: int = 20) -> list[float]:
+        """time `n` sequential /healthz calls"""
+        latencies = []
+        for _ in range(n):
+            start = time.perf_counter()
+            assert client_unpatched_auth.get("/healthz").status_code == 200
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    app.state.cpu_executor.shutdown()
+    executor = app.state.cpu_executor = CpuExecutor(mode="process", max_workers=1, max_queue=1)
+    baseline = healthz_latencies()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        burns = [pool.submit(client_unpatched_auth.get, "/burn", params={"iterations": 1_000_000}) for _ in range(2)]
+        deadline = time.monotonic() + 10
+        while executor.depth < executor.capacity and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert executor.depth == executor.capacity
+
+        rejected = client_unpatched_auth.get("/burn", params={"iterations": 10})
+        during = healthz_latencies()
+        still_saturated = executor.depth == executor.capacity
+        results = [b.result() for b in burns]
+
+    assert rejected.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert rejected.headers["Retry-After"] == "1"
+    assert still_saturated  # the /healthz samples were all taken while /burn was saturated
+    assert all(r.status_code == 200 for r in results)
+    # * generous bound: the burn competes for the CPU via the OS scheduler, but never for the GIL
+    assert statistics.median(during) < max(0.05, 10 * statistics.median(baseline))
+
+    metrics = client_unpatched_auth.get("/metrics").text
+    assert "cpu_executor_queue_wait_seconds_bucket" in metrics
+    assert "cpu_executor_execution_seconds_bucket" in metrics
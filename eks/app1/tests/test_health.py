@@ -0,0 +1,94 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app1 import health, main
+from app1.cpu_executor import CpuExecutor
+from app1.main import app
+
+
+def test_readyz_not_ready_while_burn_saturated(client_unpatched_auth: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test /readyz reports not ready while /burn jobs are queued, /livez stays ok, and readiness returns afterwards"""
+    monkeypatch.setattr(main, "READY_MAX_EXECUTOR_QUEUE", 1)
+    app.state.cpu_executor.shutdown()
+    executor = app.state.cpu_executor = CpuExecutor(mode="process", max_workers=1, max_queue=1)
+    assert client_unpatched_auth.get("/readyz").json() == {"status": "ready"}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        burns = [pool.submit(client_unpatched_auth.get, "/burn", params={"iterations": 1_000_000}) for _ in range(2)]
+        deadline = time.monotonic() + 10
+        while executor.depth < executor.capacity and time.monotonic() < deadline:
+            time.sleep(0.01)
+        readyz = client_unpatched_auth.get("/readyz")
+        livez = client_unpatched_auth.get("/livez")
+        assert all(b.result().status_code == 200 for b in burns)
+
+    assert readyz.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert readyz.json() == {"status": "not ready", "reasons": ["1 CPU-bound jobs queued (max 1)"]}
+    assert livez.status_code == 200
+    assert client_unpatched_auth.get("/readyz").status_code == 200
+
+
+def test_readyz_not_ready_with_too_many_requests_in_flight() -> None:
+    """test /readyz counts in-flight requests (but not probes) against the threshold"""
+    monitor = health.HealthMonitor(max_in_flight=1)
+    release = asyncio.Event()
+    probe_app = FastAPI()
+
+    @probe_app.get("/slow")
+    async def slow() -> dict[str, str]:
+        """hold the request open until released"""
+        await release.wait()
+        return {"status": "done"}
+
+    health.add_health_endpoints(probe_app, monitor)
+
+    async def run() -> tuple[httpx.Response, httpx.Response, httpx.Response]:
+        """check /readyz with one, two and then no slow requests in flight"""
+        transport = httpx.ASGITransport(app=probe_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://probe") as client:
+            one = asyncio.create_task(client.get("/slow"))
+            await asyncio.sleep(0.05)
+            with_one = await client.get("/readyz")
+            two = asyncio.create_task(client.get("/slow"))
+            await asyncio.sleep(0.05)
+            with_two = await client.get("/readyz")
+            release.set()
+            await asyncio.gather(one, two)
+            return with_one, with_two, await client.get("/readyz")
+
+    with_one, with_two, after = asyncio.run(run())
+    assert with_one.status_code == 200
+    assert with_two.status_code == 503
+    assert with_two.json()["reasons"] == ["2 requests in flight (max 1)"]
+    assert after.status_code == 200 and monitor.in_flight == 0
+
+
+def test_event_loop_lag_sampled() -> None:
+    """test a late timer shows up as lag in the monitor, its gauge and the readiness reasons"""
+    now = [0.0]
+    monitor = health.HealthMonitor(max_event_loop_lag_seconds=0.1, lag_interval_seconds=0.05, clock=lambda: now[0])
+
+    async def sampled() -> None:
+        """wait for the sampler to publish a lag"""
+        while not monitor.event_loop_lag:
+            await asyncio.sleep(0.001)
+
+    async def run() -> None:
+        """let the sampler's sleep overrun by half a second on the injected clock"""
+        monitor.start()
+        await asyncio.sleep(0)  # the sampler reads the clock and starts its sleep
+        now[0] += 0.5  # as if the loop had been blocked, like a sync call in an async handler
+        await asyncio.wait_for(sampled(), timeout=5)
+        await monitor.stop()
+
+    asyncio.run(run())
+    assert monitor.event_loop_lag == pytest.approx(0.45)
+    assert REGISTRY.get_sample_value("event_loop_lag_seconds") == pytest.approx(0.45)
+    assert monitor.not_ready_reasons()[0].startswith("event loop lag")
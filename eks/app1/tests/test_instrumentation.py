@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from pytest_httpx import HTTPXMock
+
+from app1.instrumentation import Span
+from app1.main import APP2_URL, burn_cpu
+
+
+def span_count(span: str) -> float:
+    """number of observations of a hot-path span"""
+    return REGISTRY.get_sample_value("span_duration_seconds_count", {"span": span}) or 0.0
+
+
+def test_read_app2_records_spans(httpx_mock: HTTPXMock, client_verified_auth_header: TestClient) -> None:
+    """test /read_app2 times the JWT verification and the app2 round trip separately"""
+    httpx_mock.add_response(url=APP2_URL, json={"mocked": True})
+    verify_before, app2_before = span_count("verify_jwt"), span_count("app2_call")
+
+    assert client_verified_auth_header.get("/read_app2").status_code == 200
+    assert span_count("verify_jwt") == verify_before + 1
+    assert span_count("app2_call") == app2_before + 1
+
+
+def test_span_decorates_sync_and_async_and_can_be_disabled() -> None:
+    """test spans time sync/async calls (also when they raise) and are no-ops when disabled"""
+    span = Span("span-test")
+
+    @span
+    def fails() -> None:
+        """raise, to check failed calls are timed too"""
+        raise ValueError("boom")
+
+    @span
+    async def succeeds() -> str:
+        """return a value from a coroutine"""
+        return "ok"
+
+    with pytest.raises(ValueError):
+        fails()
+    assert asyncio.run(succeeds()) == "ok"
+    with span.time():
+        pass
+    assert span_count("span-test") == 3
+
+    disabled = Span("span-test", enabled=False)
+    assert disabled(burn_cpu) is burn_cpu
+    with disabled.time():
+        pass
+    disabled.observe(1.0)
+    assert span_count("span-test") == 3
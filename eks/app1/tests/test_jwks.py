@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from fastapi import FastAPI, HTTPException
+
+from app1 import main
+from app1.jwks import JwksCache
+from app1.main import JWT_CACHE, SECRET_KEY, verify_jwt
+from app1.tests.helpers import bearer
+
+
+class AuthStandIn:
+    """a local stand-in for the auth service: signs eddsa tokens and serves their public keys as a jwks"""
+
+    def __init__(self) -> None:
+        self.private_keys: dict[str, Ed25519PrivateKey] = {}
+        self.jwks_requests = 0
+        self.app = FastAPI()
+        self.app.get("/.well-known/jwks.json")(self.jwks)
+        self.rotate()
+
+    def jwks(self) -> dict[str, list[dict]]:
+        """the jwks endpoint"""
+        self.jwks_requests += 1
+        keys = []
+        for kid, private_key in self.private_keys.items():
+            jwk = jwt.algorithms.OKPAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+            keys.append({**jwk, "kid": kid, "alg": "EdDSA", "use": "sig"})
+        return {"keys": keys}
+
+    def rotate(self) -> str:
+        """add a new signing key and return its kid"""
+        kid = f"key-{len(self.private_keys) + 1}"
+        self.private_keys[kid] = Ed25519PrivateKey.generate()
+        return kid
+
+    def token(self, sub: str, kid: str) -> str:
+        """sign a token with the key `kid`"""
+        return jwt.encode({"sub": sub}, self.private_keys[kid], algorithm="EdDSA", headers={"kid": kid})
+
+    def jwks_cache(self, min_refetch_interval_seconds: float = 60) -> JwksCache:
+        """a jwks cache fetching from this stand-in in-process"""
+        return JwksCache(
+            url="http://auth/.well-known/jwks.json",
+            min_refetch_interval_seconds=min_refetch_interval_seconds,
+            transport=httpx.ASGITransport(app=self.app),
+        )
+
+
+def test_verify_jwt_with_jwks(monkeypatch: pytest.MonkeyPatch) -> None:
+    """test asymmetric tokens are verified with the key fetched from auth's jwks"""
+    auth = AuthStandIn()
+    cache = auth.jwks_cache()
+    monkeypatch.setattr(main, "ALGORITHM", "EdDSA")
+    monkeypatch.setattr(main, "JWKS", cache)
+    JWT_CACHE.clear()
+
+    async def run() -> None:
+        """verify a signed token against the cached key and reject an hs256 forgery"""
+        await cache.start()
+        try:
+            main.prime_jwt()  # the warm-up's made-up signature is checked against every cached key and rejected quietly
+            payload = verify_jwt(bearer(auth.token("Nadeko Sengoku", "key-1")))  # type: ignore[arg-type]
+            assert payload["sub"] == "Nadeko Sengoku"
+            # * an HS256 token carrying a known kid must not be accepted (algorithm confusion)
+            forged = jwt.encode({"sub": "admin"}, SECRET_KEY, algorithm="HS256", headers={"kid": "key-1"})
+            with pytest.raises(HTTPException) as exc:
+                verify_jwt(bearer(forged))  # type: ignore[arg-type]
+            assert exc.value.detail == "Invalid token"
+        finally:
+            await cache.stop()
+
+    asyncio.run(run())
+    assert auth.jwks_requests == 1
+
+
+def test_jwks_unknown_kid_refetch_is_rate_limited(monkeypatch: pytest.MonkeyPatch) -> None:
+    """test an unknown kid is rejected without waiting on the network and triggers at most one background refetch"""
+    auth = AuthStandIn()
+    cache = auth.jwks_cache(min_refetch_interval_seconds=60)
+    monkeypatch.setattr(main, "ALGORITHM", "EdDSA")
+    monkeypatch.setattr(main, "JWKS", cache)
+    JWT_CACHE.clear()
+
+    async def run() -> None:
+        """rotate the key and check unknown kids are refetched once per window"""
+        await cache.start()
+        try:
+            rotated = auth.token("Karen Araragi", auth.rotate())
+            for _ in range(3):  # rejected immediately, only the first miss schedules a refetch
+                with pytest.raises(HTTPException) as exc:
+                    verify_jwt(bearer(rotated))  # type: ignore[arg-type]
+                assert exc.value.detail == "Unknown signing key"
+            await asyncio.sleep(0.1)  # let the background task fetch the rotated key
+            assert verify_jwt(bearer(rotated))["sub"] == "Karen Araragi"  # type: ignore[arg-type]
+
+            with pytest.raises(HTTPException):
+                verify_jwt(bearer(auth.token("Karen Araragi", auth.rotate())))  # type: ignore[arg-type]
+            await asyncio.sleep(0.1)
+        finally:
+            await cache.stop()
+
+    asyncio.run(run())
+    assert auth.jwks_requests == 2  # startup + one refetch, the second rotation is inside the rate limit window
@@ -0,0 +1,100 @@
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app1 import main
+from app1.jwt_cache import VerifiedTokenCache
+from app1.main import ALGORITHM, JWT_CACHE, SECRET_KEY, verify_jwt
+from app1.tests.helpers import DummyRequest, create_jwt_token, metric_value
+
+
+def test_verify_jwt_cache_hit_matches_cold_decode() -> None:
+    """test a cached payload is identical to a cold decode, whether the token comes from a header or a cookie"""
+    JWT_CACHE.clear()
+    token = create_jwt_token({"sub": "Nadeko Sengoku", "exp": int(time.time()) + 60})
+    expected = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    hits_before = metric_value("jwt_cache_hits_total")
+
+    cold = verify_jwt(DummyRequest(headers={"Authorization": f"Bearer {token}"}))  # type: ignore[arg-type]
+    from_cookie = verify_jwt(DummyRequest(cookies={"access_token": token}))  # type: ignore[arg-type]
+    from_header = verify_jwt(DummyRequest(headers={"Authorization": f"Bearer {token}"}))  # type: ignore[arg-type]
+
+    assert cold == from_cookie == from_header == expected
+    assert metric_value("jwt_cache_hits_total") == hits_before + 2
+
+
+def test_verify_jwt_cache_returns_copies() -> None:
+    """test mutating a returned payload does not corrupt the cached entry"""
+    JWT_CACHE.clear()
+    token = create_jwt_token({"sub": "Suruga Kanbaru"})
+    req = DummyRequest(headers={"Authorization": f"Bearer {token}"})
+
+    verify_jwt(req)["sub"] = "mutated"  # type: ignore[arg-type]
+    assert verify_jwt(req)["sub"] == "Suruga Kanbaru"  # type: ignore[arg-type]
+
+
+def test_verify_jwt_expired_token_never_cached() -> None:
+    """test an expired token is rejected on every call and never enters the cache"""
+    JWT_CACHE.clear()
+    token = create_jwt_token({"sub": "Shinobu Oshino", "exp": int(time.time()) - 10})
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            verify_jwt(DummyRequest(cookies={"access_token": token}))  # type: ignore[arg-type]
+        assert exc.value.detail == "Token expired"
+    assert len(JWT_CACHE) == 0
+
+
+def test_verify_jwt_cache_entry_expires_at_exp(monkeypatch: pytest.MonkeyPatch) -> None:
+    """test a cached entry stops being served once the clock reaches the token's `exp` claim"""
+    now = [time.time()]
+    cache = VerifiedTokenCache(max_entries=10, max_ttl_seconds=3600, clock=lambda: now[0])
+    monkeypatch.setattr(main, "JWT_CACHE", cache)
+    token = create_jwt_token({"sub": "Karen Araragi", "exp": int(now[0]) + 30})
+    req = DummyRequest(headers={"Authorization": f"Bearer {token}"})
+
+    verify_jwt(req)  # type: ignore[arg-type]
+    assert cache.get(token) is not None
+
+    now[0] += 30  # clock reaches `exp`
+    assert cache.get(token) is None
+    assert len(cache) == 0
+
+
+def test_verify_jwt_tampered_token_rejected_after_cache_hit() -> None:
+    """test a token with a tampered payload or signature is rejected even when the original is cached"""
+    JWT_CACHE.clear()
+    token = create_jwt_token({"sub": "Tsukihi Araragi"})
+    verify_jwt(DummyRequest(headers={"Authorization": f"Bearer {token}"}))  # type: ignore[arg-type]
+
+    header, payload, signature = token.split(".")
+    forged_payload = jwt.utils.base64url_encode(b'{"sub":"admin"}').decode()
+    forged_signature = signature[:-2] + ("AA" if not signature.endswith("AA") else "BB")
+    for forged in (f"{header}.{forged_payload}.{signature}", f"{header}.{payload}.{forged_signature}"):
+        with pytest.raises(HTTPException) as exc:
+            verify_jwt(DummyRequest(headers={"Authorization": f"Bearer {forged}"}))  # type: ignore[arg-type]
+        assert exc.value.detail == "Invalid token"
+
+
+def test_jwt_cache_evicts_least_recently_used() -> None:
+    """test the cache stays bounded and evicts the least recently used entry"""
+    cache = VerifiedTokenCache(max_entries=2, max_ttl_seconds=60)
+    evictions_before = metric_value("jwt_cache_evictions_total")
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    assert cache.get("a") == {"sub": "a"}  # `a` becomes most recently used
+    cache.put("c", {"sub": "c"})
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert metric_value("jwt_cache_evictions_total") == evictions_before + 1
+
+
+def test_jwt_cache_metrics_exposed(client_verified_auth_header: TestClient) -> None:
+    """test the cache counters are exported on the instrumentator /metrics endpoint"""
+    client_verified_auth_header.get("/")
+    body = client_verified_auth_header.get("/metrics").text
+    for name in ("jwt_cache_hits_total", "jwt_cache_misses_total", "jwt_cache_evictions_total"):
+        assert name in body
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import pytest
+
+from app1 import cgroup, launcher
+
+
+def test_cgroup_cpu_quota(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the cgroup v2 `cpu.max` file is parsed into cores"""
+    cpu_max = tmp_path / "cpu.max"
+    monkeypatch.setattr(cgroup, "CGROUP_V2_CPU_MAX", str(cpu_max))
+
+    cpu_max.write_text("50000 100000\n")
+    assert cgroup.cpu_quota() == 0.5
+    assert cgroup.available_cpus() == 1
+
+    cpu_max.write_text("max 100000\n")
+    assert cgroup.cpu_quota() is None
+
+
+def test_launcher_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the launcher sizes workers from the cpu quota and switches to multiprocess metrics for >1 worker"""
+    monkeypatch.setattr(launcher, "available_cpus", lambda: 3)
+    assert launcher.resolve_workers("auto") == 3
+    assert launcher.resolve_workers("2") == 2
+    assert launcher.resolve_loop("asyncio") == "asyncio"
+    assert launcher.resolve_http("h11") == "h11"
+    assert launcher.prepare_multiprocess_metrics(1) is None
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    (tmp_path / "counter_123.db").write_bytes(b"stale")
+    assert launcher.prepare_multiprocess_metrics(2) == str(tmp_path)
+    assert not list(tmp_path.glob("*.db"))
@@ -0,0 +1,167 @@
+import io
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from loguru import logger
+from prometheus_client import REGISTRY
+
+from app1 import logging_config, middleware
+
+
+def test_batching_sink_writes_in_batches() -> None:
+    """test queued log records are all written, with fewer writes than records"""
+
+    class CountingStream(io.StringIO):
+        """string stream that counts write calls"""
+        writes = 0
+
+        def write(self, s: str) -> int:
+            """count the call and write through"""
+            self.writes += 1
+            return super().write(s)
+
+    stream = CountingStream()
+    sink = logging_config.BatchingSink(stream, max_queue=100, batch_size=50, flush_interval=0.5)
+    for i in range(20):
+        sink.write(f"line {i}\n")
+    sink.stop()
+
+    assert stream.getvalue() == "".join(f"line {i}\n" for i in range(20))
+    assert stream.writes < 20
+
+
+def test_batching_sink_drops_when_full() -> None:
+    """test the sink never blocks the caller: records beyond the queue size are dropped and counted"""
+    entered, release = threading.Event(), threading.Event()
+
+    class BlockingStream(io.StringIO):
+        """string stream whose writes block until released"""
+        def write(self, s: str) -> int:
+            """signal entry, then wait for the test to release the write"""
+            entered.set()
+            release.wait(timeout=5)
+            return super().write(s)
+
+    stream = BlockingStream()
+    sink = logging_config.BatchingSink(stream, max_queue=2, batch_size=1, flush_interval=0)
+    dropped_before = REGISTRY.get_sample_value("log_records_dropped_total", {"reason": "queue_full"}) or 0.0
+
+    sink.write("a")
+    assert entered.wait(timeout=5)  # flusher thread is now stuck writing "a"
+    for record in ("b", "c", "d"):  # queue holds two records, "d" is dropped
+        sink.write(record)
+    release.set()
+    sink.stop()
+
+    assert stream.getvalue() == "abc"
+    assert REGISTRY.get_sample_value("log_records_dropped_total", {"reason": "queue_full"}) == dropped_before + 1
+
+
+def test_batching_sink_survives_failed_write(capsys: pytest.CaptureFixture[str]) -> None:
+    """test a write that raises loses only its batch: it is counted and reported, later records are still written"""
+
+    class FullDiskOnce(io.StringIO):
+        """string stream whose first write fails like a full disk"""
+        failed = False
+
+        def write(self, s: str) -> int:
+            """fail the first call, write through afterwards"""
+            if not self.failed:
+                self.failed = True
+                raise OSError(28, "No space left on device")
+            return super().write(s)
+
+    stream = FullDiskOnce()
+    errors_before = REGISTRY.get_sample_value("batch_worker_errors_total", {"worker": "log-flusher"}) or 0.0
+    sink = logging_config.BatchingSink(stream, max_queue=10, batch_size=1, flush_interval=0)
+    for record in ("a", "b", "c"):
+        sink.write(record)
+    sink.stop()
+
+    assert stream.getvalue() == "bc"
+    assert REGISTRY.get_sample_value("batch_worker_errors_total", {"worker": "log-flusher"}) == errors_before + 1
+    assert "log-flusher: dropped a batch of 1" in capsys.readouterr().err
+
+
+def test_rotating_file_and_worker_log_files(tmp_path: Path) -> None:
+    """test the batched sink's file is renamed into an archive when due and each worker of several writes its own file"""
+    path = str(tmp_path / "app1_service.log")
+    stream = logging_config.RotatingFile(path, rotation_seconds=3600)
+    stream.write("a\n")
+    stream.rotate_at = 0  # due
+    stream.write("b\n")
+    stream.close()
+
+    (archive,) = [p for p in tmp_path.iterdir() if p.name != "app1_service.log"]
+    assert archive.name.startswith("app1_service.20") and archive.read_text() == "a\n"
+    assert Path(path).read_text() == "b\n"
+
+    assert logging_config.worker_log_file(path, "1") == logging_config.worker_log_file(path, "auto") == path
+    assert logging_config.worker_log_file(path, "4").endswith(f"app1_service.worker-{os.getpid()}.log")
+
+
+def test_should_log_sampling(monkeypatch: pytest.MonkeyPatch) -> None:
+    """test per-route sampling drops probe traffic and counts what it dropped"""
+    assert logging_config.parse_sample_rates("/healthz=0, /metrics=0.25,/burn=3") == {
+        "/healthz": 0.0,
+        "/metrics": 0.25,
+        "/burn": 1.0,
+    }
+    monkeypatch.setattr(logging_config, "SAMPLE_RATES", {"/healthz": 0.0})
+    sampled_before = REGISTRY.get_sample_value("log_records_dropped_total", {"reason": "sampled"}) or 0.0
+
+    assert not logging_config.should_log("/healthz")
+    assert logging_config.should_log("/read_app2")
+    assert REGISTRY.get_sample_value("log_records_dropped_total", {"reason": "sampled"}) == sampled_before + 1
+
+
+def build_failing_app(slow_request_seconds: float = 0) -> FastAPI:
+    """build an app behind RequestLoggingMiddleware with a route that raises"""
+    failing_app = FastAPI()
+    failing_app.add_middleware(middleware.RequestLoggingMiddleware, slow_request_seconds=slow_request_seconds)
+
+    @failing_app.get("/boom")
+    def boom() -> None:
+        """always raise"""
+        raise RuntimeError("boom")
+
+    @failing_app.get("/slow")
+    def slow() -> dict[str, str]:
+        """answer after a short blocking sleep"""
+        time.sleep(0.05)
+        return {"status": "ok"}
+
+    return failing_app
+
+
+def test_request_logging_middleware_returns_json_500() -> None:
+    """test an unhandled exception becomes a json 500 response and is logged with the request path"""
+    messages: list[str] = []
+    sink_id = logger.add(messages.append, level="ERROR")
+    try:
+        with TestClient(build_failing_app()) as test_client:
+            response = test_client.get("/boom")
+    finally:
+        logger.remove(sink_id)
+
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal Server Error"}
+    assert any("GET /boom" in m and "RuntimeError" in m for m in messages)
+
+
+def test_request_logging_middleware_warns_on_slow_requests() -> None:
+    """test requests slower than slow_request_seconds are logged as a warning"""
+    messages: list[str] = []
+    sink_id = logger.add(messages.append, level="WARNING")
+    try:
+        with TestClient(build_failing_app(slow_request_seconds=0.01)) as test_client:
+            assert test_client.get("/slow").status_code == 200
+    finally:
+        logger.remove(sink_id)
+
+    assert any("SLOW REQUEST: GET /slow" in m for m in messages)
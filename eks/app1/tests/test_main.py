@@ -1,57 +1,15 @@
-from typing import Generator
 
-import jwt
 import pytest
 from fastapi import HTTPException, status
+from fastapi.middleware.cors import CORSMiddleware
 from fastapi.testclient import TestClient
 from httpx import TimeoutException
 from pytest_httpx import HTTPXMock
 
-from app1.main import ALGORITHM, APP2_URL, SECRET_KEY, app, verify_jwt
-
-
-class DummyRequest:
-    """a dummy request class to simulate fastapi request objects for testing purposes"""
-
-    def __init__(self, headers: dict = None, cookies: dict = None) -> None:
-        self.headers = headers or {}
-        self.cookies = cookies or {}
-
-
-@pytest.fixture
-def client_verified_auth_header() -> Generator[TestClient, None, None]:
-    """fixture to create a testclient with jwt authentication via authorization header"""
-    # * generate a valid JWT token
-    token = jwt.encode({"sub": "Koyomi Araragi"}, SECRET_KEY, algorithm=ALGORITHM)
-
-    with TestClient(app) as test_client:
-        # * set the Authorization header for all requests
-        test_client.headers.update({"Authorization": f"Bearer {token}"})
-        yield test_client
-
-
-@pytest.fixture
-def client_verified_auth_cookies() -> Generator[TestClient, None, None]:
-    """fixture to create a testclient with verified jwt authentication using cookies"""
-    # * generate a valid JWT token
-    token = jwt.encode({"sub": "Koyomi Araragi"}, SECRET_KEY, algorithm=ALGORITHM)
-
-    with TestClient(app) as test_client:
-        # * set the Authorization header for all requests
-        test_client.cookies.set("access_token", token)
-        yield test_client
-
-
-@pytest.fixture
-def client_unpatched_auth() -> Generator[TestClient, None, None]:
-    """fixture to create a testclient without any jwt authentication"""
-    with TestClient(app) as test_client_unpatched:
-        yield test_client_unpatched
-
-
-def create_jwt_token(payload: dict) -> str:
-    """create a jwt token for testing purposes"""
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+from app1 import main
+from app1.main import APP2_URL, app, verify_jwt
+from app1.middleware import ALLOWED_ORIGINS
+from app1.tests.helpers import DummyRequest, bearer_for, create_jwt_token
 
 
 def test_healthz(client_unpatched_auth: TestClient) -> None:
@@ -131,6 +89,17 @@ def test_read_app2(httpx_mock: HTTPXMock, client_verified_auth_header: TestClien
     assert response.json()['app2_response'] == {"mocked": True}
 
 
+def test_read_app2_embeds_app2_body_as_is(httpx_mock: HTTPXMock, client_verified_auth_header: TestClient) -> None:
+    """test app2's json body is passed through byte for byte instead of being decoded and encoded again"""
+    body = b'{"mocked": true,  "text": "caf\\u00e9"}'  # spacing and escapes a re-encode would change
+    httpx_mock.add_response(url=APP2_URL, content=body, headers={"Content-Type": "application/json"})
+
+    response = client_verified_auth_header.get("/read_app2")
+    assert response.status_code == 200
+    assert response.content == b'{"message":"Hello from FastAPI App 1 (with configmap)","app2_response":' + body + b"}"
+    assert response.json()["app2_response"] == {"mocked": True, "text": "caf\u00e9"}
+
+
 def test_read_app2_error(httpx_mock: HTTPXMock, client_verified_auth_header: TestClient) -> None:
     """test the /read_app2 endpoint when app2 returns an error response"""
     httpx_mock.add_exception(url=APP2_URL, exception=Exception())
@@ -138,9 +107,49 @@ def test_read_app2_error(httpx_mock: HTTPXMock, client_verified_auth_header: Tes
     assert response.status_code == 500
 
 
+def test_read_app2_uses_shared_client(httpx_mock: HTTPXMock, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the /read_app2 endpoint reuses one pooled client created in the lifespan and closes it on shutdown"""
+    monkeypatch.setattr(main, "APP2_CACHE_TTL_SECONDS", 0)  # every sequential request goes upstream
+    monkeypatch.setattr(main, "APP2_CACHE_STALE_WHILE_REVALIDATE_SECONDS", 0)
+    httpx_mock.add_response(url=APP2_URL, json={"mocked": True}, is_reusable=True)
+    token = create_jwt_token({"sub": "Tsubasa Hanekawa"})
+
+    with TestClient(app) as test_client:
+        shared_client = app.state.app2_client
+        for _ in range(3):
+            response = test_client.get("/read_app2", headers={"Authorization": f"Bearer {token}"})
+            assert response.status_code == 200
+        assert app.state.app2_client is shared_client
+
+    assert shared_client.is_closed
+    assert len(httpx_mock.get_requests()) == 3
+
+
 def test_read_app2_timeout(httpx_mock: HTTPXMock, client_verified_auth_header: TestClient) -> None:
     """test the /read_app2 endpoint when app2 times out"""
-    httpx_mock.add_exception(url=APP2_URL, exception=TimeoutException("timeout"))
+    httpx_mock.add_exception(url=APP2_URL, exception=TimeoutException("timeout"), is_reusable=True)  # retried
     response = client_verified_auth_header.get("/read_app2")
     assert response.status_code == 504
     assert response.json()["detail"].startswith("timeout:")
+
+
+def test_read_app2_upstream_5xx(httpx_mock: HTTPXMock, client_verified_auth_header: TestClient) -> None:
+    """test an app2 5xx with nothing cached is reported as a bad gateway"""
+    httpx_mock.add_response(url=APP2_URL, status_code=503, json={"detail": "unavailable"}, is_reusable=True)
+    response = client_verified_auth_header.get("/read_app2")
+    assert response.status_code == 502
+    assert response.json()["detail"] == "upstream error: 503"
+
+
+def test_middleware_errors_carry_cors_headers(client_unpatched_auth: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test cors is the outermost middleware, so the frontend can read a 500 built by the request logging middleware"""
+
+    async def broken_limiter(route: str, key: str) -> None:
+        """fail like a rate limiter backend that is down"""
+        raise RuntimeError("limiter down")
+
+    monkeypatch.setattr(main.RATE_LIMITER, "limit", broken_limiter)
+    response = client_unpatched_auth.get("/", headers={**bearer_for("a"), "Origin": ALLOWED_ORIGINS[0]})
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert response.headers["access-control-allow-origin"] == ALLOWED_ORIGINS[0]
+    assert app.user_middleware[0].cls is CORSMiddleware
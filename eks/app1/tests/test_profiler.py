@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app1.main import verify_jwt
+from app1.profiler import SamplingProfiler, add_profiler_endpoints
+from app1.tests.helpers import bearer_for
+
+
+def profiler_client(profiler: SamplingProfiler) -> TestClient:
+    """a testclient for an app with only the profiler endpoints, `admin` being the only admin"""
+    debug_app = FastAPI()
+    add_profiler_endpoints(debug_app, profiler, verify_jwt, admins=frozenset({"admin"}))
+    return TestClient(debug_app)
+
+
+def test_profiler_samples_burn_cpu(client_unpatched_auth: TestClient) -> None:
+    """test a profile taken while /burn runs shows burn_cpu, as collapsed stacks and as a speedscope file"""
+    stop = threading.Event()
+
+    def burn() -> None:
+        """keep /burn busy until the profile is taken"""
+        while not stop.is_set():
+            client_unpatched_auth.get("/burn", params={"iterations": 20_000})
+
+    with ThreadPoolExecutor(max_workers=1) as pool, profiler_client(SamplingProfiler(True, interval_seconds=0.002)) as debug:
+        pool.submit(burn)
+        try:
+            collapsed = debug.get("/debug/profile", params={"seconds": 0.5}, headers=bearer_for("admin"))
+            speedscope = debug.get("/debug/profile/latest", params={"format": "speedscope"}, headers=bearer_for("admin"))
+        finally:
+            stop.set()
+
+    assert collapsed.status_code == 200
+    assert any(line.split(" ")[0].endswith("app1.main:burn_cpu") for line in collapsed.text.splitlines())
+    assert "attachment" in speedscope.headers["Content-Disposition"]
+    assert "app1.main:burn_cpu" in [frame["name"] for frame in speedscope.json()["shared"]["frames"]]
+
+
+def test_profiler_admin_only_single_session() -> None:
+    """test the profiler needs an admin token and runs one session at a time"""
+    profiler = SamplingProfiler(True)
+    with profiler_client(profiler) as debug:
+        assert debug.get("/debug/profile").status_code == 401
+        assert debug.get("/debug/profile", headers=bearer_for("Koyomi Araragi")).status_code == 403
+        assert debug.get("/debug/profile", params={"seconds": 3600}, headers=bearer_for("admin")).status_code == 422
+        assert debug.get("/debug/profile/latest", headers=bearer_for("admin")).status_code == 404
+
+        profiler._session.acquire()  # pylint: disable=protected-access  # another session running
+        try:
+            assert debug.get("/debug/profile", params={"seconds": 0.1}, headers=bearer_for("admin")).status_code == 409
+        finally:
+            profiler._session.release()  # pylint: disable=protected-access
+        assert debug.get("/debug/profile", params={"seconds": 0.1}, headers=bearer_for("admin")).status_code == 200
@@ -0,0 +1,75 @@
+
+import jwt
+import pytest
+from fastapi import HTTPException, status
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app1 import main
+from app1.main import ALGORITHM, SECRET_KEY
+from app1.ratelimit import LocalBackend, RateLimiter, Rule, parse_rules
+from app1.tests.helpers import bearer_for
+from app1.workloads import WorkloadEngine
+
+
+def test_gcra_allows_burst_then_paces_requests() -> None:
+    """test a client gets its burst at once, then one request per interval, with retry-after until the next one"""
+    now = [1000.0]
+    limiter = RateLimiter("/gcra-test=2:3", enabled=True, backend=LocalBackend(), clock=lambda: now[0])
+    assert limiter.rules == {"/gcra-test": Rule(0.5, 3)}
+    for _ in range(3):
+        limiter.check("/gcra-test", "sub:a")
+    with pytest.raises(HTTPException) as exc:
+        limiter.check("/gcra-test", "sub:a")
+    assert exc.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert exc.value.headers == {"Retry-After": "1"}  # 0.5s, rounded up to whole seconds
+    limiter.check("/gcra-test", "sub:b")  # every client has its own limit
+    limiter.check("/other", "sub:a")  # routes without a rule are not limited
+
+    now[0] += 0.5
+    limiter.check("/gcra-test", "sub:a")
+    with pytest.raises(HTTPException):
+        limiter.check("/gcra-test", "sub:a")
+    assert REGISTRY.get_sample_value("rate_limit_rejections_total", {"route": "/gcra-test"}) == 2
+    with pytest.raises(ValueError):
+        parse_rules("/login=0:5")
+
+
+def test_rate_limit_local_backend_forgets_least_recently_seen() -> None:
+    """test the local backend keeps at most max_keys clients per route, the least recently seen one goes first"""
+    backend = LocalBackend(max_keys=2)
+    rule = Rule(interval=10.0, burst=1)
+    assert backend.acquire("/", "a", rule, 0.0) == 0 and backend.acquire("/", "b", rule, 0.0) == 0
+    assert backend.acquire("/", "a", rule, 1.0) == pytest.approx(9.0)  # `a` is seen again, `b` is least recent
+    assert backend.acquire("/", "c", rule, 1.0) == 0
+    assert list(backend._tats["/"]) == ["a", "c"]
+    assert backend.acquire("/", "b", rule, 1.0) == 0  # forgotten, so its limit starts over
+
+
+def test_rate_limit_keys_on_subject(client_unpatched_auth: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test app1 routes are limited per token subject, /burn without a token per client address"""
+    monkeypatch.setattr(main, "RATE_LIMITER", RateLimiter("/=0.01:2,/burn=0.01:1", enabled=True, backend=LocalBackend()))
+    as_a, as_b = (
+        {"Authorization": f"Bearer {jwt.encode({'sub': sub}, SECRET_KEY, algorithm=ALGORITHM)}"} for sub in ("a", "b")
+    )
+    assert [client_unpatched_auth.get("/", headers=as_a).status_code for _ in range(3)] == [200, 200, 429]
+    assert client_unpatched_auth.get("/", headers=as_b).status_code == status.HTTP_200_OK
+    assert client_unpatched_auth.get("/").status_code == status.HTTP_401_UNAUTHORIZED  # no token: not even counted
+
+    assert client_unpatched_auth.get("/burn", params={"iterations": 1}).status_code == status.HTTP_200_OK
+    rejected = client_unpatched_auth.get("/burn", params={"iterations": 1})
+    assert rejected.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert rejected.headers["Retry-After"] == "100"
+    assert client_unpatched_auth.get("/burn", params={"iterations": 1}, headers=as_a).status_code == status.HTTP_200_OK
+
+
+def test_rate_limit_keys_on_route_template(client_unpatched_auth: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test a rule on a parameterised route's template limits every path of the route together"""
+    monkeypatch.setattr(main, "RATE_LIMITER", RateLimiter("/workload/{name}=0.01:1", enabled=True, backend=LocalBackend()))
+    monkeypatch.setattr(main, "WORKLOADS", WorkloadEngine(enabled=True))
+    monkeypatch.setattr(main, "WORKLOAD_ADMINS", frozenset({"admin"}))
+    as_admin = bearer_for("admin")
+
+    assert client_unpatched_auth.get("/workload/no-such-profile", headers=as_admin).status_code == status.HTTP_404_NOT_FOUND
+    assert client_unpatched_auth.get("/workload/another-one", headers=as_admin).status_code == 429
+    assert REGISTRY.get_sample_value("rate_limit_rejections_total", {"route": "/workload/{name}"}) == 1
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app1 import main
+from app1.main import app
+from app1.resilience import DEADLINE_HEADER, CircuitBreaker, CircuitOpenError, Deadline, RetryBudget, Upstream
+from app1.tests.helpers import App2StandIn, create_jwt_token
+
+
+def test_circuit_breaker_opens_and_probes(app2_stand_in: App2StandIn) -> None:
+    """test the breaker opens after consecutive failures, fails fast, and closes after a successful half-open probe"""
+    now = [0.0]
+    breaker = CircuitBreaker("app2-breaker-test", failure_threshold=3, recovery_seconds=5, clock=lambda: now[0])
+    upstream = Upstream("app2-breaker-test", breaker, RetryBudget(), max_attempts=1)
+    state = lambda: REGISTRY.get_sample_value("upstream_circuit_state", {"upstream": "app2-breaker-test"})  # noqa: E731
+    app2_stand_in.fail_status = 503
+
+    async def run() -> None:
+        """trip the breaker, then probe it half-open with a failing and a succeeding upstream"""
+        async with httpx.AsyncClient() as client:
+            for _ in range(3):
+                assert (await upstream.get(client, app2_stand_in.url, Deadline(5))).status_code == 503
+            assert breaker.state == "open" and state() == 1
+            with pytest.raises(CircuitOpenError):
+                await upstream.get(client, app2_stand_in.url, Deadline(5))
+            assert app2_stand_in.requests == 3  # rejected without calling app2
+
+            now[0] += 5  # half-open: the failed probe reopens the circuit
+            assert (await upstream.get(client, app2_stand_in.url, Deadline(5))).status_code == 503
+            assert breaker.state == "open"
+
+            now[0] += 5
+            app2_stand_in.fail_status = None  # app2 recovered: the probe closes the circuit
+            assert (await upstream.get(client, app2_stand_in.url, Deadline(5))).status_code == 200
+            assert breaker.state == "closed" and state() == 0
+            assert app2_stand_in.requests == 5
+
+    asyncio.run(run())
+
+
+def test_retry_budget_caps_retries(app2_stand_in: App2StandIn) -> None:
+    """test retries against a failing app2 stay within the budget's fraction of requests"""
+    breaker = CircuitBreaker("app2-budget-test", failure_threshold=10_000)
+    upstream = Upstream("app2-budget-test", breaker, RetryBudget(ratio=0.1, min_per_second=0), max_attempts=3)
+    app2_stand_in.fail_status = 503
+
+    async def run() -> None:
+        """send 100 requests to an always-failing upstream"""
+        async with httpx.AsyncClient() as client:
+            for _ in range(100):
+                assert (await upstream.get(client, app2_stand_in.url, Deadline(5))).status_code == 503
+
+    asyncio.run(run())
+    assert 100 < app2_stand_in.requests <= 110  # not 300, as a fixed 3 attempts per request would send
+
+
+def test_upstream_hedges_slow_requests(app2_stand_in: App2StandIn) -> None:
+    """test a request slower than the observed p95 is hedged and the faster copy's response is used"""
+    breaker = CircuitBreaker("app2-hedge-test")
+    upstream = Upstream("app2-hedge-test", breaker, RetryBudget(), hedge=True, hedge_min_samples=20)
+    hedge_wins = lambda: REGISTRY.get_sample_value("upstream_hedge_wins_total", {"upstream": "app2-hedge-test"})  # noqa: E731
+
+    async def run() -> float:
+        """build a latency history, then time one slow request"""
+        async with httpx.AsyncClient() as client:
+            for _ in range(20):  # latency history the hedging delay is derived from
+                await upstream.get(client, app2_stand_in.url, Deadline(5))
+            app2_stand_in.delays = [2.0]  # only the next request is slow
+            started = time.perf_counter()
+            assert (await upstream.get(client, app2_stand_in.url, Deadline(5))).status_code == 200
+            return time.perf_counter() - started
+
+    assert asyncio.run(run()) < 1.0
+    assert app2_stand_in.requests == 22
+    assert hedge_wins() == 1
+
+
+def test_upstream_hedge_reports_the_first_copys_error() -> None:
+    """test when every hedged copy fails, the error of the copy that failed first is raised, not the last one's"""
+    upstream = Upstream("app2-hedge-error-test", CircuitBreaker("app2-hedge-error-test"), RetryBudget(), max_attempts=1)
+    upstream.hedge, upstream.hedge_min_samples = True, 1
+    calls = 0
+
+    async def app2(request: httpx.Request) -> httpx.Response:
+        """answer the first call, then fail the next request's first copy quickly and its hedge slowly"""
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return httpx.Response(200)  # the latency sample hedging needs
+        if calls == 2:
+            await asyncio.sleep(0.05)  # slower than the hedging delay, so a hedge is sent
+            raise httpx.ReadError("first copy", request=request)
+        await asyncio.sleep(0.2)
+        raise httpx.ConnectError("hedge", request=request)
+
+    async def run() -> None:
+        """record a latency sample, then send a request whose copies both fail"""
+        async with httpx.AsyncClient(transport=httpx.MockTransport(app2), base_url="http://app2") as client:
+            assert (await upstream.get(client, "/", Deadline(5))).status_code == 200
+            with pytest.raises(httpx.ReadError, match="first copy"):
+                await upstream.get(client, "/", Deadline(5))
+
+    asyncio.run(run())
+    assert calls == 3
+
+
+def test_read_app2_deadline(app2_stand_in: App2StandIn, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test /read_app2 callers give up at their own deadline, the app2 request they share runs on for the others"""
+    monkeypatch.setattr(main, "APP2_URL", app2_stand_in.url)
+    token = create_jwt_token({"sub": "Nadeko Sengoku"})
+
+    with TestClient(app) as test_client:
+        test_client.headers.update({"Authorization": f"Bearer {token}"})
+        response = test_client.get("/read_app2", headers={DEADLINE_HEADER: "0"})
+        assert response.status_code == 504
+        assert app2_stand_in.requests == 0  # no time left: app2 is not called
+
+        app2_stand_in.delays = [1.0]
+        started = time.perf_counter()
+        response = test_client.get("/read_app2", headers={DEADLINE_HEADER: "300"})
+        assert response.status_code == 504
+        assert time.perf_counter() - started < 0.8  # gave up at its deadline
+        # * a later caller with a longer budget waits on the same, still running request instead of inheriting 300ms
+        response = test_client.get("/read_app2", headers={DEADLINE_HEADER: "5000"})
+        assert response.status_code == 200
+        deadline_ms = app2_stand_in.deadlines[0]
+        assert app2_stand_in.requests == 1
+        assert deadline_ms is not None and 5000 < int(deadline_ms) <= main.REQUEST_DEADLINE_SECONDS * 1000
+
+
+def test_read_app2_circuit_open(app2_stand_in: App2StandIn, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test /read_app2 fails fast with 503 + retry-after once app2's circuit is open, and exports the state"""
+    monkeypatch.setattr(main, "APP2_URL", app2_stand_in.url)
+    monkeypatch.setattr(main, "APP2_BREAKER_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(main, "APP2_MAX_ATTEMPTS", 1)
+    app2_stand_in.fail_status = 500
+    token = create_jwt_token({"sub": "Shinobu Oshino"})
+
+    with TestClient(app) as test_client:
+        test_client.headers.update({"Authorization": f"Bearer {token}"})
+        assert [test_client.get("/read_app2").status_code for _ in range(2)] == [502, 502]
+        response = test_client.get("/read_app2")
+        assert response.status_code == 503
+        assert response.json()["detail"] == "circuit open: app2"
+        assert int(response.headers["Retry-After"]) >= 1
+        assert app2_stand_in.requests == 2
+        assert 'upstream_circuit_state{upstream="app2"} 1.0' in test_client.get("/metrics").text
@@ -0,0 +1,130 @@
+import asyncio
+from collections.abc import Iterator
+
+import httpx
+import pytest
+from httpx import TimeoutException
+from pytest_httpx import HTTPXMock
+
+from app1.main import APP2_URL, app
+from app1.response_cache import ResponseCache
+from app1.tests.helpers import create_jwt_token, metric_value
+
+
+def test_read_app2_coalesces_concurrent_misses(httpx_mock: HTTPXMock) -> None:
+    """test 1000 concurrent /read_app2 requests produce exactly one upstream call to app2"""
+
+    async def slow_app2(request: httpx.Request) -> httpx.Response:
+        """answer like app2, slowly enough for every request to miss the cache"""
+        await asyncio.sleep(0.2)  # keep the upstream call in flight while every request arrives
+        return httpx.Response(200, json={"mocked": True})
+
+    httpx_mock.add_callback(slow_app2, url=APP2_URL)
+    headers = {"Authorization": f"Bearer {create_jwt_token({'sub': 'Mayoi Hachikuji'})}"}
+    coalesced_before = metric_value("response_cache_coalesced_total")
+
+    async def run() -> list[httpx.Response]:
+        """send 1000 concurrent /read_app2 requests through app1"""
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app1") as client:
+                return await asyncio.gather(*(client.get("/read_app2", headers=headers) for _ in range(1000)))
+
+    responses = asyncio.run(run())
+    assert all(r.status_code == 200 and r.json()["app2_response"] == {"mocked": True} for r in responses)
+    assert len(httpx_mock.get_requests()) == 1
+    assert metric_value("response_cache_coalesced_total") - coalesced_before > 0
+
+
+def test_response_cache_stale_while_revalidate() -> None:
+    """test an expired entry is served immediately while a single background fetch refreshes it"""
+    now = [0.0]
+    cache = ResponseCache(ttl_seconds=1, stale_while_revalidate_seconds=5, clock=lambda: now[0])
+    calls = []
+
+    async def fetch() -> int:
+        """record the clock and return the call count"""
+        calls.append(now[0])
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def run() -> None:
+        """walk the clock through fresh, stale and expired reads"""
+        assert await cache.get("k", fetch) == 1
+        assert await cache.get("k", fetch) == 1  # fresh hit
+        now[0] = 2.0
+        assert await asyncio.gather(cache.get("k", fetch), cache.get("k", fetch)) == [1, 1]  # stale, one refresh
+        await asyncio.sleep(0.05)
+        assert await cache.get("k", fetch) == 2
+        now[0] = 10.0  # past the revalidate window: wait for the upstream
+        assert await cache.get("k", fetch) == 3
+
+    asyncio.run(run())
+    assert calls == [0.0, 2.0, 10.0]
+
+
+def test_response_cache_stale_if_error() -> None:
+    """test an upstream error serves the stale entry inside the stale-if-error window and raises after it"""
+    now = [0.0]
+    cache = ResponseCache(ttl_seconds=1, stale_if_error_seconds=30, clock=lambda: now[0])
+    results: Iterator[dict | Exception] = iter([{"v": 1}, TimeoutException("timeout"), TimeoutException("timeout")])
+
+    async def fetch() -> dict:
+        """return or raise the next scripted result"""
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def run() -> None:
+        """serve the stale value while the upstream fails, until the error window ends"""
+        assert await cache.get("k", fetch) == {"v": 1}
+        now[0] = 20.0
+        assert await cache.get("k", fetch) == {"v": 1}
+        now[0] = 40.0
+        with pytest.raises(TimeoutException):
+            await cache.get("k", fetch)
+
+    asyncio.run(run())
+
+
+def test_response_cache_evicts_least_recently_used() -> None:
+    """test the response cache keeps at most max_entries keys"""
+    cache = ResponseCache(ttl_seconds=60, max_entries=2)
+
+    async def fetch() -> str:
+        """return a constant value"""
+        return "value"
+
+    async def run() -> None:
+        """load a, b, a, c so that b is the least recently used"""
+        for key in ("a", "b", "a", "c"):
+            await cache.get(key, fetch)
+
+    asyncio.run(run())
+    assert len(cache) == 2
+    assert set(cache._entries) == {"a", "c"}  # pylint: disable=protected-access
+
+
+def test_response_cache_ttl_zero_only_coalesces() -> None:
+    """test a zero TTL shares concurrent fetches but never serves a stored value, not even stale or on errors"""
+    cache = ResponseCache(ttl_seconds=0, stale_while_revalidate_seconds=5, stale_if_error_seconds=60, clock=lambda: 0.0)
+    calls = []
+
+    async def fetch() -> int:
+        """count the call, fail from the third one on"""
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) > 2:
+            raise TimeoutException("timeout")
+        return len(calls)
+
+    async def run() -> None:
+        """read concurrently, then again, then while the upstream fails"""
+        assert await asyncio.gather(cache.get("k", fetch), cache.get("k", fetch)) == [1, 1]  # coalesced
+        assert await cache.get("k", fetch) == 2
+        with pytest.raises(TimeoutException):
+            await cache.get("k", fetch)
+
+    asyncio.run(run())
+    assert len(cache) == 0
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app1.responses import CompressionMiddleware, FastJSONResponse, RawJSON, dumps, negotiate_encoding
+
+
+def test_dumps_matches_json_response() -> None:
+    """test dumps renders the same bytes as starlette's jsonresponse, with stdlib json and with orjson"""
+    content = {"message": "héllo ✓", "nested": {"items": [1, 2.5, None, True]}, "empty": []}
+    assert dumps(content, fast=False) == JSONResponse(content).body
+    assert dumps(content, fast=True) == JSONResponse(content).body
+    assert FastJSONResponse(content).body == JSONResponse(content).body
+    embedded = dumps({"index": 0, "app2_response": RawJSON(b'{"a": [1]}')}, fast=True)
+    assert embedded == b'{"index":0,"app2_response":{"a": [1]}}'
+
+
+def test_compression_middleware_negotiates_encoding() -> None:
+    """test larger json bodies are sent as br or gzip as accepted, small ones as is, and streams chunk by chunk"""
+    pytest.importorskip("brotli")
+    large = {"items": [{"id": i, "name": f"item-{i}"} for i in range(200)]}
+    compressed_app = FastAPI()
+
+    @compressed_app.get("/large")
+    def large_body() -> FastJSONResponse:
+        """a body well above the compression threshold"""
+        return FastJSONResponse(large)
+
+    @compressed_app.get("/small")
+    def small_body() -> dict[str, str]:
+        """a body below the compression threshold"""
+        return {"status": "ok"}
+
+    @compressed_app.get("/stream")
+    def stream() -> StreamingResponse:
+        """the large body streamed as ndjson, without a content-length"""
+        return StreamingResponse((dumps(item) + b"\n" for item in large["items"]), media_type="application/x-ndjson")
+
+    compressed_app.add_middleware(CompressionMiddleware, min_bytes=1024)
+    with TestClient(compressed_app) as test_client:
+        as_br = test_client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+        as_gzip = test_client.get("/large", headers={"Accept-Encoding": "gzip, br;q=0"})
+        as_is = test_client.get("/large", headers={"Accept-Encoding": "identity"})
+        small = test_client.get("/small", headers={"Accept-Encoding": "gzip, br"})
+        streamed = test_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    raw = dumps(large)
+    assert as_br.headers["Content-Encoding"] == "br" and as_br.headers["Vary"] == "Accept-Encoding"
+    assert as_gzip.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in as_is.headers and "Content-Encoding" not in small.headers
+    assert as_br.json() == as_gzip.json() == as_is.json() == large  # the test client decodes br / gzip
+    assert int(as_br.headers["Content-Length"]) < len(raw) // 4
+    assert streamed.headers["Content-Encoding"] == "gzip" and "Content-Length" not in streamed.headers
+    assert [json.loads(line) for line in streamed.text.splitlines()] == large["items"]
+    assert negotiate_encoding("deflate") is None and negotiate_encoding("*") == "br"
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import httpx
+import jwt
+import pytest
+from fastapi import FastAPI, HTTPException
+from prometheus_client import REGISTRY
+
+from app1 import main
+from app1.main import ALGORITHM, JWT_CACHE, SECRET_KEY, verify_jwt
+from app1.revocation import BloomFilter, RevocationList
+from app1.tests.helpers import bearer
+
+
+class RevocationFeedStandIn:
+    """a local stand-in for auth's revocation feed, serving pages of `page_size` revocations"""
+
+    def __init__(self, page_size: int = 2) -> None:
+        self.epoch = "epoch-1"
+        self.entries: list[tuple[int, str, int]] = []  # (seq, jti, exp)
+        self.page_size = page_size
+        self.requests: list[int] = []
+        self.app = FastAPI()
+        self.app.get("/revocations")(self.feed)
+
+    def revoke(self, jti: str, expires_at: int) -> None:
+        """append a revocation to the feed"""
+        self.entries.append((len(self.entries) + 1, jti, expires_at))
+
+    def feed(self, since: int = 0) -> dict:
+        """the revocation feed endpoint"""
+        self.requests.append(since)
+        later = [entry for entry in self.entries if entry[0] > since]
+        page = later[: self.page_size]
+        return {
+            "epoch": self.epoch,
+            "revocations": [{"jti": jti, "exp": expires_at} for _, jti, expires_at in page],
+            "cursor": page[-1][0] if page else since,
+            "more": len(later) > len(page),
+        }
+
+    def revocation_list(self, now: list[float]) -> RevocationList:
+        """a revocation list syncing from this stand-in in-process, with a filter sized for 2 tokens"""
+        transport = httpx.ASGITransport(app=self.app)
+        return RevocationList("http://auth/revocations", capacity=2, transport=transport, clock=lambda: now[0])
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    """test every added item is found and unknown items are false positives at about the configured rate"""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"jti-{i}")
+    assert all(f"jti-{i}" in bloom for i in range(1000))
+    assert sum(f"other-{i}" in bloom for i in range(10_000)) < 300
+
+
+def test_revocation_list_syncs_incrementally() -> None:
+    """test the revocation list pages through the feed, continues from its cursor, merges a new epoch and ages out"""
+    feed = RevocationFeedStandIn()
+    for i in range(3):
+        feed.revoke(f"jti-{i}", 2_000 + i)
+    now = [1_000.0]
+    revocations = feed.revocation_list(now)
+
+    async def run() -> None:
+        """sync the initial feed, an incremental page and a restarted feed"""
+        await revocations.start()
+        try:
+            assert feed.requests == [0, 2]
+            assert all(revocations.is_revoked(f"jti-{i}") for i in range(3))  # beyond the filter's capacity: grown
+            assert not revocations.is_revoked("jti-other") and not revocations.is_revoked(None)
+
+            feed.revoke("jti-3", 2_003)
+            assert await revocations.sync()
+            assert feed.requests[2:] == [3] and revocations.is_revoked("jti-3")
+
+            feed.epoch, feed.entries = "epoch-2", []  # auth restarted with an empty in-memory store
+            feed.revoke("jti-new", 2_010)
+            assert await revocations.sync()
+            assert feed.requests[3:] == [4, 0]
+            assert revocations.is_revoked("jti-new") and revocations.is_revoked("jti-0")  # merged, not replaced
+
+            now[0] = 2_001.5  # jti-0 and jti-1 expired
+            assert await revocations.sync()
+            assert len(revocations) == 3
+            assert not revocations.is_revoked("jti-0") and revocations.is_revoked("jti-2")
+        finally:
+            await revocations.stop()
+
+    asyncio.run(run())
+
+
+def test_revocation_list_follows_each_replica_feed() -> None:
+    """test feeds of auth replicas answering in turn are each read on from their own cursor, not from the start"""
+    replica_a, replica_b = RevocationFeedStandIn(page_size=10), RevocationFeedStandIn(page_size=10)
+    replica_a.epoch, replica_b.epoch = "epoch-a", "epoch-b"
+    for i in range(3):
+        replica_a.revoke(f"a-{i}", 2_000)
+    replica_b.revoke("b-0", 2_000)
+    answering = [replica_a, replica_b, replica_b, replica_a, replica_b, replica_b]  # as the Service picks them
+
+    def feed(request: httpx.Request) -> httpx.Response:
+        """answer from the next replica in line"""
+        return httpx.Response(200, json=answering.pop(0).feed(int(request.url.params["since"])))
+
+    revocations = RevocationList("http://auth/revocations", transport=httpx.MockTransport(feed), clock=lambda: 1_000.0)
+
+    async def run() -> None:
+        """sync from replica a, then b, then each again after a new revocation"""
+        await revocations.start()
+        try:
+            assert await revocations.sync()
+            replica_a.revoke("a-3", 2_000)
+            assert await revocations.sync()
+            replica_b.revoke("b-1", 2_000)
+            assert await revocations.sync()
+        finally:
+            await revocations.stop()
+
+    asyncio.run(run())
+    assert replica_a.requests == [0, 1]
+    assert replica_b.requests == [3, 0, 4, 1]  # another replica's cursor is only replaced by its own
+    assert all(revocations.is_revoked(jti) for jti in ("a-0", "a-1", "a-2", "a-3", "b-0", "b-1"))
+
+
+def test_verify_jwt_rejects_revoked_token(monkeypatch: pytest.MonkeyPatch) -> None:
+    """test a revoked token is rejected by verify_jwt, also when its payload is already in the jwt cache"""
+    revocations = RevocationList("http://auth/revocations")
+    monkeypatch.setattr(main, "REVOCATIONS", revocations)
+    JWT_CACHE.clear()
+    token = jwt.encode({"sub": "Hitagi Senjougahara", "jti": "stolen", "exp": int(time.time()) + 60}, SECRET_KEY, ALGORITHM)
+    assert verify_jwt(bearer(token))["sub"] == "Hitagi Senjougahara"  # type: ignore[arg-type]
+
+    rejected = REGISTRY.get_sample_value("tokens_rejected_revoked_total") or 0.0
+    revocations.add("stolen", int(time.time()) + 60)
+    with pytest.raises(HTTPException) as exc:
+        verify_jwt(bearer(token))  # type: ignore[arg-type]
+    assert exc.value.detail == "Token revoked"
+    assert REGISTRY.get_sample_value("tokens_rejected_revoked_total") == rejected + 1
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from typing import Any
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from app1 import main
+from app1.resilience import DEADLINE_HEADER, CircuitBreaker, Deadline, RetryBudget, Upstream
+from app1.rpc import RPC_CONTENT_TYPE, RpcRequest, RpcServer, unpack_body
+from app1.rpc_client import RpcTransport
+from app1.tests.helpers import App2StandIn
+
+
+def test_rpc_transport_multiplexes_calls_and_falls_back_to_http(app2_stand_in: App2StandIn) -> None:
+    """test calls share a few rpc connections and are answered out of order, unrouted paths and a down server use http"""
+    server = RpcServer(host="127.0.0.1", port=0)
+    headers_seen: list[dict[str, str]] = []
+
+    def sent(transport: str) -> float:
+        """requests sent so far over `transport`"""
+        return REGISTRY.get_sample_value("rpc_client_requests_total", {"transport": transport}) or 0
+
+    @server.route("GET", "/")
+    async def sleep(request: RpcRequest) -> dict[str, Any]:
+        """answer after the delay given in the query string"""
+        headers_seen.append(request.headers)
+        delay = float(request.path.partition("delay=")[2] or 0)
+        await asyncio.sleep(delay)
+        return {"delay": delay}
+
+    @server.route("GET", "/boom")
+    def boom(_: RpcRequest) -> None:
+        """always raise"""
+        raise RuntimeError("boom")
+
+    async def run() -> None:
+        """multiplex calls, then check errors, timeouts and both http fallbacks"""
+        await server.start()
+        transport = RpcTransport("127.0.0.1", server.port, fallback=httpx.AsyncHTTPTransport(), connections=2)
+        async with httpx.AsyncClient(base_url=app2_stand_in.url, transport=transport) as client:
+            delays = [round(0.3 - i * 0.01, 2) for i in range(20)]  # the first calls sent answer last
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(client.get(f"/?delay={d}", headers={DEADLINE_HEADER: "900"}) for d in delays))
+            assert time.perf_counter() - started < 1.0  # 4 s one after the other
+            assert [unpack_body(r.content)["delay"] for r in responses] == delays
+            assert {r.headers["content-type"] for r in responses} == {RPC_CONTENT_TYPE}
+            assert len(server._connections) == 2  # pylint: disable=protected-access
+            assert headers_seen[0][DEADLINE_HEADER.lower()] == "900" and "user-agent" not in headers_seen[0]
+
+            assert (await client.get("/boom")).status_code == 500
+            with pytest.raises(httpx.ReadTimeout):
+                await client.get("/?delay=1", timeout=0.1)
+
+            http_before = sent("http_fallback")
+            for _ in range(2):  # no rpc route: app2's http 404, the second time without asking the rpc server first
+                response = await client.get("/no-rpc-route")
+                assert response.status_code == 404 and response.headers["content-type"] == "application/json"
+            assert sent("http_fallback") - http_before == 2
+
+            await server.stop()
+            await asyncio.sleep(0.05)  # the client sees its connections close
+            rpc_before = sent("rpc")
+            assert (await client.get("/")).json() == {"message": "Hello from FastAPI App 2"}
+            assert app2_stand_in.requests == 1 and sent("rpc") == rpc_before
+
+    asyncio.run(run())
+
+
+def test_rpc_transport_keeps_healthy_connections_when_one_fails(app2_stand_in: App2StandIn) -> None:
+    """test a connection that fails to open leaves the others in use and is retried alone after its backoff"""
+    server = RpcServer(host="127.0.0.1", port=0)
+    now = [0.0]
+    attempts = 0
+
+    @server.route("GET", "/")
+    def root(_: RpcRequest) -> dict[str, Any]:
+        """answer over rpc"""
+        return {"rpc": True}
+
+    class FlakyTransport(RpcTransport):
+        """fails the first connect only"""
+
+        async def _connect(self) -> Any:
+            """refuse the first attempt, connect for real after"""
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise ConnectionRefusedError("refused")
+            return await super()._connect()
+
+    async def run() -> None:
+        """call with one slot down, then again before and after its backoff"""
+        await server.start()
+        transport = FlakyTransport(
+            "127.0.0.1", server.port, fallback=httpx.AsyncHTTPTransport(), connections=2, clock=lambda: now[0]
+        )
+        async with httpx.AsyncClient(base_url=app2_stand_in.url, transport=transport) as client:
+            assert unpack_body((await client.get("/")).content) == {"rpc": True}  # not the http fallback
+            assert attempts == 2 and len(server._connections) == 1  # pylint: disable=protected-access
+
+            await client.get("/")
+            assert attempts == 2  # the failed slot waits for its backoff, the open one is used
+            now[0] += transport.retry_seconds
+            await client.get("/")
+            await asyncio.sleep(0.05)  # reconnected in the background
+            assert attempts == 3 and len(server._connections) == 2  # pylint: disable=protected-access
+            assert app2_stand_in.requests == 0
+        await server.stop()
+
+    asyncio.run(run())
+
+
+def test_fetch_app2_over_rpc() -> None:
+    """test app1's app2 client sends calls over rpc through the resilience policy and decodes the msgpack body"""
+    server = RpcServer(host="127.0.0.1", port=0)
+    deadlines: list[str] = []
+
+    @server.route("GET", "/")
+    def root(request: RpcRequest) -> dict[str, str]:
+        """answer like app2's root, recording the propagated deadline"""
+        deadlines.append(request.headers[DEADLINE_HEADER.lower()])
+        return {"message": "Hello from FastAPI App 2!"}
+
+    async def run() -> Any:
+        """fetch app2's root through app1's client over rpc"""
+        await server.start()
+        client = main.build_app2_client(
+            max_connections=10,
+            max_keepalive_connections=10,
+            keepalive_expiry=4.0,
+            connect_timeout=2.0,
+            read_timeout=5.0,
+            pool_timeout=2.0,
+            rpc_url=f"tcp://127.0.0.1:{server.port}",
+        )
+        upstream = Upstream("app2-rpc-test", CircuitBreaker("app2-rpc-test"), RetryBudget())
+        try:
+            return await main.fetch_app2(client, upstream, "http://app2/", Deadline(2))
+        finally:
+            await client.aclose()
+            await server.stop()
+
+    assert asyncio.run(run()) == {"message": "Hello from FastAPI App 2!"}
+    assert 0 < int(deadlines[0]) <= 2000
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from pytest_httpx import HTTPXMock
+
+from app1 import tracing
+from app1.main import APP2_URL
+
+
+@pytest.fixture
+def traced_spans(monkeypatch: pytest.MonkeyPatch) -> list[dict]:
+    """fixture enabling tracing in-process, every trace kept, exported spans collected in a list"""
+    spans: list[dict] = []
+    monkeypatch.setattr(tracing.TRACER, "export", spans.extend)
+    monkeypatch.setattr(tracing.TRACER, "sample_rate", 1.0)
+    return spans
+
+
+def test_read_app2_propagates_trace_context(
+    httpx_mock: HTTPXMock, client_verified_auth_header: TestClient, traced_spans: list[dict]
+) -> None:
+    """test /read_app2 continues the caller's trace and makes app2's request a child of its app2 attempt span"""
+    httpx_mock.add_response(url=APP2_URL, json={"mocked": True})
+    caller = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+    assert client_verified_auth_header.get("/read_app2", headers={"traceparent": caller}).status_code == 200
+    app2_request = httpx_mock.get_request()
+    assert app2_request is not None
+    sent = tracing.parse_traceparent(app2_request.headers["traceparent"])
+    spans = {span["name"]: span for span in traced_spans}
+
+    server = spans["GET /read_app2"]
+    assert (server["trace_id"], server["parent_span_id"], server["kind"]) == (caller[3:35], caller[36:52], "server")
+    assert spans["verify_jwt"]["parent_span_id"] == server["span_id"]
+    assert spans["app2_call"]["parent_span_id"] == server["span_id"]
+    attempt = spans["GET app2"]
+    assert (attempt["parent_span_id"], attempt["kind"], attempt["attributes"]) == (
+        spans["app2_call"]["span_id"],
+        "client",
+        {"attempt": "first", "http.status_code": 200},
+    )
+    assert sent == (caller[3:35], attempt["span_id"])
+    assert {span["trace_id"] for span in traced_spans} == {server["trace_id"]}
+
+
+def test_tail_sampling_keeps_slow_and_failed_traces() -> None:
+    """test only slow or failed requests are exported with sampling off, late spans following their request"""
+    exported: list[dict] = []
+    tracer = tracing.Tracer(exported.extend, service="test", slow_seconds=0.05, sample_rate=0.0)
+
+    def request(slow: bool = False, fail: bool = False) -> tracing.TraceSpan:
+        """record a request with one child span, optionally slow or failed"""
+        with tracer.server_span("GET /", []) as root:
+            with tracer.span("child") as child:
+                child.error = fail
+            time.sleep(0.06 if slow else 0)
+        return root
+
+    fast = request()
+    assert exported == []
+    failed = request(fail=True)
+    assert [span["name"] for span in exported] == ["child", "GET /"] and exported[0]["status"] == "error"
+    request(slow=True)
+    assert len(exported) == 4
+
+    with tracing._SpanScope(tracer, tracing.TraceSpan(fast.trace_id, fast.span_id, "late", "internal", fast.segment)):
+        pass  # a background task finishing after its (dropped) request
+    with tracing._SpanScope(tracer, tracing.TraceSpan(failed.trace_id, failed.span_id, "late", "internal", failed.segment)):
+        pass  # ... and after a kept one
+    assert [span["trace_id"] for span in exported[4:]] == [failed.trace_id]
+
+    assert tracing.parse_traceparent("00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-00-extra") is None
+    assert tracing.parse_traceparent("00-00000000000000000000000000000000-b7ad6b7169203331-01") is None
+    assert tracing.parse_traceparent("01-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01-future") is not None
+
+
+def test_batch_span_exporter_drops_when_full() -> None:
+    """test the span exporter never blocks: spans beyond the queue are dropped and counted, the rest written"""
+    unblock, written = threading.Event(), []
+
+    def write(batch: list[dict]) -> None:
+        """block until the test unblocks it, then collect the batch"""
+        unblock.wait(5)
+        written.extend(batch)
+
+    dropped_before = REGISTRY.get_sample_value("trace_spans_total", {"outcome": "queue_full"}) or 0.0
+    exporter = tracing.BatchSpanExporter(write, max_queue=2, batch_size=1, flush_interval=0.01)
+    exporter.export([{"n": 0}])  # taken by the writer thread, which then blocks
+    time.sleep(0.1)
+    exporter.export([{"n": 1}, {"n": 2}, {"n": 3}])
+    unblock.set()
+    exporter.stop()
+
+    assert written == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert REGISTRY.get_sample_value("trace_spans_total", {"outcome": "queue_full"}) == dropped_before + 1
+
+
+def test_batch_span_exporter_keeps_exporting_after_collector_error() -> None:
+    """test a failed collector post drops only its batch, later spans are still exported"""
+    received: list[dict] = []
+
+    class FlakyCollector(BaseHTTPRequestHandler):
+        """collector answering its first post with a 500"""
+
+        def do_POST(self) -> None:  # noqa: N802 - http.server naming
+            """fail the first batch, accept the others"""
+            spans = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["spans"]
+            failed = self.server.posts == 0  # type: ignore[attr-defined]
+            self.server.posts += 1  # type: ignore[attr-defined]
+            if not failed:
+                received.extend(spans)
+            self.send_response(500 if failed else 200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+            """Silence the per-request access log."""
+
+    collector = ThreadingHTTPServer(("127.0.0.1", 0), FlakyCollector)
+    collector.posts = 0  # type: ignore[attr-defined]
+    threading.Thread(target=collector.serve_forever, daemon=True).start()
+    failed_before = REGISTRY.get_sample_value("trace_spans_total", {"outcome": "export_error"}) or 0.0
+    url = f"http://127.0.0.1:{collector.server_address[1]}/v1/traces"
+    exporter = tracing.BatchSpanExporter(tracing.http_writer(url), max_queue=10, batch_size=1, flush_interval=0)
+    try:
+        exporter.export([{"n": 0}, {"n": 1}, {"n": 2}])
+        exporter.stop()
+    finally:
+        collector.shutdown()
+        collector.server_close()
+
+    assert received == [{"n": 1}, {"n": 2}]
+    assert REGISTRY.get_sample_value("trace_spans_total", {"outcome": "export_error"}) == failed_before + 1
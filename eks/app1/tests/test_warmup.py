@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from loguru import logger
+from pytest_httpx import HTTPXMock
+
+from app1 import main
+from app1.main import APP2_URL, app
+from app1.warmup import Warmup
+
+
+def test_warmup_runs_steps_in_order_and_skips_failures() -> None:
+    """test the warm-up runs every step, sync or async, logs a failing one and stops at its time budget"""
+    calls = []
+
+    def failing() -> None:
+        """record the call and fail"""
+        calls.append("failing")
+        raise RuntimeError("upstream not up yet")
+
+    async def slow() -> None:
+        """record the call and outlast the warm-up timeout"""
+        calls.append("slow")
+        await asyncio.sleep(10)
+
+    warmup = Warmup(enabled=True, timeout_seconds=0.2)
+    warmup.add_step("sync", lambda: calls.append("sync"))
+    warmup.add_step("failing", failing)
+    warmup.add_step("slow", slow)
+    warmup.add_step("skipped", lambda: calls.append("skipped"))
+    messages: list = []
+    sink_id = logger.add(messages.append, level="WARNING")
+    try:
+        durations = asyncio.run(warmup.run())
+    finally:
+        logger.remove(sink_id)
+
+    assert calls == ["sync", "failing", "slow"]
+    assert list(durations) == ["sync", "failing", "slow"]
+    assert durations["slow"] < 1
+    assert any("upstream not up yet" in message for message in messages)
+    assert any("skipping `skipped`" in message for message in messages)
+    assert asyncio.run(Warmup(enabled=False).run()) == {}
+
+
+def test_lifespan_warms_up_before_serving(httpx_mock: HTTPXMock, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the lifespan primes jwt and the cpu workers, and the app2 pool warm-up opens concurrent connections"""
+    with TestClient(app) as test_client:
+        assert list(main.WARMUP.durations) == ["jwt", "cpu_executor"]
+        assert 'warmup_duration_seconds{step="jwt"}' in test_client.get("/metrics").text
+
+        monkeypatch.setattr(main, "WARMUP_APP2_CONNECTIONS", 3)
+        httpx_mock.add_response(url=APP2_URL.rstrip("/") + "/livez", json={"status": "ok"}, is_reusable=True)
+        assert test_client.portal is not None  # set while the client's lifespan runs
+        test_client.portal.call(main.warm_app2_pool)
+    assert len(httpx_mock.get_requests()) == 3
@@ -0,0 +1,115 @@
+import json
+from pathlib import Path
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest_httpx import HTTPXMock
+
+from app1 import main
+from app1.main import APP2_URL
+from app1.tests.helpers import bearer_for
+from app1.workloads import WorkloadEngine, hash_chain, load_profiles
+
+
+@pytest.fixture
+def as_admin(monkeypatch: pytest.MonkeyPatch) -> dict[str, str]:
+    """fixture making `admin` the only admin subject, returning an authorization header with its token"""
+    monkeypatch.setattr(main, "WORKLOAD_ADMINS", frozenset({"admin"}))
+    return bearer_for("admin")
+
+
+def test_workload_profile_reports_every_step(
+    httpx_mock: HTTPXMock,
+    client_unpatched_auth: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    as_admin: dict[str, str],
+) -> None:
+    """test a configured workload profile runs cpu, memory, sleep, io and app2 steps and reports each of them"""
+    profiles = load_profiles(
+        json.dumps(
+            {
+                "mix": {
+                    "steps": [
+                        {"kind": "cpu", "iterations": 50, "chunk_bytes": 64},
+                        {"kind": "memory", "mb": 8, "seconds": 0.01},
+                        {"kind": "sleep", "seconds": 0.01, "blocking": True},
+                        {"kind": "io", "mb": 0.5},
+                        {"kind": "app2", "calls": 2},
+                    ]
+                }
+            }
+        )
+    )
+    assert {"cpu", "memory", "api", "mix"} <= set(profiles)
+    engine = WorkloadEngine(enabled=True, profiles=profiles, tmp_dir=str(tmp_path))
+    monkeypatch.setattr(main, "WORKLOADS", engine)
+    httpx_mock.add_response(url=APP2_URL, json={"mocked": True})
+    httpx_mock.add_response(url=APP2_URL, status_code=404)
+
+    response = client_unpatched_auth.get("/workload/mix", headers=as_admin)
+    assert response.status_code == 200
+    report = response.json()
+    cpu, memory, sleep, io_step, app2 = report["steps"]
+    assert [step["kind"] for step in report["steps"]] == ["cpu", "memory", "sleep", "io", "app2"]
+    assert cpu["digest"] == hash_chain(50, 64)[0] and cpu["cpu_seconds"] >= 0
+    assert memory["mb"] == 8 and memory["rss_mb"] > 8
+    assert sleep["seconds"] >= 0.01 and sleep["blocking"] is True
+    assert io_step["bytes"] == 2**19
+    assert app2 == {"kind": "app2", "seconds": app2["seconds"], "calls": 2, "errors": 1}
+    assert report["profile"] == "mix" and report["seconds"] >= sum(step["seconds"] for step in report["steps"])
+    assert report["max_rss_mb"] >= report["rss_mb"] > 0
+    assert engine.retained_mb == 0 and list(tmp_path.iterdir()) == []
+    assert 'workload_step_seconds_count{kind="io"}' in client_unpatched_auth.get("/metrics").text
+
+    assert "mix" in client_unpatched_auth.get("/workload", headers=as_admin).json()
+    monkeypatch.setattr(engine, "enabled", False)
+    assert client_unpatched_auth.get("/workload/mix", headers=as_admin).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_workload_limits(client_unpatched_auth: TestClient, monkeypatch: pytest.MonkeyPatch, as_admin: dict[str, str]) -> None:
+    """test workload profiles are bounded: per step limits, scaling, the memory budget and unknown profiles"""
+    monkeypatch.setattr(main, "WORKLOADS", WorkloadEngine(enabled=True, max_memory_mb=1))
+
+    assert client_unpatched_auth.get("/workload/nope", headers=as_admin).status_code == status.HTTP_404_NOT_FOUND
+    too_many_iterations = client_unpatched_auth.get("/workload/cpu", params={"scale": 1000}, headers=as_admin)
+    assert too_many_iterations.status_code == 422  # 10M iterations
+    too_much_io = {"steps": [{"kind": "io", "mb": 1024}]}
+    assert client_unpatched_auth.post("/workload", json=too_much_io, headers=as_admin).status_code == 422
+    over_budget = client_unpatched_auth.get("/workload/memory", headers=as_admin)  # 64 MB
+    assert over_budget.status_code == status.HTTP_503_SERVICE_UNAVAILABLE and over_budget.headers["Retry-After"] == "1"
+    with pytest.raises(ValueError):
+        load_profiles('{"bad": {"steps": [{"kind": "gpu"}]}}')
+
+    scaled = client_unpatched_auth.get("/workload/cpu", params={"scale": 0.01}, headers=as_admin)
+    assert scaled.status_code == 200 and scaled.json()["steps"][0]["iterations"] == 100
+
+
+def test_workload_concurrent_steps_overlap(
+    client_unpatched_auth: TestClient, monkeypatch: pytest.MonkeyPatch, as_admin: dict[str, str]
+) -> None:
+    """test concurrent steps run at the same time: a blocking and an async sleep take as long as one of them"""
+    monkeypatch.setattr(main, "WORKLOADS", WorkloadEngine(enabled=True))
+    sleeps = [{"kind": "sleep", "seconds": 0.2, "blocking": True}, {"kind": "sleep", "seconds": 0.2}]
+
+    sequential = client_unpatched_auth.post("/workload", json={"steps": sleeps}, headers=as_admin).json()
+    concurrent = client_unpatched_auth.post("/workload", json={"steps": sleeps, "concurrent": True}, headers=as_admin).json()
+    assert sequential["seconds"] >= 0.4
+    assert 0.2 <= concurrent["seconds"] < 0.35
+
+
+def test_workload_endpoints_admin_only(client_unpatched_auth: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the workload endpoints need an admin token, and stay hidden behind a 404 while disabled"""
+    monkeypatch.setattr(main, "WORKLOAD_ADMINS", frozenset({"admin"}))
+    monkeypatch.setattr(main, "WORKLOADS", WorkloadEngine(enabled=True))
+    adhoc = {"steps": [{"kind": "sleep", "seconds": 0}]}
+
+    assert client_unpatched_auth.get("/workload/latency").status_code == status.HTTP_401_UNAUTHORIZED
+    assert client_unpatched_auth.post("/workload", json=adhoc).status_code == status.HTTP_401_UNAUTHORIZED
+    assert client_unpatched_auth.get("/workload/latency", headers=bearer_for("user")).status_code == status.HTTP_403_FORBIDDEN
+    assert client_unpatched_auth.post("/workload", json=adhoc, headers=bearer_for("user")).status_code == 403
+    assert client_unpatched_auth.post("/workload", json=adhoc, headers=bearer_for("admin")).status_code == 200
+
+    monkeypatch.setattr(main, "WORKLOADS", WorkloadEngine(enabled=False))
+    assert client_unpatched_auth.get("/workload/latency").status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,79 @@
+import asyncio
+import inspect
+import os
+import time
+from collections.abc import Awaitable
+from typing import Any, Callable
+
+from prometheus_client import Gauge
+
+from .logging_config import logger
+from .metrics import get_or_create
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# * the whole warm-up is cut short after this long (e.g. an upstream that is not up yet), startup never fails because of it
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", 5))
+
+WARMUP_DURATION = get_or_create(
+    Gauge,
+    "warmup_duration_seconds",
+    "Time a startup warm-up step took in this worker",
+    labelnames=["step"],
+    multiprocess_mode="livemax",
+)
+
+# * a sync function or a coroutine function, its return value is ignored
+WarmupStep = Callable[[], Awaitable[Any] | Any]
+
+
+class Warmup:
+    """
+    One-off work run from the app's lifespan before the worker serves its first request, so the first requests
+    routed to a new replica don't pay for lazy initialisation (JWT/crypto code paths, upstream connections,
+    CPU worker processes). uvicorn only accepts connections once the lifespan startup has completed,
+    so `/readyz` cannot pass before the warm-up is done.
+
+    Steps run in order and share `timeout_seconds`; a step that fails or runs out of time is logged and skipped.
+
+    Attributes:
+        enabled (bool): Whether `run` does anything.
+        timeout_seconds (float): Time budget of the whole warm-up.
+        durations (dict[str, float]): Seconds every step of the last run took, also on `/metrics`.
+    """
+
+    def __init__(self, enabled: bool = WARMUP_ENABLED, timeout_seconds: float = WARMUP_TIMEOUT_SECONDS) -> None:
+        self.enabled = enabled
+        self.timeout_seconds = timeout_seconds
+        self.durations: dict[str, float] = {}
+        self._steps: list[tuple[str, WarmupStep]] = []
+
+    def add_step(self, name: str, step: WarmupStep) -> None:
+        """Add a step, run after the ones added before it."""
+        self._steps.append((name, step))
+
+    async def run(self) -> dict[str, float]:
+        """
+        Run the steps (called from the app's lifespan, after the resources they use are created).
+        Returns:
+            dict[str, float]: Seconds every step took, empty when disabled.
+        """
+        self.durations = {}
+        if not self.enabled:
+            return self.durations
+        deadline = time.monotonic() + self.timeout_seconds
+        for name, step in self._steps:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(f"warm-up out of time ({self.timeout_seconds}s), skipping `{name}`")
+                continue
+            started = time.perf_counter()
+            try:
+                result = step()
+                if inspect.isawaitable(result):
+                    await asyncio.wait_for(result, remaining)
+            except Exception as e:  # a cold first request is better than a pod that never starts
+                logger.warning(f"warm-up step `{name}` failed: {e!r}")
+            self.durations[name] = time.perf_counter() - started
+            WARMUP_DURATION.labels(step=name).set(self.durations[name])
+        logger.info(f"warm-up done in {sum(self.durations.values()):.3f}s: {self.durations}")
+        return self.durations
@@ -0,0 +1,298 @@
+import asyncio
+import hashlib
+import os
+import resource
+import tempfile
+import time
+from collections.abc import Awaitable
+from typing import Any, Callable, Literal
+
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import Gauge, Histogram
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
+
+from .cpu_executor import CpuExecutor
+from .metrics import get_or_create
+
+WORKLOAD_ENABLED = os.getenv("WORKLOAD_ENABLED", "false").lower() == "true"
+# * JWT `sub` claims allowed to run workloads (comma separated), nobody by default
+WORKLOAD_ADMINS = frozenset(sub.strip() for sub in os.getenv("WORKLOAD_ADMINS", "").split(",") if sub.strip())
+# * JSON `{"<name>": {"steps": [...], "concurrent": false}}`, added to (or replacing) the built-in `PROFILES`
+WORKLOAD_PROFILES = os.getenv("WORKLOAD_PROFILES", "")
+# * per step limits, a profile (or a scaled one) above them is rejected with 422
+WORKLOAD_MAX_ITERATIONS = int(os.getenv("WORKLOAD_MAX_ITERATIONS", 1_000_000))
+WORKLOAD_MAX_SECONDS = float(os.getenv("WORKLOAD_MAX_SECONDS", 30))
+WORKLOAD_MAX_IO_MB = float(os.getenv("WORKLOAD_MAX_IO_MB", 64))
+WORKLOAD_MAX_APP2_CALLS = int(os.getenv("WORKLOAD_MAX_APP2_CALLS", 20))
+# * memory retained by all `memory` steps of a worker at once, keep it well below the container's memory limit
+WORKLOAD_MAX_MEMORY_MB = float(os.getenv("WORKLOAD_MAX_MEMORY_MB", 256))
+WORKLOAD_TMP_DIR = os.getenv("WORKLOAD_TMP_DIR", tempfile.gettempdir())
+
+WORKLOAD_STEP_DURATION = get_or_create(
+    Histogram,
+    "workload_step_seconds",
+    "Time synthetic workload steps took",
+    labelnames=["kind"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+WORKLOAD_RETAINED_MEMORY = get_or_create(
+    Gauge, "workload_retained_megabytes", "Memory held by running `memory` workload steps", multiprocess_mode="livesum"
+)
+
+_IO_CHUNK = os.urandom(64 * 1024)  # incompressible, so the page cache and the disk see every byte
+
+
+class WorkloadLimitError(Exception):
+    """Raised when a `memory` step would retain more than `WORKLOAD_MAX_MEMORY_MB` in this worker."""
+
+
+class WorkloadStep(BaseModel):
+    """
+    One unit of synthetic work, the fields a `kind` doesn't use are ignored.
+
+    Attributes:
+        kind (str): `cpu` - a SHA-256 chain on the CPU executor, `memory` - allocate and retain `mb` for `seconds`,
+            `sleep` - wait `seconds` (`blocking`: `time.sleep` on a threadpool thread, like a sync driver call),
+            `io` - write `mb` to a temp file, fsync and read it back, `app2` - `calls` concurrent GETs to app2.
+        iterations (int): `cpu`: hashes in the chain.
+        chunk_bytes (int): `cpu`: bytes hashed per iteration.
+        mb (float): `memory`: megabytes retained, `io`: megabytes written and read.
+        seconds (float): `sleep`: the wait, `memory`: how long the allocation is held.
+        blocking (bool): `sleep`: block a threadpool thread instead of awaiting.
+        calls (int): `app2`: concurrent requests.
+    """
+
+    kind: Literal["cpu", "memory", "sleep", "io", "app2"]
+    iterations: int = Field(0, ge=0, le=WORKLOAD_MAX_ITERATIONS)
+    chunk_bytes: int = Field(1024, ge=1, le=1024 * 1024)
+    mb: float = Field(0.0, ge=0)
+    seconds: float = Field(0.0, ge=0, le=WORKLOAD_MAX_SECONDS)
+    blocking: bool = False
+    calls: int = Field(0, ge=0, le=WORKLOAD_MAX_APP2_CALLS)
+
+    @model_validator(mode="after")
+    def io_within_limit(self) -> "WorkloadStep":
+        """`mb` is bounded per kind: by `WORKLOAD_MAX_IO_MB` for `io`, at run time by the worker's budget for `memory`."""
+        if self.kind == "io" and self.mb > WORKLOAD_MAX_IO_MB:
+            raise ValueError(f"io steps write at most {WORKLOAD_MAX_IO_MB} MB")
+        return self
+
+    def scaled(self, scale: float) -> "WorkloadStep":
+        """This step with its amount of work (iterations, megabytes, seconds, calls) multiplied by `scale`, validated."""
+        return WorkloadStep.model_validate(
+            {
+                **self.model_dump(),
+                "iterations": round(self.iterations * scale),
+                "mb": self.mb * scale,
+                "seconds": self.seconds * scale,
+                "calls": round(self.calls * scale),
+            }
+        )
+
+
+class WorkloadProfile(BaseModel):
+    """
+    A named mix of steps, e.g. the CPU / memory / latency shape of one kind of production request.
+
+    Attributes:
+        steps (list[WorkloadStep]): The work, in order.
+        concurrent (bool): Run the steps at the same time instead of one after the other.
+    """
+
+    steps: list[WorkloadStep] = Field(min_length=1, max_length=32)
+    concurrent: bool = False
+
+    def scaled(self, scale: float) -> "WorkloadProfile":
+        """This profile with every step scaled by `scale`."""
+        return WorkloadProfile(steps=[step.scaled(scale) for step in self.steps], concurrent=self.concurrent)
+
+
+PROFILES_ADAPTER = TypeAdapter(dict[str, WorkloadProfile])
+
+# * `cpu` is what `/burn` does, `api` roughly one authenticated request that also calls app2
+PROFILES = PROFILES_ADAPTER.validate_python(
+    {
+        "cpu": {"steps": [{"kind": "cpu", "iterations": 10_000}]},
+        "memory": {"steps": [{"kind": "memory", "mb": 64, "seconds": 5}]},
+        "latency": {"steps": [{"kind": "sleep", "seconds": 0.1}]},
+        "blocking": {"steps": [{"kind": "sleep", "seconds": 0.1, "blocking": True}]},
+        "io": {"steps": [{"kind": "io", "mb": 8}]},
+        "fanout": {"steps": [{"kind": "app2", "calls": 5}]},
+        "api": {
+            "steps": [
+                {"kind": "cpu", "iterations": 2_000},
+                {"kind": "memory", "mb": 4, "seconds": 0.05},
+                {"kind": "app2", "calls": 1},
+            ]
+        },
+    }
+)
+
+
+def load_profiles(spec: str = WORKLOAD_PROFILES) -> dict[str, WorkloadProfile]:
+    """
+    The built-in profiles plus the ones configured in `WORKLOAD_PROFILES`.
+    Args:
+        spec (str): JSON object of profiles by name, empty for none.
+    Raises:
+        ValueError: If the JSON is malformed or a profile is invalid (a pydantic `ValidationError`).
+    Returns:
+        dict[str, WorkloadProfile]: Every profile by name, configured ones override built-in ones of the same name.
+    """
+    return {**PROFILES, **(PROFILES_ADAPTER.validate_json(spec) if spec.strip() else {})}
+
+
+def hash_chain(iterations: int, chunk_bytes: int) -> tuple[str, float]:
+    """
+    SHA-256 chain of `iterations` hashes of `chunk_bytes` each, run on the CPU executor.
+    Returns the digest and the CPU time it took (of the worker thread, so valid in every executor mode).
+    """
+    started = time.thread_time()
+    data = b"x" * chunk_bytes
+    result = b""
+    for _ in range(iterations):
+        result = hashlib.sha256(data + result).digest()
+    return result.hex(), time.thread_time() - started
+
+
+def write_read_file(directory: str, size: int) -> tuple[int, float]:
+    """
+    Write `size` bytes to a new temp file in `directory`, fsync it, drop it from the page cache (where supported)
+    and read it back. Returns the bytes read and the CPU time it took.
+    """
+    started = time.thread_time()
+    read = 0
+    with tempfile.TemporaryFile(dir=directory) as f:
+        for offset in range(0, size, len(_IO_CHUNK)):
+            f.write(_IO_CHUNK[: size - offset])
+        f.flush()
+        os.fsync(f.fileno())
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        f.seek(0)
+        while chunk := f.read(len(_IO_CHUNK)):
+            read += len(chunk)
+    return read, time.thread_time() - started
+
+
+def allocate(size: int) -> tuple[bytes, float]:
+    """
+    Allocate `size` bytes, all of them written so the pages are resident (a zeroed `bytearray` may not be).
+    Run in the threadpool: copying tens of MB would otherwise stall the event loop. Returns the block and the CPU time.
+    """
+    started = time.thread_time()
+    block = b"\xa5" * size
+    return block, time.thread_time() - started
+
+
+def resident_memory_mb() -> float | None:
+    """Resident set size of this process in MB, None where `/proc` is not available."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+class WorkloadEngine:
+    """
+    Runs synthetic workload profiles to reproduce a production-like CPU / memory / latency mix on a pod
+    (and watch how the HPA reacts to it). Every step reports its wall time and the CPU time spent on it,
+    the whole run the process' resident and peak memory.
+
+    Attributes:
+        enabled (bool): Whether the `/workload` endpoints are served.
+        profiles (dict[str, WorkloadProfile]): The named profiles.
+        max_memory_mb (float): Memory all `memory` steps of this worker may hold at once.
+        tmp_dir (str): Where `io` steps create their files.
+        retained_mb (float): Memory held by running `memory` steps.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = WORKLOAD_ENABLED,
+        profiles: dict[str, WorkloadProfile] | None = None,
+        max_memory_mb: float = WORKLOAD_MAX_MEMORY_MB,
+        tmp_dir: str = WORKLOAD_TMP_DIR,
+    ) -> None:
+        self.enabled = enabled
+        self.profiles = load_profiles() if profiles is None else profiles
+        self.max_memory_mb = max_memory_mb
+        self.tmp_dir = tmp_dir
+        self.retained_mb = 0.0  # only touched from the event loop thread
+
+    async def _retain(self, mb: float, seconds: float) -> dict[str, Any]:
+        """Allocate and hold `mb` MB for `seconds`, within `max_memory_mb` across concurrent requests."""
+        if self.retained_mb + mb > self.max_memory_mb:
+            raise WorkloadLimitError(f"{self.retained_mb:.0f} MB already retained (limit {self.max_memory_mb:.0f} MB)")
+        self.retained_mb += mb  # reserved before allocating, so concurrent steps can't overshoot the budget meanwhile
+        WORKLOAD_RETAINED_MEMORY.inc(mb)
+        block: bytes | None = None
+        try:
+            block, cpu_seconds = await run_in_threadpool(allocate, int(mb * 2**20))
+            await asyncio.sleep(seconds)
+            return {"mb": mb, "cpu_seconds": cpu_seconds, "rss_mb": resident_memory_mb()}
+        finally:
+            del block
+            self.retained_mb -= mb
+            WORKLOAD_RETAINED_MEMORY.dec(mb)
+
+    async def _fan_out(self, calls: int, fetch_app2: Callable[[], Awaitable[Any]]) -> dict[str, Any]:
+        """Make `calls` concurrent app2 calls and count the failed ones."""
+        results = await asyncio.gather(*(fetch_app2() for _ in range(calls)), return_exceptions=True)
+        return {"calls": calls, "errors": sum(isinstance(result, Exception) for result in results)}
+
+    async def _step(
+        self, step: WorkloadStep, executor: CpuExecutor, fetch_app2: Callable[[], Awaitable[Any]]
+    ) -> dict[str, Any]:
+        """Run one step of a profile and report what it did and how long it took."""
+        started = time.perf_counter()
+        report: dict[str, Any]
+        if step.kind == "cpu":
+            digest, cpu_seconds = await executor.run(hash_chain, step.iterations, step.chunk_bytes)
+            report = {"iterations": step.iterations, "digest": digest, "cpu_seconds": cpu_seconds}
+        elif step.kind == "memory":
+            report = await self._retain(step.mb, step.seconds)
+        elif step.kind == "sleep":
+            if step.blocking:
+                await run_in_threadpool(time.sleep, step.seconds)
+            else:
+                await asyncio.sleep(step.seconds)
+            report = {"blocking": step.blocking}
+        elif step.kind == "io":
+            read, cpu_seconds = await run_in_threadpool(write_read_file, self.tmp_dir, int(step.mb * 2**20))
+            report = {"bytes": read, "cpu_seconds": cpu_seconds}
+        else:
+            report = await self._fan_out(step.calls, fetch_app2)
+        seconds = time.perf_counter() - started
+        WORKLOAD_STEP_DURATION.labels(kind=step.kind).observe(seconds)
+        return {"kind": step.kind, "seconds": seconds, **report}
+
+    async def run(
+        self, profile: WorkloadProfile, executor: CpuExecutor, fetch_app2: Callable[[], Awaitable[Any]]
+    ) -> dict[str, Any]:
+        """
+        Run a profile's steps and report what each of them cost.
+        Args:
+            profile (WorkloadProfile): The work.
+            executor (CpuExecutor): Where `cpu` steps run.
+            fetch_app2 (Callable): One app2 request, for `app2` steps (errors are counted, not raised).
+        Raises:
+            ExecutorSaturatedError: If the CPU executor's queue is full.
+            WorkloadLimitError: If a `memory` step would exceed `max_memory_mb`.
+        Returns:
+            dict: `seconds` and `cpu_seconds` of the whole run, `rss_mb` / `max_rss_mb` of the process
+                and a report per step: `kind`, `seconds` (wall time), `cpu_seconds` and the step's own figures.
+        """
+        started = time.perf_counter()
+        if profile.concurrent:
+            steps = await asyncio.gather(*(self._step(step, executor, fetch_app2) for step in profile.steps))
+        else:
+            steps = [await self._step(step, executor, fetch_app2) for step in profile.steps]
+        return {
+            "seconds": time.perf_counter() - started,
+            "cpu_seconds": sum(step.get("cpu_seconds", 0.0) for step in steps),
+            "rss_mb": resident_memory_mb(),
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KB on Linux
+            "steps": steps,
+        }
@@ -0,0 +1,195 @@
+import os
+import time
+from typing import TypedDict, Unpack
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from prometheus_client import Counter, Gauge
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .health import PROBE_PATHS
+from .metrics import get_or_create
+
+CONCURRENCY_LIMIT_ENABLED = os.getenv("CONCURRENCY_LIMIT_ENABLED", "false").lower() == "true"
+# * routes with their own limiter, e.g. `/burn,/read_app2` - every other route shares one (`*`)
+CONCURRENCY_LIMIT_ROUTES = os.getenv("CONCURRENCY_LIMIT_ROUTES", "")
+CONCURRENCY_LIMIT_INITIAL = int(os.getenv("CONCURRENCY_LIMIT_INITIAL", 20))
+CONCURRENCY_LIMIT_MIN = int(os.getenv("CONCURRENCY_LIMIT_MIN", 1))
+CONCURRENCY_LIMIT_MAX = int(os.getenv("CONCURRENCY_LIMIT_MAX", 200))
+# * a request slower than `tolerance x` the route's no-load latency (and than the floor) counts as congestion
+CONCURRENCY_LIMIT_LATENCY_TOLERANCE = float(os.getenv("CONCURRENCY_LIMIT_LATENCY_TOLERANCE", 2.0))
+CONCURRENCY_LIMIT_LATENCY_FLOOR_SECONDS = float(os.getenv("CONCURRENCY_LIMIT_LATENCY_FLOOR_SECONDS", 0.05))
+CONCURRENCY_LIMIT_BACKOFF = float(os.getenv("CONCURRENCY_LIMIT_BACKOFF", 0.9))  # multiplicative decrease
+
+CONCURRENCY_LIMIT = get_or_create(
+    Gauge, "concurrency_limit", "Current adaptive concurrency limit", labelnames=["route"], multiprocess_mode="livesum"
+)
+CONCURRENCY_REJECTED = get_or_create(
+    Counter, "concurrency_limit_rejections", "Requests rejected by the concurrency limiter", labelnames=["route"]
+)
+
+# * built once and replayed for every rejected request (a `Response` without background tasks is a reusable ASGI app)
+OVERLOADED = JSONResponse({"detail": "Server overloaded"}, status_code=503, headers={"Retry-After": "1"})
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit driven by observed latency.
+
+    The limit grows by one for every request that completes fast while at least half of the limit was in use,
+    and shrinks by `backoff` whenever a request fails (5xx / exception) or is slower than
+    `max(latency_tolerance x no-load latency, latency_floor_seconds)`. The no-load latency is the minimum over
+    the last `window` completions, so the limit adapts per route without a configured latency target.
+    Only used from the event loop thread, so no locking.
+
+    Attributes:
+        route (str): The route this limiter guards, used as the metric label.
+        limit (float): Current limit, requests above `int(limit)` in flight are rejected.
+        in_flight (int): Requests currently admitted.
+    """
+
+    def __init__(
+        self,
+        route: str,
+        initial_limit: int = CONCURRENCY_LIMIT_INITIAL,
+        min_limit: int = CONCURRENCY_LIMIT_MIN,
+        max_limit: int = CONCURRENCY_LIMIT_MAX,
+        latency_tolerance: float = CONCURRENCY_LIMIT_LATENCY_TOLERANCE,
+        latency_floor_seconds: float = CONCURRENCY_LIMIT_LATENCY_FLOOR_SECONDS,
+        backoff: float = CONCURRENCY_LIMIT_BACKOFF,
+        window: int = 500,
+    ) -> None:
+        self.route = route
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.latency_floor_seconds = latency_floor_seconds
+        self.backoff = backoff
+        self.window = window
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self._min_latency = float("inf")  # no-load latency of the current window
+        self._window_min = float("inf")  # minimum of the window being collected
+        self._samples = 0
+        self._limit_gauge = CONCURRENCY_LIMIT.labels(route=route)
+        self._limit_gauge.set(self.limit)
+        self._rejected = CONCURRENCY_REJECTED.labels(route=route)
+
+    def try_acquire(self) -> bool:
+        """Admit a request if the limit allows it, otherwise count the rejection."""
+        if self.in_flight >= int(self.limit):
+            self._rejected.inc()
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float, failed: bool = False) -> None:
+        """
+        Record the outcome of an admitted request and adjust the limit.
+        Args:
+            latency (float): Seconds the request took.
+            failed (bool, optional): The request failed (5xx or exception). Defaults to False.
+        """
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        if not failed:
+            self._record_latency(latency)
+        threshold = max(self.latency_tolerance * self._min_latency, self.latency_floor_seconds)
+        if failed or latency > threshold:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif in_flight * 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1)
+        else:
+            return
+        self._limit_gauge.set(self.limit)
+
+    def _record_latency(self, latency: float) -> None:
+        """Track the minimum latency of the current window and roll it over as the baseline every `window` samples."""
+        self._window_min = min(self._window_min, latency)
+        self._min_latency = min(self._min_latency, latency)
+        self._samples += 1
+        if self._samples >= self.window:  # start over, so a route that got slower for good is not throttled forever
+            self._min_latency, self._window_min, self._samples = self._window_min, float("inf"), 0
+
+
+class LimiterSettings(TypedDict, total=False):
+    """`AdaptiveLimiter` arguments shared by every limiter of a `RouteLimiters`, the env defaults for those left out."""
+
+    initial_limit: int
+    min_limit: int
+    max_limit: int
+    latency_tolerance: float
+    latency_floor_seconds: float
+    backoff: float
+    window: int
+
+
+class RouteLimiters:
+    """
+    One `AdaptiveLimiter` per configured route plus a shared one (`*`) for every other route.
+    Probe and metrics paths are never limited, so an overloaded pod still answers its probes and scrapes.
+
+    Attributes:
+        routes (frozenset[str]): Paths with a dedicated limiter.
+    """
+
+    def __init__(self, routes: str = CONCURRENCY_LIMIT_ROUTES, **limiter_kwargs: Unpack[LimiterSettings]) -> None:
+        self.routes = frozenset(route.strip() for route in routes.split(",") if route.strip())
+        self._limiters = {route: AdaptiveLimiter(route, **limiter_kwargs) for route in self.routes | {"*"}}
+
+    def get(self, path: str) -> AdaptiveLimiter | None:
+        """Return the limiter guarding `path`, or None if the path is never limited."""
+        if path in PROBE_PATHS:
+            return None
+        return self._limiters[path if path in self.routes else "*"]
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Pure ASGI middleware failing fast with 503 + `Retry-After` once a route's adaptive limit is reached,
+    instead of letting requests queue inside the server until latency collapses for everyone.
+
+    Attributes:
+        app (ASGIApp): The wrapped application.
+        limiters (RouteLimiters): The per-route limiters.
+    """
+
+    def __init__(self, app: ASGIApp, limiters: RouteLimiters | None = None) -> None:
+        self.app = app
+        self.limiters = limiters or RouteLimiters()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Admit the request under its route's limiter or answer 503, then feed back its latency and outcome."""
+        limiter = self.limiters.get(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        if not limiter.try_acquire():
+            await OVERLOADED(scope, receive, send)
+            return
+
+        failed = True  # unless a non-5xx response starts
+
+        async def send_tracking_status(message: Message) -> None:
+            """Forward `message`, noting whether the response is a 5xx."""
+            nonlocal failed
+            if message["type"] == "http.response.start":
+                failed = message["status"] >= 500
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_tracking_status)
+        finally:
+            limiter.release(time.perf_counter() - started, failed)
+
+
+def add_concurrency_limit_middleware(app: FastAPI) -> None:
+    """
+    Add `ConcurrencyLimitMiddleware` to the FastAPI application when `CONCURRENCY_LIMIT_ENABLED` is set.
+    Call it before `add_request_logging_middleware`, so rejected requests are still logged.
+    Args:
+        app (FastAPI): The FastAPI application instance to which the middleware will be added.
+    """
+    if CONCURRENCY_LIMIT_ENABLED:
+        app.add_middleware(ConcurrencyLimitMiddleware)
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from prometheus_client import Gauge
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .metrics import get_or_create
+
+# * `/readyz` answers 503 while one of these thresholds is crossed, `0` disables the check
+READY_MAX_IN_FLIGHT = int(os.getenv("READY_MAX_IN_FLIGHT", 100))
+READY_MAX_EVENT_LOOP_LAG_SECONDS = float(os.getenv("READY_MAX_EVENT_LOOP_LAG_SECONDS", 0.5))
+# * how often the event-loop lag is sampled
+EVENT_LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("EVENT_LOOP_LAG_INTERVAL_SECONDS", 0.5))
+# * probes and scrapes are not counted as in-flight requests
+PROBE_PATHS = frozenset({"/healthz", "/livez", "/readyz", "/metrics"})
+
+EVENT_LOOP_LAG = get_or_create(
+    Gauge, "event_loop_lag_seconds", "How late the event loop ran a timer, last sample", multiprocess_mode="livemax"
+)
+IN_FLIGHT_REQUESTS = get_or_create(
+    Gauge, "in_flight_requests", "Requests being handled (probes excluded)", multiprocess_mode="livesum"
+)
+
+# * returns why the service is not ready, or None
+ReadinessCheck = Callable[[], str | None]
+
+
+class HealthMonitor:
+    """
+    State behind `/readyz`: requests in flight (counted by `InFlightMiddleware`), event-loop lag
+    (sampled by a background task started from the app's lifespan) and service-specific checks.
+    Every uvicorn worker has its own monitor and answers the probes that reach it.
+
+    Attributes:
+        max_in_flight (int): Not ready above this many requests in flight, `0` disables the check.
+        max_event_loop_lag_seconds (float): Not ready above this event-loop lag, `0` disables the check.
+        lag_interval_seconds (float): How often the lag is sampled.
+        in_flight (int): Requests currently in flight.
+        event_loop_lag (float): Last sampled lag in seconds.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = READY_MAX_IN_FLIGHT,
+        max_event_loop_lag_seconds: float = READY_MAX_EVENT_LOOP_LAG_SECONDS,
+        lag_interval_seconds: float = EVENT_LOOP_LAG_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_event_loop_lag_seconds = max_event_loop_lag_seconds
+        self.lag_interval_seconds = lag_interval_seconds
+        self._clock = clock
+        self.in_flight = 0  # only touched from the event loop thread
+        self.event_loop_lag = 0.0
+        self.checks: list[ReadinessCheck] = []
+        self._task: asyncio.Task | None = None
+
+    def add_check(self, check: ReadinessCheck) -> None:
+        """Add a service-specific readiness check, e.g. executor queue depth."""
+        self.checks.append(check)
+
+    async def _sample_lag(self) -> None:
+        """Measure how late each `lag_interval_seconds` sleep wakes up and publish it as the event-loop lag."""
+        while True:
+            started = self._clock()
+            await asyncio.sleep(self.lag_interval_seconds)
+            # * anything beyond the requested sleep is time the loop was busy running something else
+            self.event_loop_lag = max(0.0, self._clock() - started - self.lag_interval_seconds)
+            EVENT_LOOP_LAG.set(self.event_loop_lag)
+
+    def start(self) -> None:
+        """Start sampling the event-loop lag (called from the app's lifespan)."""
+        self.event_loop_lag = 0.0
+        self._task = asyncio.create_task(self._sample_lag())
+
+    async def stop(self) -> None:
+        """Stop sampling the event-loop lag."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def not_ready_reasons(self) -> list[str]:
+        """Return why the service should not receive traffic right now, empty if it is ready."""
+        reasons = []
+        if self.max_in_flight and self.in_flight > self.max_in_flight:
+            reasons.append(f"{self.in_flight} requests in flight (max {self.max_in_flight})")
+        if self.max_event_loop_lag_seconds and self.event_loop_lag > self.max_event_loop_lag_seconds:
+            reasons.append(f"event loop lag {self.event_loop_lag:.3f}s (max {self.max_event_loop_lag_seconds}s)")
+        for check in self.checks:
+            reason = check()
+            if reason:
+                reasons.append(reason)
+        return reasons
+
+
+class InFlightMiddleware:
+    """
+    Pure ASGI middleware counting the requests in flight for `HealthMonitor` (probe and metrics paths excluded).
+
+    Attributes:
+        app (ASGIApp): The wrapped application.
+        monitor (HealthMonitor): The monitor to count in.
+    """
+
+    def __init__(self, app: ASGIApp, monitor: HealthMonitor) -> None:
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Count the request as in flight while the app handles it. Probes are not counted."""
+        if scope["type"] != "http" or scope["path"] in PROBE_PATHS:
+            await self.app(scope, receive, send)
+            return
+        self.monitor.in_flight += 1
+        IN_FLIGHT_REQUESTS.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.in_flight -= 1
+            IN_FLIGHT_REQUESTS.dec()
+
+
+def add_health_endpoints(app: FastAPI, monitor: HealthMonitor) -> None:
+    """
+    Add `/livez` and `/readyz` to the application and count its in-flight requests.
+    Both endpoints are `async` so they never wait for a free threadpool thread.
+
+    - `/livez`: the process is up and its event loop runs - for the liveness probe, never checks dependencies
+    - `/readyz`: 503 with the reasons while the service is saturated - for the readiness probe,
+      Kubernetes stops routing new requests to the pod until it catches up
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+        monitor (HealthMonitor): The monitor backing `/readyz`, started and stopped in the app's lifespan.
+    """
+    app.add_middleware(InFlightMiddleware, monitor=monitor)
+
+    @app.get("/livez")
+    async def livez() -> dict[str, str]:
+        """Liveness probe endpoint."""
+        return {"status": "ok"}
+
+    @app.get("/readyz", response_model=None)
+    async def readyz() -> dict[str, Any] | JSONResponse:
+        """Readiness probe endpoint."""
+        reasons = monitor.not_ready_reasons()
+        if reasons:
+            return JSONResponse({"status": "not ready", "reasons": reasons}, status_code=503)
+        return {"status": "ready"}
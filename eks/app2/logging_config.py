@@ -1,3 +1,180 @@
+import atexit
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import TextIO
+
 from loguru import logger
+from prometheus_client import Counter
+
+from .batching import BatchWorker
+from .metrics import get_or_create
+
+LOG_FILE = "app2/app2_service.log"
+LOG_SINK = os.getenv("LOG_SINK", "file")  # file | stdout (stdout keeps the container's writable layer clean)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json (one structured JSON object per line)
+# * the file is renamed to `<name>.<date>_<time>_<us>.log` (like loguru's rotation) once it is this old
+LOG_ROTATION_SECONDS = float(os.getenv("LOG_ROTATION_SECONDS", 7 * 24 * 3600))
+# * > 0 moves disk/stdout writes off the request path into a bounded queue flushed in batches by a background thread
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 0))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 256))
+LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("LOG_FLUSH_INTERVAL_SECONDS", 0.2))
+# * per-route sampling of request logs, e.g. `/healthz=0,/metrics=0.01` (unlisted routes are always logged)
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+LOG_RECORDS_DROPPED = get_or_create(
+    Counter, "log_records_dropped", "Log records dropped before being written", labelnames=["reason"]
+)
+_DROPPED_QUEUE_FULL = LOG_RECORDS_DROPPED.labels(reason="queue_full")
+_DROPPED_SAMPLED = LOG_RECORDS_DROPPED.labels(reason="sampled")
+
+
+class RotatingFile:
+    """
+    Append-only text file renamed into an archive once `rotation_seconds` old (counted from when it was
+    opened), for the batched sink: only its flusher thread writes, so it is rotated from that one thread.
+
+    Attributes:
+        path (str): The live file.
+        rotation_seconds (float): Age at which it is rotated.
+        rotate_at (float): `time.time()` of the next rotation.
+    """
+
+    def __init__(self, path: str, rotation_seconds: float = LOG_ROTATION_SECONDS) -> None:
+        self.path = path
+        self.rotation_seconds = rotation_seconds
+        self._file = open(path, "a", encoding="utf-8")  # pylint: disable=consider-using-with - closed in `close`
+        self.rotate_at = time.time() + rotation_seconds
+
+    def write(self, text: str) -> int:
+        """Append `text`, rotating the file first when it is due."""
+        if time.time() >= self.rotate_at:
+            self.rotate()
+        return self._file.write(text)
+
+    def rotate(self) -> None:
+        """Rename the live file into an archive next to it and start a new one."""
+        self._file.close()
+        root, extension = os.path.splitext(self.path)
+        os.rename(self.path, f"{root}.{datetime.now():%Y-%m-%d_%H-%M-%S_%f}{extension}")
+        self._file = open(self.path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+        self.rotate_at = time.time() + self.rotation_seconds
+
+    def flush(self) -> None:
+        """Flush the live file."""
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the live file."""
+        self._file.close()
+
+
+class BatchingSink:
+    """
+    Non-blocking loguru sink: `write` only puts the formatted record on a bounded queue
+    (dropping and counting it when the queue is full) and a background thread writes
+    whole batches to the underlying stream with a single write + flush.
+
+    Attributes:
+        stream (TextIO | RotatingFile): Where batches are written.
+        batch_size (int): Maximum number of records per write.
+        flush_interval (float): Seconds to wait for a batch to fill before writing it anyway.
+    """
+
+    def __init__(
+        self, stream: TextIO | RotatingFile, max_queue: int, batch_size: int = 256, flush_interval: float = 0.2
+    ) -> None:
+        self.stream = stream
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._worker = BatchWorker(self._write_batch, max_queue, batch_size, flush_interval, name="log-flusher")
+
+    def write(self, message: str) -> None:
+        """Called by loguru on the request path - never blocks."""
+        if not self._worker.put(message):
+            _DROPPED_QUEUE_FULL.inc()
+
+    def _write_batch(self, batch: list[str]) -> None:
+        """Write a batch of records to the stream in one call."""
+        self.stream.write("".join(batch))
+        self.stream.flush()
+
+    def stop(self) -> None:
+        """Flush what is queued and stop the background thread (called by loguru on `logger.remove`)."""
+        self._worker.stop()
+
+
+def worker_log_file(path: str, workers: str) -> str:
+    """
+    The log file of this process: `path` for a single worker, `<name>.worker-<pid>.log` with several (`SERVER_WORKERS`,
+    set by `launcher.py`), so every worker rotates its own file instead of several of them renaming the same one.
+    Args:
+        path (str): The service's log file.
+        workers (str): The `SERVER_WORKERS` setting.
+    Returns:
+        str: The file this process writes to.
+    """
+    if not workers.isdigit() or int(workers) <= 1:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.worker-{os.getpid()}{extension}"
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """
+    Parse `LOG_SAMPLE_RATES` into a path -> rate mapping.
+    Args:
+        spec (str): Comma separated `path=rate` pairs, rate between 0 (never log) and 1 (always log).
+    Returns:
+        dict[str, float]: The sampling rate per path.
+    """
+    rates = {}
+    for pair in filter(None, (p.strip() for p in spec.split(","))):
+        path, _, rate = pair.partition("=")
+        rates[path.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+SAMPLE_RATES = parse_sample_rates(LOG_SAMPLE_RATES)
+
+
+def should_log(path: str) -> bool:
+    """
+    Decide whether the request log line for `path` is written, based on `LOG_SAMPLE_RATES`.
+    Args:
+        path (str): The request path.
+    Returns:
+        bool: True if the request should be logged.
+    """
+    rate = SAMPLE_RATES.get(path)
+    if rate is None or rate >= 1.0 or (rate > 0.0 and random.random() < rate):  # nosec B311 - not security related
+        return True
+    _DROPPED_SAMPLED.inc()
+    return False
+
+
+def configure_logging() -> None:
+    """Add the configured sink to the shared loguru `logger`."""
+    serialize = LOG_FORMAT == "json"
+    log_file = worker_log_file(LOG_FILE, os.getenv("SERVER_WORKERS", "1"))
+    if LOG_QUEUE_SIZE <= 0 and LOG_SINK == "file":  # legacy behaviour: synchronous, rotated file next to the app
+        logger.add(log_file, rotation=timedelta(seconds=LOG_ROTATION_SECONDS), level="INFO", serialize=serialize)
+        return
+
+    logger.remove()  # the default stderr handler is synchronous too
+    if LOG_QUEUE_SIZE <= 0:
+        logger.add(sys.stdout, level="INFO", serialize=serialize)
+        return
+    stream: TextIO | RotatingFile = sys.stdout
+    if LOG_SINK == "file":  # rotated by the flusher thread, the only writer of the file
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        stream = RotatingFile(log_file)
+
+    sink = BatchingSink(stream, LOG_QUEUE_SIZE, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL_SECONDS)
+    logger.add(sink, level="INFO", serialize=serialize)
+    atexit.register(sink.stop)
+
 
-logger.add("app2/app2_service.log", rotation="1 week", level="INFO")
+configure_logging()
@@ -1,38 +1,173 @@
-from typing import Callable
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+import jwt
+from fastapi import Depends, FastAPI, HTTPException, Request
+from jwt.utils import base64url_encode
 from prometheus_fastapi_instrumentator import Instrumentator
 
-from .logging_config import logger
-from .middleware import add_cors_middleware
+from .concurrency import add_concurrency_limit_middleware
+from .health import HealthMonitor, add_health_endpoints
+from .instrumentation import Span
+from .jwks import ASYMMETRIC_ALGORITHMS, JwksCache
+from .middleware import add_cors_middleware, add_request_logging_middleware
+from .profiler import SamplingProfiler, add_profiler_endpoints
+from .responses import FastJSONResponse, add_compression_middleware
+from .rpc import DEADLINE_HEADER, RPC_ENABLED, RpcRequest, RpcServer, deadline_passed
+from .warmup import Warmup
 
-app = FastAPI()
-add_cors_middleware(app)  # Add CORS middleware to allow cross-origin requests from the frontend
+# * only the admin-only `/debug/profile` endpoints need tokens verified: with the secret shared with auth (HS256),
+# * or with EdDSA/RS256/ES256 with auth's public keys (see `jwks.py`), the algorithm must match auth's
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+# * verify with `kubectl get svc` in the `auth` namespace
+AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://fastapi-auth-service:80")
+JWKS_REFRESH_INTERVAL_SECONDS = float(os.getenv("JWKS_REFRESH_INTERVAL_SECONDS", 300))
+# * an unknown `kid` triggers an early refetch at most this often
+JWKS_MIN_REFETCH_INTERVAL_SECONDS = float(os.getenv("JWKS_MIN_REFETCH_INTERVAL_SECONDS", 30))
+JWKS_FETCH_TIMEOUT_SECONDS = float(os.getenv("JWKS_FETCH_TIMEOUT_SECONDS", 2.0))
+
+HEALTH = HealthMonitor()
+PROFILER = SamplingProfiler()  # admin-only `/debug/profile` when `PROFILER_ENABLED`
+WARMUP = Warmup()  # steps added below, run before the worker serves its first request
+RPC = RpcServer()  # app1's calls as msgpack frames on `RPC_PORT` when `RPC_ENABLED`, routes registered below
+JWKS = JwksCache(
+    url=AUTH_SERVICE_URL.rstrip("/") + "/.well-known/jwks.json",
+    refresh_interval_seconds=JWKS_REFRESH_INTERVAL_SECONDS,
+    min_refetch_interval_seconds=JWKS_MIN_REFETCH_INTERVAL_SECONDS,
+    timeout_seconds=JWKS_FETCH_TIMEOUT_SECONDS,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Manage resources that live for the whole lifetime of the application.
+    Loads auth's JWKS when tokens are asymmetrically signed, runs the warm-up, starts sampling the event-loop lag
+    reported by `/readyz`, the profiler's background mode and the RPC server (when enabled) on startup
+    and stops them on shutdown.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+    """
+    if ALGORITHM in ASYMMETRIC_ALGORITHMS:
+        await JWKS.start()
+    await WARMUP.run()  # nothing is served before it is done, so the readiness probe can't pass earlier
+    HEALTH.start()
+    PROFILER.start()
+    if RPC_ENABLED:
+        await RPC.start()
+    try:
+        yield
+    finally:
+        await RPC.stop()
+        await PROFILER.stop()
+        await HEALTH.stop()
+        await JWKS.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # * allows Prometheus to scrape metrics from this FastAPI app
 # * automatically exposes metrics at /metrics endpoint that Prometheus can scrape
 Instrumentator().instrument(app).expose(app)
+add_health_endpoints(app, HEALTH)  # `/livez` + `/readyz` for the probes
+add_concurrency_limit_middleware(app)  # fail fast with 503 instead of queueing once the adaptive limit is reached
+add_compression_middleware(app)  # `br` / `gzip` for larger JSON bodies when `COMPRESSION_ENABLED`
+add_request_logging_middleware(app)  # logs every request and turns unhandled errors into a JSON 500
+# * added last, so outermost: the frontend can read the 503s and 500s of the middleware above, not just route responses
+add_cors_middleware(app)
 
 
-@app.get("/")
-def read_root() -> dict[str, str]:
-    """Root endpoint that returns a simple greeting message."""
+def greeting() -> dict[str, str]:
+    """app2's root response, over HTTP and RPC."""
     return {"message": "Hello from FastAPI App 2!"}
 
 
-@app.get("/healthz")
-def health_check() -> dict[str, str]:
-    """Health check endpoint to verify if the service is running."""
+def check_deadline(request: Request) -> None:
+    """
+    Answer 504 without doing the work once the caller's deadline (`DEADLINE_HEADER`, sent by app1) has passed:
+    app1 stopped waiting, so the answer would be thrown away. The RPC server checks the same header per call.
+    """
+    if deadline_passed(request.headers.get(DEADLINE_HEADER)):
+        raise HTTPException(status_code=504, detail="Deadline exceeded")
+
+
+@app.get("/", dependencies=[Depends(check_deadline)], response_model=dict[str, str])
+@Span("read_root")  # app2's share of app1's `app2_call` span, the rest is network and queueing
+def read_root() -> FastJSONResponse:
+    """Root endpoint that returns a simple greeting message."""
+    return FastJSONResponse(greeting())
+
+
+@RPC.route("GET", "/")
+@Span("read_root")
+def rpc_read_root(_: RpcRequest) -> dict[str, str]:
+    """`GET /` over RPC: the same greeting, without HTTP parsing, routing, middleware or JSON."""
+    return greeting()
+
+
+@RPC.route("GET", "/livez")
+def rpc_livez(_: RpcRequest) -> dict[str, str]:
+    """`GET /livez` over RPC, what app1's warm-up calls to open its connections."""
     return {"status": "ok"}
 
 
-@app.middleware("http")
-async def log_path(request: Request, call_next: Callable) -> JSONResponse:
-    """Middleware to log the incoming request path"""
-    logger.info(f"INCOMING PATH: {request.url.path}")
+def verify_jwt(request: Request) -> dict:
+    """
+    Verify a token issued by auth, from the Authorization header or the `access_token` cookie.
+    With an asymmetric `ALGORITHM` the key is looked up by the token's `kid` in the cached JWKS (no network call).
+    Args:
+        request (Request): The FastAPI request object.
+    Raises:
+        HTTPException: If the token is missing, expired, or invalid (always invalid with HS256 and no `SECRET_KEY`).
+    Returns:
+        dict: The decoded JWT payload.
+    """
+    auth = request.headers.get("Authorization")
+    token = auth.split(" ")[1] if auth and auth.startswith("Bearer ") else request.cookies.get("access_token")
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing token")
     try:
-        return await call_next(request)
-    except Exception as e:
-        logger.error(f"Error occurred: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+        if ALGORITHM in ASYMMETRIC_ALGORITHMS:
+            signing_key = JWKS.get(jwt.get_unverified_header(token).get("kid"))
+            if signing_key is None:
+                raise HTTPException(status_code=401, detail="Unknown signing key")
+            return jwt.decode(token, signing_key.key, algorithms=[signing_key.algorithm_name])
+        if not SECRET_KEY:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+
+add_profiler_endpoints(app, PROFILER, verify_jwt)  # admins (`PROFILER_ADMINS`) only
+
+
+def prime_jwt() -> None:
+    """Warm-up step: verify a token once, so the first admin request doesn't pay for PyJWT's and the crypto backend's setup."""
+    if ALGORITHM not in ASYMMETRIC_ALGORITHMS:
+        jwt.decode(jwt.encode({"sub": "warmup"}, SECRET_KEY, algorithm=ALGORITHM), SECRET_KEY, algorithms=[ALGORITHM])
+        return
+    # * no private key here: a made-up signature still runs the whole verification with every cached public key
+    for key in JWKS.keys():
+        header = base64url_encode(json.dumps({"alg": key.algorithm_name, "kid": key.key_id}).encode())
+        token = b".".join([header, base64url_encode(b'{"sub":"warmup"}'), base64url_encode(bytes(64))])
+        try:
+            jwt.decode(token, key.key, algorithms=[key.algorithm_name])
+        except jwt.InvalidTokenError:
+            pass
+
+
+if SECRET_KEY or ALGORITHM in ASYMMETRIC_ALGORITHMS:
+    WARMUP.add_step("jwt", prime_jwt)
+
+
+@app.get("/healthz")
+def health_check() -> dict[str, str]:
+    """Health check endpoint to verify if the service is running."""
+    return {"status": "ok"}
@@ -1,9 +1,19 @@
 import os
+import time
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .logging_config import logger, should_log
+from .tracing import TRACER
 
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:8003").split(",")
+# * requests taking longer than this are logged as a warning, `0` disables the check
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 1.0))
+
+INTERNAL_SERVER_ERROR = JSONResponse({"detail": "Internal Server Error"}, status_code=500)
 
 
 def add_cors_middleware(app: FastAPI) -> None:
@@ -21,3 +31,66 @@ def add_cors_middleware(app: FastAPI) -> None:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+
+
+class RequestLoggingMiddleware:
+    """
+    Pure ASGI middleware logging the path of every request (sampled per route, see `LOG_SAMPLE_RATES`),
+    turning unhandled exceptions into a JSON 500 response and warning about slow requests.
+    It also opens the request's server span (`tracing.py`), continuing the caller's W3C `traceparent`.
+    Unlike `@app.middleware("http")` (`BaseHTTPMiddleware`) it does not wrap the request and response
+    in extra tasks and memory streams, so it adds almost nothing per request and does not buffer streaming responses.
+
+    Attributes:
+        app (ASGIApp): The wrapped application.
+        slow_request_seconds (float): Threshold for the slow request warning, `0` disables it.
+    """
+
+    def __init__(self, app: ASGIApp, slow_request_seconds: float = SLOW_REQUEST_SECONDS) -> None:
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Log and trace an HTTP request, answering a JSON 500 if the app raises before responding."""
+        if scope["type"] != "http":  # lifespan / websocket
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if should_log(path):
+            logger.info(f"INCOMING PATH: {path}")
+
+        with TRACER.server_span(f"{scope['method']} {path}", scope["headers"]) as span:
+            response_started = False
+
+            async def send_tracking_start(message: Message) -> None:
+                """Forward `message`, noting that the response started and its status on the span."""
+                nonlocal response_started
+                if message["type"] == "http.response.start":
+                    response_started = True
+                    if span is not None:
+                        span.set_status_code(message["status"])
+                await send(message)
+
+            started = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_tracking_start)
+            except Exception as e:
+                logger.error(f"Error occurred: {scope['method']} {path}: {e!r}")
+                if response_started:  # too late for a 500, let the server close the connection
+                    raise
+                await INTERNAL_SERVER_ERROR(scope, receive, send_tracking_start)
+            finally:
+                elapsed = time.perf_counter() - started
+                if self.slow_request_seconds and elapsed >= self.slow_request_seconds:
+                    logger.warning(f"SLOW REQUEST: {scope['method']} {path} took {elapsed:.3f}s")
+
+
+def add_request_logging_middleware(app: FastAPI) -> None:
+    """
+    Add `RequestLoggingMiddleware` to the FastAPI application.
+    Call it after every other `add_middleware` so it is the outermost middleware and sees every error.
+    Args:
+        app (FastAPI): The FastAPI application instance to which the middleware will be added.
+    """
+    app.add_middleware(RequestLoggingMiddleware)
@@ -0,0 +1,244 @@
+import asyncio
+import inspect
+import os
+import struct
+import time
+from typing import Any, Callable, NamedTuple
+
+import msgpack
+from prometheus_client import Counter, Histogram
+
+from .logging_config import logger
+from .metrics import get_or_create
+from .tracing import TRACER
+
+# * internal service-to-service calls as length-prefixed msgpack frames over persistent TCP connections,
+# * next to the HTTP port: no HTTP parsing, routing or middleware per call, many calls in flight per connection
+RPC_ENABLED = os.getenv("RPC_ENABLED", "false").lower() == "true"  # listen on `RPC_PORT` (the server side)
+RPC_HOST = os.getenv("RPC_HOST", "0.0.0.0")  # nosec B104 - listens on all interfaces inside the pod
+RPC_PORT = int(os.getenv("RPC_PORT", 9000))
+RPC_MAX_FRAME_BYTES = int(os.getenv("RPC_MAX_FRAME_BYTES", 4 * 1024 * 1024))
+# * calls handled at once per connection, the server stops reading a connection's frames above it (backpressure)
+RPC_MAX_CONCURRENT_STREAMS = int(os.getenv("RPC_MAX_CONCURRENT_STREAMS", 100))
+
+RPC_CONTENT_TYPE = "application/msgpack"
+# * set on the 404 for a path without an RPC route: app1 resends the call (and later ones to the path) over HTTP
+UNROUTED_HEADER = "x-rpc-unrouted"
+# * milliseconds the caller (app1, see its `resilience.py`) still waits for the answer, over HTTP and RPC
+DEADLINE_HEADER = "x-request-deadline-ms"
+_LENGTH = struct.Struct(">I")
+
+RPC_SERVER_REQUESTS = get_or_create(
+    Counter, "rpc_server_requests", "RPC calls handled, by route and status", labelnames=["path", "status"]
+)
+RPC_SERVER_DURATION = get_or_create(
+    Histogram,
+    "rpc_server_request_duration_seconds",
+    "Time spent handling an RPC call, from its frame read to its response written",
+    labelnames=["path"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+def deadline_passed(value: str | None) -> bool:
+    """
+    Whether the caller's deadline had passed when it sent the request (`DEADLINE_HEADER` of 0 ms or less).
+    Requests without the header, or with a malformed one, are handled as usual.
+    """
+    try:
+        return value is not None and float(value) <= 0
+    except ValueError:
+        return False
+
+
+class RpcProtocolError(Exception):
+    """Raised for a frame that is too large or not a valid call / response."""
+
+
+class RpcRequest(NamedTuple):
+    """
+    An incoming RPC call.
+
+    Attributes:
+        method (str): The HTTP method it stands for, e.g. `GET`.
+        path (str): The path, with the query string.
+        headers (dict[str, str]): Lower-case header names (`traceparent`, `x-request-deadline-ms`, ...).
+        body (bytes): The request body.
+    """
+
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes
+
+
+RpcHandler = Callable[[RpcRequest], Any]
+
+
+def encode_frame(message: list[Any]) -> bytes:
+    """A message as a frame: its msgpack encoding, prefixed with its length (4 bytes, big-endian)."""
+    payload = msgpack.packb(message)
+    return _LENGTH.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader, max_frame_bytes: int = RPC_MAX_FRAME_BYTES) -> list[Any] | None:
+    """
+    Read one frame.
+    Raises:
+        RpcProtocolError: If the frame is larger than `max_frame_bytes` or not a msgpack array.
+        asyncio.IncompleteReadError: If the connection closed in the middle of a frame.
+    Returns:
+        list | None: The decoded message, None when the connection closed between frames.
+    """
+    try:
+        header = await reader.readexactly(_LENGTH.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    (size,) = _LENGTH.unpack(header)
+    if size > max_frame_bytes:
+        raise RpcProtocolError(f"frame of {size} bytes (max {max_frame_bytes})")
+    try:
+        message = msgpack.unpackb(await reader.readexactly(size))
+    except (ValueError, msgpack.UnpackException) as e:
+        raise RpcProtocolError(f"undecodable frame: {e!r}") from e
+    if not isinstance(message, list):
+        raise RpcProtocolError("frame is not a msgpack array")
+    return message
+
+
+def unpack_body(content: bytes) -> Any:
+    """The object in an `RPC_CONTENT_TYPE` response body."""
+    return msgpack.unpackb(content)
+
+
+class RpcServer:
+    """
+    Serves registered handlers on a TCP port as RPC calls: one frame `[stream_id, method, path, headers, body]` per call,
+    answered with `[stream_id, status, headers, body]` as soon as its handler returns (in any order, so a slow call
+    doesn't hold up the others on the connection). Handlers return any msgpack-serialisable object, sent as the
+    `RPC_CONTENT_TYPE` body of a 200; sync handlers run on the event loop, so they have to be quick.
+    Every call continues the caller's `traceparent` in a server span, like the HTTP middleware does.
+    Started in every uvicorn worker with `SO_REUSEPORT`, the kernel spreads the connections between them.
+
+    Attributes:
+        host (str): Interface to listen on.
+        port (int): Port to listen on.
+        max_concurrent_streams (int): Calls handled at once per connection.
+        max_frame_bytes (int): Largest frame accepted, a larger one closes the connection.
+    """
+
+    def __init__(
+        self,
+        host: str = RPC_HOST,
+        port: int = RPC_PORT,
+        max_concurrent_streams: int = RPC_MAX_CONCURRENT_STREAMS,
+        max_frame_bytes: int = RPC_MAX_FRAME_BYTES,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.max_concurrent_streams = max_concurrent_streams
+        self.max_frame_bytes = max_frame_bytes
+        self._routes: dict[tuple[str, str], tuple[RpcHandler, bool]] = {}
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set[asyncio.Task] = set()
+
+    def route(self, method: str, path: str) -> Callable[[RpcHandler], RpcHandler]:
+        """Decorator registering a sync or async handler for `method` `path` (matched without the query string)."""
+
+        def register(handler: RpcHandler) -> RpcHandler:
+            """Register `handler` and return it unchanged."""
+            self._routes[(method.upper(), path)] = (handler, inspect.iscoroutinefunction(handler))
+            return handler
+
+        return register
+
+    async def start(self) -> None:
+        """Start listening (call from the running event loop, e.g. the app's lifespan)."""
+        self._server = await asyncio.start_server(self._serve, self.host, self.port, reuse_port=True)
+        self.port = self._server.sockets[0].getsockname()[1]  # the one picked by the OS for port 0
+        logger.info(f"RPC server listening on {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """Stop listening and close the open connections (their calls in flight are cancelled)."""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*list(self._connections), return_exceptions=True)
+
+    async def dispatch(self, request: RpcRequest) -> tuple[int, dict[str, str], bytes]:
+        """
+        Run the handler of a call.
+        Returns:
+            tuple: Status, headers and body: 200 with the handler's result, 404 (`UNROUTED_HEADER`) without a handler,
+                504 without running it once the caller's deadline passed, 500 if it raised.
+        """
+        route = request.path.partition("?")[0]
+        registered = self._routes.get((request.method, route))
+        if registered is None:
+            RPC_SERVER_REQUESTS.labels(path="unrouted", status="404").inc()
+            return 404, {"content-type": RPC_CONTENT_TYPE, UNROUTED_HEADER: "1"}, msgpack.packb({"detail": "Not Found"})
+        if deadline_passed(request.headers.get(DEADLINE_HEADER)):
+            RPC_SERVER_REQUESTS.labels(path=route, status="504").inc()
+            return 504, {"content-type": RPC_CONTENT_TYPE}, msgpack.packb({"detail": "Deadline exceeded"})
+        handler, is_async = registered
+        raw_headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in request.headers.items()]
+        with TRACER.server_span(f"RPC {request.method} {route}", raw_headers) as span:
+            try:
+                result = await handler(request) if is_async else handler(request)
+                status, body = 200, msgpack.packb(result)
+            except Exception as e:
+                logger.error(f"Error occurred: RPC {request.method} {route}: {e!r}")
+                status, body = 500, msgpack.packb({"detail": "Internal Server Error"})
+            if span is not None:
+                span.set_status_code(status)
+        RPC_SERVER_REQUESTS.labels(path=route, status=str(status)).inc()
+        return status, {"content-type": RPC_CONTENT_TYPE}, body
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one connection: run each incoming call as its own task, at most `max_concurrent_streams` at a time."""
+        connection = asyncio.current_task()  # `asyncio.start_server` runs every connection's `_serve` as its own task
+        if connection is not None:
+            self._connections.add(connection)
+        streams = asyncio.Semaphore(self.max_concurrent_streams)
+        calls: set[asyncio.Task] = set()
+
+        async def call(frame: list[Any]) -> None:
+            """Dispatch one call frame and write its response frame."""
+            started = time.perf_counter()
+            try:
+                stream_id, method, path, headers, body = frame
+                status, response_headers, response_body = await self.dispatch(RpcRequest(method, path, headers, body))
+                writer.write(encode_frame([stream_id, status, response_headers, response_body]))
+                await writer.drain()
+                route = path.partition("?")[0]
+                RPC_SERVER_DURATION.labels(path=route if (method, route) in self._routes else "unrouted").observe(
+                    time.perf_counter() - started
+                )
+            except (ValueError, TypeError, AttributeError) as e:  # not a call frame: drop the connection
+                logger.warning(f"invalid RPC call: {e!r}")
+                writer.close()
+            except ConnectionError:
+                pass
+            finally:
+                streams.release()
+
+        try:
+            while (frame := await read_frame(reader, self.max_frame_bytes)) is not None:
+                await streams.acquire()
+                task = asyncio.create_task(call(frame))
+                calls.add(task)
+                task.add_done_callback(calls.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except RpcProtocolError as e:
+            logger.warning(f"closing RPC connection: {e}")
+        finally:
+            for task in list(calls):
+                task.cancel()
+            writer.close()
+            if connection is not None:
+                self._connections.discard(connection)
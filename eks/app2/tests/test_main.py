@@ -1,9 +1,23 @@
+import asyncio
+import socket
+import struct
+from pathlib import Path
 from typing import Generator
 
+import httpx
+import jwt
+import msgpack
 import pytest
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
 from fastapi.testclient import TestClient
 
+from app2 import concurrency, launcher, main, middleware, tracing  # pylint: disable=import-error
+from app2.jwks import JwksCache  # pylint: disable=import-error
 from app2.main import app  # pylint: disable=import-error
+from app2.profiler import SamplingProfiler, add_profiler_endpoints  # pylint: disable=import-error
+from app2.rpc import RpcRequest, encode_frame  # pylint: disable=import-error
 
 
 @pytest.fixture
@@ -20,8 +34,168 @@ def test_healthz(client: TestClient) -> None:
     assert response.json() == {"status": "ok"}
 
 
+def test_livez_and_readyz(client: TestClient) -> None:
+    """test the liveness and readiness probe endpoints of an idle app2"""
+    assert client.get("/livez").json() == {"status": "ok"}
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
+    assert "event_loop_lag_seconds" in client.get("/metrics").text
+
+
+def test_lifespan_warms_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the warm-up primes jwt only when app2 has a secret to verify admin tokens with"""
+    with TestClient(app):
+        assert list(main.WARMUP.durations) == (["jwt"] if main.SECRET_KEY else [])
+    monkeypatch.setattr(main, "SECRET_KEY", "test-secret")
+    main.prime_jwt()
+
+
 def test_root(client: TestClient) -> None:
     """test the root endpoint"""
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Hello from FastAPI App 2!"}
+    assert 'span_duration_seconds_count{span="read_root"}' in client.get("/metrics").text
+
+
+def test_root_honours_caller_deadline(client: TestClient) -> None:
+    """test a request whose deadline already passed gets a 504 without the work, over http and rpc"""
+    assert client.get("/", headers={"X-Request-Deadline-Ms": "0"}).status_code == 504
+    assert client.get("/", headers={"X-Request-Deadline-Ms": "250"}).status_code == 200
+    assert client.get("/", headers={"X-Request-Deadline-Ms": "soon"}).status_code == 200
+
+    expired = asyncio.run(main.RPC.dispatch(RpcRequest("GET", "/", {"x-request-deadline-ms": "0"}, b"")))
+    assert expired[0] == 504 and msgpack.unpackb(expired[2]) == {"detail": "Deadline exceeded"}
+    assert asyncio.run(main.RPC.dispatch(RpcRequest("GET", "/", {"x-request-deadline-ms": "250"}, b"")))[0] == 200
+
+
+def test_root_over_rpc(monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the lifespan starts the rpc server when enabled, and calls on one connection are answered by stream id"""
+    monkeypatch.setattr(main, "RPC_ENABLED", True)
+    monkeypatch.setattr(main.RPC, "host", "127.0.0.1")
+    monkeypatch.setattr(main.RPC, "port", 0)
+
+    def read_frame(sock: socket.socket) -> list:
+        """read one length-prefixed msgpack frame from `sock`"""
+        (size,) = struct.unpack(">I", sock.recv(4, socket.MSG_WAITALL))
+        return msgpack.unpackb(sock.recv(size, socket.MSG_WAITALL))
+
+    with TestClient(app) as client:
+        with socket.create_connection(("127.0.0.1", main.RPC.port), timeout=5) as sock:
+            sock.sendall(encode_frame([1, "GET", "/", {}, b""]) + encode_frame([2, "GET", "/healthz", {}, b""]))
+            responses = {frame[0]: frame for frame in (read_frame(sock), read_frame(sock))}
+        assert responses[1][1:3] == [200, {"content-type": "application/msgpack"}]
+        assert msgpack.unpackb(responses[1][3]) == {"message": "Hello from FastAPI App 2!"}
+        assert responses[2][1] == 404 and responses[2][2]["x-rpc-unrouted"] == "1"  # app1 sends it over http instead
+        assert 'rpc_server_requests_total{path="/",status="200"}' in client.get("/metrics").text
+
+
+def test_profiler_admin_only(monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the profiler endpoints verify tokens with the shared secret and allow admins only"""
+    monkeypatch.setattr(main, "SECRET_KEY", "app2-test-secret-that-is-32-bytes")
+    debug_app = FastAPI()
+    add_profiler_endpoints(debug_app, SamplingProfiler(True), main.verify_jwt, admins=frozenset({"admin"}))
+
+    def get(sub: str, secret: str = "app2-test-secret-that-is-32-bytes") -> int:
+        """status of a profile request with a token for `sub` signed with `secret`"""
+        token = jwt.encode({"sub": sub}, secret, algorithm="HS256")
+        return debug.get("/debug/profile", params={"seconds": 0.1}, headers={"Authorization": f"Bearer {token}"}).status_code
+
+    with TestClient(debug_app) as debug:
+        assert get("admin") == 200
+        assert get("user") == 403
+        assert get("admin", secret="not-the-shared-secret-of-32-bytes") == 401
+
+
+def test_profiler_admin_only_with_jwks(monkeypatch: pytest.MonkeyPatch) -> None:
+    """test asymmetric admin tokens are verified with auth's jwks, loaded in the lifespan"""
+    private_key = Ed25519PrivateKey.generate()
+    jwk = jwt.algorithms.OKPAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    auth = FastAPI()
+    auth.get("/.well-known/jwks.json")(lambda: {"keys": [{**jwk, "kid": "key-1", "alg": "EdDSA", "use": "sig"}]})
+    cache = JwksCache(url="http://auth/.well-known/jwks.json", transport=httpx.ASGITransport(app=auth))
+    monkeypatch.setattr(main, "ALGORITHM", "EdDSA")
+    monkeypatch.setattr(main, "JWKS", cache)
+    debug_app = FastAPI()
+    add_profiler_endpoints(debug_app, SamplingProfiler(True), main.verify_jwt, admins=frozenset({"admin"}))
+
+    def get(sub: str, kid: str = "key-1") -> int:
+        """status of a profile request with a token for `sub` signed under `kid`"""
+        token = jwt.encode({"sub": sub}, private_key, algorithm="EdDSA", headers={"kid": kid})
+        return debug.get("/debug/profile", params={"seconds": 0.1}, headers={"Authorization": f"Bearer {token}"}).status_code
+
+    with TestClient(app), TestClient(debug_app) as debug:  # app2's lifespan fetches the jwks and primes it
+        assert len(cache) == 1
+        assert get("admin") == 200
+        assert get("user") == 403
+        assert get("admin", kid="key-2") == 401
+        shared_secret_token = jwt.encode({"sub": "admin"}, "app2-test-secret-that-is-32-bytes", algorithm="HS256")
+        assert debug.get("/debug/profile", headers={"Authorization": f"Bearer {shared_secret_token}"}).status_code == 401
+
+
+def test_root_continues_caller_trace(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test a request with a traceparent (from app1) is recorded as a child of the caller's span"""
+    spans: list[dict] = []
+    monkeypatch.setattr(tracing.TRACER, "export", spans.extend)
+    monkeypatch.setattr(tracing.TRACER, "sample_rate", 1.0)
+
+    client.get("/", headers={"traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"})
+    server = next(span for span in spans if span["kind"] == "server")
+    assert (server["service"], server["trace_id"], server["parent_span_id"]) == (
+        "app2",
+        "0af7651916cd43dd8448eb211c80319c",
+        "b7ad6b7169203331",
+    )
+    assert server["attributes"] == {"http.status_code": 200}
+    assert next(span for span in spans if span["name"] == "read_root")["parent_span_id"] == server["span_id"]
+
+
+def test_launcher_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the launcher sizes workers from the cpu quota and switches to multiprocess metrics for >1 worker"""
+    monkeypatch.setattr(launcher, "available_cpus", lambda: 3)
+    assert launcher.resolve_workers("auto") == 3
+    assert launcher.resolve_workers("2") == 2
+    assert launcher.resolve_loop("asyncio") == "asyncio"
+    assert launcher.resolve_http("h11") == "h11"
+    assert launcher.prepare_multiprocess_metrics(1) is None
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    (tmp_path / "counter_123.db").write_bytes(b"stale")
+    assert launcher.prepare_multiprocess_metrics(2) == str(tmp_path)
+    assert not list(tmp_path.glob("*.db"))
+
+
+def test_request_logging_middleware_returns_json_500() -> None:
+    """test an unhandled exception behind the request logging middleware becomes a json 500 response"""
+    failing_app = FastAPI()
+    middleware.add_request_logging_middleware(failing_app)
+
+    @failing_app.get("/boom")
+    def boom() -> None:
+        """always raise"""
+        raise RuntimeError("boom")
+
+    with TestClient(failing_app) as test_client:
+        response = test_client.get("/boom")
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal Server Error"}
+
+
+def test_cors_is_outermost_middleware() -> None:
+    """test cors wraps every other middleware, so their own 503s and 500s carry the cors headers too"""
+    assert app.user_middleware[0].cls is CORSMiddleware
+
+
+def test_concurrency_limit_middleware_rejects_over_limit() -> None:
+    """test the limiter answers 503 + retry-after once the route's limit is in use"""
+    limiters = concurrency.RouteLimiters(initial_limit=1, min_limit=1)
+    limiters.get("/").try_acquire()  # one request already in flight
+    limited_app = FastAPI()
+    limited_app.add_middleware(concurrency.ConcurrencyLimitMiddleware, limiters=limiters)
+
+    with TestClient(limited_app) as test_client:
+        response = test_client.get("/")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert test_client.get("/healthz").status_code == 404  # not limited, just not a route of this app
@@ -0,0 +1,85 @@
+import queue
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, Generic, TypeVar
+
+from prometheus_client import Counter
+
+from .metrics import get_or_create
+
+T = TypeVar("T")
+
+BATCH_WORKER_ERRORS = get_or_create(
+    Counter, "batch_worker_errors", "Batches whose handler raised, by background worker", labelnames=["worker"]
+)
+
+
+class BatchWorker(Generic[T]):
+    """
+    Bounded queue drained by a daemon thread that hands whole batches to `handle`: a batch is written once
+    `batch_size` items are queued or `flush_interval` seconds after its first item, whichever comes first.
+    `put` never blocks, so it is safe on the request path. Shared by the batched log sink (`logging_config.py`)
+    and the span exporter (`tracing.py`). A batch whose `handle` raises is lost, counted and reported on stderr,
+    the thread carries on with the next one.
+
+    Attributes:
+        handle (Callable[[list[T]], None]): Called from the background thread with each batch.
+        batch_size (int): Maximum number of items per batch.
+        flush_interval (float): Seconds to wait for a batch to fill before handing it over anyway.
+    """
+
+    def __init__(
+        self, handle: Callable[[list[T]], None], max_queue: int, batch_size: int, flush_interval: float, name: str
+    ) -> None:
+        self.handle = handle
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue[T | None] = queue.Queue(maxsize=max_queue)
+        self._errors = BATCH_WORKER_ERRORS.labels(worker=name)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, item: T) -> bool:
+        """Queue `item` without blocking. Returns False (the item is dropped) when the queue is full."""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            return False
+        return True
+
+    def _run(self) -> None:
+        """Collect batches from the queue and hand them to `handle` until `stop` enqueues the sentinel."""
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self.handle(batch)
+            except Exception:  # pylint: disable=broad-exception-caught - a failed write must not end the thread
+                self._errors.inc()
+                # * not through loguru: the log sink itself runs on this thread
+                print(f"{self._thread.name}: dropped a batch of {len(batch)}", file=sys.stderr)
+                traceback.print_exc(file=sys.stderr)
+
+    def stop(self) -> None:
+        """Hand over what is queued and stop the background thread."""
+        if self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=1.0)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=2.0)
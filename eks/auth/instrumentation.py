@@ -0,0 +1,133 @@
+import functools
+import inspect
+import os
+import time
+from typing import Any, Callable, TypeVar
+
+from prometheus_client import Histogram
+
+from .metrics import get_or_create
+from .tracing import TRACER
+
+# * `false` turns every span into a no-op, decorated functions are then returned unwrapped
+SPAN_METRICS_ENABLED = os.getenv("SPAN_METRICS_ENABLED", "true").lower() == "true"
+
+# * from 100us (a JWT cache hit) to 10s (a long `/burn`)
+SPAN_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SPAN_DURATION = get_or_create(
+    Histogram,
+    "span_duration_seconds",
+    "Time spent in instrumented hot-path sections",
+    labelnames=["span"],
+    buckets=SPAN_BUCKETS,
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class _Timer:
+    """Context manager observing the time spent in its block (one per `Span.time()` call, so safe under concurrency)."""
+
+    __slots__ = ("_observe", "_started", "_trace")
+
+    def __init__(self, observe: Callable[[float], None], name: str) -> None:
+        self._observe = observe
+        self._started = 0.0
+        self._trace = TRACER.span(name)
+
+    def __enter__(self) -> None:
+        """Open the trace span and start the clock."""
+        self._trace.__enter__()
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Record the elapsed time and close the trace span."""
+        self._observe(time.perf_counter() - self._started)
+        self._trace.__exit__(*exc_info)
+
+
+class _NoopTimer:
+    """Context manager doing nothing, shared by every disabled span."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        """Do nothing."""
+        return
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Do nothing (exceptions propagate)."""
+        return
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class Span:
+    """
+    A named hot-path section timed into `span_duration_seconds{span=<name>}`.
+
+    The labelled histogram child is resolved once, when the span is created at import time, so timing a call
+    costs two `perf_counter()` calls and an `observe` - no `.labels()` lookup (label tuple, dict, lock) per request.
+    Calls that raise are timed too. Inside a traced request the section is also a child span (`tracing.py`).
+
+    Usage:
+        @Span("verify_jwt")
+        def verify_jwt(...): ...
+
+        APP2_CALL = Span("app2_call")
+        with APP2_CALL.time():
+            ...
+
+    Attributes:
+        name (str): The `span` label value.
+        enabled (bool): False makes the span a no-op.
+    """
+
+    __slots__ = ("_observe", "enabled", "name")
+
+    def __init__(self, name: str, enabled: bool = SPAN_METRICS_ENABLED) -> None:
+        self.name = name
+        self.enabled = enabled
+        self._observe = SPAN_DURATION.labels(span=name).observe
+
+    def observe(self, seconds: float) -> None:
+        """Record a duration measured elsewhere."""
+        if self.enabled:
+            self._observe(seconds)
+
+    def time(self) -> _Timer | _NoopTimer:
+        """Return a context manager timing its block."""
+        return _Timer(self._observe, self.name) if self.enabled else _NOOP_TIMER
+
+    def __call__(self, fn: F) -> F:
+        """Decorate a sync or async function to time every call (FastAPI still sees the original signature)."""
+        if not self.enabled:
+            return fn
+        observe, name = self._observe, self.name
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def timed_async(*args: Any, **kwargs: Any) -> Any:
+                """Await `fn` inside a trace span and record its duration."""
+                with TRACER.span(name):
+                    started = time.perf_counter()
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        observe(time.perf_counter() - started)
+
+            return timed_async  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            """Call `fn` inside a trace span and record its duration."""
+            with TRACER.span(name):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    observe(time.perf_counter() - started)
+
+        return timed  # type: ignore[return-value]
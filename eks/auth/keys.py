@@ -0,0 +1,82 @@
+import hashlib
+import json
+import re
+from typing import Any
+
+import jwt  # PyJWT
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from jwt.utils import base64url_encode
+
+# * algorithms whose public key can be published, verifying services never need the signing secret
+ASYMMETRIC_ALGORITHMS = ("EdDSA", "RS256", "ES256")
+
+# * members that identify a key in the RFC 7638 JWK thumbprint, per key type
+_THUMBPRINT_MEMBERS = {"RSA": ("e", "kty", "n"), "EC": ("crv", "kty", "x", "y"), "OKP": ("crv", "kty", "x")}
+_PEM_PUBLIC_KEY = re.compile(r"-----BEGIN PUBLIC KEY-----.+?-----END PUBLIC KEY-----", re.DOTALL)
+
+
+def load_private_key(pem: str) -> Any:
+    """
+    Parse the PEM encoded (unencrypted) private key auth signs tokens with.
+    Args:
+        pem (str): The key, e.g. generated with `openssl genpkey -algorithm ed25519`.
+    Raises:
+        ValueError: If no key is set or it cannot be parsed.
+    Returns:
+        Any: The `cryptography` private key object.
+    """
+    if not pem.strip():
+        raise ValueError("PRIVATE_KEY environment variable is not set")
+    return serialization.load_pem_private_key(pem.encode(), password=None)
+
+
+def load_public_keys(bundle: str) -> list[Any]:
+    """
+    Parse zero or more concatenated PEM public keys,
+    e.g. the previous signing key while tokens signed with it are still valid.
+    Args:
+        bundle (str): PEM blocks, possibly empty.
+    Returns:
+        list: The `cryptography` public key objects.
+    """
+    return [serialization.load_pem_public_key(block.encode()) for block in _PEM_PUBLIC_KEY.findall(bundle)]
+
+
+def algorithm_for(public_key: Any) -> str:
+    """Return the JWS algorithm auth uses for a key of this type."""
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        return "EdDSA"
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return "RS256"
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        return "ES256"
+    raise ValueError(f"unsupported signing key type {type(public_key).__name__}")
+
+
+def public_jwk(public_key: Any) -> dict[str, str]:
+    """
+    Build the JWK published for `public_key`, with its RFC 7638 thumbprint as `kid`.
+    Args:
+        public_key (Any): A `cryptography` RSA, EC (P-256) or Ed25519 public key.
+    Returns:
+        dict: The JWK including `kid`, `alg` and `use`.
+    """
+    algorithm = algorithm_for(public_key)
+    jwk = jwt.get_algorithm_by_name(algorithm).to_jwk(public_key, as_dict=True)
+    members = {name: jwk[name] for name in _THUMBPRINT_MEMBERS[jwk["kty"]]}
+    thumbprint = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode()).digest()
+    return {**jwk, "kid": base64url_encode(thumbprint).decode(), "alg": algorithm, "use": "sig"}
+
+
+def build_jwks(signing_key: Any, previous_public_keys: list[Any] = None) -> dict[str, list[dict[str, str]]]:
+    """
+    Build the JWK Set served on `/.well-known/jwks.json`: the current signing key first, then keys still being rotated out.
+    Args:
+        signing_key (Any): The current private key.
+        previous_public_keys (list, optional): Public keys of earlier signing keys.
+    Returns:
+        dict: `{"keys": [...]}`.
+    """
+    public_keys = [signing_key.public_key(), *(previous_public_keys or [])]
+    return {"keys": [public_jwk(key) for key in public_keys]}
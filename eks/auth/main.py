@@ -1,28 +1,110 @@
+import json
 import os
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
-from typing import Callable
+from typing import Any, AsyncIterator
 
 import jwt  # PyJWT
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response
 from prometheus_fastapi_instrumentator import Instrumentator
 from pydantic import BaseModel
 
-from .logging_config import logger
-from .middleware import add_cors_middleware
+from .concurrency import add_concurrency_limit_middleware
+from .health import HealthMonitor, add_health_endpoints
+from .instrumentation import Span
+from .keys import ASYMMETRIC_ALGORITHMS, build_jwks, load_private_key, load_public_keys
+from .middleware import add_cors_middleware, add_request_logging_middleware
+from .profiler import SamplingProfiler, add_profiler_endpoints
+from .ratelimit import RateLimiter, route_path
+from .responses import FastJSONResponse, add_compression_middleware
+from .revocations import TOKENS_REVOKED, build_revocation_store, revocation_feed
+from .tokens import TokenMinter, new_jti
+from .warmup import Warmup
 
-app = FastAPI()
-add_cors_middleware(app)  # Add CORS middleware to allow cross-origin requests from the frontend
+HEALTH = HealthMonitor()
+# * hot-path timings on `/metrics` as `span_duration_seconds{span=...}` (`create_access_token` is timed by its decorator)
+MINT_TOKEN_SPAN = Span("mint_token")
+PROFILER = SamplingProfiler()  # admin-only `/debug/profile` when `PROFILER_ENABLED`
+WARMUP = Warmup()  # steps added below, run before the worker serves its first request
+RATE_LIMITER = RateLimiter()  # per-client login quotas (`RATE_LIMIT_RULES`) when `RATE_LIMIT_ENABLED`
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Manage resources that live for the whole lifetime of the application.
+    Runs the warm-up, starts sampling the event-loop lag reported by `/readyz` and the profiler's background mode
+    on startup and stops them on shutdown.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+    """
+    await WARMUP.run()  # nothing is served before it is done, so the readiness probe can't pass earlier
+    HEALTH.start()
+    PROFILER.start()
+    try:
+        yield
+    finally:
+        await PROFILER.stop()
+        await HEALTH.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # * allows Prometheus to scrape metrics from this FastAPI app
 # * automatically exposes metrics at /metrics endpoint that Prometheus can scrape
 Instrumentator().instrument(app).expose(app)
+add_health_endpoints(app, HEALTH)  # `/livez` + `/readyz` for the probes
+add_concurrency_limit_middleware(app)  # fail fast with 503 instead of queueing once the adaptive limit is reached
+add_compression_middleware(app)  # `br` / `gzip` for larger JSON bodies when `COMPRESSION_ENABLED`
+add_request_logging_middleware(app)  # logs every request and turns unhandled errors into a JSON 500
+# * added last, so outermost: the frontend can read the 503s and 500s of the middleware above, not just route responses
+add_cors_middleware(app)
 
-SECRET_KEY = os.environ["SECRET_KEY"]
-if not SECRET_KEY:
-    raise ValueError("SECRET_KEY environment variable is not set")
 ALGORITHM = os.environ.get("ALGORITHM", "HS256")
+# * HS256 signs with the shared `SECRET_KEY`, asymmetric algorithms (`keys.py`) sign with `PRIVATE_KEY`
+# * and publish the public key(s) on `/.well-known/jwks.json`, so verifying services need no secret
+SECRET_KEY = os.environ.get("SECRET_KEY", "")
+PRIVATE_KEY = os.environ.get("PRIVATE_KEY", "")
+# * PEM public keys of earlier signing keys, kept in the JWKS until the tokens they signed have expired
+PREVIOUS_PUBLIC_KEYS = os.environ.get("PREVIOUS_PUBLIC_KEYS", "")
+JWKS_MAX_AGE_SECONDS = int(os.environ.get("JWKS_MAX_AGE_SECONDS", 300))
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+# * a user logging in again within this window gets the token issued last time, `0` signs a new token every login
+TOKEN_REUSE_WINDOW_SECONDS = float(os.environ.get("TOKEN_REUSE_WINDOW_SECONDS", 0))
+TOKEN_REUSE_MAX_ENTRIES = int(os.environ.get("TOKEN_REUSE_MAX_ENTRIES", 10_000))
+# * `/login/batch` for load-test tooling, maximum credentials per request (`0` disables the endpoint)
+LOGIN_BATCH_MAX_SIZE = int(os.environ.get("LOGIN_BATCH_MAX_SIZE", 0))
+# * `sub` claims allowed to revoke any token with `POST /revocations` (comma separated), nobody by default
+REVOCATION_ADMINS = frozenset(sub.strip() for sub in os.getenv("REVOCATION_ADMINS", "").split(",") if sub.strip())
+
+KEY_ID: str | None  # `kid` of the signing key, None for HS256
+if ALGORITHM in ASYMMETRIC_ALGORITHMS:
+    SIGNING_KEY = load_private_key(PRIVATE_KEY)
+    JWKS = build_jwks(SIGNING_KEY, load_public_keys(PREVIOUS_PUBLIC_KEYS))
+    KEY_ID = JWKS["keys"][0]["kid"]
+else:
+    if not SECRET_KEY:
+        raise ValueError("SECRET_KEY environment variable is not set")
+    SIGNING_KEY, JWKS, KEY_ID = SECRET_KEY, {"keys": []}, None  # a symmetric secret is never published
+JWKS_BODY = json.dumps(JWKS).encode()
+
+# * revoked token IDs, published on `/revocations` for verifiers (app1) to sync - see `revocations.py`
+REVOCATIONS = build_revocation_store()
+# * signing key parsed and JOSE header encoded once, see `tokens.py`
+TOKEN_MINTER = TokenMinter(
+    key=SIGNING_KEY,
+    algorithm=ALGORITHM,
+    expire_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    reuse_window_seconds=TOKEN_REUSE_WINDOW_SECONDS,
+    max_reuse_entries=TOKEN_REUSE_MAX_ENTRIES,
+    kid=KEY_ID,
+    is_revoked=REVOCATIONS.is_revoked,  # a token revoked through another worker is never handed out again
+)
+# * auth verifies its own tokens (admin-only endpoints) with the secret, or the public half of the signing key
+VERIFY_KEY = SIGNING_KEY.public_key() if ALGORITHM in ASYMMETRIC_ALGORITHMS else SECRET_KEY
 
 TEST_USERS = {
     "user": "pass",
@@ -45,9 +127,10 @@ class LoginRequest(BaseModel):
     password: str
 
 
+@Span("create_access_token")
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """
-    Create a JWT access token with an expiration time.
+    Create a JWT access token with an expiration time for arbitrary claims (`/login` uses `TOKEN_MINTER.mint`).
     Args:
         data (dict): The data to encode in the token.
         expires_delta (timedelta, optional): The expiration time for the token. Defaults to 30 minutes.
@@ -56,18 +139,28 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": int(expire.timestamp())})
+    to_encode.setdefault("jti", new_jti())  # what the token can be revoked by
+    return TOKEN_MINTER.encode(to_encode)
+
+
+async def limit_client(request: Request) -> None:
+    """
+    Per-client quota of the requested route (`RATE_LIMIT_RULES`), keyed on the client address (there is no token yet).
+    `async`, so the limiter state is only touched from the event loop thread.
+    """
+    await RATE_LIMITER.limit(route_path(request), f"ip:{RATE_LIMITER.client_address(request)}")
 
 
-@app.post("/login")
-def login(data: LoginRequest) -> JSONResponse:
+@app.post("/login", dependencies=[Depends(limit_client)])
+def login(data: LoginRequest) -> FastJSONResponse:
     """Endpoint to handle user login and return a JWT token"""
     if not TEST_USERS.get(data.username) == data.password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    token = create_access_token({"sub": data.username})
-    resp = JSONResponse(content={"access_token": token, "token_type": "bearer"})
+    with MINT_TOKEN_SPAN.time():
+        token = TOKEN_MINTER.mint(data.username)
+    resp = FastJSONResponse(content={"access_token": token, "token_type": "bearer"})
     resp.set_cookie(
         key="access_token",
         value=token,
@@ -78,10 +171,72 @@ def login(data: LoginRequest) -> JSONResponse:
     return resp
 
 
+@app.post("/login/batch", dependencies=[Depends(limit_client)])
+def login_batch(data: list[LoginRequest]) -> dict[str, list[dict[str, str]]]:
+    """
+    Log in many users at once and return their tokens (no cookies), for load-test tooling.
+    Disabled unless `LOGIN_BATCH_MAX_SIZE` is set.
+
+    Args:
+        data (list[LoginRequest]): The credentials to log in with.
+    Raises:
+        HTTPException: 404 when disabled, 413 when the batch is too large, 401 if any credentials are invalid.
+    Returns:
+        dict: The tokens in request order.
+    """
+    if LOGIN_BATCH_MAX_SIZE <= 0:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if len(data) > LOGIN_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {LOGIN_BATCH_MAX_SIZE} credentials per batch")
+    if any(TEST_USERS.get(item.username) != item.password for item in data):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    return {
+        "tokens": [
+            {"username": item.username, "access_token": TOKEN_MINTER.mint(item.username), "token_type": "bearer"}
+            for item in data
+        ]
+    }
+
+
+class RevokeRequest(BaseModel):
+    """
+    Model for an admin revocation request
+
+    Attributes:
+        token (str): The token to revoke, e.g. one that leaked
+    """
+
+    token: str
+
+
+def revoke(payload: dict, reason: str) -> bool:
+    """
+    Revoke a verified token until its `exp` and stop handing it out again from the login reuse window.
+    Args:
+        payload (dict): The token's decoded claims.
+        reason (str): Why, the `reason` label of `auth_tokens_revoked_total`.
+    Returns:
+        bool: False if the token has no `jti` (issued before tokens carried one) and can't be revoked.
+    """
+    if not payload.get("jti") or "exp" not in payload:
+        return False
+    REVOCATIONS.prune(time.time())  # revocations of expired tokens are not needed anymore
+    REVOCATIONS.revoke(payload["jti"], int(payload["exp"]))
+    if payload.get("sub"):
+        TOKEN_MINTER.forget(payload["sub"])
+    TOKENS_REVOKED.labels(reason=reason).inc()
+    return True
+
+
 @app.post("/logout")
-def logout() -> JSONResponse:
-    """Endpoint to handle user logout and clear the JWT token"""
-    resp = JSONResponse(content={"message": "Logged out successfully"})
+def logout(request: Request) -> FastJSONResponse:
+    """Endpoint to handle user logout: revoke the caller's token (if still valid) and clear the JWT cookie"""
+    try:
+        revoke(verify_jwt(request), reason="logout")
+    except HTTPException:
+        pass  # no token, or an expired/invalid one: nothing to revoke
+    resp = FastJSONResponse(content={"message": "Logged out successfully"})
     resp.delete_cookie(  # set attributes to be consistent with login
         key="access_token",
         httponly=True,
@@ -91,18 +246,81 @@ def logout() -> JSONResponse:
     return resp
 
 
+@app.get("/.well-known/jwks.json")
+def jwks() -> Response:
+    """Public keys tokens are signed with (empty for HS256), cached by verifiers for `JWKS_MAX_AGE_SECONDS`"""
+    return Response(
+        content=JWKS_BODY, media_type="application/json", headers={"Cache-Control": f"public, max-age={JWKS_MAX_AGE_SECONDS}"}
+    )
+
+
+def verify_jwt(request: Request) -> dict:
+    """
+    Verify a token issued by this service, from the Authorization header or the `access_token` cookie.
+    Args:
+        request (Request): The FastAPI request object.
+    Raises:
+        HTTPException: If the token is missing, expired, invalid or revoked (`REVOCATIONS`, like app1 checks).
+    Returns:
+        dict: The decoded JWT payload.
+    """
+    auth = request.headers.get("Authorization")
+    token = auth.split(" ")[1] if auth and auth.startswith("Bearer ") else request.cookies.get("access_token")
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing token")
+    try:
+        payload = jwt.decode(token, VERIFY_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("jti") and REVOCATIONS.is_revoked(payload["jti"]):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return payload
+
+
+add_profiler_endpoints(app, PROFILER, verify_jwt)  # admins (`PROFILER_ADMINS`) only
+
+
+@app.get("/revocations", response_model=dict[str, Any])
+def revocations(since: int = Query(0, ge=0)) -> FastJSONResponse:
+    """Revoked token IDs after the feed position `since`, synced incrementally by verifiers (app1)"""
+    return FastJSONResponse(revocation_feed(REVOCATIONS, since))  # up to a page of entries, skips response validation
+
+
+@app.post("/revocations")
+def revoke_token(data: RevokeRequest, payload: dict = Depends(verify_jwt)) -> dict[str, bool]:
+    """
+    Revoke any token issued by this service, e.g. a stolen one - admins (`REVOCATION_ADMINS`) only.
+    Args:
+        data (RevokeRequest): The token to revoke.
+        payload (dict): The caller's decoded JWT payload.
+    Raises:
+        HTTPException: 403 for non-admins, 400 if the token was not issued by this service.
+    Returns:
+        dict: Whether the token was revoked (not for already expired tokens, or tokens without `jti`).
+    """
+    if payload.get("sub") not in REVOCATION_ADMINS:
+        raise HTTPException(status_code=403, detail="Admin only")
+    try:
+        claims = jwt.decode(data.token, VERIFY_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        return {"revoked": False}  # rejected everywhere already
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=400, detail="Invalid token")
+    return {"revoked": revoke(claims, reason="admin")}
+
+
+def prime_jwt() -> None:
+    """Warm-up step: sign and verify a token once, so the first `/login` doesn't pay for the crypto backend's setup."""
+    token = TOKEN_MINTER.encode({"sub": "warmup", "exp": int(datetime.now(timezone.utc).timestamp()) + 60})
+    jwt.decode(token, VERIFY_KEY, algorithms=[ALGORITHM])
+
+
+WARMUP.add_step("jwt", prime_jwt)
+
+
 @app.get("/healthz")
 def health_check() -> dict[str, str]:
     """Health check endpoint to verify the service is running"""
     return {"status": "ok"}
-
-
-@app.middleware("http")
-async def log_path(request: Request, call_next: Callable) -> JSONResponse:
-    """Middleware to log the incoming request path"""
-    logger.info(f"INCOMING PATH: {request.url.path}")
-    try:
-        return await call_next(request)
-    except Exception as e:
-        logger.error(f"Error occurred: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
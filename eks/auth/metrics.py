@@ -0,0 +1,29 @@
+from typing import Any, TypeVar
+
+from prometheus_client import REGISTRY
+from prometheus_client.metrics import MetricWrapperBase
+
+MetricT = TypeVar("MetricT", bound=MetricWrapperBase)
+
+
+def get_or_create(metric_cls: type[MetricT], name: str, documentation: str, **kwargs: Any) -> MetricT:
+    """
+    Create a metric in the default registry (the one the Instrumentator exposes on `/metrics`),
+    or return the metric already registered under `name`.
+    Modules shared between services are copied into every service package, so importing more than
+    one service into the same process (e.g. the test suite) would otherwise register the metric twice.
+
+    Args:
+        metric_cls (type): The metric type, e.g. `Counter` or `Histogram`.
+        name (str): The metric name.
+        documentation (str): The metric help text.
+        **kwargs: Extra arguments for the metric constructor (`labelnames`, `buckets`, ...).
+    Returns:
+        MetricT: The new or already registered metric.
+    """
+    try:
+        return metric_cls(name, documentation, **kwargs)
+    except ValueError as e:
+        if "Duplicated timeseries" not in str(e):
+            raise
+        return REGISTRY._names_to_collectors[name]  # type: ignore[return-value]  # pylint: disable=protected-access
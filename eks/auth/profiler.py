@@ -0,0 +1,269 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from types import CodeType, FrameType
+from typing import Any, Callable, Literal
+
+from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+# * `sub` claims allowed to use `/debug/profile` (comma separated), nobody by default
+PROFILER_ADMINS = frozenset(sub.strip() for sub in os.getenv("PROFILER_ADMINS", "").split(",") if sub.strip())
+# * bounds that keep the overhead predictable: one session at a time, at most this long, sampled this often
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", 30))
+PROFILER_INTERVAL_SECONDS = max(0.001, float(os.getenv("PROFILER_INTERVAL_SECONDS", 0.01)))
+PROFILER_MAX_STACK_DEPTH = int(os.getenv("PROFILER_MAX_STACK_DEPTH", 64))
+PROFILER_MAX_STACKS = int(os.getenv("PROFILER_MAX_STACKS", 5000))  # distinct stacks kept per profile
+# * background mode: profile for `..._DURATION_SECONDS` every `..._INTERVAL_SECONDS` (`0` = off),
+# * the last `PROFILER_RING_SIZE` profiles are served by `/debug/profile/latest`
+PROFILER_BACKGROUND_INTERVAL_SECONDS = float(os.getenv("PROFILER_BACKGROUND_INTERVAL_SECONDS", 0))
+PROFILER_BACKGROUND_DURATION_SECONDS = float(os.getenv("PROFILER_BACKGROUND_DURATION_SECONDS", 5))
+PROFILER_RING_SIZE = int(os.getenv("PROFILER_RING_SIZE", 6))
+
+# * stacks beyond `PROFILER_MAX_STACKS` are counted under this name
+TRUNCATED_STACK = "[truncated]"
+
+ProfileFormat = Literal["collapsed", "speedscope"]
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profiling session is requested while another one is running."""
+
+
+class Profile:
+    """
+    Samples of every thread's stack, aggregated per distinct stack.
+
+    Attributes:
+        stacks (Counter[str]): Samples per stack, frames `module:qualname` from the root to the leaf, `;` separated.
+        samples (int): Number of times all threads were sampled.
+        interval_seconds (float): Time between samples.
+        started_at (float): Unix time the session started.
+        duration_seconds (float): How long the session ran.
+    """
+
+    def __init__(
+        self, stacks: Counter[str], samples: int, interval_seconds: float, started_at: float, duration_seconds: float
+    ) -> None:
+        self.stacks = stacks
+        self.samples = samples
+        self.interval_seconds = interval_seconds
+        self.started_at = started_at
+        self.duration_seconds = duration_seconds
+
+    def collapsed(self) -> str:
+        """Return the collapsed stacks (`frame;frame;frame count` per line), the input of `flamegraph.pl`."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def speedscope(self) -> dict[str, Any]:
+        """Return the profile in speedscope's file format (https://www.speedscope.app), one sample per distinct stack."""
+        frames: dict[str, int] = {}
+        samples, weights = [], []
+        for stack, count in self.stacks.most_common():
+            samples.append([frames.setdefault(name, len(frames)) for name in stack.split(";")])
+            weights.append(count * self.interval_seconds)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": name} for name in frames]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": f"all threads, {self.samples} samples",
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.duration_seconds,
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "name": f"profile-{int(self.started_at)}",
+            "exporter": "sampling-profiler",
+        }
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the running worker process: a daemon thread reads every other thread's
+    stack with `sys._current_frames()` every `interval_seconds`, nothing is traced between samples.
+    Only one session runs at a time (on-demand or background). Work on a `ProcessPoolExecutor` runs in other
+    processes and is not sampled, only the wait for it.
+
+    Attributes:
+        enabled (bool): Whether the endpoints and the background mode are available.
+        interval_seconds (float): Time between samples.
+        max_stack_depth (int): Frames kept per stack, counted from the leaf.
+        max_stacks (int): Distinct stacks kept per profile.
+        background_interval_seconds (float): Time between background sessions, `0` disables them.
+        background_duration_seconds (float): Length of a background session.
+        latest (deque[Profile]): The most recent profiles, on-demand and background, oldest first.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = PROFILER_ENABLED,
+        interval_seconds: float = PROFILER_INTERVAL_SECONDS,
+        max_stack_depth: int = PROFILER_MAX_STACK_DEPTH,
+        max_stacks: int = PROFILER_MAX_STACKS,
+        background_interval_seconds: float = PROFILER_BACKGROUND_INTERVAL_SECONDS,
+        background_duration_seconds: float = PROFILER_BACKGROUND_DURATION_SECONDS,
+        ring_size: int = PROFILER_RING_SIZE,
+    ) -> None:
+        self.enabled = enabled
+        self.interval_seconds = interval_seconds
+        self.max_stack_depth = max_stack_depth
+        self.max_stacks = max_stacks
+        self.background_interval_seconds = background_interval_seconds
+        self.background_duration_seconds = background_duration_seconds
+        self.latest: deque[Profile] = deque(maxlen=ring_size)
+        self._session = threading.Lock()
+        self._stop = threading.Event()
+        self._labels: dict[CodeType, str] = {}  # frame names, formatted once per code object
+        self._task: asyncio.Task | None = None
+
+    def _frame_label(self, frame: FrameType) -> str:
+        """`module:qualname` of the frame's code, cached per code object."""
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+        return label
+
+    def _collapse(self, frame: FrameType | None) -> str:
+        """The stack ending in `frame` as `;`-joined labels, outermost first, cut at `max_stack_depth`."""
+        names: list[str] = []
+        while frame is not None and len(names) < self.max_stack_depth:
+            names.append(self._frame_label(frame))
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _sample_threads(self, stacks: Counter[str], own_thread: int) -> None:
+        """Add one sample of every thread but the profiler's own to `stacks`."""
+        for thread_id, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if thread_id == own_thread:
+                continue
+            stack = self._collapse(frame)
+            if stack in stacks or len(stacks) < self.max_stacks:
+                stacks[stack] += 1
+            else:
+                stacks[TRUNCATED_STACK] += 1
+
+    def _run(self, seconds: float, result: Future) -> None:
+        """Sample for `seconds` on the profiler thread and resolve `result` with the profile."""
+        own_thread = threading.get_ident()
+        stacks: Counter[str] = Counter()
+        samples = 0
+        started_at, started = time.time(), time.monotonic()
+        next_sample = started
+        try:
+            while time.monotonic() - started < seconds and not self._stop.is_set():
+                self._sample_threads(stacks, own_thread)  # no frame outlives the call
+                samples += 1
+                next_sample += self.interval_seconds
+                self._stop.wait(max(0.0, next_sample - time.monotonic()))
+            result.set_result(Profile(stacks, samples, self.interval_seconds, started_at, time.monotonic() - started))
+        except BaseException as e:  # pylint: disable=broad-exception-caught
+            result.set_exception(e)
+        finally:
+            self._session.release()
+
+    async def record(self, seconds: float) -> Profile:
+        """
+        Profile the process for `seconds` without blocking the event loop, and keep the result in `latest`.
+        Args:
+            seconds (float): How long to sample.
+        Raises:
+            ProfilerBusyError: If another session is running.
+        Returns:
+            Profile: The recorded profile.
+        """
+        if not self._session.acquire(blocking=False):
+            raise ProfilerBusyError("a profiling session is already running")
+        self._stop.clear()
+        result: Future = Future()
+        threading.Thread(target=self._run, args=(seconds, result), name="sampling-profiler", daemon=True).start()
+        profile = await asyncio.wrap_future(result)
+        self.latest.append(profile)
+        return profile
+
+    async def _record_periodically(self) -> None:
+        """Record a short profile every `background_interval_seconds`."""
+        while True:
+            await asyncio.sleep(self.background_interval_seconds)
+            try:
+                await self.record(self.background_duration_seconds)
+            except ProfilerBusyError:
+                pass  # an on-demand session is running, it ends up in `latest` too
+
+    def start(self) -> None:
+        """Start the background mode, if enabled (called from the app's lifespan)."""
+        if self.enabled and self.background_interval_seconds > 0:
+            self._task = asyncio.create_task(self._record_periodically())
+
+    async def stop(self) -> None:
+        """Stop the background mode and end a running session early."""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def profile_response(profile: Profile, output: ProfileFormat) -> Response:
+    """Return `profile` as collapsed stacks (text) or as a speedscope file (JSON download)."""
+    if output == "speedscope":
+        filename = f"profile-{int(profile.started_at)}.speedscope.json"
+        return JSONResponse(profile.speedscope(), headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    return PlainTextResponse(profile.collapsed())
+
+
+def add_profiler_endpoints(
+    app: FastAPI, profiler: SamplingProfiler, verify: Callable[..., dict], admins: frozenset[str] = PROFILER_ADMINS
+) -> None:
+    """
+    Add the admin-only profiler endpoints to the application when the profiler is enabled (`PROFILER_ENABLED`).
+    Both profile the uvicorn worker that handles the request.
+
+    - `/debug/profile?seconds=5&format=collapsed|speedscope`: sample for `seconds` (at most `PROFILER_MAX_SECONDS`),
+      409 while another session runs
+    - `/debug/profile/latest?format=...`: the most recent profile (background mode or on-demand), 404 if none yet
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+        profiler (SamplingProfiler): The profiler, started and stopped in the app's lifespan.
+        verify (Callable): The service's JWT verification dependency, returning the token's claims.
+        admins (frozenset[str], optional): `sub` claims allowed. Defaults to `PROFILER_ADMINS`.
+    """
+    if not profiler.enabled:
+        return
+
+    def require_admin(payload: dict = Depends(verify)) -> dict:
+        """Reject verified tokens whose subject is not a profiler admin."""
+        if payload.get("sub") not in admins:
+            raise HTTPException(status_code=403, detail="Admin only")
+        return payload
+
+    @app.get("/debug/profile", dependencies=[Depends(require_admin)], response_model=None)
+    async def profile(
+        seconds: float = Query(5.0, gt=0, le=PROFILER_MAX_SECONDS), output: ProfileFormat = Query("collapsed", alias="format")
+    ) -> Response:
+        """Profile this worker for `seconds`."""
+        try:
+            recorded = await profiler.record(seconds)
+        except ProfilerBusyError as e:
+            raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": str(int(PROFILER_MAX_SECONDS))})
+        return profile_response(recorded, output)
+
+    @app.get("/debug/profile/latest", dependencies=[Depends(require_admin)], response_model=None)
+    async def latest_profile(output: ProfileFormat = Query("collapsed", alias="format")) -> Response:
+        """Return this worker's most recent profile."""
+        if not profiler.latest:
+            raise HTTPException(status_code=404, detail="No profile recorded yet")
+        return profile_response(profiler.latest[-1], output)
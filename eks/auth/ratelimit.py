@@ -0,0 +1,266 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, NamedTuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import Counter
+
+from .metrics import get_or_create
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+# * per route `<path>=<requests per second>:<burst>`, e.g. `/login=0.2:5,/workload/{name}=1:10` - routes are matched by
+# * their path template (`/workload/{name}`, not `/workload/cpu`), routes not listed are not limited
+RATE_LIMIT_RULES = os.getenv("RATE_LIMIT_RULES", "")
+# * clients tracked per route by the `local` backend, the least recently seen ones are forgotten first
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 10_000))
+# * `local` (per worker process) or `sqlite:///path/to/ratelimit.db` (shared by every worker of the pod)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")
+# * proxies in front of the service that append to `X-Forwarded-For` (ALB / ingress-nginx: 1), 0 = use the peer address
+RATE_LIMIT_FORWARDED_HOPS = int(os.getenv("RATE_LIMIT_FORWARDED_HOPS", 0))
+
+RATE_LIMIT_REJECTED = get_or_create(
+    Counter, "rate_limit_rejections", "Requests rejected by the rate limiter", labelnames=["route"]
+)
+
+
+class Rule(NamedTuple):
+    """
+    A GCRA rate limit: `burst` requests at once, then one every `interval` seconds.
+
+    Attributes:
+        interval (float): Seconds between requests at the sustained rate.
+        burst (int): Requests allowed back to back.
+    """
+
+    interval: float
+    burst: int
+
+
+def parse_rules(spec: str) -> dict[str, Rule]:
+    """
+    Parse `RATE_LIMIT_RULES`.
+    Args:
+        spec (str): Comma-separated `<path>=<requests per second>:<burst>`, the path as declared on the route.
+    Raises:
+        ValueError: For a malformed rule, a rate <= 0 or a burst < 1.
+    Returns:
+        dict[str, Rule]: The rule of every limited path.
+    """
+    rules = {}
+    for item in filter(None, (item.strip() for item in spec.split(","))):
+        path, _, limit = item.partition("=")
+        rate, _, burst = limit.partition(":")
+        if float(rate) <= 0 or int(burst or 1) < 1:
+            raise ValueError(f"invalid rate limit rule {item!r}, expected `<path>=<requests per second>:<burst>`")
+        rules[path.strip()] = Rule(1 / float(rate), int(burst or 1))
+    return rules
+
+
+def route_path(request: Request) -> str:
+    """
+    The path template of the route `request` matched (`/workload/{name}` for `/workload/cpu`), which rules are keyed on,
+    so a rule covers every path of a parameterised route. The raw path if no route matched (yet).
+    """
+    route = request.scope.get("route")
+    return route.path if route is not None else request.scope["path"]
+
+
+class RateLimitBackend(ABC):
+    """
+    Where the GCRA state (each client's theoretical arrival time, TAT) is kept. A request is admitted when
+    the TAT it would push forward stays within `burst x interval` of now; rejected requests don't change it.
+
+    Attributes:
+        blocking (bool): Whether `acquire` does blocking I/O, `RateLimiter.limit` then calls it from the threadpool.
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def acquire(self, route: str, key: str, rule: Rule, now: float) -> float:
+        """
+        Admit a request of `key` on `route` if its rule allows it.
+        Args:
+            route (str): The limited path.
+            key (str): The client, e.g. `ip:10.0.0.1` or `sub:alice`.
+            rule (Rule): The route's limit.
+            now (float): Current Unix time.
+        Returns:
+            float: 0 if the request is admitted, otherwise seconds until it would be.
+        """
+
+
+class LocalBackend(RateLimitBackend):
+    """
+    GCRA state in this worker process: one float per client, in an LRU-ordered dict per route bounded by `max_keys`.
+    Forgetting a client is only lossy while it is still limited, idle clients go first.
+    Only used from the event loop thread (the limiter runs in `async` dependencies), so no locking.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS) -> None:
+        self.max_keys = max_keys
+        self._tats: dict[str, OrderedDict[str, float]] = {}
+
+    def acquire(self, route: str, key: str, rule: Rule, now: float) -> float:
+        """GCRA against this process's per-route TATs, evicting the least recently admitted key beyond `max_keys`."""
+        tats = self._tats.get(route)
+        if tats is None:
+            tats = self._tats[route] = OrderedDict()
+        tat = tats.get(key, now)
+        tat = max(tat, now) + rule.interval
+        excess = tat - now - rule.interval * rule.burst
+        if excess > 0:
+            tats.move_to_end(key)  # a hammering client stays tracked (keys are added on admission only)
+            return excess
+        tats[key] = tat
+        tats.move_to_end(key)
+        if len(tats) > self.max_keys:
+            tats.popitem(last=False)
+        return 0.0
+
+
+class SqliteBackend(RateLimitBackend):
+    """
+    GCRA state in a SQLite file, shared by every worker process that opens it (WAL mode, one connection per thread).
+    Local stand-in for a shared store: a Redis/Memcached backend implements the same `acquire` for limits
+    that hold across replicas. Rows of idle clients are deleted every `prune_every` admissions.
+    `blocking`: a transaction waits up to 5s for the lock held by another worker, so it runs in the threadpool.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, prune_every: int = 1000) -> None:
+        self.path = path
+        self.prune_every = prune_every
+        self._admitted = 0
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS gcra (route TEXT NOT NULL, key TEXT NOT NULL, tat REAL NOT NULL, "
+            "PRIMARY KEY (route, key))"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened in WAL mode on first use."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)  # explicit transactions
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")  # losing the last updates on a crash only resets some limits
+        return db
+
+    def acquire(self, route: str, key: str, rule: Rule, now: float) -> float:
+        """GCRA in one `BEGIN IMMEDIATE` transaction, pruning idle rows every `prune_every` admissions."""
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")  # read-modify-write of the TAT, serialised between processes
+        try:
+            row = db.execute("SELECT tat FROM gcra WHERE route = ? AND key = ?", (route, key)).fetchone()
+            tat = max(row[0] if row else now, now) + rule.interval
+            excess = tat - now - rule.interval * rule.burst
+            if excess <= 0:
+                db.execute("INSERT OR REPLACE INTO gcra (route, key, tat) VALUES (?, ?, ?)", (route, key, tat))
+                self._admitted += 1
+                if self._admitted % self.prune_every == 0:
+                    db.execute("DELETE FROM gcra WHERE tat <= ?", (now,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return max(excess, 0.0)
+
+
+def build_rate_limit_backend(url: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    """
+    Create the backend configured by `RATE_LIMIT_BACKEND`.
+    Args:
+        url (str): `local` or `sqlite:///<path>`.
+    Raises:
+        ValueError: For any other value.
+    Returns:
+        RateLimitBackend: The backend.
+    """
+    if url == "local":
+        return LocalBackend()
+    if url.startswith("sqlite:///"):
+        return SqliteBackend(url.removeprefix("sqlite:///"))
+    raise ValueError(f"RATE_LIMIT_BACKEND must be `local` or `sqlite:///<path>`, got {url!r}")
+
+
+class RateLimiter:
+    """
+    Per-client rate limits per route (GCRA, the token bucket expressed as one timestamp per client).
+    Called from the routes' `async` dependencies with the client's key (`limit`); over the limit the request
+    gets 429 with `Retry-After` before any work is done for it.
+
+    Attributes:
+        enabled (bool): Whether `check` does anything.
+        rules (dict[str, Rule]): The limit of every limited path.
+        backend (RateLimitBackend): Where the state is kept.
+        forwarded_hops (int): Proxies in front of the service that append to `X-Forwarded-For`.
+    """
+
+    def __init__(
+        self,
+        rules: str = RATE_LIMIT_RULES,
+        enabled: bool = RATE_LIMIT_ENABLED,
+        backend: RateLimitBackend | None = None,
+        forwarded_hops: int = RATE_LIMIT_FORWARDED_HOPS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.enabled = enabled
+        self.rules = parse_rules(rules)
+        self.backend = backend or build_rate_limit_backend()
+        self.forwarded_hops = forwarded_hops
+        self._clock = clock  # wall clock, the `sqlite` backend compares it between processes
+        self._rejected = {route: RATE_LIMIT_REJECTED.labels(route=route) for route in self.rules}
+
+    def check(self, route: str, key: str) -> None:
+        """
+        Count a request of `key` against the limit of `route`.
+        Args:
+            route (str): The route's path template (`route_path`), routes without a rule are not limited.
+            key (str): The client.
+        Raises:
+            HTTPException: 429 with `Retry-After` (whole seconds) when the client is over the limit.
+        """
+        rule = self.rules.get(route)
+        if rule is None or not self.enabled:
+            return
+        retry_after = self.backend.acquire(route, key, rule, self._clock())
+        if retry_after > 0:
+            self._rejected[route].inc()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    async def limit(self, route: str, key: str) -> None:
+        """
+        `check` from the event loop: the `local` backend runs inline (its state is only touched from the loop thread),
+        a `blocking` one (`sqlite`) in the threadpool, so waiting for another worker's lock doesn't stall the loop.
+        Raises:
+            HTTPException: 429 with `Retry-After` when the client is over the limit.
+        """
+        if self.backend.blocking and self.enabled and route in self.rules:
+            await run_in_threadpool(self.check, route, key)
+        else:
+            self.check(route, key)
+
+    def client_address(self, request: Request) -> str:
+        """
+        The client's address: the entry `forwarded_hops` from the right of `X-Forwarded-For` (the one our own proxy
+        appended, entries further left are client-supplied), or the peer address without proxies or when the header
+        has fewer entries (a request that didn't come through the proxy, e.g. from inside the cluster).
+        """
+        if self.forwarded_hops:
+            forwarded = [entry.strip() for entry in request.headers.get("X-Forwarded-For", "").split(",")]
+            forwarded = [entry for entry in forwarded if entry]
+            if len(forwarded) >= self.forwarded_hops:
+                return forwarded[-self.forwarded_hops]
+        return request.client.host if request.client else "unknown"
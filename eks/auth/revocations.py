@@ -0,0 +1,213 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, NamedTuple
+
+from prometheus_client import Counter
+
+from .metrics import get_or_create
+
+# * where revoked token IDs are kept: `memory` (this process only, refused with several workers) or
+# * `sqlite:///path/to/revocations.db` (shared by every worker of the pod) - verifiers follow each replica's feed
+REVOCATION_STORE = os.getenv("REVOCATION_STORE", "memory")
+# * revocations returned per `/revocations` page, verifiers page through larger backlogs
+REVOCATION_FEED_PAGE_SIZE = int(os.getenv("REVOCATION_FEED_PAGE_SIZE", 1000))
+
+TOKENS_REVOKED = get_or_create(Counter, "auth_tokens_revoked", "Access tokens revoked", labelnames=["reason"])
+
+
+class Revocation(NamedTuple):
+    """
+    A revoked token.
+
+    Attributes:
+        seq (int): Position in the store's feed, increasing.
+        jti (str): The token's `jti` claim.
+        expires_at (int): The token's `exp`, the revocation is dropped afterwards.
+    """
+
+    seq: int
+    jti: str
+    expires_at: int
+
+
+class RevocationStore(ABC):
+    """
+    Append-only feed of revoked token IDs that verifiers (app1) follow incrementally with a cursor (`seq`).
+    Entries of tokens that have expired anyway are pruned. `epoch` identifies the feed: it changes when
+    the feed starts over (e.g. an in-memory store after a restart), verifiers then resync from the start.
+
+    Attributes:
+        epoch (str): Identifier of this feed.
+    """
+
+    epoch: str
+
+    @abstractmethod
+    def revoke(self, jti: str, expires_at: int) -> int:
+        """
+        Add a revocation, revoking the same `jti` again is a no-op.
+        Args:
+            jti (str): The token's `jti` claim.
+            expires_at (int): The token's `exp` (Unix time).
+        Returns:
+            int: The feed position of the revocation.
+        """
+
+    @abstractmethod
+    def is_revoked(self, jti: str) -> bool:
+        """Whether `jti` is in the feed (until pruned after its token expired)."""
+
+    @abstractmethod
+    def since(self, seq: int, limit: int) -> list[Revocation]:
+        """
+        Return up to `limit` unexpired revocations after feed position `seq`, oldest first.
+        Args:
+            seq (int): The verifier's cursor, `0` for the whole feed.
+            limit (int): Maximum number of revocations returned.
+        Returns:
+            list[Revocation]: The revocations.
+        """
+
+    @abstractmethod
+    def prune(self, now: float) -> int:
+        """Drop revocations of tokens expired before `now` and return how many were dropped."""
+
+
+class MemoryRevocationStore(RevocationStore):
+    """Revocations in a dict of this process, for local runs and tests (every uvicorn worker has its own feed)."""
+
+    def __init__(self) -> None:
+        self.epoch = secrets.token_hex(8)
+        self._entries: dict[str, Revocation] = {}  # insertion order = feed order
+        self._seq = 0
+        self._lock = threading.Lock()  # sync endpoints run in the threadpool
+
+    def revoke(self, jti: str, expires_at: int) -> int:
+        """Append `jti` to the feed unless it is already in it, and return its position."""
+        with self._lock:
+            existing = self._entries.get(jti)
+            if existing is not None:
+                return existing.seq
+            self._seq += 1
+            self._entries[jti] = Revocation(self._seq, jti, expires_at)
+            return self._seq
+
+    def is_revoked(self, jti: str) -> bool:
+        """Whether `jti` is in the dict."""
+        return jti in self._entries
+
+    def since(self, seq: int, limit: int) -> list[Revocation]:
+        """Unexpired revocations after `seq`, oldest first, at most `limit`."""
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.values())
+        return [entry for entry in entries if entry.seq > seq and entry.expires_at > now][:limit]
+
+    def prune(self, now: float) -> int:
+        """Drop revocations expired before `now`."""
+        with self._lock:
+            expired = [jti for jti, entry in self._entries.items() if entry.expires_at <= now]
+            for jti in expired:
+                del self._entries[jti]
+        return len(expired)
+
+
+class SqliteRevocationStore(RevocationStore):
+    """
+    Revocations in a SQLite file, shared by every worker process that opens it (WAL mode, one connection per thread).
+    The feed position is the table's `AUTOINCREMENT` key, the epoch is stored in the file, so it survives restarts.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS revocations "
+                "(seq INTEGER PRIMARY KEY AUTOINCREMENT, jti TEXT UNIQUE NOT NULL, expires_at INTEGER NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS revocations_expires_at ON revocations (expires_at)")
+            db.execute("CREATE TABLE IF NOT EXISTS feed (epoch TEXT NOT NULL)")
+            if db.execute("SELECT epoch FROM feed").fetchone() is None:
+                db.execute("INSERT INTO feed (epoch) VALUES (?)", (secrets.token_hex(8),))
+            self.epoch = db.execute("SELECT epoch FROM feed").fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened in WAL mode on first use."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def revoke(self, jti: str, expires_at: int) -> int:
+        """Insert `jti` unless it is already in the feed, and return its position."""
+        with self._connection() as db:
+            db.execute("INSERT OR IGNORE INTO revocations (jti, expires_at) VALUES (?, ?)", (jti, expires_at))
+            return db.execute("SELECT seq FROM revocations WHERE jti = ?", (jti,)).fetchone()[0]
+
+    def is_revoked(self, jti: str) -> bool:
+        """Whether `jti` is in the table, whichever worker revoked it."""
+        return self._connection().execute("SELECT 1 FROM revocations WHERE jti = ?", (jti,)).fetchone() is not None
+
+    def since(self, seq: int, limit: int) -> list[Revocation]:
+        """Unexpired revocations after `seq`, oldest first, at most `limit`."""
+        rows = self._connection().execute(
+            "SELECT seq, jti, expires_at FROM revocations WHERE seq > ? AND expires_at > ? ORDER BY seq LIMIT ?",
+            (seq, int(time.time()), limit),
+        )
+        return [Revocation(*row) for row in rows]
+
+    def prune(self, now: float) -> int:
+        """Delete revocations expired before `now`."""
+        with self._connection() as db:
+            return db.execute("DELETE FROM revocations WHERE expires_at <= ?", (now,)).rowcount
+
+
+def build_revocation_store(url: str = REVOCATION_STORE, workers: str | None = None) -> RevocationStore:
+    """
+    Create the store configured by `REVOCATION_STORE`.
+    Args:
+        url (str): `memory` or `sqlite:///<path>`.
+        workers (str | None, optional): Worker processes serving the app, `SERVER_WORKERS` (as resolved by
+            `launcher.py`) if None.
+    Raises:
+        ValueError: For any other value, or for `memory` with several workers: a logout would only revoke the
+            token on the worker that handled it, and verifiers polling through the Service would see a different
+            feed on almost every sync.
+    Returns:
+        RevocationStore: The store.
+    """
+    if url == "memory":
+        workers = os.getenv("SERVER_WORKERS", "1") if workers is None else workers
+        if workers.isdigit() and int(workers) > 1:
+            raise ValueError(f"REVOCATION_STORE=memory is per process, use `sqlite:///<path>` with {workers} workers")
+        return MemoryRevocationStore()
+    if url.startswith("sqlite:///"):
+        return SqliteRevocationStore(url.removeprefix("sqlite:///"))
+    raise ValueError(f"REVOCATION_STORE must be `memory` or `sqlite:///<path>`, got {url!r}")
+
+
+def revocation_feed(store: RevocationStore, since: int, limit: int = REVOCATION_FEED_PAGE_SIZE) -> dict[str, Any]:
+    """
+    Build a `/revocations` page.
+    Args:
+        store (RevocationStore): The store.
+        since (int): The verifier's cursor.
+        limit (int, optional): Page size. Defaults to `REVOCATION_FEED_PAGE_SIZE`.
+    Returns:
+        dict: `epoch`, the `revocations` (`jti`, `exp`), the `cursor` to ask with next time and whether there is `more`.
+    """
+    page = store.since(since, limit + 1)
+    more = len(page) > limit
+    page = page[:limit]
+    return {
+        "epoch": store.epoch,
+        "revocations": [{"jti": entry.jti, "exp": entry.expires_at} for entry in page],
+        "cursor": page[-1].seq if page else since,
+        "more": more,
+    }
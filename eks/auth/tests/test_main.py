@@ -1,11 +1,30 @@
+import asyncio
+import threading
+from pathlib import Path
 from typing import Generator
 
 import jwt
 import pytest
-from fastapi import status
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.middleware.cors import CORSMiddleware
 from fastapi.testclient import TestClient
 
-from auth.main import ALGORITHM, SECRET_KEY, TEST_USERS, app
+from auth import concurrency, launcher, main, middleware
+from auth.keys import build_jwks, load_private_key, load_public_keys
+from auth.main import ALGORITHM, SECRET_KEY, TEST_USERS, app, verify_jwt
+from auth.profiler import SamplingProfiler, add_profiler_endpoints
+from auth.ratelimit import LocalBackend, RateLimitBackend, RateLimiter, Rule, SqliteBackend
+from auth.revocations import (
+    MemoryRevocationStore,
+    RevocationStore,
+    SqliteRevocationStore,
+    build_revocation_store,
+    revocation_feed,
+)
+from auth.tokens import TokenMinter
 
 
 @pytest.fixture
@@ -22,6 +41,20 @@ def test_healthz(client: TestClient) -> None:
     assert response.json() == {"status": "ok"}
 
 
+def test_livez_and_readyz(client: TestClient) -> None:
+    """test the liveness and readiness probe endpoints of an idle auth service"""
+    assert client.get("/livez").json() == {"status": "ok"}
+    response = client.get("/readyz")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "ready"}
+
+
+def test_lifespan_warms_up(client: TestClient) -> None:
+    """test the lifespan signs and verifies a token before serving"""
+    assert list(main.WARMUP.durations) == ["jwt"]
+    assert 'warmup_duration_seconds{step="jwt"}' in client.get("/metrics").text
+
+
 def test_login_success(client: TestClient) -> None:
     """test login with valid credentials"""
     for username, password in TEST_USERS.items():
@@ -37,6 +70,13 @@ def test_login_success(client: TestClient) -> None:
         break  # only test first user for brevity
 
 
+def test_login_records_mint_span(client: TestClient) -> None:
+    """test /login times token minting as a hot-path span on /metrics"""
+    username, password = next(iter(TEST_USERS.items()))
+    client.post("/login", json={"username": username, "password": password})
+    assert 'span_duration_seconds_count{span="mint_token"}' in client.get("/metrics").text
+
+
 def test_login_invalid_credentials(client: TestClient) -> None:
     """test login with invalid credentials"""
     response = client.post("/login", json={"username": "not_a_user", "password": "badpass"})
@@ -44,8 +84,328 @@ def test_login_invalid_credentials(client: TestClient) -> None:
     assert response.json()["detail"] == "Invalid credentials"
 
 
+def test_token_minter_matches_pyjwt() -> None:
+    """test minted tokens carry the same header and claims jwt.encode would produce"""
+    minter = TokenMinter(SECRET_KEY, ALGORITHM, expire_seconds=60, clock=lambda: 1_000.5, jti_factory=lambda: "jti-1")
+    token = minter.mint("alice")
+    claims = {"sub": "alice", "exp": 1060, "jti": "jti-1"}
+    assert jwt.get_unverified_header(token) == {"alg": ALGORITHM, "typ": "JWT"}
+    assert jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False}) == claims
+    assert token == jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+    without_jti = TokenMinter(SECRET_KEY, ALGORITHM, expire_seconds=60, jti_factory=None).mint("bob")
+    assert "jti" not in jwt.decode(without_jti, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+def test_token_minter_asymmetric() -> None:
+    """test the minter signs with a preloaded asymmetric key"""
+    private_key = Ed25519PrivateKey.generate()
+    token = TokenMinter(private_key, "EdDSA", expire_seconds=60).mint("bob")
+    assert jwt.decode(token, private_key.public_key(), algorithms=["EdDSA"])["sub"] == "bob"
+
+
+def test_token_minter_reuse_window() -> None:
+    """test the same subject gets the same token within the reuse window and a new one after it"""
+    now = [1_000.0]
+    minter = TokenMinter(SECRET_KEY, ALGORITHM, expire_seconds=600, reuse_window_seconds=10, clock=lambda: now[0])
+    first = minter.mint("alice")
+    now[0] += 5
+    assert minter.mint("alice") == first
+    assert minter.mint("bob") != first
+    now[0] += 6
+    assert minter.mint("alice") != first
+    second = minter.mint("alice")
+    minter.forget("alice")  # e.g. revoked on logout, never handed out again
+    assert minter.mint("alice") != second
+
+    with pytest.raises(ValueError):
+        TokenMinter(SECRET_KEY, ALGORITHM, expire_seconds=60, reuse_window_seconds=60)
+
+
+def test_token_minter_reuse_skips_token_revoked_by_another_worker(tmp_path: Path) -> None:
+    """test a login never reuses a token that a logout on another worker (own minter, same store file) revoked"""
+    workers = []
+    for _ in range(2):
+        store = SqliteRevocationStore(str(tmp_path / "revocations.db"))
+        minter = TokenMinter(SECRET_KEY, ALGORITHM, expire_seconds=600, reuse_window_seconds=10, is_revoked=store.is_revoked)
+        workers.append((minter, store))
+    (minter_a, _), (minter_b, store_b) = workers
+
+    first = minter_a.mint("alice")
+    assert minter_a.mint("alice") == first
+    claims = jwt.decode(first, SECRET_KEY, algorithms=[ALGORITHM])
+    store_b.revoke(claims["jti"], claims["exp"])  # `/logout` handled by worker b
+    minter_b.forget("alice")  # only reaches b's own reuse window
+
+    second = minter_a.mint("alice")
+    assert second != first and not store_b.is_revoked(jwt.decode(second, SECRET_KEY, algorithms=[ALGORITHM])["jti"])
+    assert minter_a.mint("alice") == second
+
+
+def test_jwks_endpoint_never_publishes_hs256_secret(client: TestClient) -> None:
+    """test the jwks endpoint is empty when tokens are signed with the shared secret"""
+    response = client.get("/.well-known/jwks.json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"keys": []}
+    assert response.headers["cache-control"].startswith("public, max-age=")
+
+
+def test_jwks_verifies_minted_tokens_during_rotation() -> None:
+    """test tokens signed with the current or the previous key verify against the published jwks by kid"""
+    pem_format = (serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    signing_key = load_private_key(Ed25519PrivateKey.generate().private_bytes(*pem_format).decode())
+    previous_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    previous_pem = previous_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    jwks = build_jwks(signing_key, load_public_keys(previous_pem.decode()))
+    assert [(k["kty"], k["alg"]) for k in jwks["keys"]] == [("OKP", "EdDSA"), ("RSA", "RS256")]
+    assert all("d" not in k for k in jwks["keys"])  # public parts only
+
+    key_set = jwt.PyJWKSet.from_dict(jwks)
+    current = TokenMinter(signing_key, "EdDSA", expire_seconds=60, kid=jwks["keys"][0]["kid"]).mint("alice")
+    previous = TokenMinter(previous_key, "RS256", expire_seconds=60, kid=jwks["keys"][1]["kid"]).mint("bob")
+    for token, sub in ((current, "alice"), (previous, "bob")):
+        key = key_set[jwt.get_unverified_header(token)["kid"]]
+        assert jwt.decode(token, key.key, algorithms=[key.algorithm_name])["sub"] == sub
+
+
+def test_login_batch(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the batch login returns one valid token per credential and is limited in size"""
+    credentials = [{"username": username, "password": password} for username, password in TEST_USERS.items()]
+    assert client.post("/login/batch", json=credentials).status_code == status.HTTP_404_NOT_FOUND  # disabled by default
+
+    monkeypatch.setattr(main, "LOGIN_BATCH_MAX_SIZE", len(credentials))
+    response = client.post("/login/batch", json=credentials)
+    assert response.status_code == status.HTTP_200_OK
+    tokens = response.json()["tokens"]
+    assert [t["username"] for t in tokens] == list(TEST_USERS)
+    for t in tokens:
+        assert jwt.decode(t["access_token"], SECRET_KEY, algorithms=[ALGORITHM])["sub"] == t["username"]
+
+    response = client.post("/login/batch", json=credentials + credentials[:1])
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    response = client.post("/login/batch", json=[{"username": "user", "password": "wrong"}])
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
 def test_logout(client: TestClient) -> None:
     """test logout endpoint clears cookie"""
     response = client.post("/logout")
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["message"] == "Logged out successfully"
+
+
+def test_logout_revokes_token(client: TestClient) -> None:
+    """test logging out publishes the token's jti on the revocation feed, from the cursor on"""
+    cursor = client.get("/revocations").json()["cursor"]
+    token = client.post("/login", json={"username": "bob", "password": TEST_USERS["bob"]}).json()["access_token"]
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    assert client.post("/logout", headers={"Authorization": f"Bearer {token}"}).status_code == status.HTTP_200_OK
+    feed = client.get("/revocations", params={"since": cursor}).json()
+    assert feed["revocations"] == [{"jti": claims["jti"], "exp": claims["exp"]}]
+    assert feed["cursor"] > cursor and feed["more"] is False
+    assert client.get("/revocations", params={"since": feed["cursor"]}).json()["revocations"] == []
+    assert client.get("/revocations", params={"since": -1}).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_revoked_token_is_refused_by_auth(client: TestClient) -> None:
+    """test a logged-out token is refused by auth's own endpoints too, not only by app1"""
+    token = client.post("/login", json={"username": "bob", "password": TEST_USERS["bob"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/logout", headers=headers).status_code == status.HTTP_200_OK
+
+    response = client.post("/revocations", json={"token": token}, headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json()["detail"] == "Token revoked"
+
+
+def test_revoke_token_admin_only(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test admins can revoke any token, other users and tokens not issued by auth are refused"""
+    monkeypatch.setattr(main, "REVOCATION_ADMINS", frozenset({"alice"}))
+    tokens = {
+        username: client.post("/login", json={"username": username, "password": TEST_USERS[username]}).json()["access_token"]
+        for username in ("alice", "charlie")
+    }
+    as_admin, as_user = ({"Authorization": f"Bearer {tokens[username]}"} for username in ("alice", "charlie"))
+
+    response = client.post("/revocations", json={"token": tokens["alice"]}, headers=as_user)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    response = client.post("/revocations", json={"token": "not-a-jwt"}, headers=as_admin)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert client.post("/revocations", json={"token": tokens["charlie"]}, headers=as_admin).json() == {"revoked": True}
+    jti = jwt.decode(tokens["charlie"], SECRET_KEY, algorithms=[ALGORITHM])["jti"]
+    assert jti in [revocation["jti"] for revocation in client.get("/revocations").json()["revocations"]]
+
+
+@pytest.mark.parametrize("store_type", ["memory", "sqlite"])
+def test_revocation_store_feed(store_type: str, tmp_path: Path) -> None:
+    """test the revocation feed pages through revocations in order, skips and prunes expired ones, keeps its epoch"""
+
+    def open_store() -> RevocationStore:
+        """open the parametrized store, the same file each time for sqlite"""
+        return MemoryRevocationStore() if store_type == "memory" else SqliteRevocationStore(str(tmp_path / "revocations.db"))
+
+    store = open_store()
+    far, past = 4_000_000_000, 1_000
+    seqs = [store.revoke(f"jti-{i}", far) for i in range(3)]
+    assert store.revoke("jti-0", far) == seqs[0]  # revoking twice is a no-op
+    assert store.is_revoked("jti-1") and not store.is_revoked("jti-9")
+    store.revoke("expired", past)
+
+    first = revocation_feed(store, 0, limit=2)
+    assert [r["jti"] for r in first["revocations"]] == ["jti-0", "jti-1"] and first["more"] is True
+    second = revocation_feed(store, first["cursor"], limit=2)
+    assert second["revocations"] == [{"jti": "jti-2", "exp": far}] and second["more"] is False
+    assert second["epoch"] == first["epoch"]
+    assert store.prune(2_000) == 1
+    if store_type == "sqlite":  # shared by the workers of a pod, and across restarts
+        reopened = open_store()
+        assert reopened.epoch == store.epoch
+        assert [r.jti for r in reopened.since(0, 10)] == ["jti-0", "jti-1", "jti-2"]
+
+
+def test_build_revocation_store_refuses_memory_with_several_workers(tmp_path: Path) -> None:
+    """test the per-process memory store is only built for a single worker, sqlite for any number"""
+    assert isinstance(build_revocation_store("memory", workers="1"), MemoryRevocationStore)
+    with pytest.raises(ValueError, match="per process"):
+        build_revocation_store("memory", workers="4")
+    assert isinstance(build_revocation_store(f"sqlite:///{tmp_path / 'revocations.db'}", workers="4"), SqliteRevocationStore)
+    with pytest.raises(ValueError):
+        build_revocation_store("redis://auth-redis", workers="1")
+
+
+def test_profiler_admin_only(client: TestClient) -> None:
+    """test the profiler endpoints accept tokens issued by /login, for admins only"""
+    debug_app = FastAPI()
+    add_profiler_endpoints(debug_app, SamplingProfiler(True), verify_jwt, admins=frozenset({"alice"}))
+    tokens = {
+        username: client.post("/login", json={"username": username, "password": TEST_USERS[username]}).json()["access_token"]
+        for username in ("alice", "bob")
+    }
+
+    with TestClient(debug_app) as debug:
+        bob = debug.get("/debug/profile", params={"seconds": 0.1}, headers={"Authorization": f"Bearer {tokens['bob']}"})
+        alice = debug.get("/debug/profile", params={"seconds": 0.1}, headers={"Authorization": f"Bearer {tokens['alice']}"})
+    assert bob.status_code == status.HTTP_403_FORBIDDEN
+    assert alice.status_code == status.HTTP_200_OK
+    assert alice.headers["content-type"].startswith("text/plain")
+
+
+def test_launcher_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the launcher sizes workers from the cpu quota and switches to multiprocess metrics for >1 worker"""
+    monkeypatch.setattr(launcher, "available_cpus", lambda: 3)
+    assert launcher.resolve_workers("auto") == 3
+    assert launcher.resolve_workers("2") == 2
+    assert launcher.resolve_loop("asyncio") == "asyncio"
+    assert launcher.resolve_http("h11") == "h11"
+    assert launcher.prepare_multiprocess_metrics(1) is None
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    (tmp_path / "counter_123.db").write_bytes(b"stale")
+    assert launcher.prepare_multiprocess_metrics(2) == str(tmp_path)
+    assert not list(tmp_path.glob("*.db"))
+
+
+def test_request_logging_middleware_returns_json_500() -> None:
+    """test an unhandled exception behind the request logging middleware becomes a json 500 response"""
+    failing_app = FastAPI()
+    middleware.add_request_logging_middleware(failing_app)
+
+    @failing_app.get("/boom")
+    def boom() -> None:
+        """always raise"""
+        raise RuntimeError("boom")
+
+    with TestClient(failing_app) as test_client:
+        response = test_client.get("/boom")
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal Server Error"}
+
+
+def test_cors_is_outermost_middleware() -> None:
+    """test cors wraps every other middleware, so their own 503s and 500s carry the cors headers too"""
+    assert app.user_middleware[0].cls is CORSMiddleware
+
+
+def test_concurrency_limit_middleware_rejects_over_limit() -> None:
+    """test the limiter answers 503 + retry-after once the route's limit is in use, probes are never limited"""
+    limiters = concurrency.RouteLimiters(routes="/login", initial_limit=1, min_limit=1)
+    limiters.get("/login").try_acquire()  # one login already in flight
+    limited_app = FastAPI()
+    limited_app.add_middleware(concurrency.ConcurrencyLimitMiddleware, limiters=limiters)
+
+    with TestClient(limited_app) as test_client:
+        response = test_client.post("/login")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
+        assert test_client.get("/readyz").status_code == status.HTTP_404_NOT_FOUND  # passed through, not a route here
+
+
+def test_login_rate_limited_per_client(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """test /login answers 429 + retry-after once a client address used its burst, keyed on the proxy-appended address"""
+    limiter = RateLimiter("/login=0.1:2", enabled=True, backend=LocalBackend(), forwarded_hops=1)
+    monkeypatch.setattr(main, "RATE_LIMITER", limiter)
+    credentials = {"username": "bob", "password": "wrong"}
+    spoofed = {"X-Forwarded-For": "1.2.3.4, 10.0.0.1"}  # the client made up `1.2.3.4`, our proxy appended the real one
+
+    statuses = [client.post("/login", json=credentials, headers=spoofed).status_code for _ in range(3)]
+    assert statuses == [status.HTTP_401_UNAUTHORIZED] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS]
+    response = client.post("/login", json=credentials, headers={"X-Forwarded-For": "5.6.7.8, 10.0.0.1"})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.headers["Retry-After"] == "10"
+    assert client.post("/login", json=credentials, headers={"X-Forwarded-For": "10.0.0.2"}).status_code == 401
+
+
+@pytest.mark.parametrize("forwarded_for", [None, "", " , "])
+def test_client_address_without_proxy(forwarded_for: str | None) -> None:
+    """test a request that didn't come through the proxy is keyed on its peer address, not on an empty header entry"""
+    headers = [] if forwarded_for is None else [(b"x-forwarded-for", forwarded_for.encode())]
+    request = Request({"type": "http", "headers": headers, "client": ("10.1.2.3", 40000)})
+
+    assert RateLimiter("", forwarded_hops=1, backend=LocalBackend()).client_address(request) == "10.1.2.3"
+
+
+def test_sqlite_rate_limit_runs_in_the_threadpool(tmp_path: Path) -> None:
+    """test the blocking sqlite backend is called off the event loop thread, the local one on it"""
+    threads = []
+
+    class RecordingBackend(SqliteBackend):
+        """sqlite backend recording the thread of every call"""
+        def acquire(self, route: str, key: str, rule: Rule, now: float) -> float:
+            """record the calling thread and acquire"""
+            threads.append(threading.get_ident())
+            return super().acquire(route, key, rule, now)
+
+    limiter = RateLimiter("/login=0.1:1", enabled=True, backend=RecordingBackend(str(tmp_path / "ratelimit.db")))
+
+    async def run() -> int:
+        """admit one request, reject the next, and return the event loop's thread"""
+        await limiter.limit("/login", "ip:a")
+        with pytest.raises(HTTPException) as exc:
+            await limiter.limit("/login", "ip:a")
+        assert exc.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 2 and loop_thread not in threads
+
+
+@pytest.mark.parametrize("backend_type", ["local", "sqlite"])
+def test_rate_limit_backends(backend_type: str, tmp_path: Path) -> None:
+    """test every backend implements the same gcra limit, the sqlite one shared between workers opening the same file"""
+
+    def open_backend() -> RateLimitBackend:
+        """open the parametrized backend, the same file each time for sqlite"""
+        return LocalBackend() if backend_type == "local" else SqliteBackend(str(tmp_path / "ratelimit.db"), prune_every=2)
+
+    worker_1, worker_2 = open_backend(), open_backend()
+    rule = Rule(interval=1.0, burst=2)
+    assert [worker_1.acquire("/login", "ip:a", rule, 100.0) for _ in range(2)] == [0, 0]
+    assert worker_1.acquire("/login", "ip:a", rule, 100.0) == pytest.approx(1.0)
+    assert worker_1.acquire("/login", "ip:a", rule, 101.0) == 0
+    assert worker_1.acquire("/login", "ip:b", rule, 101.0) == 0
+    if backend_type == "sqlite":
+        assert worker_2.acquire("/login", "ip:a", rule, 101.0) == pytest.approx(1.0)
+    else:
+        assert worker_2.acquire("/login", "ip:a", rule, 101.0) == 0  # per worker process
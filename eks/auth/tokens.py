@@ -0,0 +1,123 @@
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+import jwt  # PyJWT
+from jwt.utils import base64url_encode
+from prometheus_client import Counter
+
+from .metrics import get_or_create
+
+TOKENS_ISSUED = get_or_create(Counter, "auth_tokens_issued", "Access tokens handed out", labelnames=["source"])
+_TOKENS_MINTED = TOKENS_ISSUED.labels(source="minted")  # newly signed
+_TOKENS_REUSED = TOKENS_ISSUED.labels(source="reused")  # served from the reuse window
+
+
+def new_jti() -> str:
+    """Return a random token ID (`jti` claim), what a token is revoked by (see `revocations.py`)."""
+    return secrets.token_hex(16)
+
+
+class TokenMinter:
+    """
+    Signs access tokens without the per-call setup `jwt.encode` does: the signing key is parsed once
+    (`Algorithm.prepare_key`), the JOSE header is serialized and base64url encoded once, and only the
+    claims are serialized per token. The output is a standard compact JWS, verifiable with `jwt.decode`.
+
+    With `reuse_window_seconds > 0` a subject logging in again within that window gets the token it was
+    issued last time (still valid, same `exp` and `jti`) instead of a newly signed one - unless `is_revoked`
+    says its `jti` was revoked since, e.g. by a logout handled by another worker whose `forget` didn't reach this one.
+
+    Attributes:
+        algorithm (str): JWS algorithm, e.g. `HS256`, `RS256`, `ES256` or `EdDSA`.
+        expire_seconds (int): Lifetime of minted tokens.
+        reuse_window_seconds (float): How long an issued token is handed out again, `0` always signs a new one.
+        max_reuse_entries (int): Maximum number of subjects remembered for reuse (least recently used evicted).
+        kid (str | None): Key ID put in the JOSE header, the `kid` of the signing key's JWK.
+        jti_factory (Callable[[], str] | None): Returns the `jti` claim of every minted token, None leaves it out.
+        is_revoked (Callable[[str], bool] | None): Checks a reused token's `jti` against the shared revocations.
+    """
+
+    def __init__(
+        self,
+        key: Any,
+        algorithm: str,
+        expire_seconds: int,
+        reuse_window_seconds: float = 0.0,
+        max_reuse_entries: int = 10_000,
+        kid: str | None = None,
+        clock: Callable[[], float] = time.time,
+        jti_factory: Callable[[], str] | None = new_jti,
+        is_revoked: Callable[[str], bool] | None = None,
+    ) -> None:
+        if reuse_window_seconds >= expire_seconds:
+            raise ValueError("the token reuse window must be shorter than the token lifetime")
+        self.algorithm = algorithm
+        self.expire_seconds = expire_seconds
+        self.reuse_window_seconds = reuse_window_seconds
+        self.max_reuse_entries = max_reuse_entries
+        self.jti_factory = jti_factory
+        self.is_revoked = is_revoked
+        self._clock = clock
+        self._signer = jwt.get_algorithm_by_name(algorithm)
+        self._key = self._signer.prepare_key(key)  # PEM parsing / HMAC key checks happen once, not per token
+        header = {"alg": algorithm, "typ": "JWT", **({"kid": kid} if kid else {})}  # `kid` tells verifiers which JWK to use
+        self._header_segment = base64url_encode(json.dumps(header, separators=(",", ":"), sort_keys=True).encode()) + b"."
+        self._issued: OrderedDict[str, tuple[float, str, str | None]] = OrderedDict()  # subject -> (issued at, token, jti)
+        self._lock = threading.Lock()  # sync endpoints run in the threadpool
+
+    def encode(self, claims: dict[str, Any]) -> str:
+        """
+        Sign `claims` as they are (the caller sets `exp`).
+        Args:
+            claims (dict): JSON serializable claims.
+        Returns:
+            str: The compact JWS.
+        """
+        payload = json.dumps(claims, separators=(",", ":")).encode()
+        signing_input = self._header_segment + base64url_encode(payload)
+        signature = self._signer.sign(signing_input, self._key)
+        return (signing_input + b"." + base64url_encode(signature)).decode()
+
+    def mint(self, subject: str) -> str:
+        """
+        Return an access token for `subject`, reusing the one issued within the reuse window if there is one.
+        Args:
+            subject (str): The `sub` claim.
+        Returns:
+            str: The encoded JWT.
+        """
+        now = self._clock()
+        if self.reuse_window_seconds > 0:
+            with self._lock:
+                issued = self._issued.get(subject)
+                if issued is not None and now - issued[0] >= self.reuse_window_seconds:
+                    issued = None
+            # * outside the lock: the check may be a database read
+            if issued is not None and not (issued[2] and self.is_revoked and self.is_revoked(issued[2])):
+                with self._lock:
+                    if subject in self._issued:
+                        self._issued.move_to_end(subject)
+                _TOKENS_REUSED.inc()
+                return issued[1]
+
+        claims: dict[str, Any] = {"sub": subject, "exp": int(now) + self.expire_seconds}
+        if self.jti_factory is not None:
+            claims["jti"] = self.jti_factory()
+        token = self.encode(claims)
+        _TOKENS_MINTED.inc()
+        if self.reuse_window_seconds > 0:
+            with self._lock:
+                self._issued[subject] = (now, token, claims.get("jti"))
+                self._issued.move_to_end(subject)
+                while len(self._issued) > self.max_reuse_entries:
+                    self._issued.popitem(last=False)
+        return token
+
+    def forget(self, subject: str) -> None:
+        """Stop handing out the token last issued to `subject` (e.g. it was revoked on logout)."""
+        with self._lock:
+            self._issued.pop(subject, None)
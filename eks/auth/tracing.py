@@ -0,0 +1,348 @@
+import atexit
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar, Token
+from typing import Any, Callable, TextIO
+
+from prometheus_client import Counter
+
+from .batching import BatchWorker
+from .metrics import get_or_create
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+SERVICE_NAME = os.getenv("SERVICE_NAME", __package__ or "service")
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "stdout")  # stdout | file | http (the collector, see `trace_collector`)
+TRACING_FILE = os.getenv("TRACING_FILE", f"{SERVICE_NAME}_traces.jsonl")
+TRACING_COLLECTOR_URL = os.getenv("TRACING_COLLECTOR_URL", "http://localhost:4318/v1/traces")
+# * finished spans wait in a bounded queue and are written in batches by a background thread, never on the request path
+TRACING_QUEUE_SIZE = int(os.getenv("TRACING_QUEUE_SIZE", 2048))
+TRACING_BATCH_SIZE = int(os.getenv("TRACING_BATCH_SIZE", 256))
+TRACING_FLUSH_INTERVAL_SECONDS = float(os.getenv("TRACING_FLUSH_INTERVAL_SECONDS", 1.0))
+# * tail sampling, decided when the request ends: slow or errored traces are always kept, plus this share of the others
+TRACING_SLOW_SECONDS = float(os.getenv("TRACING_SLOW_SECONDS", 0.5))
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", 0.01))
+TRACING_MAX_SPANS_PER_TRACE = int(os.getenv("TRACING_MAX_SPANS_PER_TRACE", 512))
+
+TRACEPARENT_HEADER = "traceparent"
+# * W3C trace context: version-trace_id-parent_id-flags, lowercase hex
+_TRACEPARENT = re.compile(r"([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?")
+
+TRACE_SPANS = get_or_create(Counter, "trace_spans", "Finished trace spans, by what happened to them", labelnames=["outcome"])
+_EXPORTED = TRACE_SPANS.labels(outcome="exported")
+_SAMPLED_OUT = TRACE_SPANS.labels(outcome="sampled_out")
+_DROPPED_QUEUE_FULL = TRACE_SPANS.labels(outcome="queue_full")
+_DROPPED_TRACE_FULL = TRACE_SPANS.labels(outcome="trace_full")
+_DROPPED_EXPORT_ERROR = TRACE_SPANS.labels(outcome="export_error")
+
+SpanExport = Callable[[list[dict[str, Any]]], None]
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str] | None:
+    """
+    Parse a W3C `traceparent` header.
+    Args:
+        value (str | None): The header value.
+    Returns:
+        tuple[str, str] | None: The trace id and the parent span id, or None if the header is missing or invalid.
+    """
+    match = _TRACEPARENT.fullmatch(value.strip()) if value else None
+    if match is None:
+        return None
+    version, trace_id, parent_id, _, rest = match.groups()
+    if version == "ff" or (version == "00" and rest) or trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id
+
+
+def _random_id(bits: int) -> str:
+    """Random non-zero id of `bits` bits as lowercase hex, as W3C trace context requires."""
+    return f"{random.getrandbits(bits) or 1:0{bits // 4}x}"  # nosec B311 - ids, not secrets
+
+
+class _Segment:
+    """The spans of one trace recorded by this process for one incoming request, kept or dropped together."""
+
+    __slots__ = ("error", "keep", "lock", "root", "spans")
+
+    def __init__(self) -> None:
+        self.root: TraceSpan | None = None
+        self.spans: list[TraceSpan] = []
+        self.keep: bool | None = None  # decided when the root span ends
+        self.error = False
+        self.lock = threading.Lock()  # spans of sync dependencies end on threadpool threads
+
+
+class TraceSpan:
+    """
+    One timed operation of a trace.
+
+    Attributes:
+        trace_id (str): 32 hex digits shared by every span of the trace, across services.
+        span_id (str): 16 hex digits.
+        parent_id (str | None): The parent span, possibly in the calling service.
+        name (str): What the span covers, e.g. `GET /read_app2` or `verify_jwt`.
+        kind (str): `server` (an incoming request), `client` (an outgoing call) or `internal`.
+        attributes (dict): Extra details, e.g. `http.status_code`.
+        error (bool): The operation failed.
+    """
+
+    __slots__ = ("attributes", "end_ns", "error", "kind", "name", "parent_id", "segment", "span_id", "start_ns", "trace_id")
+
+    def __init__(self, trace_id: str, parent_id: str | None, name: str, kind: str, segment: _Segment) -> None:
+        self.trace_id = trace_id
+        self.span_id = _random_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes: dict[str, Any] = {}
+        self.error = False
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.segment = segment
+
+    def traceparent(self) -> str:
+        """Return the `traceparent` header making a downstream call a child of this span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"  # always sampled: the tail sampler decides later
+
+    def set_status_code(self, status_code: int) -> None:
+        """Record the HTTP status of the request or call, 5xx marks the span as failed."""
+        self.attributes["http.status_code"] = status_code
+        if status_code >= 500:
+            self.error = True
+
+    def to_dict(self, service: str) -> dict[str, Any]:
+        """Return the span as exported, one JSON object per span."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "service": service,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": "error" if self.error else "ok",
+            "attributes": self.attributes,
+        }
+
+
+_CURRENT_SPAN: ContextVar[TraceSpan | None] = ContextVar("current_span", default=None)
+
+
+class _SpanScope:
+    """Makes a span current for its block and finishes it on exit (failed if the block raised an `Exception`)."""
+
+    __slots__ = ("_token", "span", "tracer")
+
+    def __init__(self, tracer: "Tracer", span: TraceSpan) -> None:
+        self.tracer = tracer
+        self.span = span
+        self._token: Token | None = None
+
+    def __enter__(self) -> TraceSpan:
+        """Make the span the current one."""
+        self._token = _CURRENT_SPAN.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type: type[BaseException] | None, *_: Any) -> None:
+        """Restore the previous span and finish this one, marking it failed on an exception."""
+        _CURRENT_SPAN.reset(self._token)  # type: ignore[arg-type]
+        if exc_type is not None and issubclass(exc_type, Exception):  # a cancelled hedge is not a failure
+            self.span.error = True
+        self.tracer.finish(self.span)
+
+
+class _NoopScope:
+    """Scope used outside of a traced request or while tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        """Do nothing, there is no span."""
+        return
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Do nothing (exceptions propagate)."""
+        return
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+class Tracer:
+    """
+    Records spans of the requests this process handles and tail-samples them per request: when the request's
+    server span ends, its spans are exported if it was slow (`slow_seconds`), if any of them failed, or if the
+    trace id falls in the `sample_rate` share (derived from the id, so every service keeps the same traces).
+    Spans finishing after their request (background refreshes) follow the request's decision.
+
+    Attributes:
+        export (SpanExport | None): Where kept spans go, e.g. `BatchSpanExporter.export`, None disables tracing.
+        service (str): Service name on every span.
+        slow_seconds (float): Requests at least this slow are kept.
+        sample_rate (float): Share of the other traces kept.
+        max_spans_per_trace (int): Spans recorded per request, more are dropped.
+    """
+
+    def __init__(
+        self,
+        export: SpanExport | None,
+        service: str = SERVICE_NAME,
+        slow_seconds: float = TRACING_SLOW_SECONDS,
+        sample_rate: float = TRACING_SAMPLE_RATE,
+        max_spans_per_trace: int = TRACING_MAX_SPANS_PER_TRACE,
+    ) -> None:
+        self.export = export
+        self.service = service
+        self.slow_seconds = slow_seconds
+        self.sample_rate = sample_rate
+        self.max_spans_per_trace = max_spans_per_trace
+
+    def server_span(self, name: str, headers: list[tuple[bytes, bytes]]) -> _SpanScope | _NoopScope:
+        """
+        Scope of an incoming request, continuing the caller's trace if it sent a valid `traceparent`.
+        Args:
+            name (str): The span name, e.g. `GET /read_app2`.
+            headers (list): The raw ASGI request headers.
+        Returns:
+            The scope, entering it returns the span (None while tracing is disabled).
+        """
+        if self.export is None:
+            return _NOOP_SCOPE
+        traceparent = next((v.decode("latin-1") for k, v in headers if k == b"traceparent"), None)
+        trace_id, parent_id = parse_traceparent(traceparent) or (_random_id(128), None)
+        segment = _Segment()
+        segment.root = TraceSpan(trace_id, parent_id, name, "server", segment)
+        return _SpanScope(self, segment.root)
+
+    def span(self, name: str, kind: str = "internal") -> _SpanScope | _NoopScope:
+        """
+        Scope of a child of the current span, a no-op outside of a traced request.
+        Args:
+            name (str): The span name.
+            kind (str, optional): `internal` or `client`. Defaults to "internal".
+        Returns:
+            The scope, entering it returns the span or None.
+        """
+        parent = _CURRENT_SPAN.get()
+        if parent is None:
+            return _NOOP_SCOPE
+        return _SpanScope(self, TraceSpan(parent.trace_id, parent.span_id, name, kind, parent.segment))
+
+    def _sampled(self, trace_id: str) -> bool:
+        """Head-sampling decision derived from the trace id, so every service agrees on it."""
+        return int(trace_id[-8:], 16) < self.sample_rate * 0x1_0000_0000
+
+    def finish(self, span: TraceSpan) -> None:
+        """End `span`, and decide on its request's spans if it is the request's server span."""
+        span.end_ns = time.time_ns()
+        segment = span.segment
+        with segment.lock:
+            segment.error = segment.error or span.error
+            if span is segment.root:
+                slow = span.end_ns - span.start_ns >= self.slow_seconds * 1e9
+                segment.keep = segment.error or slow or self._sampled(span.trace_id)
+                batch, segment.spans = segment.spans + [span], []
+            elif segment.keep is None:
+                if len(segment.spans) < self.max_spans_per_trace:
+                    segment.spans.append(span)
+                else:
+                    _DROPPED_TRACE_FULL.inc()
+                return
+            else:
+                batch = [span]  # finished after its request
+        if not segment.keep or self.export is None:
+            _SAMPLED_OUT.inc(len(batch))
+            return
+        self.export([s.to_dict(self.service) for s in batch])
+
+
+def current_traceparent() -> str | None:
+    """Return the `traceparent` header for an outgoing call made from the current span, None outside of a trace."""
+    span = _CURRENT_SPAN.get()
+    return span.traceparent() if span is not None else None
+
+
+class BatchSpanExporter:
+    """
+    Non-blocking span exporter: `export` only puts spans on a bounded queue (dropping and counting them
+    when it is full) and a background thread hands whole batches to `write`.
+
+    Attributes:
+        write (SpanExport): Writes one batch, e.g. `stream_writer(sys.stdout)` or `http_writer(url)`.
+        batch_size (int): Maximum number of spans per write.
+        flush_interval (float): Seconds to wait for a batch to fill before writing it anyway.
+    """
+
+    def __init__(self, write: SpanExport, max_queue: int, batch_size: int = 256, flush_interval: float = 1.0) -> None:
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._worker = BatchWorker(self._write_batch, max_queue, batch_size, flush_interval, name="span-exporter")
+
+    def export(self, spans: list[dict[str, Any]]) -> None:
+        """Called when a trace is kept - never blocks."""
+        for span in spans:
+            if not self._worker.put(span):
+                _DROPPED_QUEUE_FULL.inc()
+
+    def _write_batch(self, batch: list[dict[str, Any]]) -> None:
+        """Export a batch, counting it as dropped if the writer fails."""
+        try:
+            self.write(batch)
+            _EXPORTED.inc(len(batch))
+        except Exception:  # pylint: disable=broad-exception-caught - the collector being down must not stop exporting
+            _DROPPED_EXPORT_ERROR.inc(len(batch))
+
+    def stop(self) -> None:
+        """Flush what is queued and stop the background thread."""
+        self._worker.stop()
+
+
+def stream_writer(stream: TextIO) -> SpanExport:
+    """Write batches as JSON lines to `stream` (stdout or a file)."""
+
+    def write(batch: list[dict[str, Any]]) -> None:
+        """Write `batch` as JSON lines."""
+        stream.write("".join(json.dumps(span, separators=(",", ":")) + "\n" for span in batch))
+        stream.flush()
+
+    return write
+
+
+def http_writer(url: str, timeout: float = 2.0) -> SpanExport:
+    """POST batches as `{"spans": [...]}` to the collector at `url`."""
+
+    def write(batch: list[dict[str, Any]]) -> None:
+        """POST `batch` to the collector."""
+        body = json.dumps({"spans": batch}, separators=(",", ":")).encode()
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=timeout) as response:  # nosec B310 - configured collector URL
+            response.read()
+
+    return write
+
+
+def build_tracer() -> Tracer:
+    """Build the process-wide tracer from the `TRACING_*` settings (disabled unless `TRACING_ENABLED`)."""
+    if not TRACING_ENABLED:
+        return Tracer(None)
+    if TRACING_EXPORTER == "http":
+        write = http_writer(TRACING_COLLECTOR_URL)
+    elif TRACING_EXPORTER == "file":
+        write = stream_writer(open(TRACING_FILE, "a", encoding="utf-8"))  # pylint: disable=consider-using-with
+    else:
+        write = stream_writer(sys.stdout)
+    exporter = BatchSpanExporter(write, TRACING_QUEUE_SIZE, TRACING_BATCH_SIZE, TRACING_FLUSH_INTERVAL_SECONDS)
+    atexit.register(exporter.stop)
+    return Tracer(exporter.export)
+
+
+TRACER = build_tracer()
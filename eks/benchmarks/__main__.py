@@ -0,0 +1,79 @@
+"""
+Load-test the sandbox services on this machine, offline: start auth, app2 and app1, drive the scenarios
+(`login_flow`, `read_app2`, `mixed_burn`) and print throughput, p50/p95/p99 latency and error rate as JSON.
+The report is compared with `benchmarks/baseline.json` (exit code 1 on a regression).
+
+Run from `eks/`:
+    python -m benchmarks --mode subprocess --requests 2000 --concurrency 32
+    python -m benchmarks --mode inprocess --scenarios read_app2 --write-baseline
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any
+
+import httpx
+
+from .baseline import BASELINE_FILE, find_regressions, load_baseline, save_baseline
+from .common import drive
+from .harness import STACK_MODES, Stack, run_stack
+from .scenarios import SCENARIOS
+
+
+async def run_scenarios(stack: Stack, names: list[str], total: int, concurrency: int) -> dict[str, dict[str, float]]:
+    """
+    Run every scenario in `names` against `stack`, one after the other, each after a short warm-up.
+    Args:
+        stack (Stack): The running services.
+        names (list[str]): Scenario names from `SCENARIOS`.
+        total (int): Calls per scenario.
+        concurrency (int): Concurrent in-flight calls.
+    Returns:
+        dict: Summary per scenario.
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        results = {}
+        for name in names:
+            call = await SCENARIOS[name](client, stack)
+            await drive(call, min(total, 100), concurrency)  # warm-up: connections, caches
+            results[name] = await drive(call, total, concurrency)
+        return results
+
+
+def main() -> None:
+    """Entry point: run the suite, print the JSON report and flag regressions against the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=STACK_MODES, default="subprocess", help="how the services are started")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers per service (subprocess mode)")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=1000, help="calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent in-flight calls")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative throughput/p99 change")
+    parser.add_argument("--write-baseline", action="store_true", help="save this run as the new baseline")
+    args = parser.parse_args()
+
+    settings = {"mode": args.mode, "workers": args.workers, "requests": args.requests, "concurrency": args.concurrency}
+    with run_stack(args.mode, args.workers) as stack:
+        scenarios = asyncio.run(run_scenarios(stack, args.scenarios, args.requests, args.concurrency))
+    report: dict[str, Any] = {"settings": settings, "scenarios": scenarios}
+
+    if args.write_baseline:
+        save_baseline(report, args.baseline)
+    else:
+        baseline = load_baseline(args.baseline)
+        if baseline is not None:
+            if baseline.get("settings") != settings:
+                print(f"warning: baseline was recorded with {baseline.get('settings')}", file=sys.stderr)
+            report["regressions"] = find_regressions(report, baseline, args.tolerance)
+
+    print(json.dumps(report, indent=2))
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
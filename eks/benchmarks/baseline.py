@@ -0,0 +1,47 @@
+import json
+import os
+from typing import Any
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def load_baseline(path: str = BASELINE_FILE) -> dict[str, Any] | None:
+    """Return the saved baseline, or None if there is none yet."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(report: dict[str, Any], path: str = BASELINE_FILE) -> None:
+    """Save a benchmark report as the new baseline."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+
+
+def find_regressions(report: dict[str, Any], baseline: dict[str, Any], tolerance: float = 0.2) -> list[str]:
+    """
+    Compare a benchmark report with the baseline, scenario by scenario.
+    A scenario regressed if its throughput dropped, or its p99 latency grew, by more than `tolerance`,
+    or its error rate grew by more than one percentage point.
+
+    Args:
+        report (dict): The current report (`settings` + `scenarios`).
+        baseline (dict): A previously saved report.
+        tolerance (float, optional): Allowed relative change. Defaults to 0.2 (20%).
+    Returns:
+        list[str]: One message per regression, empty if there is none.
+    """
+    regressions = []
+    for name, current in report["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {current['rps']} req/s < baseline {base['rps']} req/s")
+        if current["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {current['p99_ms']} ms > baseline {base['p99_ms']} ms")
+        if current["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{name}: error rate {current['error_rate']} > baseline {base['error_rate']}")
+    return regressions
@@ -0,0 +1,63 @@
+"""
+Compare a fresh `httpx.AsyncClient` per request (old `read_app2`) with the shared pooled client (`app1/http_client.py`).
+
+Run from `eks/`:
+    python -m benchmarks.bench_app2_client --requests 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+
+import httpx
+
+from app1.http_client import build_app2_client
+
+from .common import drive, free_port, uvicorn_subprocess
+
+
+async def run(url: str, total: int, concurrency: int) -> dict[str, dict[str, float]]:
+    """Benchmark both client strategies against the app2 stand-in at `url`."""
+
+    async def per_request() -> None:
+        """One request through a client opened and closed for it, the pre-pooling behaviour."""
+        async with httpx.AsyncClient() as client:
+            (await client.get(url)).raise_for_status()
+
+    pooled_client = build_app2_client(
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+        keepalive_expiry=4.0,
+        connect_timeout=2.0,
+        read_timeout=5.0,
+        pool_timeout=5.0,
+    )
+
+    async def pooled() -> None:
+        """One request through the shared keep-alive client."""
+        (await pooled_client.get(url)).raise_for_status()
+
+    try:
+        await drive(pooled, min(total, 200), concurrency)  # warm up the server and the pool
+        return {
+            "per_request_client": await drive(per_request, total, concurrency),
+            "pooled_client": await drive(pooled, total, concurrency),
+        }
+    finally:
+        await pooled_client.aclose()
+
+
+def main() -> None:
+    """Entry point: start the app2 stand-in and print the comparison as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per strategy")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent in-flight requests")
+    args = parser.parse_args()
+
+    with uvicorn_subprocess("benchmarks.stand_ins:app2_stand_in", free_port()) as base_url:
+        results = asyncio.run(run(base_url + "/", args.requests, args.concurrency))
+    print(json.dumps({"concurrency": args.concurrency, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
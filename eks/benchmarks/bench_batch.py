@@ -0,0 +1,79 @@
+"""
+Compare fetching N app2 results with N `/read_app2` calls in a loop vs one `/read_app2/batch` call.
+Batch sub-requests never use the app2 response cache. The cache is disabled for the loop's `/read_app2` calls,
+its single-flight still joins concurrent ones: run with `--concurrency 1` for every loop call to reach app2 as well.
+Locally there is no ingress in between, so the gap measured here is a lower bound of the saving of one round-trip
+instead of N.
+
+Run from `eks/`:
+    python -m benchmarks.bench_batch --sizes 1 10 50 --operations 200 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Any
+
+import httpx
+
+from .common import drive
+from .harness import Stack, run_stack
+from .scenarios import login
+
+NO_CACHE_ENV = {"APP2_CACHE_TTL_SECONDS": "0", "APP2_CACHE_STALE_WHILE_REVALIDATE_SECONDS": "0"}
+
+
+async def compare(stack: Stack, sizes: list[int], operations: int, concurrency: int) -> dict:
+    """
+    For every batch size N, drive `operations` operations each fetching N app2 results, both ways.
+    Args:
+        stack (Stack): The running services.
+        sizes (list[int]): Batch sizes to compare.
+        operations (int): Operations per size and variant.
+        concurrency (int): Concurrent in-flight operations.
+    Returns:
+        dict: Summary per size and variant (latencies are per operation, not per app2 result).
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        headers = {"Authorization": f"Bearer {await login(client, stack)}"}
+        results: dict[str, dict[str, Any]] = {}
+        for size in sizes:
+            # * distinct paths, so every sub-request fetches a different app2 result
+            body = [{"id": str(i), "path": f"/?item={i}"} for i in range(size)]
+
+            # * bound as defaults: `drive` awaits the calls before the next size rebinds the loop variables
+            async def loop(size: int = size) -> None:
+                """Fetch `size` items one `/read_app2` call at a time."""
+                for _ in range(size):
+                    (await client.get(stack.app1_url + "/read_app2", headers=headers)).raise_for_status()
+
+            async def batch(body: list[dict[str, str]] = body) -> None:
+                """Fetch the same items in one `/read_app2/batch` call, failing if any sub-request failed."""
+                response = await client.post(stack.app1_url + "/read_app2/batch", json=body, headers=headers)
+                response.raise_for_status()
+                if any(json.loads(line)["status"] != 200 for line in response.text.splitlines()):
+                    raise httpx.HTTPError("sub-request failed")
+
+            results[str(size)] = {}
+            for variant, call in (("loop", loop), ("batch", batch)):
+                await drive(call, min(operations, 20), concurrency)  # warm-up
+                results[str(size)][variant] = await drive(call, operations, concurrency)
+        return results
+
+
+def main() -> None:
+    """Entry point: print per-size loop vs batch throughput/latency as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50], help="app2 results per operation")
+    parser.add_argument("--operations", type=int, default=200, help="operations per size and variant")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent in-flight operations")
+    args = parser.parse_args()
+
+    with run_stack("subprocess", env=NO_CACHE_ENV) as stack:
+        results = asyncio.run(compare(stack, args.sizes, args.operations, args.concurrency))
+    print(json.dumps({"concurrency": args.concurrency, "sizes": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
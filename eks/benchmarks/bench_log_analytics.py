@@ -0,0 +1,151 @@
+"""
+Throughput of the log analytics CLI (`log_analytics/analyzer.py`) on synthetic service logs, text and
+`LOG_FORMAT=json`, against reading the same bytes: a full scan, the Python heap it peaks at (the files are
+memory-mapped, never read into memory) and a re-run from the checkpoint after appending to the log.
+The logs are still in the page cache after being written, so `read_mb_per_s` is the memory-bound ceiling,
+the disk's sequential read speed is the one in production.
+
+Run from `eks/`:
+    python -m benchmarks.bench_log_analytics --size-mb 2048 --formats text json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+
+from log_analytics.analyzer import LogAnalyzer
+
+PLACEHOLDER = "2000-01-01 00:00:00"
+PATHS = ["/", "/", "/", "/read_app2", "/read_app2", "/healthz", "/metrics", "/login", "/burn", "/items/42"]
+
+
+def record(second: str, millisecond: int, level: str, message: str, fmt: str) -> str:
+    """One record of `app1/middleware.py`, in the text or the loguru JSON format."""
+    text = f"{second}.{millisecond:03d} | {level:<8} | app1.middleware:__call__:61 - {message}\n"
+    if fmt == "text":
+        return text
+    fields = {"level": {"name": level}, "message": message, "time": {"repr": second}}
+    return json.dumps({"text": text, "record": fields}) + "\n"
+
+
+def second_block(rps: int, fmt: str) -> tuple[bytes, int, int]:
+    """
+    A second of logs, its timestamps left as `PLACEHOLDER`: `rps` requests, 1% of them failing, 2% slow.
+    Returns:
+        tuple: The block, and its requests and errors.
+    """
+    lines, errors = [], 0
+    for i in range(rps):
+        path, millisecond = PATHS[i % len(PATHS)], i * 1000 // rps
+        lines.append(record(PLACEHOLDER, millisecond, "INFO", f"INCOMING PATH: {path}", fmt))
+        if i % 100 == 7:
+            lines.append(record(PLACEHOLDER, millisecond, "ERROR", f"Error occurred: GET {path}: ValueError('boom')", fmt))
+            errors += 1
+        if i % 50 == 3:
+            lines.append(record(PLACEHOLDER, millisecond, "WARNING", f"SLOW REQUEST: GET {path} took 1.234s", fmt))
+    return "".join(lines).encode(), rps, errors
+
+
+def write_log(path: str, size_bytes: int, rps: int, fmt: str, first_second: int = 0) -> tuple[int, int, int]:
+    """
+    Append about `size_bytes` of synthetic logs to `path`, one second after the other.
+    Returns:
+        tuple: The next second, and the requests and errors written.
+    """
+    block, block_requests, block_errors = second_block(rps, fmt)
+    second, written, requests, errors = first_second, 0, 0, 0
+    with open(path, "ab") as f:
+        while written < size_bytes:
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1_792_000_000 + second)).encode()
+            written += f.write(block.replace(PLACEHOLDER.encode(), timestamp))
+            second, requests, errors = second + 1, requests + block_requests, errors + block_errors
+    return second, requests, errors
+
+
+def read_speed(path: str) -> float:
+    """MB/s of reading the file in 16 MB chunks."""
+    buffer = bytearray(16 * 1024 * 1024)
+    started = time.perf_counter()
+    with open(path, "rb", buffering=0) as f:
+        while f.readinto(buffer):
+            pass
+    return os.path.getsize(path) / 1e6 / (time.perf_counter() - started)
+
+
+def totals(logs: LogAnalyzer) -> tuple[int, int]:
+    """Requests and errors counted over every minute and path."""
+    return sum(c.requests for c in logs.counts.values()), sum(c.errors for c in logs.counts.values())
+
+
+def measure(directory: str, size_mb: int, append_mb: int, rps: int, fmt: str) -> dict[str, Any]:
+    """
+    Write a log of `size_mb`, scan it from scratch, then append `append_mb` and scan again from the checkpoint.
+    Raises:
+        RuntimeError: If the counts differ from what was written.
+    Returns:
+        dict: Throughputs, heap peak and the incremental re-run.
+    """
+    log, checkpoint = os.path.join(directory, f"app1_service.{fmt}.log"), os.path.join(directory, f"{fmt}.checkpoint")
+    second, requests, errors = write_log(log, size_mb * 1024 * 1024, rps, fmt)
+    size = os.path.getsize(log)
+    read_mb_per_s = read_speed(log)
+
+    logs = LogAnalyzer()
+    started = time.perf_counter()
+    logs.update([log])
+    full_seconds = time.perf_counter() - started
+    if totals(logs) != (requests, errors):
+        raise RuntimeError(f"counted {totals(logs)} requests and errors, wrote {(requests, errors)}")
+    logs.save(checkpoint)
+
+    tracemalloc.start()
+    LogAnalyzer().update([log])
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    _, appended_requests, appended_errors = write_log(log, append_mb * 1024 * 1024, rps, fmt, second)
+    started = time.perf_counter()
+    resumed = LogAnalyzer.load(checkpoint)
+    scanned = resumed.update([log])
+    resumed.save(checkpoint)
+    rerun_seconds = time.perf_counter() - started
+    if totals(resumed) != (requests + appended_requests, errors + appended_errors):
+        raise RuntimeError(f"counted {totals(resumed)} requests and errors after the re-run")
+    return {
+        "size_mb": round(size / 1e6, 1),
+        "requests": requests,
+        "read_mb_per_s": round(read_mb_per_s),
+        "scan_mb_per_s": round(size / 1e6 / full_seconds),
+        "scan_seconds": round(full_seconds, 2),
+        "heap_peak_mb": round(heap_peak / 1e6, 1),
+        "rows": len(logs.counts),
+        "rerun_scanned_mb": round(scanned / 1e6, 1),
+        "rerun_seconds": round(rerun_seconds, 3),
+        "checkpoint_kb": round(os.path.getsize(checkpoint) / 1e3, 1),
+    }
+
+
+def main() -> None:
+    """Entry point: print the measurements per log format as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=1024, help="size of each synthetic log")
+    parser.add_argument("--append-mb", type=int, default=16, help="appended before the re-run from the checkpoint")
+    parser.add_argument("--rps", type=int, default=1000, help="requests logged per second")
+    parser.add_argument("--formats", nargs="+", choices=["text", "json"], default=["text", "json"], help="log formats")
+    parser.add_argument("--dir", default=None, help="directory the logs are written to (a temporary one by default)")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for fmt in args.formats:
+            results[fmt] = measure(directory, args.size_mb, args.append_mb, args.rps, fmt)
+            os.remove(os.path.join(directory, f"app1_service.{fmt}.log"))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
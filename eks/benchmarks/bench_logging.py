@@ -0,0 +1,121 @@
+"""
+Measure the per-request cost of the `log_path` middleware for each logging mode of `logging_config.py`:
+no logging, the legacy synchronous rotated file, the batched file sink, batched JSON lines and a sampled-out route.
+Requests are sent in-process through `httpx.ASGITransport` so the numbers isolate the middleware.
+
+Run from `eks/`:
+    python -m benchmarks.bench_logging --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Callable
+
+os.environ.setdefault("LOG_SINK", "stdout")  # keep the import below from creating `app1/app1_service.log` here
+os.environ.setdefault("LOG_QUEUE_SIZE", "0")
+
+# pylint: disable=wrong-import-position
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request, Response  # noqa: E402
+from loguru import logger  # noqa: E402
+
+from app1 import logging_config  # noqa: E402
+from app1.logging_config import BatchingSink, should_log  # noqa: E402
+
+from .common import drive  # noqa: E402
+
+
+def build_app(log_requests: bool) -> FastAPI:
+    """A minimal app with the same request logging middleware as the services (or none)."""
+    app = FastAPI()
+
+    if log_requests:
+
+        @app.middleware("http")
+        async def log_path(request: Request, call_next: Callable) -> Response:
+            """Log the incoming path the way app1's middleware does."""
+            if should_log(request.url.path):
+                logger.info(f"INCOMING PATH: {request.url.path}")
+            return await call_next(request)
+
+    else:
+
+        @app.middleware("http")
+        async def no_log(request: Request, call_next: Callable) -> Response:
+            """Pass-through middleware, so every mode pays the same middleware cost."""
+            return await call_next(request)
+
+    @app.get("/")
+    async def root() -> dict:
+        """Trivial route, so the logging cost dominates."""
+        return {"status": "ok"}
+
+    return app
+
+
+@contextmanager
+def sink(mode: str, workdir: str, queue_size: int) -> Iterator[None]:
+    """Install the loguru sink for `mode` for the duration of the block."""
+    logger.remove()
+    path = os.path.join(workdir, f"{mode}.log")
+    batching = None
+    if mode == "sync_file":
+        logger.add(path, rotation="1 week", level="INFO")
+    elif mode == "queued_file":
+        batching = BatchingSink(open(path, "a", encoding="utf-8"), queue_size)  # pylint: disable=consider-using-with
+        logger.add(batching, level="INFO")
+    elif mode == "queued_json":
+        batching = BatchingSink(open(path, "a", encoding="utf-8"), queue_size)  # pylint: disable=consider-using-with
+        logger.add(batching, level="INFO", serialize=True)
+    try:
+        yield
+    finally:
+        logger.remove()
+        if batching is not None:
+            batching.stream.close()
+
+
+async def measure(app: FastAPI, total: int) -> dict[str, float]:
+    """Send `total` sequential requests to `app` and summarize the latencies."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+
+        async def call() -> None:
+            """One GET of `/`."""
+            (await client.get("/")).raise_for_status()
+
+        await drive(call, min(total, 200), 1)  # warm-up
+        return await drive(call, total, 1)
+
+
+def main() -> None:
+    """Entry point: print latency per logging mode and the p50 overhead relative to no logging as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000, help="requests per mode")
+    parser.add_argument("--queue-size", type=int, default=10000, help="LOG_QUEUE_SIZE of the batched sinks")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-logging-") as workdir:
+        with sink("none", workdir, args.queue_size):
+            results["no_logging"] = asyncio.run(measure(build_app(log_requests=False), args.requests))
+        for mode in ("sync_file", "queued_file", "queued_json"):
+            with sink(mode, workdir, args.queue_size):
+                results[mode] = asyncio.run(measure(build_app(log_requests=True), args.requests))
+        with sink("sync_file", workdir, args.queue_size):
+            logging_config.SAMPLE_RATES["/"] = 0.0  # like `/healthz=0`: the line is never formatted or written
+            results["sampled_out"] = asyncio.run(measure(build_app(log_requests=True), args.requests))
+            logging_config.SAMPLE_RATES.pop("/")
+
+    baseline = results["no_logging"]["p50_ms"]
+    for summary in results.values():
+        summary["p50_overhead_ms"] = round(summary["p50_ms"] - baseline, 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare requests/sec through the old `@app.middleware("http")` request logging middleware (`BaseHTTPMiddleware`)
+and the pure ASGI `RequestLoggingMiddleware` from `middleware.py`, for the routes of app1, app2 and auth.
+Both stacks also include the CORS middleware, requests are sent in-process through `httpx.ASGITransport`
+and log output is discarded, so the numbers isolate the middleware mechanics.
+
+Run from `eks/`:
+    python -m benchmarks.bench_middleware --requests 5000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+from typing import Any, Callable
+
+from .harness import BENCH_SECRET_KEY
+
+os.environ.setdefault("SECRET_KEY", BENCH_SECRET_KEY)
+os.environ.setdefault("LOG_SINK", "stdout")  # keep the service imports from creating log files here
+os.environ.setdefault("LOG_QUEUE_SIZE", "0")
+
+# pylint: disable=wrong-import-position
+import httpx  # noqa: E402
+import jwt  # noqa: E402
+from fastapi import FastAPI, HTTPException, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from loguru import logger  # noqa: E402
+
+from .common import drive  # noqa: E402
+
+# * (service, method, path) - one cheap route per service so the middleware dominates
+ROUTES = (("app1", "GET", "/"), ("app2", "GET", "/"), ("auth", "POST", "/logout"))
+
+
+def legacy_log_path(should_log: Callable[[str], bool]) -> Callable:
+    """The `log_path` middleware every `main.py` registered with `@app.middleware("http")` before `middleware.py`."""
+
+    async def log_path(request: Request, call_next: Callable) -> JSONResponse:
+        """The removed `@app.middleware("http")` logger, kept as the baseline."""
+        if should_log(request.url.path):
+            logger.info(f"INCOMING PATH: {request.url.path}")
+        try:
+            return await call_next(request)
+        except Exception as e:
+            logger.error(f"Error occurred: {e}")
+            raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    return log_path
+
+
+def build_stack(service: str, legacy: bool) -> FastAPI:
+    """An app with the service's routes behind CORS + the old or the new request logging middleware."""
+    service_app = importlib.import_module(f"{service}.main").app
+    service_middleware = importlib.import_module(f"{service}.middleware")
+
+    stack = FastAPI()
+    stack.router.routes.extend(route for route in service_app.router.routes if getattr(route, "path", "") != "/metrics")
+    service_middleware.add_cors_middleware(stack)
+    if legacy:
+        stack.middleware("http")(legacy_log_path(service_middleware.should_log))
+    else:
+        service_middleware.add_request_logging_middleware(stack)
+    return stack
+
+
+async def measure(stack: FastAPI, method: str, path: str, total: int, concurrency: int) -> dict[str, float]:
+    """Send `total` requests to `stack` with `concurrency` in flight and summarize the latencies."""
+    token = jwt.encode({"sub": "bench"}, os.environ["SECRET_KEY"], algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=stack)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+
+        async def call() -> None:
+            """One request to `path`."""
+            (await client.request(method, path)).raise_for_status()
+
+        await drive(call, min(total, 200), concurrency)  # warm-up
+        return await drive(call, total, concurrency)
+
+
+def main() -> None:
+    """Entry point: print requests/sec and latency of both middleware stacks per service as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000, help="requests per service and stack")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent in-flight requests")
+    args = parser.parse_args()
+
+    for service, _, _ in ROUTES:
+        importlib.import_module(f"{service}.main")  # every import configures logging, discard the output afterwards
+    logger.remove()
+    results: dict[str, dict[str, Any]] = {}
+    for service, method, path in ROUTES:
+        route = f"{service} {method} {path}"
+        results[route] = {
+            "base_http_middleware": asyncio.run(
+                measure(build_stack(service, legacy=True), method, path, args.requests, args.concurrency)
+            ),
+            "pure_asgi_middleware": asyncio.run(
+                measure(build_stack(service, legacy=False), method, path, args.requests, args.concurrency)
+            ),
+        }
+        old_rps, new_rps = (results[route][stack]["rps"] for stack in ("base_http_middleware", "pure_asgi_middleware"))
+        results[route]["rps_change_pct"] = round((new_rps / old_rps - 1) * 100, 1) if old_rps else 0.0
+    print(json.dumps({"concurrency": args.concurrency, "routes": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Goodput of app1 under 2x overload, with and without the adaptive concurrency limiter (`app1/concurrency.py`).
+
+`/burn` runs on a single process-pool worker with an effectively unbounded queue, so without the limiter
+excess requests queue up and soon every response misses the latency SLO. The capacity is measured first
+(closed loop), then requests arrive at `--overload` x that rate (open loop) for `--duration` seconds.
+Goodput = 2xx responses within `--slo-ms` per second. Keep `/burn` expensive (`--iterations`) compared with
+the HTTP overhead, otherwise client and server compete for the CPU more than for the worker.
+
+Run from `eks/`:
+    python -m benchmarks.bench_overload --duration 15 --overload 2
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from .common import drive, free_port, percentile, service_subprocess
+from .harness import stack_env
+
+
+def app1_env(limiter: bool) -> dict[str, str]:
+    """app1 settings: one CPU worker, a queue that never rejects, and the limiter on `/burn` on or off."""
+    return {
+        **stack_env(),
+        "CPU_EXECUTOR_MODE": "process",
+        "CPU_EXECUTOR_WORKERS": "1",
+        "CPU_EXECUTOR_MAX_QUEUE": "100000",
+        "CONCURRENCY_LIMIT_ENABLED": str(limiter).lower(),
+        "CONCURRENCY_LIMIT_ROUTES": "/burn",
+    }
+
+
+async def open_loop(url: str, iterations: int, rate: float, duration: float, slo: float) -> dict[str, float]:
+    """
+    Send requests at a fixed arrival rate, whether earlier ones have completed or not.
+    Args:
+        url (str): The `/burn` URL.
+        iterations (int): `/burn` iterations per request.
+        rate (float): Requests per second.
+        duration (float): Seconds to keep sending.
+        slo (float): Latency (seconds) a 2xx response must meet to count as goodput.
+    Returns:
+        dict: Offered load, goodput, rejections and latency of the 2xx responses.
+    """
+    outcomes: list[tuple[int, float]] = []  # (status, latency), status 0 = transport error
+    limits = httpx.Limits(max_connections=2000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(limits=limits, timeout=120.0) as client:
+
+        async def one() -> None:
+            """Send one request and record its status (0 on a transport error) and latency."""
+            started = time.perf_counter()
+            try:
+                status = (await client.get(url, params={"iterations": iterations})).status_code
+            except httpx.HTTPError:
+                status = 0
+            outcomes.append((status, time.perf_counter() - started))
+
+        tasks = []
+        started = time.perf_counter()
+        for i in range(int(rate * duration)):
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one()))
+        await asyncio.gather(*tasks)
+
+    ok = sorted(latency for status, latency in outcomes if 200 <= status < 300)
+    return {
+        "offered_rps": round(rate, 1),
+        "goodput_rps": round(sum(1 for latency in ok if latency <= slo) / duration, 1),
+        "rejected_rps": round(sum(1 for status, _ in outcomes if status == 503) / duration, 1),
+        "errors": sum(1 for status, _ in outcomes if status == 0 or (status >= 500 and status != 503)),
+        "ok_p50_ms": round(percentile(ok, 50) * 1000, 3),
+        "ok_p99_ms": round(percentile(ok, 99) * 1000, 3),
+    }
+
+
+async def measure(
+    app1_url: str, iterations: int, overload: float, duration: float, slo: float
+) -> dict[str, dict[str, float]]:
+    """Measure `/burn` capacity with a closed loop, then run the open loop at `overload` x capacity."""
+    url = app1_url + "/burn"
+    async with httpx.AsyncClient(timeout=60.0) as client:
+
+        async def burn() -> None:
+            """One `/burn` request."""
+            (await client.get(url, params={"iterations": iterations})).raise_for_status()
+
+        await drive(burn, 10, 2)  # warm-up: process pool start, connections
+        capacity = await drive(burn, 100, 2)
+    overloaded = await open_loop(url, iterations, capacity["rps"] * overload, duration, slo)
+    return {"capacity": capacity, "overload": overloaded}
+
+
+def main() -> None:
+    """Entry point: print capacity and overload goodput with and without the limiter as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50000, help="`/burn` iterations per request")
+    parser.add_argument("--overload", type=float, default=2.0, help="arrival rate as a multiple of the capacity")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds of overload")
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="latency a response must meet to count as goodput")
+    args = parser.parse_args()
+
+    results = {}
+    for limiter in (False, True):
+        port = free_port()
+        with service_subprocess("app1", port, app1_env(limiter)) as app1_url:
+            results["limiter" if limiter else "no_limiter"] = asyncio.run(
+                measure(app1_url, args.iterations, args.overload, args.duration, args.slo_ms / 1000)
+            )
+    print(json.dumps({"slo_ms": args.slo_ms, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Per-request cost of the rate limiter (`<service>/ratelimit.py`) in nanoseconds: a route without a rule,
+an admitted request of a known client, of a new client with the `local` backend full (`--max-keys` clients,
+one evicted per call), a rejected one (429 raised), the `sqlite` backend, and app1's `limit_subject` dependency.
+
+Run from `eks/`:
+    python -m benchmarks.bench_ratelimit --max-keys 10000
+"""
+
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import timeit
+from collections.abc import Coroutine
+from typing import Callable
+
+from fastapi import HTTPException
+
+from .harness import BENCH_SECRET_KEY
+
+os.environ.setdefault("SECRET_KEY", BENCH_SECRET_KEY)
+
+# pylint: disable=wrong-import-position
+from app1 import main as app1_main  # noqa: E402
+from app1.ratelimit import LocalBackend, RateLimiter, SqliteBackend  # noqa: E402
+
+OPEN = "/=1000000:1000000"  # never reached by the benchmark
+TIGHT = "/=0.001:1"
+
+
+class ScopeRequest:
+    """The parts of a request `limit_subject` reads."""
+
+    def __init__(self, path: str) -> None:
+        self.scope = {"path": path}
+
+
+def run_sync(coroutine: Coroutine) -> None:
+    """Run a coroutine that never awaits to completion, without an event loop."""
+    try:
+        coroutine.send(None)
+    except StopIteration:
+        pass
+
+
+def rejected(limiter: RateLimiter) -> None:
+    """A request over the limit."""
+    try:
+        limiter.check("/", "sub:hammering")
+    except HTTPException:
+        pass
+
+
+def variants(max_keys: int, workdir: str) -> dict[str, Callable[[], object]]:
+    """One zero-argument callable per measured operation."""
+    local = RateLimiter(OPEN, enabled=True, backend=LocalBackend(max_keys=max_keys))
+    full = RateLimiter(OPEN, enabled=True, backend=LocalBackend(max_keys=max_keys))
+    for i in range(max_keys):
+        full.check("/", f"sub:{i}")
+    new_keys = (f"sub:new-{i}" for i in itertools.count())
+    tight = RateLimiter(TIGHT, enabled=True, backend=LocalBackend())
+    tight.check("/", "sub:hammering")
+    sqlite = RateLimiter(OPEN, enabled=True, backend=SqliteBackend(os.path.join(workdir, "ratelimit.db")))
+    app1_main.RATE_LIMITER = local
+    request, payload = ScopeRequest("/"), {"sub": "bench"}
+    return {
+        "unlimited_route": lambda: local.check("/other", "sub:bench"),
+        "admitted": lambda: local.check("/", "sub:bench"),
+        "admitted_new_client_at_capacity": lambda: full.check("/", next(new_keys)),
+        "rejected": lambda: rejected(tight),
+        "admitted_sqlite": lambda: sqlite.check("/", "sub:bench"),
+        "limit_subject": lambda: run_sync(app1_main.limit_subject(request, payload)),  # type: ignore[arg-type]
+    }
+
+
+def main() -> None:
+    """Entry point: print nanoseconds per call for each operation as JSON (best of `--repeat`)."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-keys", type=int, default=10_000, help="clients the `local` backend keeps per route")
+    parser.add_argument("--calls", type=int, default=100_000, help="calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per operation, the best one is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        results = {
+            name: round(min(timeit.repeat(fn, number=args.calls, repeat=args.repeat)) / args.calls * 1e9, 1)
+            for name, fn in variants(args.max_keys, workdir).items()
+        }
+    print(json.dumps({"ns_per_call": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
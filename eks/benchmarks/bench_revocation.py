@@ -0,0 +1,86 @@
+"""
+Per-request cost of the token revocation check in app1's `verify_jwt` (`app1/revocation.py`), in nanoseconds:
+`is_revoked` for a token that is not revoked (almost every request, answered by the Bloom filter),
+for a revoked one (filter + exact map), a plain dict lookup for comparison, and `verify_jwt` itself with a cached
+token. The added cost per request is `verify_jwt` with a `jti` minus `verify_jwt` with a token without one
+(which skips the check), for no revocations and for `--revoked` of them.
+
+Run from `eks/`:
+    python -m benchmarks.bench_revocation --revoked 1000 100000
+"""
+
+import argparse
+import json
+import os
+import time
+import timeit
+from typing import Callable
+
+from .harness import BENCH_SECRET_KEY
+
+os.environ.setdefault("SECRET_KEY", BENCH_SECRET_KEY)
+
+# pylint: disable=wrong-import-position
+import jwt  # noqa: E402
+
+from app1 import main as app1_main  # noqa: E402
+from app1.revocation import RevocationList  # noqa: E402
+
+
+class BearerRequest:
+    """The parts of a request `verify_jwt` reads: a bearer token and no cookies."""
+
+    def __init__(self, token: str) -> None:
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.cookies: dict[str, str] = {}
+
+
+def revocation_list(revoked: int) -> RevocationList:
+    """A revocation list holding `revoked` unexpired revocations, its filter sized for them."""
+    revocations = RevocationList("http://auth/revocations", capacity=max(1, revoked))
+    expires_at = int(time.time()) + 3600
+    for i in range(revoked):
+        revocations.add(f"revoked-{i:032x}", expires_at)
+    return revocations
+
+
+def variants(revoked: int) -> dict[str, Callable[[], object]]:
+    """One zero-argument callable per measured operation, against `revoked` revocations."""
+    revocations = revocation_list(revoked)
+    exact = {f"revoked-{i:032x}": 0 for i in range(revoked)}
+    claims = {"sub": "bench", "exp": int(time.time()) + 3600}
+    with_jti = BearerRequest(jwt.encode({**claims, "jti": "a" * 32}, BENCH_SECRET_KEY, algorithm="HS256"))
+    without_jti = BearerRequest(jwt.encode(claims, BENCH_SECRET_KEY, algorithm="HS256"))
+    app1_main.REVOCATIONS = revocations
+    for request in (with_jti, without_jti):
+        app1_main.verify_jwt(request)  # type: ignore[arg-type]  # verified once, served from `JWT_CACHE` afterwards
+    hit = f"revoked-{0:032x}" if revoked else "a" * 32
+    return {
+        "is_revoked_miss": lambda: revocations.is_revoked("a" * 32),
+        "is_revoked_hit": lambda: revocations.is_revoked(hit),
+        "dict_lookup": lambda: "a" * 32 in exact,
+        "verify_jwt_cached": lambda: app1_main.verify_jwt(with_jti),  # type: ignore[arg-type]
+        "verify_jwt_cached_without_jti": lambda: app1_main.verify_jwt(without_jti),  # type: ignore[arg-type]
+    }
+
+
+def main() -> None:
+    """Entry point: print nanoseconds per call for each operation and revocation count as JSON (best of `--repeat`)."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--revoked", type=int, nargs="+", default=[1000, 100_000], help="revocations held by app1")
+    parser.add_argument("--calls", type=int, default=100_000, help="calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per operation, the best one is reported")
+    args = parser.parse_args()
+
+    results = {}
+    for revoked in [0, *args.revoked]:
+        results[str(revoked)] = {
+            name: round(min(timeit.repeat(fn, number=args.calls, repeat=args.repeat)) / args.calls * 1e9, 1)
+            for name, fn in variants(revoked).items()
+        }
+    added = {revoked: round(r["verify_jwt_cached"] - r["verify_jwt_cached_without_jti"], 1) for revoked, r in results.items()}
+    print(json.dumps({"ns_per_call": results, "verify_jwt_added_ns": added}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
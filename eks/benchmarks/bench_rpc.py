@@ -0,0 +1,90 @@
+"""
+Compare app1 -> app2 calls over HTTP/1.1 (the pooled client of `app1/http_client.py`) and over app2's msgpack RPC port
+(`app1/rpc_client.py`, `app2/rpc.py`): latency percentiles and CPU time per call on both ends - app1's client in this
+process (`time.process_time`), app2 from its own `process_cpu_seconds_total`. app2 runs through its `launcher.py`
+with one worker, like a pod with a 500m limit; its request logs are sampled out, so neither path pays for logging.
+
+Run from `eks/`:
+    python -m benchmarks.bench_rpc --requests 5000 --concurrency 1 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any
+
+import httpx
+
+from app1.http_client import build_app2_client
+from app1.rpc import unpack_body
+
+from .common import drive, free_port, service_subprocess
+
+
+def app2_cpu_seconds(base_url: str) -> float:
+    """app2's `process_cpu_seconds_total`, from its `/metrics`."""
+    for line in httpx.get(base_url + "/metrics").text.splitlines():
+        if line.startswith("process_cpu_seconds_total "):
+            return float(line.split()[1])
+    raise RuntimeError("app2 exports no process_cpu_seconds_total")
+
+
+async def measure(base_url: str, rpc_url: str, total: int, concurrency: int) -> dict[str, Any]:
+    """
+    Drive `GET /` on app2 through a client built like app1's, over RPC when `rpc_url` is set.
+    Returns:
+        dict: The latency summary plus app1 (client) and app2 (server) CPU microseconds per call.
+    """
+    client = build_app2_client(
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+        keepalive_expiry=4.0,
+        connect_timeout=2.0,
+        read_timeout=5.0,
+        pool_timeout=5.0,
+        rpc_url=rpc_url,
+    )
+
+    async def call() -> None:
+        """One app1 -> app2 request, decoding the body when it came over RPC."""
+        response = await client.get(base_url + "/")
+        response.raise_for_status()
+        if rpc_url:  # over HTTP app1 embeds app2's JSON body as is, over RPC it decodes the msgpack one
+            unpack_body(response.content)
+
+    try:
+        await drive(call, min(total, 500), concurrency)  # warm up the connections and both processes
+        app2_before, app1_before = app2_cpu_seconds(base_url), time.process_time()
+        summary = await drive(call, total, concurrency)
+        app1_cpu, app2_cpu = time.process_time() - app1_before, app2_cpu_seconds(base_url) - app2_before
+    finally:
+        await client.aclose()
+    return {
+        **summary,
+        "app1_cpu_us_per_call": round(app1_cpu / total * 1e6, 1),
+        "app2_cpu_us_per_call": round(app2_cpu / total * 1e6, 1),
+    }
+
+
+def main() -> None:
+    """Entry point: start app2 with its RPC port and print both paths per concurrency as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000, help="calls per path and concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 50], help="calls in flight at once")
+    args = parser.parse_args()
+
+    rpc_port = free_port()
+    env = {"RPC_ENABLED": "true", "RPC_PORT": str(rpc_port), "SERVER_WORKERS": "1", "LOG_SAMPLE_RATES": "/=0"}
+    results = {}
+    with service_subprocess("app2", free_port(), env) as base_url:
+        for concurrency in args.concurrency:
+            results[concurrency] = {
+                "http": asyncio.run(measure(base_url, "", args.requests, concurrency)),
+                "rpc": asyncio.run(measure(base_url, f"tcp://127.0.0.1:{rpc_port}", args.requests, concurrency)),
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+JSON rendering and response compression (`<service>/responses.py`), for a small body (`/`), a large one
+(a 1000-entry `/revocations` page) and `/read_app2`'s envelope around app2's body:
+
+- microseconds per body for FastAPI's paths (`jsonable_encoder` + `json`, the Pydantic validation + `dump_json`
+  used for annotated return values), `JSONResponse` (stdlib `json`), `FastJSONResponse` (`pydantic_core`, or orjson
+  with `FAST_JSON_ENABLED`), and for `/read_app2` decoding and re-encoding app2's body vs embedding it as `RawJSON`
+- bytes on the wire as is, with gzip and with brotli at the configured levels, and the time compressing takes
+
+Run from `eks/`:
+    python -m benchmarks.bench_serialization --entries 1000
+"""
+
+import argparse
+import gzip
+import json
+import timeit
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app1.responses import COMPRESSION_BROTLI_QUALITY, COMPRESSION_GZIP_LEVEL, RawJSON, brotli, dumps, orjson
+
+
+def payloads(entries: int) -> dict[str, Any]:
+    """The measured bodies, by name."""
+    return {
+        "small": {"message": "Hello from Kubernetes, alice!!!!!"},
+        "large": {
+            "epoch": "5f0c1e2d3a4b5c6d",
+            "revocations": [{"jti": f"{i:032x}", "exp": 1_900_000_000 + i} for i in range(entries)],
+            "cursor": entries,
+            "more": False,
+        },
+    }
+
+
+def best_us(fn: Callable[[], object], calls: int, repeat: int) -> float:
+    """Best of `repeat` measurements, microseconds per call."""
+    return round(min(timeit.repeat(fn, number=calls, repeat=repeat)) / calls * 1e6, 2)
+
+
+def renderers(content: Any) -> dict[str, Callable[[], bytes]]:
+    """One zero-argument renderer of `content` per serialisation path."""
+    adapter = TypeAdapter(dict[str, Any])
+    renderers = {
+        "jsonable_encoder_json": lambda: json.dumps(jsonable_encoder(content)).encode(),
+        "pydantic_dump_json": lambda: adapter.dump_json(adapter.validate_python(content)),
+        "json_response_stdlib": lambda: JSONResponse(content).body,
+        "pydantic_core": lambda: dumps(content, fast=False),
+    }
+    if orjson is not None:
+        renderers["orjson"] = lambda: dumps(content, fast=True)
+    return renderers
+
+
+def envelope_renderers(app2_body: bytes) -> dict[str, Callable[[], bytes]]:
+    """`/read_app2`'s envelope around app2's body: decoded and encoded again, or embedded as is."""
+
+    def envelope(app2_response: Any, fast: bool) -> bytes:
+        """Render the `/read_app2` envelope around `app2_response`."""
+        return dumps({"message": "Hello from FastAPI App 1 (with configmap)", "app2_response": app2_response}, fast=fast)
+
+    return {
+        "decode_encode_pydantic_core": lambda: envelope(json.loads(app2_body), False),
+        "raw_passthrough_pydantic_core": lambda: envelope(RawJSON(app2_body), False),
+        "decode_encode_orjson": lambda: envelope(json.loads(app2_body) if orjson is None else orjson.loads(app2_body), True),
+        "raw_passthrough_orjson": lambda: envelope(RawJSON(app2_body), True),
+    }
+
+
+def wire(body: bytes, calls: int, repeat: int) -> dict[str, Any]:
+    """Bytes on the wire and compression time of `body` per encoding."""
+    encoders = {"gzip": lambda: gzip.compress(body, COMPRESSION_GZIP_LEVEL)}
+    if brotli is not None:
+        encoders["br"] = lambda: brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return {
+        "identity_bytes": len(body),
+        **{f"{name}_bytes": len(encode()) for name, encode in encoders.items()},
+        **{f"{name}_us": best_us(encode, calls, repeat) for name, encode in encoders.items()},
+    }
+
+
+def main() -> None:
+    """Entry point: print serialisation times and bytes on the wire as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1000, help="revocations in the large body")
+    parser.add_argument("--calls", type=int, default=200, help="calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per operation, the best one is reported")
+    args = parser.parse_args()
+
+    report: dict[str, Any] = {}
+    for name, content in payloads(args.entries).items():
+        report[name] = {
+            "render_us": {path: best_us(render, args.calls, args.repeat) for path, render in renderers(content).items()},
+            "wire": wire(dumps(content), args.calls, args.repeat),
+        }
+    app2_body = json.dumps(payloads(args.entries)["large"]).encode()
+    envelopes = envelope_renderers(app2_body)
+    report["read_app2_large_app2_body"] = {
+        "render_us": {path: best_us(render, args.calls, args.repeat) for path, render in envelopes.items()}
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Per-call overhead of the hot-path spans in `app1/instrumentation.py`, compared with the naive
+`histogram.labels(span=...).time()` per call and with a disabled span (`SPAN_METRICS_ENABLED=false`).
+The timed function does nothing, so the numbers are the pure instrumentation cost in nanoseconds per call.
+
+Run from `eks/`:
+    python -m benchmarks.bench_spans --calls 200000
+"""
+
+import argparse
+import json
+import timeit
+from typing import Callable
+
+from app1.instrumentation import SPAN_DURATION, Span
+
+
+def noop() -> None:
+    """The function being timed."""
+
+
+def variants() -> dict[str, Callable[[], None]]:
+    """One zero-argument callable per way of timing `noop`."""
+    span = Span("bench_spans")
+    decorated = span(noop)
+    disabled = Span("bench_spans", enabled=False)(noop)
+
+    def context_manager() -> None:
+        """`noop` timed with `span.time()`."""
+        with span.time():
+            noop()
+
+    def labels_per_call() -> None:
+        """`noop` timed by resolving the histogram child on every call, as before `Span`."""
+        with SPAN_DURATION.labels(span="bench_spans").time():
+            noop()
+
+    return {
+        "baseline": noop,
+        "span_decorator": decorated,
+        "span_context_manager": context_manager,
+        "labels_per_call": labels_per_call,
+        "span_disabled": disabled,
+    }
+
+
+def main() -> None:
+    """Entry point: print nanoseconds per call for each variant as JSON (best of `--repeat`)."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200_000, help="calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per variant, the best one is reported")
+    args = parser.parse_args()
+
+    results = {}
+    for name, fn in variants().items():
+        best = min(timeit.repeat(fn, number=args.calls, repeat=args.repeat))
+        results[name] = round(best / args.calls * 1e9, 1)
+    baseline = results["baseline"]
+    overhead = {name: round(ns - baseline, 1) for name, ns in results.items()}
+    print(json.dumps({"ns_per_call": results, "overhead_ns": overhead}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Startup budget of every service: import time of `<service>.main` (`python -X importtime`, biggest packages first)
+and time-to-ready (process start until `/readyz` answers 200, warm-up included), each with and without
+precompiled bytecode. "cold" hides every `.pyc` file from the interpreter, like a container whose image
+was built without `--compile-bytecode` / `compileall`, "compiled" uses the bytecode cache.
+Exit code 1 when the median compiled time-to-ready of a service is above `--budget-ms`.
+
+Run from `eks/`:
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 2000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess  # nosec B404 - only used to start the services locally
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any
+
+import httpx
+
+from .common import EKS_DIR, free_port
+from .harness import stack_env
+
+SERVICES = ("auth", "app2", "app1")
+
+
+def service_env(workdir: str, cold: bool) -> dict[str, str]:
+    """Environment of a measured process, `cold` makes it compile every module from source (and not write the result)."""
+    env = {**os.environ, **stack_env(), "PYTHONPATH": EKS_DIR}
+    if cold:
+        env.update({"PYTHONDONTWRITEBYTECODE": "1", "PYTHONPYCACHEPREFIX": os.path.join(workdir, "no-pycache")})
+    return env
+
+
+def import_times(service: str, cold: bool, top: int) -> dict[str, Any]:
+    """
+    Import `<service>.main` in a fresh interpreter with `-X importtime`.
+    Args:
+        service (str): The service package name.
+        cold (bool): Import without the bytecode cache.
+        top (int): Number of top-level packages to report.
+    Returns:
+        dict: Total import time (`total_ms`) and the `top` packages by their own import time (`packages`),
+            in milliseconds.
+    """
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        cmd = [sys.executable, "-X", "importtime", "-c", f"import {service}.main"]
+        env = service_env(workdir, cold)
+        proc = subprocess.run(cmd, cwd=workdir, env=env, capture_output=True, text=True, check=True)  # nosec B603
+
+    packages: Counter[str] = Counter()
+    total_us = 0
+    for line in proc.stderr.splitlines():  # `import time: <self us> | <cumulative us> | <indented module name>`
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (field.strip() for field in line.removeprefix("import time:").split("|"))
+        packages[name.split(".")[0]] += int(self_us)
+        if name == f"{service}.main":
+            total_us = int(cumulative_us)
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "packages": {package: round(us / 1000, 1) for package, us in packages.most_common(top)},
+    }
+
+
+def time_to_ready(service: str, cold: bool, timeout: float = 30.0) -> float:
+    """
+    Start the service like the container does (`python -m <service>.launcher`) and poll `/readyz`.
+    Args:
+        service (str): The service package name.
+        cold (bool): Start without the bytecode cache.
+        timeout (float, optional): Seconds to wait for readiness. Defaults to 30.
+    Raises:
+        RuntimeError: If the service did not become ready in time.
+    Returns:
+        float: Seconds from process start until the first 200 from `/readyz`.
+    """
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/readyz"
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        env = {**service_env(workdir, cold), "SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(port)}
+        started = time.perf_counter()
+        cmd = [sys.executable, "-m", f"{service}.launcher"]
+        proc = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)  # nosec B603
+        try:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if httpx.get(url, timeout=1.0).status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.HTTPError:
+                    pass  # not listening yet
+                time.sleep(0.005)
+            raise RuntimeError(f"{service} not ready within {timeout}s")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=15)
+
+
+def measure(service: str, runs: int, top: int) -> dict[str, dict[str, Any]]:
+    """Median import times and time-to-ready of `service` over `runs` runs, cold and compiled."""
+    results = {}
+    for cold in (True, False):
+        import_runs = [import_times(service, cold, top) for _ in range(runs)]
+        ready_runs = [time_to_ready(service, cold) for _ in range(runs)]
+        results["cold" if cold else "compiled"] = {
+            "time_to_ready_ms": round(statistics.median(ready_runs) * 1000, 1),
+            "import_ms": round(statistics.median(run["total_ms"] for run in import_runs), 1),
+            "import_by_package_ms": import_runs[-1]["packages"],
+        }
+    return results
+
+
+def main() -> None:
+    """Entry point: print the startup report as JSON, exit code 1 when a service is over budget."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", nargs="+", choices=SERVICES, default=list(SERVICES))
+    parser.add_argument("--runs", type=int, default=3, help="runs per service and mode, the median is reported")
+    parser.add_argument("--top", type=int, default=8, help="packages listed in the import-time breakdown")
+    parser.add_argument("--budget-ms", type=float, default=None, help="allowed compiled time-to-ready per service")
+    args = parser.parse_args()
+
+    report = {service: measure(service, args.runs, args.top) for service in args.services}
+    over_budget = [
+        service
+        for service, result in report.items()
+        if args.budget_ms is not None and result["compiled"]["time_to_ready_ms"] > args.budget_ms
+    ]
+    print(json.dumps({"budget_ms": args.budget_ms, "services": report, "over_budget": over_budget}, indent=2))
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Report tokens/sec of `jwt.encode` (the old `create_access_token`) vs `auth/tokens.py`'s `TokenMinter`,
+with and without the reuse window, for HS256 and asymmetric algorithms.
+
+Run from `eks/`:
+    python -m benchmarks.bench_tokens --tokens 5000
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from .harness import BENCH_SECRET_KEY
+
+os.environ.setdefault("SECRET_KEY", BENCH_SECRET_KEY)
+
+# pylint: disable=wrong-import-position
+import jwt  # noqa: E402
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa  # noqa: E402
+
+from auth.tokens import TokenMinter  # noqa: E402
+
+
+def pem(private_key: Any) -> bytes:
+    """Serialize a private key to PEM, the form a key is loaded from a Secret in."""
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def signing_keys() -> dict[str, Any]:
+    """A key per algorithm: the shared secret for HS256, freshly generated PEM private keys otherwise."""
+    return {
+        "HS256": BENCH_SECRET_KEY,
+        "RS256": pem(rsa.generate_private_key(public_exponent=65537, key_size=2048)),
+        "ES256": pem(ec.generate_private_key(ec.SECP256R1())),
+        "EdDSA": pem(ed25519.Ed25519PrivateKey.generate()),
+    }
+
+
+def tokens_per_second(issue: Callable[[int], str], total: int) -> float:
+    """Call `issue(i)` `total` times and return the rate."""
+    started = time.perf_counter()
+    for i in range(total):
+        issue(i)
+    return round(total / (time.perf_counter() - started), 1)
+
+
+def bench_algorithm(algorithm: str, key: Any, total: int, users: int) -> dict[str, float]:
+    """Tokens/sec for one algorithm, logging in `users` distinct users round-robin."""
+
+    def pyjwt_encode(i: int) -> str:
+        """Mint a token the way `/login` did before the minter: a full `jwt.encode` per call."""
+        expire = datetime.now(timezone.utc) + timedelta(minutes=30)
+        return jwt.encode({"sub": f"user-{i % users}", "exp": expire}, key, algorithm=algorithm)
+
+    minter = TokenMinter(key, algorithm, expire_seconds=1800)
+    reusing_minter = TokenMinter(key, algorithm, expire_seconds=1800, reuse_window_seconds=60)
+    return {
+        "pyjwt_encode": tokens_per_second(pyjwt_encode, total),
+        "minter": tokens_per_second(lambda i: minter.mint(f"user-{i % users}"), total),
+        "minter_reuse_window": tokens_per_second(lambda i: reusing_minter.mint(f"user-{i % users}"), total),
+    }
+
+
+def main() -> None:
+    """Entry point: print tokens/sec per algorithm and strategy as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=2_000, help="tokens per algorithm and strategy")
+    parser.add_argument("--users", type=int, default=100, help="distinct users logging in (reuse window hit rate)")
+    parser.add_argument("--algorithms", nargs="+", default=["HS256", "RS256", "ES256", "EdDSA"])
+    args = parser.parse_args()
+
+    keys = signing_keys()
+    results = {alg: bench_algorithm(alg, keys[alg], args.tokens, args.users) for alg in args.algorithms}
+    print(json.dumps({"tokens": args.tokens, "users": args.users, "tokens_per_second": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
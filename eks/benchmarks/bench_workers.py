@@ -0,0 +1,74 @@
+"""
+Compare single vs multi-worker throughput of the services started through their `launcher.py`.
+
+Run from `eks/`:
+    python -m benchmarks.bench_workers --workers 1 4 --requests 3000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+
+import httpx
+
+from .common import drive
+from .harness import run_stack
+
+
+async def run_scenarios(auth_url: str, app1_url: str, total: int, concurrency: int) -> dict[str, dict[str, float]]:
+    """
+    Drive `/` and `/read_app2` on app1 and `/login` on auth with one shared client.
+    Args:
+        auth_url (str): Base URL of the auth service.
+        app1_url (str): Base URL of app1.
+        total (int): Requests per route.
+        concurrency (int): Concurrent in-flight requests.
+    Returns:
+        dict: Summary per route.
+    """
+    credentials = {"username": "user", "password": "pass"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        login = await client.post(auth_url + "/login", json=credentials)
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        async def root() -> None:
+            """One authenticated GET of app1's `/`."""
+            (await client.get(app1_url + "/", headers=headers)).raise_for_status()
+
+        async def read_app2() -> None:
+            """One authenticated app1 -> app2 call through `/read_app2`."""
+            (await client.get(app1_url + "/read_app2", headers=headers)).raise_for_status()
+
+        async def login_call() -> None:
+            """One `/login` against the auth service."""
+            (await client.post(auth_url + "/login", json=credentials)).raise_for_status()
+
+        results = {}
+        for route, call in (("/", root), ("/read_app2", read_app2), ("/login", login_call)):
+            await drive(call, min(total, 200), concurrency)  # warm-up
+            results[route] = await drive(call, total, concurrency)
+        return results
+
+
+def run_with_workers(workers: int, total: int, concurrency: int) -> dict[str, dict[str, float]]:
+    """Start auth, app2 and app1 with `workers` uvicorn workers each and run the scenarios."""
+    with run_stack("subprocess", workers) as stack:
+        return asyncio.run(run_scenarios(stack.auth_url, stack.app1_url, total, concurrency))
+
+
+def main() -> None:
+    """Entry point: print per-route throughput/latency for every worker count as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2], help="worker counts to compare")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent in-flight requests")
+    args = parser.parse_args()
+
+    results = {str(w): run_with_workers(w, args.requests, args.concurrency) for w in args.workers}
+    print(json.dumps({"concurrency": args.concurrency, "workers": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Replay a production-like mix of app1's synthetic workload profiles (`app1/workloads.py`, `WORKLOAD_ENABLED`)
+against a running app1 - a pod behind `kubectl port-forward`, the ingress or docker-compose - at a fixed arrival rate,
+and print one JSON line per `--report-every` seconds: per profile the requests, errors (503 rejections counted
+apart), p50/p99 latency and the CPU seconds app1 reported spending on them. Watch the HPA next to it:
+    kubectl get hpa fastapi-app1-hpa -w
+
+Run from `eks/`:
+    kubectl port-forward svc/app1-service 8000:80
+    python -m benchmarks.bench_workload_mix --url http://127.0.0.1:8000 --mix api=8,cpu=1,memory=1 --rate 40 --duration 600
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Any
+
+import httpx
+
+from .common import percentile
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """`<profile>=<weight>,...` to weights by profile name."""
+    mix = {}
+    for item in filter(None, (item.strip() for item in spec.split(","))):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def report(outcomes: list[tuple[str, int, float, float]], elapsed: float) -> dict[str, Any]:
+    """Summary per profile of `(profile, status, latency, cpu_seconds)` outcomes, status 0 = transport error."""
+    by_profile: dict[str, list[tuple[int, float, float]]] = defaultdict(list)
+    for profile, status, latency, cpu_seconds in outcomes:
+        by_profile[profile].append((status, latency, cpu_seconds))
+    summary = {}
+    for profile, results in sorted(by_profile.items()):
+        ok = sorted(latency for status, latency, _ in results if 200 <= status < 300)
+        summary[profile] = {
+            "requests": len(results),
+            "rejected": sum(1 for status, _, _ in results if status in (429, 503)),
+            "errors": sum(1 for status, _, _ in results if status == 0 or (status >= 400 and status not in (429, 503))),
+            "ok_p50_ms": round(percentile(ok, 50) * 1000, 1),
+            "ok_p99_ms": round(percentile(ok, 99) * 1000, 1),
+            "cpu_seconds": round(sum(cpu_seconds for _, _, cpu_seconds in results), 3),
+        }
+    return {"elapsed_s": round(elapsed, 1), "rps": round(len(outcomes) / elapsed, 1) if elapsed else 0.0, **summary}
+
+
+async def replay(
+    url: str, mix: dict[str, float], rate: float, duration: float, report_every: float, headers: dict[str, str]
+) -> None:
+    """
+    Send requests for profiles drawn from `mix` at `rate` per second (open loop), printing a report every `report_every`.
+    Args:
+        url (str): app1's base URL.
+        mix (dict[str, float]): Profile weights.
+        rate (float): Requests per second.
+        duration (float): Seconds to keep sending.
+        report_every (float): Seconds between reports, each covers the requests completed since the last one.
+        headers (dict[str, str]): Sent with every request (e.g. a bearer token, keyed on by the rate limiter).
+    """
+    outcomes: list[tuple[str, int, float, float]] = []
+    profiles, weights = list(mix), list(mix.values())
+    limits = httpx.Limits(max_connections=2000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=120.0) as client:
+
+        async def one(profile: str) -> None:
+            """Request one `profile` and record its status, latency and reported CPU time."""
+            started = time.perf_counter()
+            status, cpu_seconds = 0, 0.0
+            try:
+                response = await client.get(f"/workload/{profile}")
+                status = response.status_code
+                if status == 200:
+                    cpu_seconds = response.json()["cpu_seconds"]
+            except httpx.HTTPError:
+                pass
+            outcomes.append((profile, status, time.perf_counter() - started, cpu_seconds))
+
+        last_report = time.perf_counter()
+
+        def print_report() -> None:
+            """Print a report of the outcomes since the last one."""
+            nonlocal last_report
+            batch, outcomes[:] = outcomes[:], []
+            now = time.perf_counter()
+            print(json.dumps(report(batch, now - last_report)), flush=True)
+            last_report = now
+
+        async def print_reports() -> None:
+            """Print a report every `report_every` seconds."""
+            while True:
+                await asyncio.sleep(report_every)
+                print_report()
+
+        reporter = asyncio.create_task(print_reports())
+        tasks = []
+        started = last_report
+        for i in range(int(rate * duration)):
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(random.choices(profiles, weights)[0])))  # nosec B311
+        await asyncio.gather(*tasks)
+        reporter.cancel()
+        print_report()
+
+
+def main() -> None:
+    """Entry point: replay the mix and print the reports as JSON lines."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="app1's base URL")
+    parser.add_argument("--mix", default="api=8,cpu=1,memory=1", help="`<profile>=<weight>,...`, see `GET /workload`")
+    parser.add_argument("--rate", type=float, default=20, help="requests per second")
+    parser.add_argument("--duration", type=float, default=300, help="seconds to keep sending")
+    parser.add_argument("--report-every", type=float, default=10, help="seconds between reports")
+    parser.add_argument("--token", default="", help="bearer token of a `WORKLOAD_ADMINS` subject")
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    asyncio.run(replay(args.url, parse_mix(args.mix), args.rate, args.duration, args.report_every, headers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import asyncio
+import math
+import os
+import socket
+import subprocess  # nosec B404 - only used to start local benchmark servers
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Iterator
+from contextlib import contextmanager
+from typing import Callable
+
+import httpx
+
+EKS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """
+    Return the `q` percentile (0-100) of an already sorted list using the nearest-rank method.
+    Args:
+        sorted_values (list[float]): Values sorted in ascending order.
+        q (float): The percentile to compute, between 0 and 100.
+    Returns:
+        float: The percentile value, or 0.0 for an empty list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list[float], elapsed: float, errors: int = 0) -> dict[str, float]:
+    """
+    Summarize per-request latencies (seconds) into throughput and percentile figures.
+    Args:
+        latencies (list[float]): Latency of every successful request in seconds.
+        elapsed (float): Wall-clock duration of the whole run in seconds.
+        errors (int, optional): Number of failed requests. Defaults to 0.
+    Returns:
+        dict: requests, errors, error rate, requests/sec and p50/p95/p99 latency in milliseconds.
+    """
+    ordered = sorted(latencies)
+    total = len(ordered) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+    }
+
+
+async def drive(call: Callable[[], Awaitable[None]], total: int, concurrency: int) -> dict[str, float]:
+    """
+    Run `total` calls of `call` with at most `concurrency` in flight and summarize the latencies.
+    Args:
+        call (Callable): Coroutine factory performing one request, raising `httpx.HTTPError` on failure.
+        total (int): Total number of requests.
+        concurrency (int): Number of concurrent workers.
+    Returns:
+        dict: Summary produced by `summarize`.
+    """
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker() -> None:
+        """Issue calls until the shared request budget runs out, recording latencies and counting errors."""
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                await call()
+                latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def free_port() -> int:
+    """Ask the OS for a free localhost TCP port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 15.0) -> None:
+    """
+    Poll `url` until it answers with any HTTP response.
+    Args:
+        url (str): URL to poll.
+        timeout (float, optional): Seconds to wait before giving up. Defaults to 15.
+    Raises:
+        RuntimeError: If the server did not come up in time.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server at {url} did not start within {timeout}s")
+
+
+@contextmanager
+def server_subprocess(cmd: list[str], port: int, env: dict[str, str] = None) -> Iterator[str]:
+    """
+    Run a server command on localhost for the duration of the block.
+    The process runs in a temporary directory (with `eks/` on `PYTHONPATH`) so the services'
+    relative log files are not written into the repository.
+
+    Args:
+        cmd (list[str]): The command to run.
+        port (int): The port the server listens on.
+        env (dict, optional): Extra environment variables for the server process.
+    Yields:
+        str: The base URL of the running server.
+    """
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        full_env = {**os.environ, "PYTHONPATH": EKS_DIR, **(env or {})}
+        # * server output (uvicorn access logs) goes to stderr, stdout is kept for the JSON reports
+        proc = subprocess.Popen(cmd, cwd=workdir, env=full_env, stdout=sys.stderr)  # nosec B603
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            wait_until_up(base_url + "/healthz")
+            yield base_url
+        finally:
+            proc.terminate()
+            proc.wait(timeout=15)
+
+
+@contextmanager
+def uvicorn_subprocess(app_path: str, port: int, env: dict[str, str] = None, args: list[str] = None) -> Iterator[str]:
+    """
+    Run `uvicorn <app_path>` on localhost in a subprocess for the duration of the block.
+    Args:
+        app_path (str): Import path of the ASGI app, e.g. `benchmarks.stand_ins:app2_stand_in`.
+        port (int): Port to listen on.
+        env (dict, optional): Extra environment variables for the server process.
+        args (list, optional): Extra uvicorn command line arguments.
+    Yields:
+        str: The base URL of the running server.
+    """
+    cmd = [sys.executable, "-m", "uvicorn", app_path, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    with server_subprocess(cmd + (args or []), port, env) as base_url:
+        yield base_url
+
+
+@contextmanager
+def service_subprocess(service: str, port: int, env: dict[str, str] = None) -> Iterator[str]:
+    """
+    Run one of the services (`app1`, `app2`, `auth`) through its `launcher.py` entry point, like the container does.
+    Args:
+        service (str): The service package name.
+        port (int): Port to listen on.
+        env (dict, optional): Extra environment variables, e.g. `SERVER_WORKERS`.
+    Yields:
+        str: The base URL of the running service.
+    """
+    launcher_env = {"SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(port), **(env or {})}
+    with server_subprocess([sys.executable, "-m", f"{service}.launcher"], port, launcher_env) as base_url:
+        yield base_url
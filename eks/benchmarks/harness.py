@@ -0,0 +1,90 @@
+import importlib
+import os
+import tempfile
+import threading
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+
+import uvicorn
+
+from .common import free_port, service_subprocess, wait_until_up
+
+BENCH_SECRET_KEY = "benchmark-secret-key-with-at-least-32-bytes"
+STACK_MODES = ("inprocess", "subprocess")
+
+
+@dataclass
+class Stack:
+    """Base URLs of a running auth / app2 / app1 stack."""
+
+    auth_url: str
+    app2_url: str
+    app1_url: str
+
+
+def stack_env(workers: int = 1) -> dict[str, str]:
+    """Environment shared by every service of a benchmark stack."""
+    return {"ENV": "production", "SECRET_KEY": BENCH_SECRET_KEY, "SERVER_WORKERS": str(workers)}
+
+
+@contextmanager
+def inprocess_server(service: str, port: int) -> Iterator[str]:
+    """
+    Serve `<service>.main:app` with uvicorn on a background thread of this process.
+    The service module is imported here, so its environment must be set before the first call.
+
+    Args:
+        service (str): The service package name.
+        port (int): Port to listen on.
+    Yields:
+        str: The base URL of the running server.
+    """
+    app = importlib.import_module(f"{service}.main").app
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name=f"bench-{service}", daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(base_url + "/healthz")
+        yield base_url
+    finally:
+        server.should_exit = True
+        thread.join(timeout=15)
+
+
+@contextmanager
+def run_stack(mode: str = "subprocess", workers: int = 1, env: dict[str, str] | None = None) -> Iterator[Stack]:
+    """
+    Start auth, app2 and app1 wired to each other on localhost, offline.
+
+    Modes:
+        - `subprocess`: every service runs through its `launcher.py` (like the container), with `workers` uvicorn workers
+        - `inprocess`: every service runs on a uvicorn thread of this process (quick, shares the GIL with the load generator)
+
+    Args:
+        mode (str): One of `STACK_MODES`.
+        workers (int): uvicorn workers per service in `subprocess` mode.
+        env (dict, optional): Extra environment variables for every service, e.g. to disable a cache.
+    Yields:
+        Stack: The base URLs of the services.
+    """
+    if mode not in STACK_MODES:
+        raise ValueError(f"stack mode must be one of {STACK_MODES}, got {mode!r}")
+    ports = {service: free_port() for service in ("auth", "app2", "app1")}
+    urls = {service: f"http://127.0.0.1:{port}" for service, port in ports.items()}
+    env = {**stack_env(workers), "APP2_URL": urls["app2"] + "/", "AUTH_SERVICE_URL": urls["auth"], **(env or {})}
+
+    with ExitStack() as stack:
+        if mode == "subprocess":
+            for service in ("auth", "app2", "app1"):
+                stack.enter_context(service_subprocess(service, ports[service], env))
+        else:
+            os.environ.update(env)  # read by the services at import time
+            workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="bench-"))
+            cwd = os.getcwd()
+            os.chdir(workdir)  # the services' relative log files end up in the temp directory
+            stack.callback(os.chdir, cwd)
+            for service in ("auth", "app2", "app1"):
+                stack.enter_context(inprocess_server(service, ports[service]))
+        yield Stack(auth_url=urls["auth"], app2_url=urls["app2"], app1_url=urls["app1"])
@@ -0,0 +1,68 @@
+import itertools
+from collections.abc import Awaitable
+from typing import Callable
+
+import httpx
+
+from .harness import Stack
+
+# * same accounts as `auth.main.TEST_USERS`, logins rotate through them
+CREDENTIALS = (("user", "pass"), ("alice", "wonderland"), ("bob", "builder"), ("charlie", "chocolate"))
+
+Call = Callable[[], Awaitable[None]]
+
+
+async def login(client: httpx.AsyncClient, stack: Stack, username: str = "user", password: str = "pass") -> str:
+    """Log in against auth and return the access token."""
+    response = await client.post(stack.auth_url + "/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def login_flow(client: httpx.AsyncClient, stack: Stack, **_: int) -> Call:
+    """Every call: `/login` on auth, then app1 `/` authenticated with the returned `access_token` cookie."""
+    users = itertools.cycle(CREDENTIALS)
+
+    async def call() -> None:
+        """Log in as the next user and use the new cookie once."""
+        token = await login(client, stack, *next(users))
+        (await client.get(stack.app1_url + "/", headers={"Cookie": f"access_token={token}"})).raise_for_status()
+
+    return call
+
+
+async def read_app2(client: httpx.AsyncClient, stack: Stack, **_: int) -> Call:
+    """Every call: app1 `/read_app2` (app1 -> app2 fan-out) with a bearer token obtained once."""
+    headers = {"Authorization": f"Bearer {await login(client, stack)}"}
+
+    async def call() -> None:
+        """One `/read_app2` call."""
+        (await client.get(stack.app1_url + "/read_app2", headers=headers)).raise_for_status()
+
+    return call
+
+
+async def mixed_burn(client: httpx.AsyncClient, stack: Stack, burn_every: int = 10, burn_iterations: int = 20_000) -> Call:
+    """
+    Every `burn_every`-th call is a CPU-bound app1 `/burn`, the rest are app1 `/` -
+    shows how CPU work affects the latency of cheap requests (a 503 from a saturated executor counts as an error).
+    """
+    headers = {"Authorization": f"Bearer {await login(client, stack)}"}
+    counter = itertools.count()
+
+    async def call() -> None:
+        """A `/burn` every `burn_every` calls, `/` otherwise."""
+        if next(counter) % burn_every == 0:
+            response = await client.get(stack.app1_url + "/burn", params={"iterations": burn_iterations})
+        else:
+            response = await client.get(stack.app1_url + "/", headers=headers)
+        response.raise_for_status()
+
+    return call
+
+
+SCENARIOS: dict[str, Callable[..., Awaitable[Call]]] = {
+    "login_flow": login_flow,
+    "read_app2": read_app2,
+    "mixed_burn": mixed_burn,
+}
@@ -0,0 +1,16 @@
+from fastapi import FastAPI
+
+# * minimal stand-in for app2 - same payload as `app2.main:read_root`, without logging/metrics overhead
+app2_stand_in = FastAPI()
+
+
+@app2_stand_in.get("/")
+def app2_root() -> dict[str, str]:
+    """Return the same greeting app2 returns."""
+    return {"message": "Hello from FastAPI App 2!"}
+
+
+@app2_stand_in.get("/healthz")
+def app2_health() -> dict[str, str]:
+    """Health check used to wait for the stand-in to come up."""
+    return {"status": "ok"}
@@ -0,0 +1,82 @@
+"""
+Offline HPA simulator: replay the Kubernetes HPA algorithm (tolerance, stabilization windows, scaling policies,
+pod startup) over a recorded CPU demand, for the chart's `hpa` values and for a sweep of alternatives, and print
+predicted replicas, queueing delay and over-provisioned CPU-hours as JSON. The sweep runs vectorised with NumPy,
+thousands of configurations over a day of 15 s periods take seconds.
+
+The demand is read from a Prometheus range query export (`.json`), a load run of
+`python -m benchmarks.bench_workload_mix` (`.jsonl`) or a `timestamp,cpu_cores` CSV. Export it with e.g.:
+    curl -G http://prometheus:9090/api/v1/query_range --data-urlencode \\
+      'query=sum(rate(process_cpu_seconds_total{job="app1-service"}[1m]))' \\
+      --data-urlencode start=<unix> --data-urlencode end=<unix> --data-urlencode step=15 > app1-cpu.json
+
+Run from `eks/`:
+    python -m hpa_simulator --chart app1-deployment --values values-prod.yaml --series app1-cpu.json \\
+      --target 40 50 60 70 80 --min-replicas 1 2 --down-window 60 120 300 --slo-ms 250
+"""
+
+import argparse
+import json
+import time
+
+from .inputs import hpa_config, load_series, load_values
+from .simulator import SYNC_PERIOD_SECONDS, HpaGrid, PodModel, rank, sweep
+
+
+def cores(quantity: str) -> float:
+    """A Kubernetes CPU quantity (`100m`, `0.5`, `2`) in cores."""
+    return float(quantity[:-1]) / 1000 if quantity.endswith("m") else float(quantity)
+
+
+def main() -> None:
+    """Entry point: replay the chart's HPA and the sweep, print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chart", required=True, help="chart directory, e.g. `app1-deployment`")
+    parser.add_argument("--values", default=None, help="values file merged over the chart's `values.yaml`")
+    parser.add_argument("--series", required=True, help="recorded CPU demand: `.json`, `.jsonl` or `.csv`")
+    parser.add_argument("--demand-scale", type=float, default=1.0, help="multiply the recorded demand (2: twice the traffic)")
+    # * the chart's `templates/deployment.yaml` requests 100m and limits to 500m
+    parser.add_argument("--cpu-request", type=cores, default=cores("100m"), help="CPU request of a pod")
+    parser.add_argument("--cpu-limit", type=cores, default=cores("500m"), help="CPU limit of a pod")
+    parser.add_argument("--startup-seconds", type=float, default=30, help="scale-up to ready pod")
+    parser.add_argument("--sync-seconds", type=float, default=SYNC_PERIOD_SECONDS, help="HPA sync period")
+    parser.add_argument("--target", type=float, nargs="+", help="targetCPUUtilizationPercentage values to sweep")
+    parser.add_argument("--min-replicas", type=int, nargs="+", help="minReplicas values to sweep")
+    parser.add_argument("--max-replicas", type=int, nargs="+", help="maxReplicas values to sweep")
+    parser.add_argument("--tolerance", type=float, nargs="+", default=[0.1], help="controller tolerance values to sweep")
+    parser.add_argument("--up-window", type=float, nargs="+", help="scaleUp stabilizationWindowSeconds values to sweep")
+    parser.add_argument("--down-window", type=float, nargs="+", help="scaleDown stabilizationWindowSeconds values to sweep")
+    parser.add_argument("--slo-ms", type=float, default=250, help="p99 queueing delay a configuration must stay within")
+    parser.add_argument("--top", type=int, default=10, help="best sweep configurations printed")
+    args = parser.parse_args()
+
+    chart = hpa_config(load_values(args.chart, args.values), tolerance=args.tolerance[0])
+    demand = load_series(args.series).resample(args.sync_seconds) * args.demand_scale
+    pod = PodModel(cpu_request=args.cpu_request, cpu_limit=args.cpu_limit, startup_seconds=args.startup_seconds)
+    grid = HpaGrid.product(
+        chart,
+        min_replicas=args.min_replicas,
+        max_replicas=args.max_replicas,
+        target_utilization=args.target,
+        tolerance=args.tolerance,
+        up_window=args.up_window,
+        down_window=args.down_window,
+    )
+
+    started = time.perf_counter()
+    rows = sweep(demand, grid, pod, args.sync_seconds)
+    elapsed = time.perf_counter() - started
+    report = {
+        "periods": len(demand),
+        "hours": round(len(demand) * args.sync_seconds / 3600, 2),
+        "peak_cpu_cores": round(float(demand.max(initial=0)), 3),
+        "chart": sweep(demand, HpaGrid.from_configs([chart]), pod, args.sync_seconds)[0],
+        "configurations": grid.size,
+        "sweep_seconds": round(elapsed, 2),
+        "best": rank(rows, args.slo_ms)[: args.top],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
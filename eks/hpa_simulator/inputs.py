@@ -0,0 +1,155 @@
+import csv
+import json
+import os
+from typing import Any, NamedTuple
+
+import numpy as np
+import yaml
+
+from .simulator import DEFAULT_BEHAVIOR, DEFAULT_TOLERANCE, HpaConfig
+
+
+class Series(NamedTuple):
+    """
+    A recorded CPU demand.
+
+    Attributes:
+        timestamps (np.ndarray): Unix seconds, ascending.
+        cpu_cores (np.ndarray): CPU cores used at each timestamp (summed over pods).
+    """
+
+    timestamps: np.ndarray
+    cpu_cores: np.ndarray
+
+    def resample(self, step_seconds: float) -> np.ndarray:
+        """The demand every `step_seconds` from the first timestamp, each value held until the next one."""
+        if len(self.timestamps) == 0:
+            return np.zeros(0)
+        grid = np.arange(self.timestamps[0], self.timestamps[-1] + step_seconds / 2, step_seconds)
+        return self.cpu_cores[np.searchsorted(self.timestamps, grid, side="right") - 1]
+
+
+def _merge(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
+    """Deep-merge `override` into a copy of `base`, like Helm merges `-f` files over `values.yaml`."""
+    merged = dict(base)
+    for key, value in override.items():
+        merged[key] = _merge(merged[key], value) if isinstance(value, dict) and isinstance(merged.get(key), dict) else value
+    return merged
+
+
+def load_values(chart_dir: str, values_file: str | None = None) -> dict[str, Any]:
+    """
+    A chart's values as Helm renders them: `values.yaml`, with `values_file` (e.g. `values-prod.yaml`) merged over it.
+    Args:
+        chart_dir (str): The chart directory, e.g. `app1-deployment`.
+        values_file (str, optional): Overrides, relative to `chart_dir` or a path.
+    Returns:
+        dict: The merged values.
+    """
+    with open(os.path.join(chart_dir, "values.yaml"), encoding="utf-8") as f:
+        values = yaml.safe_load(f) or {}
+    if values_file:
+        path = values_file if os.path.exists(values_file) else os.path.join(chart_dir, values_file)
+        with open(path, encoding="utf-8") as f:
+            values = _merge(values, yaml.safe_load(f) or {})
+    return values
+
+
+def hpa_config(values: dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> HpaConfig:
+    """
+    The HPA rendered from a chart's values by `templates/hpa.yaml`.
+    Args:
+        values (dict): The chart's values.
+        tolerance (float, optional): The controller's tolerance (a cluster setting, not part of the chart).
+    Raises:
+        ValueError: If the chart has no enabled HPA.
+    Returns:
+        HpaConfig: `hpa.minReplicas`, `maxReplicas`, `targetCPUUtilizationPercentage` and `behavior`
+            (Kubernetes defaults for what it leaves out).
+    """
+    hpa = values.get("hpa") or {}
+    if not hpa.get("enabled"):
+        raise ValueError("the chart has no enabled `hpa`")
+    overrides = hpa.get("behavior") or {}
+    behavior = {direction: {**defaults, **overrides.get(direction, {})} for direction, defaults in DEFAULT_BEHAVIOR.items()}
+    return HpaConfig(
+        min_replicas=int(hpa.get("minReplicas", 1)),
+        max_replicas=int(hpa["maxReplicas"]),
+        target_utilization=float(hpa["targetCPUUtilizationPercentage"]),
+        tolerance=tolerance,
+        behavior=behavior,
+    )
+
+
+def _counter_rate(timestamps: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Per-second rate of a counter between samples (a drop is a restart: the counter started again from 0)."""
+    increase = np.diff(values)
+    increase = np.where(increase < 0, values[1:], increase)
+    return np.concatenate([[0.0], increase / np.diff(timestamps)])
+
+
+def load_prometheus(path: str) -> Series:
+    """
+    A Prometheus range query result (`/api/v1/query_range` JSON), e.g. of
+    `sum(rate(process_cpu_seconds_total{job="app1-service"}[1m]))`. Every series is summed per timestamp;
+    raw counters (`__name__` ending in `_total`, e.g. `process_cpu_seconds_total` per pod) are turned into rates first.
+    """
+    with open(path, encoding="utf-8") as f:
+        result = json.load(f)["data"]["result"]
+    timestamps, values = [], []
+    for series in result:
+        samples = np.array(series["values"], dtype=float)
+        if not len(samples):
+            continue
+        series_values = samples[:, 1]
+        if series["metric"].get("__name__", "").endswith("_total"):
+            series_values = _counter_rate(samples[:, 0], series_values)
+        timestamps.append(samples[:, 0])
+        values.append(series_values)
+    if not timestamps:
+        return Series(np.zeros(0), np.zeros(0))
+    unique, index = np.unique(np.concatenate(timestamps), return_inverse=True)
+    cpu_cores = np.zeros(len(unique))
+    np.add.at(cpu_cores, index, np.concatenate(values))
+    return Series(unique, cpu_cores)
+
+
+def load_load_run(path: str) -> Series:
+    """
+    The JSON lines `python -m benchmarks.bench_workload_mix` prints: every interval's `cpu_seconds` (over all profiles)
+    divided by its `elapsed_s` is the CPU app1 spent on the replayed mix.
+    """
+    timestamps, cpu_cores, now = [], [], 0.0
+    with open(path, encoding="utf-8") as f:
+        for line in filter(None, (line.strip() for line in f)):
+            report = json.loads(line)
+            elapsed = report["elapsed_s"]
+            cpu_seconds = sum(value["cpu_seconds"] for value in report.values() if isinstance(value, dict))
+            timestamps.append(now)
+            cpu_cores.append(cpu_seconds / elapsed if elapsed else 0.0)
+            now += elapsed
+    return Series(np.array(timestamps), np.array(cpu_cores))
+
+
+def load_csv(path: str) -> Series:
+    """A CSV with `timestamp` (Unix seconds) and `cpu_cores` columns."""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    timestamps = np.array([float(row["timestamp"]) for row in rows])
+    order = np.argsort(timestamps, kind="stable")
+    return Series(timestamps[order], np.array([float(row["cpu_cores"]) for row in rows])[order])
+
+
+def load_series(path: str) -> Series:
+    """
+    A recorded CPU demand, by file type: `.csv`, `.jsonl` (a load run) or `.json` (a Prometheus export).
+    Raises:
+        ValueError: For any other file type.
+    """
+    if path.endswith(".csv"):
+        return load_csv(path)
+    if path.endswith(".jsonl"):
+        return load_load_run(path)
+    if path.endswith(".json"):
+        return load_prometheus(path)
+    raise ValueError(f"expected a .csv, .jsonl (load run) or .json (Prometheus export) file, got {path!r}")
@@ -0,0 +1,332 @@
+import itertools
+import math
+from typing import Any, NamedTuple
+
+import numpy as np
+
+# * kube-controller-manager `--horizontal-pod-autoscaler-sync-period` / `--horizontal-pod-autoscaler-tolerance` defaults
+SYNC_PERIOD_SECONDS = 15.0
+DEFAULT_TOLERANCE = 0.1
+# * `autoscaling/v2` `behavior` defaults, used for whatever the chart's `hpa.behavior` leaves out
+DEFAULT_BEHAVIOR: dict[str, dict[str, Any]] = {
+    "scaleUp": {
+        "stabilizationWindowSeconds": 0,
+        "selectPolicy": "Max",
+        "policies": [
+            {"type": "Percent", "value": 100, "periodSeconds": 15},
+            {"type": "Pods", "value": 4, "periodSeconds": 15},
+        ],
+    },
+    "scaleDown": {
+        "stabilizationWindowSeconds": 300,
+        "selectPolicy": "Max",
+        "policies": [{"type": "Percent", "value": 100, "periodSeconds": 15}],
+    },
+}
+
+
+class HpaConfig(NamedTuple):
+    """
+    One HPA configuration, as rendered from a chart's `hpa` values.
+
+    Attributes:
+        min_replicas (int): `minReplicas`.
+        max_replicas (int): `maxReplicas`.
+        target_utilization (float): `targetCPUUtilizationPercentage`, in percent of the pods' CPU request.
+        tolerance (float): Relative distance from the target within which the HPA doesn't scale.
+        behavior (dict): `behavior` with the Kubernetes defaults filled in.
+    """
+
+    min_replicas: int
+    max_replicas: int
+    target_utilization: float
+    tolerance: float = DEFAULT_TOLERANCE
+    behavior: dict[str, dict[str, Any]] = DEFAULT_BEHAVIOR
+
+    def window(self, direction: str) -> float:
+        """`stabilizationWindowSeconds` of `scaleUp` or `scaleDown`."""
+        return float(self.behavior[direction]["stabilizationWindowSeconds"])
+
+
+class PodModel(NamedTuple):
+    """
+    What one replica can do.
+
+    Attributes:
+        cpu_request (float): CPU request in cores, utilization is measured against it.
+        cpu_limit (float): CPU limit in cores, the most one pod serves.
+        startup_seconds (float): From scale-up to the new pod being ready (image pull, warm-up, readiness probe).
+    """
+
+    cpu_request: float = 0.1
+    cpu_limit: float = 0.5
+    startup_seconds: float = 30.0
+
+
+class HpaGrid(NamedTuple):
+    """
+    Configurations replayed side by side, one array element each (`behavior` policies are shared by all of them).
+
+    Attributes:
+        min_replicas (np.ndarray): int.
+        max_replicas (np.ndarray): int.
+        target_utilization (np.ndarray): Percent.
+        tolerance (np.ndarray): Fraction.
+        up_window (np.ndarray): `scaleUp.stabilizationWindowSeconds`.
+        down_window (np.ndarray): `scaleDown.stabilizationWindowSeconds`.
+        behavior (dict): The shared `behavior` (its policies).
+    """
+
+    min_replicas: np.ndarray
+    max_replicas: np.ndarray
+    target_utilization: np.ndarray
+    tolerance: np.ndarray
+    up_window: np.ndarray
+    down_window: np.ndarray
+    behavior: dict[str, dict[str, Any]]
+
+    @classmethod
+    def from_configs(cls, configs: list[HpaConfig]) -> "HpaGrid":
+        """One element per configuration, the policies of the first one."""
+        return cls(
+            min_replicas=np.array([c.min_replicas for c in configs]),
+            max_replicas=np.array([c.max_replicas for c in configs]),
+            target_utilization=np.array([c.target_utilization for c in configs], dtype=float),
+            tolerance=np.array([c.tolerance for c in configs], dtype=float),
+            up_window=np.array([c.window("scaleUp") for c in configs]),
+            down_window=np.array([c.window("scaleDown") for c in configs]),
+            behavior=configs[0].behavior,
+        )
+
+    @classmethod
+    def product(cls, base: HpaConfig, **values: list[float]) -> "HpaGrid":
+        """
+        Every combination of the given values, the others taken from `base`.
+        Args:
+            base (HpaConfig): Defaults for the fields not swept, and the policies.
+            **values: Lists of values by `HpaGrid` field name, e.g. `target_utilization=[40, 50, 60]`.
+        Raises:
+            ValueError: For a field that is not swept per configuration.
+        Returns:
+            HpaGrid: `prod(len(v) for v in values)` configurations.
+        """
+        defaults: dict[str, list[float]] = {
+            "min_replicas": [base.min_replicas],
+            "max_replicas": [base.max_replicas],
+            "target_utilization": [base.target_utilization],
+            "tolerance": [base.tolerance],
+            "up_window": [base.window("scaleUp")],
+            "down_window": [base.window("scaleDown")],
+        }
+        unknown = set(values) - set(defaults)
+        if unknown:
+            raise ValueError(f"cannot sweep {sorted(unknown)}, only {sorted(defaults)}")
+        axes = {name: values.get(name) or default for name, default in defaults.items()}
+        combos = np.array(list(itertools.product(*axes.values())), dtype=float)
+        columns = dict(zip(axes, combos.T))
+        return cls(
+            min_replicas=columns["min_replicas"].astype(int),
+            max_replicas=columns["max_replicas"].astype(int),
+            target_utilization=columns["target_utilization"],
+            tolerance=columns["tolerance"],
+            up_window=columns["up_window"],
+            down_window=columns["down_window"],
+            behavior=base.behavior,
+        )
+
+    @property
+    def size(self) -> int:
+        """Number of configurations."""
+        return len(self.min_replicas)
+
+    def chunk(self, start: int, stop: int) -> "HpaGrid":
+        """The configurations `start:stop`."""
+        return self._replace(**{name: getattr(self, name)[start:stop] for name in self._fields[:-1]})
+
+    def configs(self) -> list[dict[str, float]]:
+        """Every configuration as a dict of plain numbers."""
+        names = self._fields[:-1]
+        return [{name: getattr(self, name)[i].item() for name in names} for i in range(self.size)]
+
+
+def _rate_limit(policies: dict[str, Any], period_start: list[np.ndarray], replicas: np.ndarray, scale_up: bool) -> np.ndarray:
+    """
+    The most replicas (`scale_up`) or fewest replicas a direction's policies allow, from the replicas at the start of
+    every policy's period. `selectPolicy: Max` picks the policy allowing the biggest change, `Min` the smallest.
+    """
+    select = policies.get("selectPolicy", "Max")
+    if select == "Disabled":
+        return replicas  # no change in this direction
+    limits = []
+    for policy, start in zip(policies["policies"], period_start):
+        if policy["type"] == "Percent":
+            factor = 1 + policy["value"] / 100 if scale_up else 1 - policy["value"] / 100
+            limits.append(np.ceil(start * factor) if scale_up else np.floor(start * factor))
+        else:
+            limits.append(start + policy["value"] if scale_up else start - policy["value"])
+    if not limits:
+        return np.full_like(replicas, np.inf if scale_up else -np.inf)
+    biggest_change = select == "Max"
+    return np.max(limits, axis=0) if biggest_change == scale_up else np.min(limits, axis=0)
+
+
+def _windows(window_steps: np.ndarray) -> list[tuple[int, np.ndarray]]:
+    """The distinct window lengths, shortest first, each with the mask of the configurations using it."""
+    return [(int(steps), window_steps == steps) for steps in np.unique(window_steps)]
+
+
+def _window_extreme(values: np.ndarray, end: int, windows: list[tuple[int, np.ndarray]], reduce: np.ufunc) -> np.ndarray:
+    """
+    `reduce` (`np.minimum` / `np.maximum`) of every column of the time-major `values` over its own window
+    of rows ending at row `end`. The distinct window lengths are reduced incrementally, so the cost is one pass
+    over the longest window whatever the number of configurations.
+    """
+    result = np.empty(values.shape[1])
+    extreme, covered = None, 0
+    for steps, mask in windows:
+        first, last = end - steps + 1, end - covered + 1
+        newer = reduce.reduce(values[first:last], axis=0)
+        extreme = newer if extreme is None else reduce(extreme, newer)
+        result[mask] = extreme[mask]
+        covered = steps
+    return result
+
+
+def simulate(
+    cpu_demand: np.ndarray,
+    grid: HpaGrid,
+    pod: PodModel = PodModel(),
+    sync_seconds: float = SYNC_PERIOD_SECONDS,
+    initial_replicas: np.ndarray | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Replay the HPA controller's CPU utilization algorithm for every configuration of `grid` at once
+    (NumPy arrays over the configurations, one Python iteration per sync period). Every sync period:
+
+    1. pods serve the demand plus what is queued, up to `ready x cpu_limit`, the rest stays queued (fluid model)
+    2. utilization = used CPU / (ready pods x request), not-yet-ready pods count as 0% when it suggests scaling up
+    3. within `tolerance` of the target the replicas stay, otherwise `ceil(replicas x utilization / target)`
+    4. stabilization: the lowest recommendation of the `scaleUp` window, the highest of the `scaleDown` window
+    5. `behavior` policies (from the replicas at the start of each policy's period) and `minReplicas` / `maxReplicas`
+
+    New pods become ready `pod.startup_seconds` after the scale-up, removed pods go at once.
+
+    Args:
+        cpu_demand (np.ndarray): CPU cores the traffic needs, one value per sync period.
+        grid (HpaGrid): The configurations.
+        pod (PodModel, optional): CPU request / limit and startup time of a replica.
+        sync_seconds (float, optional): The HPA sync period, also the time step. Defaults to 15.
+        initial_replicas (np.ndarray, optional): Replicas at the start. Defaults to `min_replicas`.
+    Returns:
+        dict: Per configuration (arrays of `len(grid)`): `replicas_mean`, `replicas_max`, `scale_events`,
+            `queue_delay_p99_ms` / `queue_delay_max_ms` (time to work off the queue at full capacity),
+            `saturated_fraction` (share of periods with work queued), `cpu_hours_requested` and
+            `cpu_hours_overprovisioned` (requested but unused CPU).
+    """
+    n, steps = grid.size, len(cpu_demand)
+    target = grid.target_utilization / 100
+    replicas = np.array(grid.min_replicas if initial_replicas is None else initial_replicas, dtype=float)
+    replicas = np.clip(replicas, grid.min_replicas, grid.max_replicas)
+
+    up_steps = np.maximum(1, np.ceil(grid.up_window / sync_seconds)).astype(int)
+    down_steps = np.maximum(1, np.ceil(grid.down_window / sync_seconds)).astype(int)
+    up_policies, down_policies = grid.behavior["scaleUp"], grid.behavior["scaleDown"]
+    policies = up_policies["policies"] + down_policies["policies"]
+    periods = [max(1, math.ceil(policy["periodSeconds"] / sync_seconds)) for policy in policies]
+    startup_steps = math.ceil(pod.startup_seconds / sync_seconds)
+
+    # * time-major, so every window is a contiguous block of rows; the first `lead` rows hold the initial replicas
+    lead = int(max(up_steps.max(), down_steps.max(), startup_steps + 1, *periods))
+    recommendations = np.empty((lead + steps, n))
+    history = np.empty((lead + steps, n))  # replicas in effect during each period
+    recommendations[:lead] = history[:lead] = replicas
+    up_windows, down_windows = _windows(up_steps), _windows(down_steps)
+
+    backlog = np.zeros(n)  # core-seconds of queued work
+    queue_delay = np.empty((n, steps), dtype=np.float32)
+    replicas_sum, replicas_max, scale_events = np.zeros(n), replicas.copy(), np.zeros(n, dtype=int)
+    requested, overprovisioned = np.zeros(n), np.zeros(n)
+
+    for t, demand in enumerate(cpu_demand):
+        now = lead + t
+        history[now] = replicas
+        oldest, newest = now - startup_steps, now + 1
+        ready = history[oldest:newest].min(axis=0)  # pods that have existed for the whole startup time
+        capacity = ready * pod.cpu_limit
+        work = backlog + demand * sync_seconds
+        served = np.minimum(work, capacity * sync_seconds)
+        backlog = work - served
+        used = served / sync_seconds
+        queue_delay[:, t] = np.divide(backlog, capacity, out=np.full(n, np.inf), where=capacity > 0)
+
+        ratio = np.divide(used, ready * pod.cpu_request * target, out=np.full(n, np.inf), where=ready > 0)
+        unready = (ratio > 1) & (replicas > ready)
+        ratio = np.where(unready, used / (replicas * pod.cpu_request * target), ratio)
+        counted = np.where(unready, replicas, ready)
+        recommendation = np.where(np.abs(ratio - 1) <= grid.tolerance, replicas, np.ceil(ratio * counted))
+        recommendation = np.where(unready & (ratio <= 1), replicas, recommendation)  # unready pods flip the direction
+
+        recommendations[now] = recommendation
+        up_recommendation = _window_extreme(recommendations, now, up_windows, np.minimum)
+        down_recommendation = _window_extreme(recommendations, now, down_windows, np.maximum)
+        stabilized = np.minimum(np.maximum(replicas, up_recommendation), down_recommendation)
+
+        starts = [history[now - period + 1] for period in periods]
+        up_count = len(up_policies["policies"])
+        up_limit = _rate_limit(up_policies, starts[:up_count], replicas, scale_up=True)
+        down_limit = _rate_limit(down_policies, starts[up_count:], replicas, scale_up=False)
+        highest = np.minimum(np.maximum(up_limit, replicas), grid.max_replicas)
+        lowest = np.maximum(np.minimum(down_limit, replicas), grid.min_replicas)
+        new_replicas = np.clip(stabilized, lowest, np.maximum(highest, lowest))
+
+        scale_events += new_replicas != replicas
+        replicas_sum += replicas
+        requested += replicas * pod.cpu_request * sync_seconds
+        overprovisioned += np.maximum(replicas * pod.cpu_request - used, 0) * sync_seconds
+        replicas = new_replicas
+        replicas_max = np.maximum(replicas_max, replicas)
+
+    return {
+        "replicas_mean": replicas_sum / max(steps, 1),
+        "replicas_max": replicas_max,
+        "scale_events": scale_events,
+        "queue_delay_p99_ms": np.percentile(queue_delay, 99, axis=1) * 1000 if steps else np.zeros(n),
+        "queue_delay_max_ms": queue_delay.max(axis=1, initial=0) * 1000,
+        "saturated_fraction": (queue_delay > 0).mean(axis=1) if steps else np.zeros(n),
+        "cpu_hours_requested": requested / 3600,
+        "cpu_hours_overprovisioned": overprovisioned / 3600,
+    }
+
+
+def sweep(
+    cpu_demand: np.ndarray,
+    grid: HpaGrid,
+    pod: PodModel = PodModel(),
+    sync_seconds: float = SYNC_PERIOD_SECONDS,
+    chunk_size: int = 1024,
+) -> list[dict[str, Any]]:
+    """
+    `simulate` every configuration of `grid`, `chunk_size` configurations at a time (bounds the memory of the
+    per-period queue delays), and return one row per configuration: its parameters and results.
+    """
+    rows = []
+    for start in range(0, grid.size, chunk_size):
+        chunk = grid.chunk(start, start + chunk_size)
+        results = simulate(cpu_demand, chunk, pod, sync_seconds)
+        for i, config in enumerate(chunk.configs()):
+            rows.append({**config, **{name: round(values[i].item(), 4) for name, values in results.items()}})
+    return rows
+
+
+def rank(rows: list[dict[str, Any]], slo_ms: float) -> list[dict[str, Any]]:
+    """
+    Order sweep rows: the configurations keeping the p99 queue delay within `slo_ms` first, fewest over-provisioned
+    CPU-hours first among them, then the others by p99 queue delay.
+    """
+    return sorted(
+        rows,
+        key=lambda row: (
+            row["queue_delay_p99_ms"] > slo_ms,
+            row["cpu_hours_overprovisioned"] if row["queue_delay_p99_ms"] <= slo_ms else row["queue_delay_p99_ms"],
+        ),
+    )
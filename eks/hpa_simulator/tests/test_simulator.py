@@ -0,0 +1,105 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from hpa_simulator.inputs import Series, hpa_config, load_series, load_values
+from hpa_simulator.simulator import HpaConfig, HpaGrid, PodModel, rank, simulate, sweep
+
+CHARTS = Path(__file__).resolve().parents[2]
+POD = PodModel(cpu_request=0.1, cpu_limit=0.5, startup_seconds=30)
+
+
+def grid(*configs: HpaConfig) -> HpaGrid:
+    """a grid of the given configurations"""
+    return HpaGrid.from_configs(list(configs))
+
+
+def test_scale_up_follows_policies_and_counts_unready_pods_as_idle() -> None:
+    """test a scale-up is limited by the default policies and the pods still starting damp the next recommendation"""
+    # * 0.5 cores at a 50% target of 100m pods needs 10 replicas
+    results = simulate(np.full(10, 0.5), grid(HpaConfig(1, 20, 50)), POD)
+
+    # * 1 -> 5 (max of +100% and +4 pods), then 10 while 4 pods are not ready yet (counted at 0%), then stable
+    assert results["replicas_max"][0] == 10
+    assert results["scale_events"][0] == 2
+
+
+def test_tolerance_and_scale_down_stabilization() -> None:
+    """test the tolerance keeps the replicas near the target and the scale-down window holds them after a drop"""
+    within = simulate(np.full(5, 2 * 0.1 * 0.5 * 1.08), grid(HpaConfig(2, 5, 50, 0.1), HpaConfig(2, 5, 50, 0.05)), POD)
+    assert list(within["scale_events"]) == [0, 1]
+
+    demand = np.concatenate([np.full(5, 0.5), np.full(40, 0.05)])
+    immediate = {**HpaConfig(1, 10, 50).behavior, "scaleDown": {**HpaConfig(1, 10, 50).behavior["scaleDown"]}}
+    immediate["scaleDown"]["stabilizationWindowSeconds"] = 0
+    configs = grid(HpaConfig(1, 10, 50), HpaConfig(1, 10, 50, behavior=immediate))
+    results = simulate(demand, configs, POD, initial_replicas=np.array([10, 10]))
+
+    # * 10 replicas until the last high recommendation leaves the 300 s (20 periods) window, or right after the drop
+    assert results["replicas_mean"] == pytest.approx([(25 * 10 + 20) / 45, (6 * 10 + 39) / 45])
+    assert results["cpu_hours_overprovisioned"][0] > results["cpu_hours_overprovisioned"][1]
+
+
+def test_queue_delay_when_demand_exceeds_max_replicas() -> None:
+    """test demand above what max replicas serve queues up: delay grows by a period per period"""
+    results = simulate(np.full(4, 1.0), grid(HpaConfig(1, 1, 50)), POD)
+
+    assert results["queue_delay_max_ms"][0] == pytest.approx(60_000)
+    assert results["saturated_fraction"][0] == 1.0
+
+
+def test_sweep_matches_single_runs_and_ranks_by_slo() -> None:
+    """test every configuration of a vectorised sweep replays exactly like simulating it on its own"""
+    rng = np.random.default_rng(7)
+    demand = np.clip(rng.normal(0.6, 0.3, 400), 0, None)
+    configs = HpaGrid.product(
+        HpaConfig(1, 5, 50), target_utilization=[40, 60, 80], min_replicas=[1, 2], down_window=[0, 60, 300], up_window=[0, 45]
+    )
+    rows = sweep(demand, configs, POD, chunk_size=7)
+    assert len(rows) == configs.size == 36
+
+    for row in rows[::5]:
+        behavior = {
+            "scaleUp": {**HpaConfig(1, 1, 1).behavior["scaleUp"], "stabilizationWindowSeconds": row["up_window"]},
+            "scaleDown": {**HpaConfig(1, 1, 1).behavior["scaleDown"], "stabilizationWindowSeconds": row["down_window"]},
+        }
+        config = HpaConfig(row["min_replicas"], row["max_replicas"], row["target_utilization"], row["tolerance"], behavior)
+        alone = simulate(demand, grid(config), POD)
+        assert row["replicas_mean"] == pytest.approx(alone["replicas_mean"][0], abs=1e-4)
+        assert row["scale_events"] == alone["scale_events"][0]
+
+    ranked = rank(rows, slo_ms=1000)
+    within = [row["queue_delay_p99_ms"] <= 1000 for row in ranked]
+    assert within == sorted(within, reverse=True)
+
+
+def test_chart_values_and_recorded_series(tmp_path: Path) -> None:
+    """test the hpa is read from merged chart values and demand from prometheus exports, load runs and csv files"""
+    config = hpa_config(load_values(str(CHARTS / "app1-deployment"), "values-prod.yaml"))
+    assert (config.min_replicas, config.max_replicas, config.target_utilization) == (1, 5, 50.0)
+    assert config.window("scaleDown") == 300 and config.window("scaleUp") == 0
+    custom = hpa_config({"hpa": {"enabled": True, "maxReplicas": 3, "targetCPUUtilizationPercentage": 70,
+                                 "behavior": {"scaleDown": {"stabilizationWindowSeconds": 60}}}})  # fmt: skip
+    assert custom.window("scaleDown") == 60 and custom.behavior["scaleDown"]["policies"]
+    with pytest.raises(ValueError):
+        hpa_config({"hpa": {"enabled": False}})
+
+    # * two pods' raw `process_cpu_seconds_total` counters, the second one restarted
+    export = {"data": {"result": [
+        {"metric": {"__name__": "process_cpu_seconds_total", "pod": "a"}, "values": [[0, "10"], [15, "13"], [30, "16"]]},
+        {"metric": {"__name__": "process_cpu_seconds_total", "pod": "b"}, "values": [[15, "100"], [30, "1.5"]]},
+    ]}}  # fmt: skip
+    (tmp_path / "cpu.json").write_text(json.dumps(export))
+    series = load_series(str(tmp_path / "cpu.json"))
+    assert list(series.timestamps) == [0, 15, 30]
+    assert list(series.cpu_cores) == pytest.approx([0, 0.2, 0.3])
+
+    run = [{"elapsed_s": 10, "api": {"cpu_seconds": 2.0}, "cpu": {"cpu_seconds": 3.0}}, {"elapsed_s": 10, "rps": 5.0}]
+    (tmp_path / "run.jsonl").write_text("\n".join(json.dumps(line) for line in run))
+    assert list(load_series(str(tmp_path / "run.jsonl")).cpu_cores) == [0.5, 0.0]
+
+    (tmp_path / "cpu.csv").write_text("timestamp,cpu_cores\n30,0.3\n0,0.1\n")
+    assert list(load_series(str(tmp_path / "cpu.csv")).resample(15)) == [0.1, 0.1, 0.3]
+    assert list(Series(np.array([0.0, 40.0]), np.array([1.0, 2.0])).resample(15)) == [1.0, 1.0, 1.0, 2.0]
@@ -0,0 +1,264 @@
+import glob
+import hashlib
+import json
+import mmap
+import os
+import re
+from collections import Counter
+from collections.abc import Iterator
+from typing import Any, NamedTuple
+
+# * `<service>_service.log`, its rotated archives `<service>_service.<date>_<time>_<us>.log` and with several
+# * uvicorn workers their own files, `<service>_service.worker-<pid>.log` (and `...worker-<pid>.<date>_<time>_<us>.log`)
+LOG_NAME = re.compile(r"^(?P<service>.+?)_service(?:\..+)?\.log$")
+# * the start of a record, text (`2025-06-18 15:56:26.623 | INFO ...`) or `LOG_FORMAT=json` (`{"text": "2025-...`),
+# * continuation lines (tracebacks) don't match - group 1 is the minute
+RECORD_START = re.compile(rb'^(?:\{"text": ")?(\d{4}-\d\d-\d\d \d\d:\d\d):', re.MULTILINE)
+# * the request and error lines of `<service>/middleware.py`, matched in the formatted text only (the JSON records
+# * repeat the message in `record.message`): `INCOMING PATH: <path>` and `Error occurred: <METHOD> <path>: <error>`
+# * (RPC errors, `Error occurred: RPC ...`, have no request line to count them against and are left out)
+TEXT_PATTERNS = (re.compile(rb" - INCOMING PATH: (/[^\r\n]*)"), re.compile(rb" - Error occurred: [A-Z]+ (/\S*?): "))
+JSON_PATTERNS = (
+    re.compile(rb' - INCOMING PATH: (/(?:[^\\"\n]|\\[^n])*)\\n"'),
+    re.compile(rb' - Error occurred: [A-Z]+ (/(?:[^\\" \n]|\\[^n])*?): '),
+)
+HEAD_BYTES = 1024  # hashed to recognise a file again (under a new name once rotated) or notice it was replaced
+MAX_SCAN_BYTES = 64 * 1024 * 1024  # per regex pass, bounds the matches held in memory at once
+LINEAR_SCAN_BYTES = 64 * 1024  # below this the end of a minute is searched line by line instead of bisected
+CHECKPOINT_VERSION = 1
+
+
+class Counts(NamedTuple):
+    """
+    Requests and errors of one path in one minute.
+
+    Attributes:
+        requests (int): `INCOMING PATH` lines.
+        errors (int): `Error occurred` lines (unhandled exceptions, answered with a 500).
+    """
+
+    requests: int
+    errors: int
+
+
+Key = tuple[str, str, str]  # service, minute (`YYYY-MM-DD HH:MM`, as logged), path
+
+
+def service_name(path: str) -> str | None:
+    """The service a log file belongs to (`app1` for `app1_service.log` and its archives), None for another file."""
+    match = LOG_NAME.match(os.path.basename(path))
+    return match.group("service") if match else None
+
+
+def discover(paths: list[str]) -> list[str]:
+    """
+    Find the service log files, rotated archives included.
+    Args:
+        paths (list[str]): Log files, or directories searched for `*_service*.log`.
+    Returns:
+        list[str]: The log files, sorted.
+    """
+    found: set[str] = set()
+    for path in paths:
+        candidates = glob.glob(os.path.join(glob.escape(path), "*_service*.log")) if os.path.isdir(path) else [path]
+        found.update(os.path.abspath(c) for c in candidates if os.path.isfile(c) and service_name(c))
+    return sorted(found)
+
+
+def minute_ranges(buffer: Any, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """
+    Split whole lines of a log into runs of records logged in the same minute, without reading most of them:
+    the end of a minute is bisected by byte offset, only the last `LINEAR_SCAN_BYTES` before it are scanned.
+    Assumes the records are in time order, as one logger writes them - a record out of order at the edge of
+    a minute (several workers appending to one file) can be counted in the neighbouring minute.
+    Args:
+        buffer: The log (an `mmap`, `bytes`, ...).
+        start (int): Offset of a line start.
+        end (int): Offset just after a newline.
+    Returns:
+        Iterator: `(minute, start, end)` runs covering `start` to `end`, except lines before the first record.
+    """
+    record = RECORD_START.search(buffer, start, end)
+    while record is not None:
+        minute, run_start = record.group(1), record.start()
+        low, high = record.end(), end  # the next minute starts after `low` and at or before `high`
+        while high - low > LINEAR_SCAN_BYTES:
+            middle = (low + high) // 2
+            probe = RECORD_START.search(buffer, middle, high)
+            if probe is None:  # a long continuation, e.g. a traceback, runs up to `high`
+                high = middle
+            elif probe.group(1) == minute:
+                low = probe.end()
+            else:
+                high = probe.start()
+        # * the first record at or after `high` is of another minute, or there is none
+        record = next((r for r in RECORD_START.finditer(buffer, low, end) if r.group(1) != minute), None)
+        run_end = record.start() if record is not None else end
+        yield minute, run_start, run_end
+
+
+def scan(buffer: Any, start: int, end: int) -> dict[tuple[str, str], list[int]]:
+    """
+    Count the request and error lines of a log between two line boundaries, per minute and path.
+    The work stays in the regex engine: a bisection per minute and two searches for a literal prefix, matches
+    are counted per distinct path. The format (text or JSON) is told by the first record of each minute.
+    Args:
+        buffer: The log (an `mmap`, `bytes`, ...).
+        start (int): Offset of a line start.
+        end (int): Offset just after a newline.
+    Returns:
+        dict: `[requests, errors]` per `(minute, path)`.
+    """
+    counts: dict[tuple[str, str], list[int]] = {}
+    for minute, run_start, run_end in minute_ranges(buffer, start, end):
+        json_format = buffer[run_start] == ord("{")  # indexing `mmap` / `bytes` gives the byte's value
+        patterns = JSON_PATTERNS if json_format else TEXT_PATTERNS
+        while run_start < run_end:
+            chunk_end = run_end
+            if chunk_end - run_start > MAX_SCAN_BYTES:
+                chunk_end = buffer.rfind(b"\n", run_start, run_start + MAX_SCAN_BYTES) + 1 or run_end
+            for index, pattern in enumerate(patterns):
+                for path, count in Counter(pattern.findall(buffer, run_start, chunk_end)).items():
+                    counts.setdefault((minute.decode("ascii"), decode_path(path, json_format)), [0, 0])[index] += count
+            run_start = chunk_end
+    return counts
+
+
+def decode_path(path: bytes, json_format: bool) -> str:
+    """A path as logged, JSON escapes resolved for `LOG_FORMAT=json`."""
+    if json_format and b"\\" in path:
+        return json.loads(b'"' + path + b'"')
+    return path.decode("utf-8", errors="replace")
+
+
+def file_id(stat: os.stat_result) -> str:
+    """Identifies a file across renames (the rotation renames the live file into an archive)."""
+    return f"{stat.st_dev}:{stat.st_ino}"
+
+
+class LogAnalyzer:
+    """
+    Incremental per-path / per-minute request and error counts of the service logs. Files are memory-mapped,
+    only the bytes after the checkpointed offset are scanned, up to the last complete line (a line still being
+    written is picked up by the next run). Files are tracked by device and inode plus a hash of their first
+    bytes, so a live log keeps its offset once rotated into an archive, and a truncated or replaced file is
+    scanned again from the start.
+
+    Attributes:
+        counts (dict[Key, Counts]): Totals so far per service, minute and path.
+        files (dict[str, dict]): Checkpoint per file id: its last `path`, the `offset` scanned up to and its `head` hash.
+        bytes_scanned (int): Bytes scanned by this process.
+    """
+
+    def __init__(self) -> None:
+        self.counts: dict[Key, Counts] = {}
+        self.files: dict[str, dict[str, Any]] = {}
+        self.bytes_scanned = 0
+
+    @classmethod
+    def load(cls, checkpoint: str) -> "LogAnalyzer":
+        """
+        Resume from a checkpoint file written by `save`.
+        Args:
+            checkpoint (str): Its path, a missing file starts from scratch.
+        Raises:
+            ValueError: If the file is not a checkpoint of this version.
+        Returns:
+            LogAnalyzer: The analyzer with the checkpointed offsets and totals.
+        """
+        analyzer = cls()
+        if not os.path.exists(checkpoint):
+            return analyzer
+        with open(checkpoint, encoding="utf-8") as f:
+            state = json.load(f)
+        if not isinstance(state, dict) or state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"{checkpoint} is not a version {CHECKPOINT_VERSION} log analytics checkpoint")
+        analyzer.files = state["files"]
+        analyzer.counts = {(s, m, p): Counts(r, e) for s, m, p, r, e in state["counts"]}
+        return analyzer
+
+    def save(self, checkpoint: str) -> None:
+        """Write the offsets and totals to `checkpoint`, atomically (through a temporary file renamed over it)."""
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "files": self.files,
+            "counts": [[*key, *counts] for key, counts in sorted(self.counts.items())],
+        }
+        temporary = f"{checkpoint}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(temporary, checkpoint)
+
+    def update(self, paths: list[str]) -> int:
+        """
+        Scan the new bytes of `paths` into `counts`. Checkpointed files no longer among them are forgotten
+        (deleted archives), so keep passing the same files or directories.
+        Args:
+            paths (list[str]): Log files, see `discover`.
+        Returns:
+            int: The bytes scanned.
+        """
+        before, seen, vanished = self.bytes_scanned, {}, False
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    stat = os.fstat(f.fileno())
+                    seen[file_id(stat)] = self._update_file(f, path, stat)
+            except FileNotFoundError:  # rotated away since `discover`: keep its offset for its archive name, next run
+                vanished = True
+        self.files = {**self.files, **seen} if vanished else seen
+        return self.bytes_scanned - before
+
+    def _update_file(self, f: Any, path: str, stat: os.stat_result) -> dict[str, Any]:
+        """Scan one open file from its checkpointed offset and return its new checkpoint entry."""
+        entry = self.files.get(file_id(stat), {"offset": 0, "head": ""})
+        offset = entry["offset"]
+        if stat.st_size == 0:
+            return {"path": path, "offset": 0, "head": ""}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if offset > len(buffer) or self._head(buffer, offset) != entry["head"]:
+                offset = 0  # truncated, or the inode now holds another file
+            end = buffer.rfind(b"\n", offset) + 1
+            if end > offset:
+                service = service_name(path) or "unknown"
+                for (minute, request_path), (requests, errors) in scan(buffer, offset, end).items():
+                    key = (service, minute, request_path)
+                    previous = self.counts.get(key, Counts(0, 0))
+                    self.counts[key] = Counts(previous.requests + requests, previous.errors + errors)
+                self.bytes_scanned += end - offset
+                offset = end
+            return {"path": path, "offset": offset, "head": self._head(buffer, offset)}
+
+    @staticmethod
+    def _head(buffer: Any, offset: int) -> str:
+        """Hash of the first bytes of a file that were scanned (at most `HEAD_BYTES`)."""
+        return hashlib.sha1(buffer[: min(offset, HEAD_BYTES)], usedforsecurity=False).hexdigest() if offset else ""
+
+    def rows(self, by: str = "minute") -> list[dict[str, Any]]:
+        """
+        The totals as summary rows.
+        Args:
+            by (str, optional): `minute` for a row per service, minute and path, `path` for a row per service and path
+                (with its first and last minute). Defaults to "minute".
+        Raises:
+            ValueError: For another `by`.
+        Returns:
+            list[dict]: Rows with `requests`, `errors` and `error_rate` (errors per request line, None without any).
+        """
+        if by not in ("minute", "path"):
+            raise ValueError(f"unknown grouping {by!r}, expected `minute` or `path`")
+        columns = ("service", "minute", "path") if by == "minute" else ("service", "path")
+        totals: dict[tuple[str, ...], list[Any]] = {}
+        for (service, minute, path), counts in self.counts.items():
+            total = totals.setdefault((service, minute, path) if by == "minute" else (service, path), [0, 0, minute, minute])
+            total[0] += counts.requests
+            total[1] += counts.errors
+            total[2], total[3] = min(total[2], minute), max(total[3], minute)
+        rows = []
+        for key, (requests, errors, first_minute, last_minute) in sorted(totals.items()):
+            row = dict(zip(columns, key))
+            if by == "path":
+                row.update(first_minute=first_minute, last_minute=last_minute)
+            error_rate = round(errors / requests, 4) if requests else None
+            rows.append({**row, "requests": requests, "errors": errors, "error_rate": error_rate})
+        return rows
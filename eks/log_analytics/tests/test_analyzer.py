@@ -0,0 +1,124 @@
+import json
+import os
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from log_analytics import analyzer
+from log_analytics.analyzer import LogAnalyzer, discover, scan
+
+
+def text_line(timestamp: str, message: str, level: str = "INFO") -> str:
+    """a record as the text format of loguru writes it"""
+    return f"{timestamp} | {level:<8} | app1.middleware:__call__:61 - {message}\n"
+
+
+def json_line(timestamp: str, message: str, level: str = "INFO") -> str:
+    """a record as `LOG_FORMAT=json` writes it, the message repeated in `record.message`"""
+    record = {"level": {"name": level}, "message": message, "time": {"repr": f"{timestamp}000+00:00"}}
+    return json.dumps({"text": text_line(timestamp, message, level), "record": record}) + "\n"
+
+
+def requests_log(line: Callable[..., str] = text_line) -> str:
+    """two minutes of requests with an error, a traceback, a slow request and an rpc error"""
+    return "".join(
+        [
+            line("2026-10-18 13:35:01.100", "INCOMING PATH: /"),
+            line("2026-10-18 13:35:02.100", "INCOMING PATH: /burn"),
+            line("2026-10-18 13:35:02.300", "Error occurred: GET /burn: ValueError('boom')", "ERROR"),
+            "Traceback (most recent call last):\n  File \"app1/main.py\", line 1\nValueError: boom\n",
+            line("2026-10-18 13:35:59.900", "INCOMING PATH: /"),
+            line("2026-10-18 13:36:00.100", "SLOW REQUEST: GET / took 1.234s", "WARNING"),
+            line("2026-10-18 13:36:00.200", "Error occurred: RPC GET /: ValueError('boom')", "ERROR"),
+            line("2026-10-18 13:36:00.300", 'INCOMING PATH: /items/"a b"'),
+        ]
+    )
+
+
+@pytest.mark.parametrize("line", [text_line, json_line])
+def test_counts_requests_and_errors_per_minute_and_path(line: Callable[..., str]) -> None:
+    """test the request and error lines are counted per minute and path in both log formats, other lines ignored"""
+    log = requests_log(line).encode()
+    counts = scan(log, 0, len(log))
+
+    assert counts == {
+        ("2026-10-18 13:35", "/"): [2, 0],
+        ("2026-10-18 13:35", "/burn"): [1, 1],
+        ("2026-10-18 13:36", '/items/"a b"'): [1, 0],
+    }
+    crlf = log.replace(b"\n", b"\r\n")
+    assert scan(crlf, 0, len(crlf)) == counts
+
+
+def test_bisected_minutes_match_a_line_by_line_count(monkeypatch: pytest.MonkeyPatch) -> None:
+    """test the minute boundaries found by bisection cut the log where the minute changes, tracebacks included"""
+    monkeypatch.setattr(analyzer, "LINEAR_SCAN_BYTES", 64)
+    lines: list[str] = []
+    expected: dict[tuple[str, str], list[int]] = {}
+    for second in range(0, 600, 7):
+        minute = f"2026-10-18 13:{second // 60:02d}"
+        path = f"/items/{second % 3}"
+        lines.append(text_line(f"{minute}:{second % 60:02d}.000", f"INCOMING PATH: {path}"))
+        if second % 5 == 0:
+            lines.append("Traceback (most recent call last):\n" * 20)
+        expected.setdefault((minute, path), [0, 0])[0] += 1
+    log = "".join(lines).encode()
+
+    assert scan(log, 0, len(log)) == expected
+
+
+def test_rows_by_minute_and_by_path(tmp_path: Path) -> None:
+    """test the summary rows carry the error rate, per minute or per path over all minutes"""
+    (tmp_path / "app1_service.log").write_text(requests_log())
+    logs = LogAnalyzer()
+    logs.update(discover([str(tmp_path)]))
+
+    assert logs.rows()[1] == {
+        "service": "app1", "minute": "2026-10-18 13:35", "path": "/burn", "requests": 1, "errors": 1, "error_rate": 1.0
+    }  # fmt: skip
+    assert logs.rows("path")[0] == {
+        "service": "app1", "path": "/", "first_minute": "2026-10-18 13:35", "last_minute": "2026-10-18 13:35",
+        "requests": 2, "errors": 0, "error_rate": 0.0,
+    }  # fmt: skip
+    with pytest.raises(ValueError):
+        logs.rows("hour")
+
+
+def test_checkpoint_only_scans_new_complete_lines(tmp_path: Path) -> None:
+    """test a re-run from the checkpoint scans the bytes appended since, up to the last complete line"""
+    log, checkpoint = tmp_path / "auth_service.log", str(tmp_path / "checkpoint.json")
+    first = text_line("2026-10-18 13:35:01.100", "INCOMING PATH: /login")
+    partial = text_line("2026-10-18 13:35:02.100", "INCOMING PATH: /login")
+    log.write_text(first + partial[:20])
+    logs = LogAnalyzer()
+    assert logs.update([str(log)]) == len(first)
+    logs.save(checkpoint)
+
+    with open(log, "a", encoding="utf-8") as f:
+        f.write(partial[20:])
+    resumed = LogAnalyzer.load(checkpoint)
+    assert resumed.update([str(log)]) == len(partial)
+    assert resumed.update([str(log)]) == 0
+    assert resumed.rows()[0]["requests"] == 2
+
+    (tmp_path / "other.json").write_text("{}")
+    with pytest.raises(ValueError):
+        LogAnalyzer.load(str(tmp_path / "other.json"))
+
+
+def test_rotated_archive_keeps_its_offset_and_replaced_file_is_rescanned(tmp_path: Path) -> None:
+    """test a log renamed into an archive isn't scanned again, a new or truncated live log is scanned from its start"""
+    live = tmp_path / "app2_service.log"
+    live.write_text(text_line("2026-10-18 13:35:01.100", "INCOMING PATH: /"))
+    logs = LogAnalyzer()
+    logs.update(discover([str(tmp_path)]))
+
+    os.rename(live, tmp_path / "app2_service.worker-7.2026-10-18_13-35-45_123456.log")
+    live.write_text(text_line("2026-10-18 13:36:01.100", "INCOMING PATH: /"))
+    assert logs.update(discover([str(tmp_path)])) == live.stat().st_size
+    assert [row["requests"] for row in logs.rows()] == [1, 1]
+
+    live.write_text(text_line("2026-10-18 13:37:01.100", "INCOMING PATH: /healthz"))  # truncated and rewritten
+    logs.update(discover([str(tmp_path)]))
+    assert [row["minute"] for row in logs.rows()] == ["2026-10-18 13:35", "2026-10-18 13:36", "2026-10-18 13:37"]
@@ -0,0 +1,13 @@
+import axios from "axios";
+
+// * W3C trace context: every request from the browser starts a new trace that auth, app1 and app2 continue,
+// * so the `traceparent` of a slow request (browser network tab) finds it in the trace collector
+const randomHex = (bytes: number): string =>
+  Array.from(crypto.getRandomValues(new Uint8Array(bytes)), (b) => b.toString(16).padStart(2, "0")).join("");
+
+export const newTraceparent = (): string => `00-${randomHex(16)}-${randomHex(8)}-01`;
+
+axios.interceptors.request.use((config) => {
+  config.headers.set("traceparent", newTraceparent());
+  return config;
+});
@@ -0,0 +1,38 @@
+"""
+Tiny trace collector stand-in for local runs, standard library only: receives the spans the services export
+with `TRACING_EXPORTER=http`, writes them as JSON lines and serves the recent traces grouped by trace id.
+
+Run from `eks/` (or through `docker-compose.yml`):
+    python -m trace_collector --port 4318 --output traces.jsonl
+    curl localhost:4318/v1/traces                 # recent traces, most recent first
+    curl localhost:4318/v1/traces/<trace_id>      # every span of one trace, across services
+"""
+
+import argparse
+import sys
+
+from .collector import TraceStore, serve
+
+
+def main() -> None:
+    """Entry point: run the collector until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on")  # nosec B104 - local stand-in
+    parser.add_argument("--port", type=int, default=4318, help="port to listen on")
+    parser.add_argument("--output", default="-", help="file the spans are appended to, `-` for stdout")
+    parser.add_argument("--max-traces", type=int, default=1000, help="traces kept in memory")
+    args = parser.parse_args()
+
+    output = sys.stdout if args.output == "-" else open(args.output, "a", encoding="utf-8")  # pylint: disable=R1732
+    server = serve(args.host, args.port, TraceStore(args.max_traces, output))
+    print(f"trace collector listening on {args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, TextIO
+
+
+class TraceStore:
+    """
+    The most recent traces, spans grouped by trace id, oldest trace evicted first.
+
+    Attributes:
+        max_traces (int): Traces kept.
+        output (TextIO | None): Where every received span is also written as a JSON line.
+    """
+
+    def __init__(self, max_traces: int = 1000, output: TextIO | None = None) -> None:
+        self.max_traces = max_traces
+        self.output = output
+        self._traces: OrderedDict[str, list[dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, spans: list[dict[str, Any]]) -> None:
+        """Store a batch of spans as sent by the services' exporters."""
+        with self._lock:
+            for span in spans:
+                self._traces.setdefault(span["trace_id"], []).append(span)
+                self._traces.move_to_end(span["trace_id"])
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+            if self.output is not None:
+                self.output.write("".join(json.dumps(span) + "\n" for span in spans))
+                self.output.flush()
+
+    def trace(self, trace_id: str) -> list[dict[str, Any]] | None:
+        """Return the spans of a trace in start order, None if unknown."""
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return sorted(spans, key=lambda span: span["start_time_unix_nano"]) if spans is not None else None
+
+    def summaries(self) -> list[dict[str, Any]]:
+        """Return one line per trace, most recent first: services, span count, duration and whether anything failed."""
+        with self._lock:
+            traces = list(self._traces.items())
+        summaries = []
+        for trace_id, spans in reversed(traces):
+            start = min(span["start_time_unix_nano"] for span in spans)
+            end = max(span["end_time_unix_nano"] for span in spans)
+            root = min(spans, key=lambda span: span["start_time_unix_nano"])
+            summaries.append(
+                {
+                    "trace_id": trace_id,
+                    "root": f"{root['service']} {root['name']}",
+                    "services": sorted({span["service"] for span in spans}),
+                    "spans": len(spans),
+                    "duration_ms": round((end - start) / 1e6, 3),
+                    "error": any(span["status"] == "error" for span in spans),
+                }
+            )
+        return summaries
+
+
+def build_handler(store: TraceStore) -> type[BaseHTTPRequestHandler]:
+    """
+    HTTP handler of the collector stand-in.
+
+    - `POST /v1/traces`: `{"spans": [...]}` from the services' `http` exporter
+    - `GET /v1/traces`: summary of the recent traces
+    - `GET /v1/traces/<trace_id>`: the spans of one trace, across services
+    - `GET /healthz`
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        """Request handler bound to `store`."""
+        def _reply(self, status: int, body: Any) -> None:
+            """Send `body` as a JSON response with `status`."""
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self) -> None:  # noqa: N802 - http.server naming
+            """Ingest a batch of spans."""
+            if self.path != "/v1/traces":
+                self._reply(404, {"detail": "Not Found"})
+                return
+            try:
+                spans = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))["spans"]
+            except (ValueError, KeyError, TypeError):
+                self._reply(400, {"detail": "expected {\"spans\": [...]}"})
+                return
+            store.add(spans)
+            self._reply(200, {"accepted": len(spans)})
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            """Serve the health check and trace queries."""
+            if self.path == "/healthz":
+                self._reply(200, {"status": "ok"})
+            elif self.path == "/v1/traces":
+                self._reply(200, store.summaries())
+            elif self.path.startswith("/v1/traces/"):
+                spans = store.trace(self.path.removeprefix("/v1/traces/"))
+                if spans is None:
+                    self._reply(404, {"detail": "Unknown trace"})
+                else:
+                    self._reply(200, spans)
+            else:
+                self._reply(404, {"detail": "Not Found"})
+
+        def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+            """Silence the per-request access log."""
+            # one line per export batch is noise, spans are written to `output`
+
+    return Handler
+
+
+def serve(host: str, port: int, store: TraceStore) -> ThreadingHTTPServer:
+    """Create the collector server (call `serve_forever` on it)."""
+    return ThreadingHTTPServer((host, port), build_handler(store))
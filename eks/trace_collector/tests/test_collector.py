@@ -0,0 +1,83 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from trace_collector.collector import TraceStore, serve
+
+
+def span(trace_id: str, name: str, start_ms: int, service: str = "app1", status: str = "ok") -> dict[str, Any]:
+    """a span as the services' exporters send it, lasting 10ms"""
+    return {
+        "trace_id": trace_id,
+        "span_id": f"{trace_id}-{name}",
+        "parent_span_id": None,
+        "name": name,
+        "kind": "server",
+        "service": service,
+        "start_time_unix_nano": start_ms * 1_000_000,
+        "end_time_unix_nano": (start_ms + 10) * 1_000_000,
+        "duration_ms": 10.0,
+        "status": status,
+        "attributes": {},
+    }
+
+
+def test_store_groups_spans_by_trace_and_evicts_the_oldest() -> None:
+    """test spans from several batches and services are grouped per trace, the least recently updated dropped first"""
+    output = io.StringIO()
+    store = TraceStore(max_traces=2, output=output)
+    store.add([span("a", "app2 GET /", 5, service="app2"), span("b", "GET /", 0)])
+    store.add([span("a", "GET /read_app2", 0)])
+    store.add([span("c", "GET /burn", 0, status="error")])
+
+    assert store.trace("b") is None
+    assert [s["name"] for s in store.trace("a") or []] == ["GET /read_app2", "app2 GET /"]
+    assert store.summaries() == [
+        {"trace_id": "c", "root": "app1 GET /burn", "services": ["app1"], "spans": 1, "duration_ms": 10.0, "error": True},
+        {
+            "trace_id": "a", "root": "app1 GET /read_app2", "services": ["app1", "app2"], "spans": 2,
+            "duration_ms": 15.0, "error": False,
+        },
+    ]  # fmt: skip
+    assert [json.loads(line)["trace_id"] for line in output.getvalue().splitlines()] == ["a", "b", "a", "c"]
+
+
+@pytest.fixture
+def collector() -> Iterator[str]:
+    """a collector on a free local port, yields its base url"""
+    server = serve("127.0.0.1", 0, TraceStore())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def request(url: str, body: bytes | None = None) -> tuple[int, Any]:
+    """status and json body of a GET (or a POST with `body`)"""
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=body), timeout=5) as response:  # nosec B310
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_ingest_and_query_over_http(collector: str) -> None:
+    """test a batch posted like the `http` exporter does is served back per trace and in the summary"""
+    body = json.dumps({"spans": [span("t1", "GET /", 0), span("t1", "app2 GET /", 2, service="app2")]}).encode()
+
+    assert request(collector + "/v1/traces", body) == (200, {"accepted": 2})
+    status, spans = request(collector + "/v1/traces/t1")
+    assert status == 200 and [s["service"] for s in spans] == ["app1", "app2"]
+    status, summaries = request(collector + "/v1/traces")
+    assert status == 200 and [(s["trace_id"], s["spans"]) for s in summaries] == [("t1", 2)]
+    assert request(collector + "/v1/traces/unknown") == (404, {"detail": "Unknown trace"})
+    assert request(collector + "/v1/traces", b'{"not spans": []}')[0] == 400
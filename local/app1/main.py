@@ -1,11 +1,55 @@
+import importlib.util
 import os
-from typing import Any
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 
 import httpx
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
-app = FastAPI()
 APP2_URL = os.getenv("APP2_URL", "http://fastapi-app2-service")
+# * connection pool settings for the shared app2 client
+APP2_MAX_CONNECTIONS = int(os.getenv("APP2_MAX_CONNECTIONS", 100))
+APP2_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("APP2_MAX_KEEPALIVE_CONNECTIONS", 20))
+APP2_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("APP2_KEEPALIVE_EXPIRY_SECONDS", 4.0))
+APP2_CONNECT_TIMEOUT_SECONDS = float(os.getenv("APP2_CONNECT_TIMEOUT_SECONDS", 2.0))
+APP2_READ_TIMEOUT_SECONDS = float(os.getenv("APP2_READ_TIMEOUT_SECONDS", 5.0))
+APP2_POOL_TIMEOUT_SECONDS = float(os.getenv("APP2_POOL_TIMEOUT_SECONDS", 2.0))
+APP2_HTTP2 = os.getenv("APP2_HTTP2", "false").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Create one pooled, keep-alive client for all app2 calls on startup and close it on shutdown.
+    Args:
+        app (FastAPI): The FastAPI application instance.
+    """
+    http2 = APP2_HTTP2
+    if http2 and importlib.util.find_spec("h2") is None:
+        print("APP2_HTTP2 requested but `h2` is not installed, falling back to HTTP/1.1")
+        http2 = False
+
+    app.state.app2_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=APP2_MAX_CONNECTIONS,
+            max_keepalive_connections=APP2_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=APP2_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(
+            connect=APP2_CONNECT_TIMEOUT_SECONDS,
+            read=APP2_READ_TIMEOUT_SECONDS,
+            write=APP2_READ_TIMEOUT_SECONDS,
+            pool=APP2_POOL_TIMEOUT_SECONDS,
+        ),
+        http2=http2,  # requires `h2`, only negotiated over TLS
+    )
+    try:
+        yield
+    finally:
+        await app.state.app2_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.get("/")
@@ -19,19 +63,21 @@ def read_root() -> dict[str, str]:
 
 
 @app.get("/read_app2")
-async def read_app2() -> dict[str, Any]:
+async def read_app2(request: Request) -> dict[str, Any]:
     """
     Endpoint to read data from another FastAPI app (app2).
     This endpoint makes an HTTP GET request to app2 and returns its response.
     It is used to demonstrate inter-service communication in a Kubernetes environment.
+    Args:
+        request (Request): The incoming request, used to reach the shared app2 client on `app.state`.
     Returns:
         dict: A dictionary containing a greeting message and the response from FastAPI App 2.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            # r = await client.get("http://fastapi-app2-service/")
-            r = await client.get(APP2_URL)
-            app2_data = r.json()
+        client: httpx.AsyncClient = request.app.state.app2_client
+        # r = await client.get("http://fastapi-app2-service/")
+        r = await client.get(APP2_URL)
+        app2_data = r.json()
     except Exception as e:
         app2_data = {"error": str(e)}
 